@@ -0,0 +1,239 @@
+from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form, Query, Header, Request, Path as PathParam
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+import asyncio
+import logging
+
+from ....models.webhook import WebhookConfig
+from ....core.config import get_batch_max_documents, get_job_poll_interval_seconds, get_upload_chunk_size, get_max_upload_bytes
+from ....core.blob_store import get_blob_store
+from ....core.jobs import get_job_engine, job_handler, Job, QUEUED, RUNNING, SUCCEEDED, FAILED, JOB_STATES
+from ....core.storage import ingest_upload, UploadTooLargeError
+from ....core.serialization import dumps, loads, FastJSONResponse
+from ....core.metrics import label_request_mode
+from .parse import ParseOptions, run_parse_job, admitted_priority, STREAM_MEDIA_TYPES, _build_parse_options, _stream_format, _encode_event
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Batch documents run as their own job type so JOB_CONCURRENCY can give all
+# batches one shared budget (e.g. "batch_parse=2") next to interactive parses.
+BATCH_JOB_TYPE = "batch_parse"
+job_handler(BATCH_JOB_TYPE)(run_parse_job)
+
+# Per-document HTTP-style status codes, keyed by the exception name the job failed with
+_ERROR_STATUS_CODES = {
+    "DocumentNotFoundError": 404,
+    "ParseError": 422,
+    "UploadTooLargeError": 413,
+    "UnsupportedFileType": 400,
+    "ValidationError": 400,
+}
+
+# --- Submission --- #
+
+class BatchDocument(BaseModel):
+    document_url: str = Field(..., description="File ID from /api/v1/upload (file_...) or http(s) URL of the document.")
+    options: Optional[Dict[str, Any]] = Field(None, description="Per-document parse options, merged over the batch options.")
+
+class BatchParseRequest(BaseModel):
+    documents: List[BatchDocument] = Field(..., min_length=1, description="Documents to parse.")
+    options: Optional[Dict[str, Any]] = Field(None, description="Parse options applied to every document: `mode`, `ocr_enabled`, `pages`, `max_pages`.")
+    webhook: Optional[WebhookConfig] = Field(None, description="Sent a job-completion event for each document.")
+    priority: int = Field(0, description="Scheduling priority of the batch's documents.")
+
+class BatchResponse(BaseModel):
+    batch_id: str = Field(..., description="Poll /api/v1/parse_batch/{batch_id} or stream .../stream for results.")
+    job_ids: List[str] = Field(..., description="One parse job per document, in request order.")
+    message: str = Field(..., description="Confirmation message.")
+
+def _check_batch_size(count: int) -> None:
+    limit = get_batch_max_documents()
+    if count > limit:
+        raise HTTPException(status_code=413, detail=f"A batch holds at most {limit} documents ({count} given).")
+
+def _document_item(
+    document_url: str,
+    options: Dict[str, Any],
+    webhook: Optional[WebhookConfig],
+    source_filename: Optional[str] = None,
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Build one (payload, error) batch item. Invalid per-document options fail only that document."""
+    payload = {"document_url": document_url, "options": options, "webhook": webhook.model_dump() if webhook else None}
+    if source_filename:
+        payload["source_filename"] = source_filename
+    try:
+        ParseOptions(**options)
+    except ValidationError as e:
+        detail = "; ".join(error["msg"].removeprefix("Value error, ") for error in e.errors())
+        return payload, f"ValidationError: {detail}"
+    return payload, None
+
+async def _submit(items: List[Tuple[Dict[str, Any], Optional[str]]], priority: int, http_request: Request) -> BatchResponse:
+    # A batch costs one request token per document
+    priority = admitted_priority(http_request, priority, cost=len(items))
+    batch_id, jobs = await get_job_engine().submit_batch(BATCH_JOB_TYPE, items, priority=priority)
+    rejected = sum(1 for job in jobs if job.status == FAILED)
+    logger.info(f"Accepted batch {batch_id}: {len(jobs)} document(s), {rejected} rejected at submission")
+    return BatchResponse(
+        batch_id=batch_id,
+        job_ids=[job.job_id for job in jobs],
+        message=f"Batch of {len(jobs)} document(s) accepted.",
+    )
+
+@router.post(
+    "", # Actual route is /api/v1/parse_batch
+    response_model=BatchResponse,
+    summary="Parse many documents (file IDs or URLs)",
+    description="Queues one parse job per document under a single batch ID. Documents are scheduled across the "
+                "parse workers within the shared `batch_parse` concurrency budget; one bad document does not fail the batch.",
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Parsing"]
+)
+async def parse_batch(request: BatchParseRequest, http_request: Request):
+    _check_batch_size(len(request.documents))
+    batch_options = request.options or {}
+    label_request_mode(http_request, _build_parse_options(**batch_options).mode)
+    items = [
+        _document_item(document.document_url, {**batch_options, **(document.options or {})}, request.webhook)
+        for document in request.documents
+    ]
+    return await _submit(items, request.priority, http_request)
+
+@router.post(
+    "/upload", # Route is at /api/v1/parse_batch/upload
+    response_model=BatchResponse,
+    summary="Upload and parse many documents",
+    description="Stores every uploaded file in the blob store and queues one parse job per file under a single batch ID. "
+                "Files that are rejected (wrong type, too large) are reported as failed documents of the batch.",
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Parsing"]
+)
+async def parse_batch_upload(
+    files: List[UploadFile] = File(..., description="The document files (PDF) to parse."),
+    mode: str = Form("text_and_tables", description="Parsing mode applied to every file."),
+    ocr_enabled: bool = Form(False, description="Run OCR on pages without a usable text layer."),
+    pages: Optional[str] = Form(None, description="Pages to parse in every file, e.g. '1-3,10,20-'."),
+    max_pages: Optional[int] = Form(None, description="Parse at most this many of the selected pages per file."),
+    priority: int = Form(0, description="Scheduling priority of the batch's documents."),
+    *,
+    http_request: Request,
+):
+    _check_batch_size(len(files))
+    options = _build_parse_options(mode=mode, ocr_enabled=ocr_enabled, pages=pages, max_pages=max_pages)
+    label_request_mode(http_request, options.mode)
+    option_values = options.model_dump(exclude_none=True)
+
+    store = await run_in_threadpool(get_blob_store)
+    chunk_size, max_bytes = get_upload_chunk_size(), get_max_upload_bytes()
+    items = []
+    for file in files:
+        filename = file.filename or ""
+        if not filename.lower().endswith(".pdf"):
+            payload = {"document_url": "", "options": option_values, "source_filename": filename}
+            items.append((payload, "UnsupportedFileType: Only PDF is supported currently."))
+            continue
+        try:
+            record, _ = await ingest_upload(file, store, chunk_size, max_bytes)
+        except UploadTooLargeError as e:
+            payload = {"document_url": "", "options": option_values, "source_filename": filename}
+            items.append((payload, f"UploadTooLargeError: {e}"))
+            continue
+        items.append(_document_item(record.file_id, option_values, None, source_filename=filename))
+    return await _submit(items, priority, http_request)
+
+# --- Status and Results --- #
+
+def _status_code(job: Job) -> int:
+    if job.status == SUCCEEDED:
+        return 200
+    if job.status == FAILED:
+        return _ERROR_STATUS_CODES.get((job.error or "").partition(":")[0], 500)
+    return 202
+
+def _document_status(index: int, job: Job, include_result: bool) -> Dict[str, Any]:
+    document = {
+        "index": index,
+        "job_id": job.job_id,
+        "document_url": job.payload.get("document_url"),
+        "source_filename": job.payload.get("source_filename"),
+        "status": job.status,
+        "status_code": _status_code(job),
+        "progress": {"pages_done": job.pages_done, "pages_total": job.pages_total},
+    }
+    if job.status == FAILED:
+        document["error"] = job.error
+    if include_result and job.status == SUCCEEDED and job.result is not None:
+        document["result"] = loads(job.result)
+    return document
+
+def _batch_summary(batch_id: str, jobs: List[Job]) -> Dict[str, Any]:
+    counts = {state: 0 for state in JOB_STATES}
+    for job in jobs:
+        counts[job.status] += 1
+    if counts[QUEUED] + counts[RUNNING] == 0:
+        state = "completed"
+    elif counts[QUEUED] == len(jobs):
+        state = QUEUED
+    else:
+        state = RUNNING
+    return {"batch_id": batch_id, "status": state, "total": len(jobs), "counts": counts}
+
+async def _load_batch(batch_id: str, with_results: bool = False) -> List[Job]:
+    jobs = await run_in_threadpool(get_job_engine().store.list_batch, batch_id, with_results)
+    if not jobs:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found.")
+    return jobs
+
+@router.get("/{batch_id}") # Route is at /api/v1/parse_batch/{batch_id}
+async def get_batch_status(
+    batch_id: str = PathParam(..., title="The ID of the batch"),
+    include_results: bool = Query(False, description="Include the parse result of each finished document."),
+):
+    """
+    Returns the batch's overall state (queued, running or completed), counts per
+    job state, and one entry per document in request order with its own
+    `status`, HTTP-style `status_code` (200, 202 while pending, or the error's
+    code) and `error` or `result`.
+    """
+    jobs = await _load_batch(batch_id, with_results=include_results)
+    body = _batch_summary(batch_id, jobs)
+    body["documents"] = [_document_status(index, job, include_results) for index, job in enumerate(jobs)]
+    return FastJSONResponse(body)
+
+@router.get("/{batch_id}/stream") # Route is at /api/v1/parse_batch/{batch_id}/stream
+async def stream_batch(
+    batch_id: str = PathParam(..., title="The ID of the batch"),
+    stream: Optional[str] = Query(None, description="Streaming format: 'ndjson' (default) or 'sse'."),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    Streams one `document` event per document, with its result or error, in the
+    order documents finish (already finished ones first), then an `end` event
+    with the batch summary.
+    """
+    stream_format = _stream_format(stream, accept) or "ndjson"
+    await _load_batch(batch_id)
+    return StreamingResponse(_batch_events(batch_id, stream_format), media_type=STREAM_MEDIA_TYPES[stream_format])
+
+async def _batch_events(batch_id: str, stream_format: str) -> AsyncIterator[bytes]:
+    store = get_job_engine().store
+    poll_interval = get_job_poll_interval_seconds()
+    sent = set()
+    while True:
+        jobs = await run_in_threadpool(store.list_batch, batch_id)
+        for index, job in enumerate(jobs):
+            if job.job_id in sent or job.status not in (SUCCEEDED, FAILED):
+                continue
+            if job.status == SUCCEEDED:
+                # Results were left out of the listing; load each one as it is sent
+                job = await run_in_threadpool(store.get, job.job_id)
+            sent.add(job.job_id)
+            yield _encode_event(stream_format, "document", dumps(_document_status(index, job, include_result=True)))
+        if len(sent) == len(jobs):
+            yield _encode_event(stream_format, "end", dumps(_batch_summary(batch_id, jobs)))
+            return
+        await asyncio.sleep(poll_interval)
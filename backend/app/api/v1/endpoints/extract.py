@@ -1,8 +1,21 @@
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, status, Request, Depends, Header
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from typing import TYPE_CHECKING, Optional, Dict, Any
 import logging
 
+from ....core.documents import DocumentNotFoundError, ParseResultNotReadyError, document_fingerprint
+from ....models.webhook import WebhookConfig
+from ....core.jobs import job_handler, JobContext
+from ....core.parser import ParseError
+from ....core.admission import AdmissionRejected
+from .parse import (
+    open_parse_result, admit_sync_request, admitted_priority, submit_async_job, _too_busy, IDEMPOTENCY_KEY_DESCRIPTION
+)
+
+if TYPE_CHECKING:
+    from ....core.extractor import ExtractionPlan
+
 logger = logging.getLogger(__name__)
 
 sync_router = APIRouter()
@@ -15,6 +28,29 @@ async_router = APIRouter()
 class AsyncJobResponse(BaseModel):
     job_id: str = Field(..., description="The ID assigned to the asynchronous job.")
     message: str = Field(..., description="Confirmation message.")
+    deduplicated: bool = Field(False, description="True when the request matched an existing job, whose ID is returned instead of starting new work.")
+
+
+class ExtractOptions(BaseModel):
+    """Options accepted in `options`. Together with the schema they select the compiled extraction plan."""
+    model_config = ConfigDict(extra="forbid")
+
+    pages: Optional[str] = Field(None, description="Pages to search, e.g. '1-3,10'. Defaults to every parsed page.")
+    citations: bool = Field(False, description="Also return, per extracted field, the page and label it was found at.")
+
+def _build_plan(schema: Dict[str, Any], options: Optional[Dict[str, Any]]) -> "ExtractionPlan":
+    """Validate options and fetch (or compile) the plan for `schema`, turning errors into a 400 response."""
+    # Imported on first use, like the split classifier (the extractor pulls in NumPy through it)
+    from ....core.extractor import SchemaError, get_extraction_plan
+
+    try:
+        validated = ExtractOptions(**(options or {}))
+        return get_extraction_plan(schema, validated.model_dump())
+    except ValidationError as e:
+        detail = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid options: {detail}")
+    except SchemaError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid schema: {e}")
 
 
 # --- Synchronous Extract --- #
@@ -24,23 +60,51 @@ class ExtractRequest(BaseModel):
     schema_: Dict[str, Any] = Field(..., alias="schema", description="The extraction schema definition.")
     options: Optional[Dict[str, Any]] = Field(None, description="Extraction options.")
 
-# Placeholder - actual sync extract returns the extracted data
 class ExtractResponse(BaseModel):
     result: Optional[Any] = Field(None, description="Extracted data based on the schema.")
+    citations: Optional[Dict[str, Any]] = Field(None, description="Where each extracted field was found (with `options.citations`).")
+    usage: Optional[Dict[str, Any]] = Field(None, description="Usage statistics, e.g., page count.")
     message: str
 
 @sync_router.post(
     "/", # Route is at /api/v1/extract
-    response_model=ExtractResponse, # Placeholder response
+    response_model=ExtractResponse,
+    response_model_exclude_none=True,
     summary="Extract Data (Synchronous)",
-    description="(Placeholder) Extracts structured data synchronously based on a schema. Requires `document_url` (often a `jobid://`) and `schema`."
+    description="Extracts structured data synchronously based on a JSON Schema. Requires `document_url` (often a `jobid://`) and `schema`. "
+                "Each schema is compiled once into an extraction plan (cached) and run against an index of the document's labelled values and tables. "
+                "A `jobid://` reuses the stored result of that parse job without re-parsing.",
+    dependencies=[Depends(admit_sync_request)]
 )
 async def extract_data(request: ExtractRequest):
     logger.info(f"Received synchronous extract request for: {request.document_url}")
-    # --- Placeholder for actual sync extraction --- 
-    # TODO: Call sync extractor/Reducto
-    # --- End Placeholder ---
-    return ExtractResponse(result={"placeholder": "extracted data"}, message="Synchronous extract placeholder response.")
+    _build_plan(request.schema_, request.options)
+    try:
+        return await _run_extract(request, enforce_budget=True)
+    except AdmissionRejected as e:
+        raise _too_busy(e)
+    except DocumentNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ParseResultNotReadyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ParseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+async def _run_extract(request: ExtractRequest, enforce_budget: bool = False) -> ExtractResponse:
+    """Shared by the sync endpoint (which enforces the admission budget) and the extract_async job handler."""
+    from ....core.extractor import DocumentIndex
+
+    plan = _build_plan(request.schema_, request.options)
+    with await open_parse_result(request.document_url, enforce_budget=enforce_budget) as parsed:
+        page_numbers = plan.select_pages(parsed.page_numbers)
+        index = await run_in_threadpool(lambda: DocumentIndex.from_pages(parsed.pages(page_numbers)))
+    extracted = await run_in_threadpool(plan.run, index)
+    return ExtractResponse(
+        result=extracted.data,
+        citations=extracted.citations if (request.options or {}).get("citations") else None,
+        usage={"num_pages": len(page_numbers)},
+        message="Data extracted successfully."
+    )
 
 # --- Asynchronous Extract --- #
 
@@ -48,19 +112,41 @@ class AsyncExtractRequest(BaseModel):
     document_url: str = Field(..., description="URL or job ID (e.g., jobid://{parse_job_id}) of the parsed document.")
     schema_: Dict[str, Any] = Field(..., alias="schema", description="The extraction schema definition.")
     options: Optional[Dict[str, Any]] = Field(None, description="Extraction options.")
-    webhook: Optional[Dict[str, str]] = Field(None, description="Optional webhook configuration.", example={"mode": "svix"})
+    webhook: Optional[WebhookConfig] = Field(None, description="Where to POST the job-completion event, e.g. {\"mode\": \"direct\", \"url\": \"https://...\"}.")
+    priority: int = Field(0, description="Scheduling priority. Higher-priority jobs are started first.")
 
-@sync_router.post(
-    "/", # Path relative to the prefix defined in routes.py
+@async_router.post(
+    "/", # Route is at /api/v1/extract_async
     response_model=AsyncJobResponse,
     summary="Extract Data (Asynchronous)",
-    description="Initiates an asynchronous job to extract data based on a schema. Returns a job ID.",
+    description="Initiates an asynchronous job to extract data based on a schema. Returns a job ID. "
+                "A request identical to a job that is queued, running or recently succeeded returns that job instead "
+                "(`deduplicated`); send an `Idempotency-Key` header to make retries return the same job.",
     status_code=status.HTTP_202_ACCEPTED
 )
-async def extract_data_async(request: AsyncExtractRequest):
+async def extract_data_async(
+    request: AsyncExtractRequest,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", description=IDEMPOTENCY_KEY_DESCRIPTION),
+):
     logger.info(f"Received asynchronous extract request for: {request.document_url}")
-    # --- Placeholder for async triggering --- 
-    # TODO: Call async extractor/Reducto
-    dummy_job_id = f"async-extract-job-{abs(hash(request.document_url + str(request.schema_)))}"
-    # --- End Placeholder ---
-    return AsyncJobResponse(job_id=dummy_job_id, message="Asynchronous extract job accepted.") 
\ No newline at end of file
+    plan = _build_plan(request.schema_, request.options)
+    priority = admitted_priority(http_request, request.priority)
+    fingerprint = {
+        "document": document_fingerprint(request.document_url),
+        # The plan key covers the schema and the validated options
+        "plan": plan.key,
+        "webhook": request.webhook.model_dump() if request.webhook else None,
+    }
+    job, created = await submit_async_job(
+        http_request, "extract", request.model_dump(by_alias=True), fingerprint, priority, idempotency_key
+    )
+    if not created:
+        return AsyncJobResponse(job_id=job.job_id, message=f"Matching extract job already {job.status}.", deduplicated=True)
+    return AsyncJobResponse(job_id=job.job_id, message="Asynchronous extract job accepted.")
+
+@job_handler("extract")
+async def run_extract_job(ctx: JobContext) -> Dict[str, Any]:
+    """Job handler for extract_async."""
+    request = AsyncExtractRequest(**ctx.payload)
+    return (await _run_extract(request)).model_dump(exclude_none=True)
@@ -1,8 +1,19 @@
-from fastapi import APIRouter, Path
+from fastapi import APIRouter, HTTPException, Path
+from starlette.concurrency import run_in_threadpool
+
+from ....core.jobs import get_job_engine
+from ....core.serialization import FastJSONResponse
 
 router = APIRouter()
 
 @router.get("/{job_id}")
 async def get_job_status(job_id: str = Path(..., title="The ID of the job to get status for")):
-    # Placeholder for job status checking logic
-    return {"job_id": job_id, "status": "Placeholder Status"} 
\ No newline at end of file
+    """
+    Returns the state of an async job (queued, running, succeeded or failed),
+    its progress in pages, its timings, and its result or error once finished.
+    """
+    job = await run_in_threadpool(get_job_engine().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    # Job results can be large; encode them directly rather than via jsonable_encoder
+    return FastJSONResponse(job.to_status())
@@ -1,9 +1,35 @@
-from fastapi import APIRouter, HTTPException, status, Body, UploadFile, File, Form
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from fastapi import APIRouter, HTTPException, status, Body, UploadFile, File, Form, Query, Header, Request, Depends
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+from pathlib import Path
 import logging
 import sys
 
+from ....models.document import Table, Figure, Page, DocumentMetadata
+from ....models.webhook import WebhookConfig
+from ....core.config import get_upload_chunk_size, get_max_upload_bytes, get_ocr_engine_name
+from ....core.blob_store import get_blob_store, BlobRecord
+from ....core.documents import (
+    resolve_document, release_document, resolve_parse_job, document_fingerprint, is_remote_document, JOB_ID_SCHEME,
+)
+from ....core.result_store import StoredParseResult, get_result_store
+from ....core.jobs import get_job_engine, job_handler, JobContext, Job, IdempotencyKeyReused, request_fingerprint
+from ....core.storage import ingest_upload, UploadTooLargeError
+from ....core.parser import (
+    parse_document, read_document_info, iter_pages, select_pages, parse_page_spec, normalize_page_selection,
+    ParseError, PARSE_MODES, ProgressCallback, parser_version
+)
+from ....core.cache import get_parse_cache, make_cache_key
+from ....core.page_cache import get_page_cache, is_cacheable
+from ....core.ocr import ocr_unavailable_reason
+from ....core.serialization import dumps, loads, FastJSONResponse
+from ....core.metrics import CACHE_LOOKUPS, label_request_mode, stage_timer
+from ....core.admission import get_admission_controller, client_key, AdmissionRejected
+from ....core.search_queue import enqueue_pages, result_queued
+
 # Configure basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,35 +39,7 @@ sync_router = APIRouter()
 async_router = APIRouter()
 
 # --- Common Models (Used by both/or potentially shared) --- #
-
-class Table(BaseModel):
-    """Represents a table extracted from a page."""
-    bbox: Optional[List[float]] = Field(None, description="Bounding box of the table [x1, y1, x2, y2].")
-    data: List[List[Optional[str]]] = Field(..., description="Table data as a list of lists.")
-    page_number: int = Field(..., description="Page number where the table was found.")
-
-class Figure(BaseModel):
-    """Represents a figure/image extracted from a page."""
-    bbox: Optional[List[float]] = Field(None, description="Bounding box of the figure [x1, y1, x2, y2].")
-    caption: Optional[str] = Field(None, description="Caption associated with the figure.")
-    page_number: int = Field(..., description="Page number where the figure was found.")
-    # In a real scenario, might include image data (e.g., base64) or a link
-
-class Page(BaseModel):
-    """Represents content extracted from a single page."""
-    page_number: int = Field(..., description="The 1-based page number.")
-    text: str = Field(..., description="Extracted text content of the page.")
-    tables: List[Table] = Field(default_factory=list, description="List of tables extracted from the page.")
-    figures: List[Figure] = Field(default_factory=list, description="List of figures/images extracted from the page.")
-    metadata: Dict[str, Any] = Field(default_factory=dict, description="Page-specific metadata.")
-
-class DocumentMetadata(BaseModel):
-    """Represents metadata for the entire document."""
-    author: Optional[str] = Field(None, description="Document author.")
-    creation_date: Optional[str] = Field(None, description="Document creation date.")
-    modification_date: Optional[str] = Field(None, description="Document modification date.")
-    title: Optional[str] = Field(None, description="Document title.")
-    # Add other relevant metadata fields as needed
+# Page-level models live in app/models/document.py so core/parser.py can build them.
 
 # --- Synchronous Parse (File Upload Based) --- #
 
@@ -52,6 +50,106 @@ class ParseResponse(BaseModel):
     pages: List[Page] = Field(..., description="List of pages with their extracted content.")
     metadata: DocumentMetadata = Field(..., description="Extracted document-level metadata.")
     parsing_mode: str = Field(..., description="The mode used for parsing (e.g., 'text_and_tables').")
+    failed_pages: List[int] = Field(default_factory=list, description="Page numbers that could not be parsed. Their entries in `pages` carry an `error` in their metadata.")
+
+class ParseOptions(BaseModel):
+    """Parsing options shared by the synchronous endpoint and parse_async jobs."""
+    mode: str = Field("text_and_tables", description="Parsing mode: 'text', 'tables', 'text_and_tables' or 'full'.")
+    ocr_enabled: bool = Field(False, description="Run OCR on pages without a usable text layer (e.g. scanned pages).")
+    pages: Optional[str] = Field(None, description="Pages to parse, e.g. '1-3,10,20-'. Defaults to all pages.")
+    max_pages: Optional[int] = Field(None, ge=1, description="Parse at most this many of the selected pages.")
+
+    @field_validator("mode")
+    @classmethod
+    def _check_mode(cls, mode: str) -> str:
+        if mode not in PARSE_MODES:
+            raise ValueError(f"Invalid mode '{mode}'. Expected one of: {', '.join(PARSE_MODES)}.")
+        return mode
+
+    @field_validator("pages")
+    @classmethod
+    def _check_pages(cls, pages: Optional[str]) -> Optional[str]:
+        if pages is not None and pages.strip():
+            parse_page_spec(pages)
+            return pages
+        return None
+
+    def cache_key(self, content_hash: str) -> str:
+        page_selection = normalize_page_selection(self.pages, self.max_pages)
+        version = parser_version()
+        if self.ocr_enabled:
+            version += f"+ocr={get_ocr_engine_name()}"
+        return make_cache_key(content_hash, self.mode, self.ocr_enabled, version, page_selection)
+
+def _build_parse_options(**values: Any) -> ParseOptions:
+    """
+    Validate parse options, turning validation errors into a 400 response and
+    OCR requested from a server whose OCR engine cannot run into a 503.
+    """
+    try:
+        options = ParseOptions(**{key: value for key, value in values.items() if value is not None})
+    except ValidationError as e:
+        detail = "; ".join(error["msg"].removeprefix("Value error, ") for error in e.errors())
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    if options.ocr_enabled and (reason := ocr_unavailable_reason()):
+        raise HTTPException(status_code=503, detail=f"OCR is not available on this server: {reason}")
+    return options
+
+# --- Admission control --- #
+
+def _too_busy(e: AdmissionRejected) -> HTTPException:
+    """429 for a request over a client's rate or the pages-in-flight budget."""
+    logger.warning(f"Rejected request: {e}")
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": e.retry_after_header})
+
+async def admit_sync_request(request: Request) -> None:
+    """Dependency of the sync parse, split and extract routes: the per-client rate limit."""
+    try:
+        get_admission_controller().admit_sync(client_key(request))
+    except AdmissionRejected as e:
+        raise _too_busy(e)
+
+def admitted_priority(request: Request, priority: int, cost: float = 1.0) -> int:
+    """Priority for an async submission; lowered when the client or the server is over capacity."""
+    return get_admission_controller().async_priority(client_key(request), priority, cost)
+
+# --- Idempotent submission --- #
+
+IDEMPOTENCY_KEY_DESCRIPTION = (
+    "Optional client-chosen key for this submission. Retries with the same key return the same job; "
+    "reusing it for a different request is rejected with 422."
+)
+
+async def submit_async_job(
+    http_request: Request,
+    job_type: str,
+    payload: Dict[str, Any],
+    fingerprint: Dict[str, Any],
+    priority: int,
+    idempotency_key: Optional[str] = None,
+) -> Tuple[Job, bool]:
+    """
+    Submit an async job, or attach to the matching one (see `JobEngine.submit_once`).
+
+    `fingerprint` holds what determines the job's result (document identity
+    and normalized options). A finished job is only reused when the
+    payload's document is content addressed: an http(s) document may have
+    changed since. Idempotency keys are scoped to the client and the job
+    type. Returns the job and whether it was created.
+    """
+    key = None
+    if idempotency_key:
+        key = request_fingerprint(job_type, {"client": client_key(http_request), "idempotency_key": idempotency_key})
+    try:
+        job, created = await get_job_engine().submit_once(
+            job_type, payload, request_fingerprint(job_type, fingerprint), priority=priority, idempotency_key=key,
+            reuse_finished=not is_remote_document(payload.get("document_url", "")),
+        )
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not created:
+        logger.info(f"Request matched existing {job_type} job {job.job_id} ({job.status})")
+    return job, created
 
 # Endpoint for synchronous parsing via file upload
 @sync_router.post( # Use sync_router
@@ -59,23 +157,38 @@ class ParseResponse(BaseModel):
     response_model=ParseResponse,
     summary="Parse a document synchronously (Upload)",
     description="Uploads a document (currently PDF) and extracts text, tables, and metadata synchronously. "
-                "This endpoint simulates the parsing process and returns structured data.",
-    tags=["Parsing"]
+                "Pages are parsed in parallel across a process pool and returned in order. "
+                "Pass `stream=ndjson` or `stream=sse` (or send `Accept: application/x-ndjson` / `text/event-stream`) "
+                "to receive the metadata first and then each page as soon as it is parsed. "
+                "Answers 429 with `Retry-After` when the client or the server is over capacity.",
+    tags=["Parsing"],
+    dependencies=[Depends(admit_sync_request)]
 )
 async def parse_document_upload(
     file: UploadFile = File(..., description="The document file (PDF) to parse."),
     mode: str = Form("text_and_tables", description="Parsing mode (e.g., 'text', 'tables', 'text_and_tables', 'full'). Determines what content is extracted."),
-    ocr_enabled: bool = Form(False, description="Whether to force OCR even for text-based PDFs.")
+    ocr_enabled: bool = Form(False, description="Run OCR on pages without a usable text layer (e.g. scanned pages)."),
+    pages: Optional[str] = Form(None, description="Pages to parse, e.g. '1-3,10,20-'. Defaults to all pages."),
+    max_pages: Optional[int] = Form(None, description="Parse at most this many of the selected pages."),
+    stream: Optional[str] = Query(None, description="Stream the result page by page: 'ndjson' or 'sse'."),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+    *,
+    http_request: Request,
 ) -> ParseResponse:
     """
     Parses the uploaded document file based on the specified mode.
 
     - **file**: The document to be processed.
     - **mode**: Specifies the extraction detail ('text', 'tables', 'text_and_tables', 'full').
-    - **ocr_enabled**: Flag to enable/disable OCR.
+    - **ocr_enabled**: OCR pages that have no usable text layer; pages with real text keep it.
+    - **pages** / **max_pages**: Optional page selection; other pages are never loaded.
+    - **stream**: Optional streaming format ('ndjson' or 'sse').
 
     Returns a detailed JSON structure containing the extracted content and metadata.
-    **(Currently returns a dummy response)**
+    Pages that fail to parse are listed in `failed_pages` rather than failing the request.
+
+    In streaming mode the response is a sequence of events: one `metadata` event,
+    one `page` event per page in order, and a final `end` event with `failed_pages`.
     """
     logger.info(f"Received synchronous parse request for uploaded file: {file.filename}")
 
@@ -85,49 +198,225 @@ async def parse_document_upload(
     if not file.filename.lower().endswith(".pdf"):
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file type. Only PDF is supported currently.")
 
-    # --- Dummy Response Implementation ---
-    dummy_page_1 = Page(
-        page_number=1,
-        text="This is the simulated extracted text from page 1. It contains various details.",
-        tables=[
-            Table(
-                bbox=[50.0, 100.0, 550.0, 200.0],
-                data=[
-                    ["Header A", "Header B", "Header C"],
-                    ["Row 1, Cell 1", "Row 1, Cell 2", "Row 1, Cell 3"],
-                    ["Row 2, Cell 1", "Row 2, Cell 2", "Row 2, Cell 3"],
-                ],
-                page_number=1
-            )
-        ],
-        figures=[],
-        metadata={"rotation": 0}
-    )
-
-    dummy_page_2 = Page(
-        page_number=2,
-        text="Page 2 contains further information but no tables or figures in this example.",
-        tables=[],
-        figures=[],
-        metadata={}
-    )
-
-    dummy_metadata = DocumentMetadata(
-        author="Simulated Author",
-        creation_date="2024-01-01T12:00:00Z",
-        modification_date="2024-01-02T15:30:00Z",
-        title="Dummy Document Title"
-    )
-
-    dummy_response = ParseResponse(
-        source_filename=file.filename,
-        page_count=2,
-        pages=[dummy_page_1, dummy_page_2],
-        metadata=dummy_metadata,
-        parsing_mode=mode
-    )
-
-    return dummy_response
+    options = _build_parse_options(mode=mode, ocr_enabled=ocr_enabled, pages=pages, max_pages=max_pages)
+    label_request_mode(http_request, options.mode)
+    stream_format = _stream_format(stream, accept)
+
+    # Store the upload in the blob store so the parser workers can read it from disk
+    store = await run_in_threadpool(get_blob_store)
+    try:
+        record, _ = await ingest_upload(file, store, get_upload_chunk_size(), get_max_upload_bytes())
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # The upload is only needed for this parse: its blob reference is dropped once the parse ends
+    release = BackgroundTask(store.release, record.file_id)
+    if stream_format is not None:
+        try:
+            response = await _streaming_parse_response(record, store.path_for(record.digest), options, file.filename, stream_format)
+        except BaseException:
+            await release()
+            raise
+        response.background = release
+        return response
+
+    try:
+        body, cache_hit = await _parse_stored_document(record, store.path_for(record.digest), options, enforce_budget=True)
+    except ParseError as e:
+        logger.error(f"Could not parse {file.filename} ({record.file_id}): {e}")
+        raise HTTPException(status_code=422, detail=str(e))
+    except AdmissionRejected as e:
+        raise _too_busy(e)
+    finally:
+        await release()
+
+    return _json_response(_with_source_filename(body, file.filename), cache_status="hit" if cache_hit else "miss")
+
+async def _parse_stored_document(
+    record: BlobRecord,
+    path: Path,
+    options: ParseOptions,
+    on_progress: Optional[ProgressCallback] = None,
+    enforce_budget: bool = False,
+) -> Tuple[bytes, bool]:
+    """
+    Parse a stored document, going through the parse-result cache.
+
+    Returns (body, cache_hit) where body is the ParseResponse JSON without
+    `source_filename` (see `_with_source_filename`). Shared by the sync
+    endpoint and the async parse job.
+
+    The parsed pages are held against the admission budget while the workers
+    run; with `enforce_budget` (sync requests) AdmissionRejected is raised
+    before any page is submitted if they do not fit.
+    """
+    # Identical content parsed with identical options is served from the result cache
+    cache = await run_in_threadpool(get_parse_cache)
+    cache_key = options.cache_key(record.digest)
+    cached_body = await run_in_threadpool(cache.get, cache_key)
+    CACHE_LOOKUPS.inc(outcome="miss" if cached_body is None else "hit")
+    if cached_body is not None:
+        logger.info(f"Serving cached parse result for {record.file_id}")
+        if not result_queued(cache_key):
+            # Queued once per process, in case its pages were lost before they were indexed
+            enqueue_pages(record.file_id, await run_in_threadpool(_page_texts, cached_body), cache_key)
+        return cached_body, True
+
+    # The lease charges the selected page count on parse_document's first progress report
+    with stage_timer("parse", options.mode), get_admission_controller().lease(enforce_budget, on_progress) as lease:
+        parsed = await parse_document(
+            path,
+            mode=options.mode,
+            ocr_enabled=options.ocr_enabled,
+            on_progress=lease.on_progress,
+            pages=options.pages,
+            max_pages=options.max_pages,
+        )
+    logger.info(f"Parsed {record.file_id}: {parsed.page_count} page(s), {len(parsed.failed_pages)} failed")
+    # Indexed for /search in the background
+    enqueue_pages(record.file_id, ((page.page_number, page.text) for page in parsed.pages), cache_key)
+
+    # Serialized straight from the parser's records in ParseResponse field order; the
+    # filename is not part of the cache key, so it is left out of the cached body
+    with stage_timer("serialize", options.mode):
+        body = dumps({
+            "page_count": parsed.page_count,
+            "pages": parsed.pages,
+            "metadata": parsed.metadata,
+            "parsing_mode": options.mode,
+            "failed_pages": parsed.failed_pages,
+        })
+    if not parsed.failed_pages and all(is_cacheable(page) for page in parsed.pages):
+        # Don't cache partial results; a failed page (or failed OCR) may succeed on retry
+        await run_in_threadpool(cache.put, cache_key, body)
+    return body, False
+
+@sync_router.get(
+    "/cache/stats", # Route is at /api/v1/parse/cache/stats
+    summary="Parse Cache Statistics",
+    description="Hit, miss and eviction counters plus current sizes of the parse-result cache tiers.",
+    tags=["Parsing"]
+)
+async def get_parse_cache_stats():
+    cache = await run_in_threadpool(get_parse_cache)
+    return FastJSONResponse(cache.stats())
+
+@sync_router.get(
+    "/cache/pages/stats", # Route is at /api/v1/parse/cache/pages/stats
+    summary="Page Cache Statistics",
+    description="Hit, miss and eviction counters plus current sizes of the page-fingerprint cache that lets "
+                "revised documents reuse their unchanged pages.",
+    tags=["Parsing"]
+)
+async def get_page_cache_stats():
+    cache = await run_in_threadpool(get_page_cache)
+    return FastJSONResponse(cache.stats())
+
+def _page_texts(body: bytes) -> List[Tuple[int, str]]:
+    """`(page_number, text)` of every page of a serialized ParseResponse."""
+    return [(page["page_number"], page["text"]) for page in loads(body)["pages"]]
+
+def _with_source_filename(body: bytes, source_filename: str) -> bytes:
+    """Splice `source_filename` into a ParseResponse body that was serialized without it."""
+    return b'{"source_filename":' + dumps(source_filename) + b"," + body[1:]
+
+def _json_response(body: bytes, cache_status: str) -> Response:
+    return FastJSONResponse(body, headers={"X-Cache": cache_status})
+
+# --- Streaming Parse (NDJSON / Server-Sent Events) --- #
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def _stream_format(stream: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """Pick the streaming format from the `stream` query parameter, falling back to the Accept header."""
+    if stream:
+        if stream not in STREAM_MEDIA_TYPES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid stream format '{stream}'. Expected 'ndjson' or 'sse'.")
+        return stream
+    for stream_format, media_type in STREAM_MEDIA_TYPES.items():
+        if accept and media_type in accept:
+            return stream_format
+    return None
+
+def _encode_event(stream_format: str, event: str, data: bytes) -> bytes:
+    """
+    Frame one event. `data` is a JSON object; for NDJSON a `type` field is
+    spliced in front so each line is self-describing.
+    """
+    if stream_format == "sse":
+        return b"event: " + event.encode("ascii") + b"\ndata: " + data + b"\n\n"
+    return b'{"type":"' + event.encode("ascii") + b'",' + data[1:] + b"\n"
+
+async def _streaming_parse_response(
+    record: BlobRecord,
+    path: Path,
+    options: ParseOptions,
+    source_filename: str,
+    stream_format: str,
+) -> StreamingResponse:
+    """
+    Stream a parse as events. Metadata is sent as soon as the document is
+    opened and pages follow in order as the workers finish them, so only a
+    bounded window of pages is held in memory. Streamed results are not
+    written to the parse cache, but a cache hit is replayed as events.
+    """
+    cache = await run_in_threadpool(get_parse_cache)
+    cache_key = options.cache_key(record.digest)
+    cached_body = await run_in_threadpool(cache.get, cache_key)
+
+    if cached_body is not None:
+        cached = loads(cached_body)
+        if not result_queued(cache_key):
+            enqueue_pages(record.file_id, ((page["page_number"], page["text"]) for page in cached["pages"]), cache_key)
+        header = {key: cached[key] for key in ("page_count", "metadata", "parsing_mode")}
+        pages = (dumps(page) for page in cached["pages"])
+        failed_pages = cached["failed_pages"]
+        events = _replay_events(source_filename, header, pages, failed_pages, stream_format)
+        cache_status = "hit"
+    else:
+        try:
+            info = await read_document_info(path)
+        except ParseError as e:
+            logger.error(f"Could not parse {source_filename} ({record.file_id}): {e}")
+            raise HTTPException(status_code=422, detail=str(e))
+        header = {"page_count": info.page_count, "metadata": info.metadata, "parsing_mode": options.mode}
+        page_indices = select_pages(info.page_count, options.pages, options.max_pages)
+        try:
+            # Checked now, while a 429 can still be sent; the pages are charged when streaming starts
+            get_admission_controller().check_pages(info.page_count if page_indices is None else len(page_indices))
+        except AdmissionRejected as e:
+            raise _too_busy(e)
+        events = _live_events(record.file_id, source_filename, header, path, info.page_count, page_indices, options, cache_key, stream_format)
+        cache_status = "miss"
+
+    return StreamingResponse(events, media_type=STREAM_MEDIA_TYPES[stream_format], headers={"X-Cache": cache_status})
+
+def _metadata_event(source_filename: str, header: Dict[str, Any], stream_format: str) -> bytes:
+    return _encode_event(stream_format, "metadata", dumps({"source_filename": source_filename, **header}))
+
+def _end_event(failed_pages: List[int], stream_format: str) -> bytes:
+    return _encode_event(stream_format, "end", dumps({"failed_pages": failed_pages}))
+
+async def _live_events(file_id, source_filename, header, path, page_count, page_indices, options, cache_key, stream_format) -> AsyncIterator[bytes]:
+    yield _metadata_event(source_filename, header, stream_format)
+    failed_pages = []
+    with get_admission_controller().lease(enforce=False) as lease:
+        lease.start(page_count if page_indices is None else len(page_indices))
+        async for page in iter_pages(path, page_count, mode=options.mode, ocr_enabled=options.ocr_enabled, page_indices=page_indices):
+            lease.advance(lease.done + 1)
+            if page.failed:
+                failed_pages.append(page.page_number)
+            # Queued page by page, so memory stays flat and a client leaving early still gets the sent pages indexed
+            enqueue_pages(file_id, [(page.page_number, page.text)])
+            yield _encode_event(stream_format, "page", dumps(page))
+    enqueue_pages(file_id, (), cache_key)
+    yield _end_event(failed_pages, stream_format)
+
+async def _replay_events(source_filename, header, pages, failed_pages, stream_format) -> AsyncIterator[bytes]:
+    yield _metadata_event(source_filename, header, stream_format)
+    for page in pages:
+        yield _encode_event(stream_format, "page", page)
+    yield _end_event(failed_pages, stream_format)
 
 
 # --- Asynchronous Parse (URL Based) --- #
@@ -136,25 +425,92 @@ async def parse_document_upload(
 class AsyncJobResponse(BaseModel):
     job_id: str = Field(..., description="The ID assigned to the asynchronous job.")
     message: str = Field(..., description="Confirmation message.")
+    deduplicated: bool = Field(False, description="True when the request matched an existing job, whose ID is returned instead of starting new work.")
 
 class AsyncParseRequest(BaseModel):
-    document_url: str = Field(..., description="URL or identifier of the document to parse.")
-    options: Optional[Dict[str, Any]] = Field(None, description="Parsing options.")
-    webhook: Optional[Dict[str, str]] = Field(None, description="Optional webhook configuration.", example={"mode": "svix"})
+    document_url: str = Field(..., description="File ID from /api/v1/upload (file_...) or http(s) URL of the document to parse.")
+    options: Optional[Dict[str, Any]] = Field(None, description="Parsing options: `mode`, `ocr_enabled`, `pages` and `max_pages`, as for the synchronous endpoint.")
+    webhook: Optional[WebhookConfig] = Field(None, description="Where to POST the job-completion event, e.g. {\"mode\": \"direct\", \"url\": \"https://...\"}.")
+    priority: int = Field(0, description="Scheduling priority. Higher-priority jobs are started first.")
 
 @async_router.post( # Use async_router
     "/", # Path relative to the prefix defined in routes.py
     response_model=AsyncJobResponse,
     summary="Parse Document Asynchronously (URL)",
-    description="Initiates an asynchronous job to parse a document specified by URL. Returns a job ID.",
+    description="Queues a job to parse a previously uploaded file or a document URL. Returns a job ID to poll at /api/v1/jobs/{job_id}. "
+                "Jobs submitted while the client or the server is over capacity are queued at a lower priority. "
+                "A request identical to a job that is queued, running or recently succeeded returns that job instead "
+                "(`deduplicated`); send an `Idempotency-Key` header to make retries return the same job.",
     status_code=status.HTTP_202_ACCEPTED,
     tags=["Parsing"]
 )
-async def parse_document_async(request: AsyncParseRequest):
+async def parse_document_async(
+    request: AsyncParseRequest,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", description=IDEMPOTENCY_KEY_DESCRIPTION),
+):
     logger.info(f"Received asynchronous parse request for: {request.document_url}")
-    # --- Placeholder for async triggering ---
-    dummy_job_id = f"async-parse-job-{abs(hash(request.document_url))}"
-    # --- End Placeholder ---
-    return AsyncJobResponse(job_id=dummy_job_id, message="Asynchronous parse job accepted.")
+    options = _build_parse_options(**(request.options or {}))
+    label_request_mode(http_request, options.mode)
+
+    priority = admitted_priority(http_request, request.priority)
+    fingerprint = {
+        # The parse cache key covers the document, the normalized options and the parser version
+        "parse": options.cache_key(document_fingerprint(request.document_url)),
+        "webhook": request.webhook.model_dump() if request.webhook else None,
+    }
+    job, created = await submit_async_job(http_request, "parse", request.model_dump(), fingerprint, priority, idempotency_key)
+    if not created:
+        return AsyncJobResponse(job_id=job.job_id, message=f"Matching parse job already {job.status}.", deduplicated=True)
+    return AsyncJobResponse(job_id=job.job_id, message="Asynchronous parse job accepted.")
+
+@job_handler("parse")
+async def run_parse_job(ctx: JobContext) -> str:
+    """Job handler for parse_async: resolves the document and parses it with progress reporting."""
+    request = AsyncParseRequest(**ctx.payload)
+    options = ParseOptions(**(request.options or {}))
+    record, path = await run_in_threadpool(resolve_document, request.document_url)
+    try:
+        body, _ = await _parse_stored_document(record, path, options, on_progress=ctx.report_progress)
+    finally:
+        await run_in_threadpool(release_document, request.document_url, record)
+    # Keep the result addressable as jobid://{job_id} for split and extract
+    await run_in_threadpool(_store_job_result, ctx.job_id, options.cache_key(record.digest), body)
+    # Batch uploads carry the original filename; otherwise the document URL stands in for it
+    source_filename = ctx.payload.get("source_filename") or request.document_url
+    return _with_source_filename(body, source_filename).decode("utf-8")
+
+
+# --- Stored Parse Results (jobid://) --- #
+
+def _store_job_result(job_id: str, cache_key: str, body: bytes) -> None:
+    store = get_result_store()
+    store.write_body(cache_key, body)
+    store.link_job(job_id, cache_key)
+
+async def open_parse_result(document_url: str, options: Optional[ParseOptions] = None, enforce_budget: bool = False) -> StoredParseResult:
+    """
+    Resolve `document_url` to a memory-mapped parse result for split and extract.
+
+    `jobid://{parse_job_id}` opens that job's stored result without parsing.
+    File IDs and URLs are parsed with `options` (through the parse cache) and
+    the result is stored, so later calls on the same document reuse it
+    (`enforce_budget` as for `_parse_stored_document`).
+    The caller must close the returned result.
+    """
+    if document_url.startswith(JOB_ID_SCHEME):
+        return await run_in_threadpool(resolve_parse_job, document_url)
 
-# Removed old synchronous parse endpoint and its models 
\ No newline at end of file
+    options = options or ParseOptions()
+    record, path = await run_in_threadpool(resolve_document, document_url)
+    try:
+        cache_key = options.cache_key(record.digest)
+        store = await run_in_threadpool(get_result_store)
+        result = await run_in_threadpool(store.open_key, cache_key)
+        if result is None:
+            body, _ = await _parse_stored_document(record, path, options, enforce_budget=enforce_budget)
+            await run_in_threadpool(store.write_body, cache_key, body)
+            result = await run_in_threadpool(store.open_key, cache_key)
+    finally:
+        await run_in_threadpool(release_document, document_url, record)
+    return result
@@ -0,0 +1,107 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Dict, List
+import logging
+import time
+
+from ....core.blob_store import get_blob_store
+from ....core.jobs import JobContext, get_job_engine, job_handler
+from ....core.parser import ParseError
+from ....core.search_queue import flush_pending, pending_pages
+from .parse import AsyncJobResponse, ParseOptions, _parse_stored_document
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+class SearchResult(BaseModel):
+    file_id: str = Field(..., description="File ID of the document the page belongs to.")
+    page_number: int = Field(..., description="Page number within the document (1-based).")
+    score: float = Field(..., description="BM25 relevance score.")
+    snippet: str = Field(..., description="Text around the first matching term.")
+
+class SearchResponse(BaseModel):
+    query: str
+    total_hits: int = Field(..., description="Number of pages matching at least one query term.")
+    results: List[SearchResult] = Field(..., description="Best-scoring pages, highest score first.")
+    took_ms: float
+
+@router.get(
+    "", # Route is at /api/v1/search
+    response_model=SearchResponse,
+    summary="Search parsed documents",
+    description="Full-text search over every parsed page, ranked with BM25. Pages are indexed in the background "
+                "once their parse completes and become searchable within about SEARCH_INDEX_FLUSH_SECONDS."
+)
+async def search_documents(
+    q: str = Query(..., min_length=1, description="Search terms; pages matching any of them are ranked."),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of results."),
+):
+    # Imported on first use: the index needs NumPy
+    from ....core.search_index import get_search_index, tokenize
+
+    if not tokenize(q):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Query has no searchable terms.")
+    start = time.perf_counter()
+    index = await run_in_threadpool(get_search_index)
+    total_hits, hits = await run_in_threadpool(index.search, q, limit)
+    took_ms = round((time.perf_counter() - start) * 1000, 2)
+    logger.info(f"Search for {q!r}: {total_hits} matching page(s) in {took_ms} ms")
+    return SearchResponse(
+        query=q,
+        total_hits=total_hits,
+        results=[SearchResult(file_id=hit.file_id, page_number=hit.page_number, score=hit.score, snippet=hit.snippet) for hit in hits],
+        took_ms=took_ms,
+    )
+
+@router.get("/stats") # Route is at /api/v1/search/stats
+async def get_search_stats():
+    """Size of the search index, plus pages parsed but not indexed yet."""
+    from ....core.search_index import get_search_index
+
+    index = await run_in_threadpool(get_search_index)
+    return {**await run_in_threadpool(index.stats), "pending_pages": pending_pages()}
+
+# --- Backfill --- #
+
+@router.post(
+    "/backfill", # Route is at /api/v1/search/backfill
+    response_model=AsyncJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Index stored documents missing from search",
+    description="Queues a job that parses (through the parse cache, with default options) every stored PDF with no "
+                "page in the search index, e.g. documents whose pages were still queued when a process died."
+)
+async def backfill_search_index():
+    job = await get_job_engine().submit("search_backfill", {})
+    return AsyncJobResponse(job_id=job.job_id, message="Search backfill job accepted.")
+
+@job_handler("search_backfill")
+async def run_search_backfill(ctx: JobContext) -> Dict[str, int]:
+    """Job handler for /search/backfill: one document at a time, so it never holds more than one blob reference."""
+    from ....core.search_index import get_search_index
+
+    store = await run_in_threadpool(get_blob_store)
+    index = await run_in_threadpool(get_search_index)
+    records = await run_in_threadpool(store.records)
+    missing = [record for record in records if record.extension.lower() == ".pdf" and not index.has_document(record.file_id)]
+    options = ParseOptions()
+    parsed = failed = 0
+    for done, record in enumerate(missing):
+        await ctx.report_progress(done, len(missing))
+        # Referenced while it is parsed, so a sweep cannot remove it; gone already if None
+        if await run_in_threadpool(store.add_reference, record.digest) is None:
+            continue
+        try:
+            await _parse_stored_document(record, store.path_for(record.digest), options)
+            parsed += 1
+        except ParseError as e:
+            logger.warning(f"Search backfill could not parse {record.file_id}: {e}")
+            failed += 1
+        finally:
+            await run_in_threadpool(store.release, record.file_id)
+    await ctx.report_progress(len(missing), len(missing))
+    pages = await flush_pending()
+    logger.info(f"Search backfill: {parsed} document(s) parsed, {failed} failed, {pages} page(s) indexed")
+    return {"documents": parsed, "failed": failed, "pages_indexed": pages}
@@ -1,8 +1,18 @@
-from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, status, Request, Depends, Header
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 from typing import List, Optional, Dict, Any
 import logging
 
+from ....core.documents import DocumentNotFoundError, ParseResultNotReadyError, document_fingerprint
+from ....models.webhook import WebhookConfig
+from ....core.jobs import job_handler, JobContext
+from ....core.parser import ParseError
+from ....core.admission import AdmissionRejected
+from .parse import (
+    open_parse_result, admit_sync_request, admitted_priority, submit_async_job, _too_busy, IDEMPOTENCY_KEY_DESCRIPTION
+)
+
 logger = logging.getLogger(__name__)
 
 # Define TWO separate routers
@@ -16,10 +26,29 @@ class SplitDescriptionItem(BaseModel):
     description: str
     partition_key: Optional[str] = None
 
+class SplitRules(BaseModel):
+    """Options accepted in `split_rules`."""
+    model_config = ConfigDict(extra="forbid")
+
+    contiguous: bool = Field(True, description="Assign pages in contiguous sections; pages without a clear match continue the current section.")
+    switch_penalty: float = Field(0.5, ge=0, description="Score cost of starting a new section (scores are scaled to 0-1 per section).")
+    min_score: float = Field(0.0, ge=0, le=1, description="Pages scoring no more than this for every section are left unassigned.")
+    allow_overlap: bool = Field(False, description="Also add a page to other sections scoring close to its assigned one.")
+    overlap_ratio: float = Field(0.8, gt=0, le=1, description="With allow_overlap, the fraction of the assigned section's score another section needs.")
+
+def _build_split_rules(split_rules: Optional[Dict[str, Any]]) -> SplitRules:
+    """Validate split rules, turning validation errors into a 400 response."""
+    try:
+        return SplitRules(**(split_rules or {}))
+    except ValidationError as e:
+        detail = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid split_rules: {detail}")
+
 # Reusing generic response model for async jobs from parse.py concept
 class AsyncJobResponse(BaseModel):
     job_id: str = Field(..., description="The ID assigned to the asynchronous job.")
     message: str = Field(..., description="Confirmation message.")
+    deduplicated: bool = Field(False, description="True when the request matched an existing job, whose ID is returned instead of starting new work.")
 
 # --- Synchronous Split --- #
 
@@ -30,7 +59,7 @@ class SyncSplitRequest(BaseModel):
     # For now, using document_url as per other sync endpoints.
     document_url: str = Field(..., description="URL or job ID (e.g., jobid://{parse_job_id}) of the document to split.")
     split_description: List[SplitDescriptionItem] = Field(..., description="Descriptions of how to categorize pages.")
-    split_rules: Optional[Dict[str, Any]] = Field(None, description="Optional rules to modify splitting behavior.")
+    split_rules: Optional[Dict[str, Any]] = Field(None, description="Optional rules to modify splitting behavior (see `SplitRules`).")
 
 class SyncSplitResponse(BaseModel):
     # Reducto examples show a 'result' field with 'section_mapping'
@@ -43,24 +72,40 @@ class SyncSplitResponse(BaseModel):
     "/", # Will be mounted at /api/v1/split
     response_model=SyncSplitResponse,
     summary="Split Document (Synchronous)",
-    description="(Placeholder) Splits a document synchronously based on descriptions and rules. Requires prior parsing. Returns results directly."
+    description="Splits a document synchronously: every page is scored against every split description (BM25) "
+                "and pages are assigned to contiguous sections, honouring `split_rules`. "
+                "`document_url` may be a `jobid://` of a finished parse job, whose stored result is reused without re-parsing. "
+                "Returns results directly.",
+    dependencies=[Depends(admit_sync_request)]
 )
 async def split_document(request: SyncSplitRequest):
     logger.info(f"Received synchronous split request for: {request.document_url}")
-    # --- Placeholder for actual sync split --- 
-    # TODO: Call sync splitter/Reducto equivalent
-    dummy_result = {
-        "section_mapping": {
-            f"{desc.name} {desc.partition_key or ''}".strip(): [1, 2]
-            for desc in request.split_description
-        }
-    }
-    dummy_usage = {"num_pages": 10} # Example usage
-    # --- End Placeholder ---
+    _build_split_rules(request.split_rules)
+    try:
+        return await _run_split(request, enforce_budget=True)
+    except AdmissionRejected as e:
+        raise _too_busy(e)
+    except DocumentNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ParseResultNotReadyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ParseError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+async def _run_split(request: SyncSplitRequest, enforce_budget: bool = False) -> SyncSplitResponse:
+    """Shared by the sync endpoint (which enforces the admission budget) and the split_async job handler."""
+    # Imported on first use: the classifier pulls in NumPy, which /upload-only workers never need
+    from ....core.splitter import SplitSection, page_texts, split_pages
+
+    rules = SplitRules(**(request.split_rules or {}))
+    sections = [SplitSection(item.name, item.description, item.partition_key or "") for item in request.split_description]
+    with await open_parse_result(request.document_url, enforce_budget=enforce_budget) as parsed:
+        page_numbers, texts = await run_in_threadpool(lambda: page_texts(parsed.pages()))
+    section_mapping = await run_in_threadpool(split_pages, page_numbers, texts, sections, **rules.model_dump())
     return SyncSplitResponse(
-        result=dummy_result,
-        usage=dummy_usage,
-        message="Synchronous split placeholder response."
+        result={"section_mapping": section_mapping},
+        usage={"num_pages": len(page_numbers)},
+        message="Document split successfully."
     )
 
 # --- Asynchronous Split --- #
@@ -68,35 +113,51 @@ async def split_document(request: SyncSplitRequest):
 class AsyncSplitRequest(BaseModel):
     document_url: str = Field(..., description="The URL or job ID (e.g., jobid://{parse_job_id}) of the document to split.")
     split_description: List[SplitDescriptionItem] = Field(..., description="Descriptions of how to categorize pages.")
-    split_rules: Optional[Dict[str, Any]] = Field(None, description="Optional rules to modify splitting behavior.")
-    webhook: Optional[Dict[str, str]] = Field(None, description="Optional webhook configuration (e.g., {'mode': 'svix'}).", example={"mode": "svix"})
+    split_rules: Optional[Dict[str, Any]] = Field(None, description="Optional rules to modify splitting behavior (see `SplitRules`).")
+    webhook: Optional[WebhookConfig] = Field(None, description="Where to POST the job-completion event, e.g. {\"mode\": \"direct\", \"url\": \"https://...\"}.")
+    priority: int = Field(0, description="Scheduling priority. Higher-priority jobs are started first.")
 
 # Use the async_router
 @async_router.post(
     "/", # Will be mounted at /api/v1/split_async
     response_model=AsyncJobResponse,
     summary="Split Document (Asynchronous)",
-    description="Initiates an asynchronous job to split a document based on provided descriptions and rules. Requires prior parsing. Returns a job ID for status polling.",
+    description="Initiates an asynchronous job to split a document based on provided descriptions and rules. Requires prior parsing. Returns a job ID for status polling. "
+                "A request identical to a job that is queued, running or recently succeeded returns that job instead "
+                "(`deduplicated`); send an `Idempotency-Key` header to make retries return the same job.",
     status_code=status.HTTP_202_ACCEPTED # Indicate the request is accepted for processing
 )
-async def split_document_async(request: AsyncSplitRequest):
+async def split_document_async(
+    request: AsyncSplitRequest,
+    http_request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", description=IDEMPOTENCY_KEY_DESCRIPTION),
+):
     logger.info(f"Received asynchronous split request for: {request.document_url}")
 
-    # --- Placeholder for async triggering --- 
-    # TODO: Call the actual async splitting service (e.g., Reducto's /split or equivalent)
-    #       using request.document_url, request.split_description, etc.
-    # TODO: Store the job ID and its status (e.g., in a database or cache)
-
-    # Generate a dummy job ID (consider a more robust method later)
-    dummy_job_id = f"async-split-job-{abs(hash(request.document_url + str(request.split_description)))}"
-
     # Log received data (for debugging during development)
     if request.split_rules:
         logger.info(f"Split rules: {request.split_rules}")
+    rules = _build_split_rules(request.split_rules)
     if request.webhook:
         logger.info(f"Webhook config: {request.webhook}")
 
+    priority = admitted_priority(http_request, request.priority)
+    fingerprint = {
+        "document": document_fingerprint(request.document_url),
+        "split_description": [item.model_dump() for item in request.split_description],
+        "split_rules": rules.model_dump(),
+        "webhook": request.webhook.model_dump() if request.webhook else None,
+    }
+    job, created = await submit_async_job(http_request, "split", request.model_dump(), fingerprint, priority, idempotency_key)
+    if not created:
+        return AsyncJobResponse(job_id=job.job_id, message=f"Matching split job already {job.status}.", deduplicated=True)
     return AsyncJobResponse(
-        job_id=dummy_job_id,
+        job_id=job.job_id,
         message="Asynchronous document splitting job accepted."
-    ) 
\ No newline at end of file
+    )
+
+@job_handler("split")
+async def run_split_job(ctx: JobContext) -> Dict[str, Any]:
+    """Job handler for split_async."""
+    request = AsyncSplitRequest(**ctx.payload)
+    return (await _run_split(request)).model_dump()
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, UploadFile, HTTPException, Header, Request, Path as PathParam
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Optional
 import logging
 import sys
-import uuid
-import os
-import shutil
-from pathlib import Path
+
+from ....core.config import get_upload_chunk_size, get_max_upload_bytes, get_upload_session_chunk_size
+from ....core.storage import ingest_upload, UploadTooLargeError
+from ....core.blob_store import get_blob_store, BlobRecord
+from ....core.upload_sessions import (
+    get_upload_sessions, write_chunk, finalize_session, UploadSession,
+    ChunkError, SessionStateError, ChecksumMismatchError, OPEN, COMPLETED, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE,
+)
 
 # Configure basic logging
 logging.basicConfig(level=logging.INFO)
@@ -12,17 +19,24 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def get_upload_dir() -> Path:
-    """Get the upload directory path, reading from environment variable at runtime."""
-    upload_dir_str = os.getenv("UPLOAD_DIR", "/app/uploads")
-    upload_dir = Path(upload_dir_str)
-    return upload_dir
+def _record_response(record: BlobRecord) -> dict:
+    return {
+        "file_id": record.file_id,
+        "sha256": record.digest,
+        "size_bytes": record.size_bytes,
+        "content_type": record.content_type,
+        "refcount": record.refcount,
+        "last_access": record.last_access,
+    }
 
 @router.post("") # Actual route is /api/v1/upload
 async def upload_document(file: UploadFile = File(...)):
     """
-    Receives a document upload, saves it with a unique ID,
-    and returns the generated file ID.
+    Receives a document upload and stores it in the content-addressed blob store.
+
+    The file is streamed to a temp file while its SHA-256 digest is computed. If a
+    blob with the same digest already exists, the temp copy is discarded and the
+    existing file ID is returned; otherwise the temp file is moved into place.
     """
     if not file.filename:
         logger.error("Received upload request with no filename.")
@@ -31,41 +45,167 @@ async def upload_document(file: UploadFile = File(...)):
     print(f"Received file upload: {file.filename}, Content-Type: {file.content_type}")
     logger.info(f"Received file upload request for {file.filename}")
 
-    # Get upload directory at runtime
-    upload_dir = get_upload_dir()
-    
-    # Ensure upload directory exists
-    upload_dir.mkdir(parents=True, exist_ok=True)
-
-    # Generate a unique file ID and construct the path
-    file_id = f"file_{uuid.uuid4()}"
-    # Preserve the original extension if available
-    file_extension = Path(file.filename).suffix
-    save_path = upload_dir / f"{file_id}{file_extension}"
+    # Get the blob store for the upload directory (read at runtime)
+    store = await run_in_threadpool(get_blob_store)
 
+    max_bytes = get_max_upload_bytes()
     try:
-        # Save the uploaded file
-        with save_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        logger.info(f"Successfully saved file {file.filename} to {save_path} with ID {file_id}")
-
+        # Stream the uploaded file to disk in chunks, hashing as we go
+        record, created = await ingest_upload(file, store, get_upload_chunk_size(), max_bytes)
+    except UploadTooLargeError as e:
+        logger.error(f"Rejected upload {file.filename}: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
-        logger.error(f"Error saving file {file.filename} (ID: {file_id}): {e}")
-        # Attempt to remove partially saved file if error occurs
-        if save_path.exists():
-            try:
-                os.remove(save_path)
-            except OSError as rm_err:
-                logger.error(f"Failed to remove partially saved file {save_path}: {rm_err}")
+        # Partially saved temp files are removed by stream_upload_to_path
+        logger.error(f"Error saving file {file.filename}: {e}")
         raise HTTPException(status_code=500, detail=f"Could not save uploaded file: {e}")
-    finally:
-        # file.file is the actual file-like object managed by UploadFile
-        # UploadFile's context manager handles closing, no need for await file.close() here
-        pass
 
-    # Return the unique file ID
+    if created:
+        logger.info(f"Stored new blob for {file.filename} with ID {record.file_id} ({record.size_bytes} bytes)")
+    else:
+        logger.info(f"Deduplicated upload {file.filename}: reusing {record.file_id} (refcount={record.refcount})")
+
+    # Return the content-derived file ID
     return {
-        "file_id": file_id,
+        "file_id": record.file_id,
         "original_filename": file.filename,
-        "content_type": file.content_type
-    } 
\ No newline at end of file
+        "content_type": file.content_type,
+        "sha256": record.digest,
+        "size_bytes": record.size_bytes,
+        "deduplicated": not created
+    }
+
+# --- Resumable uploads --- #
+
+class UploadSessionRequest(BaseModel):
+    filename: str = Field(..., min_length=1)
+    size_bytes: int = Field(..., gt=0)
+    sha256: str = Field(..., pattern=r"^[0-9a-fA-F]{64}$", description="SHA-256 of the whole file, checked on completion")
+    content_type: Optional[str] = "application/pdf"
+    chunk_size: Optional[int] = Field(None, ge=MIN_CHUNK_SIZE, le=MAX_CHUNK_SIZE)
+
+async def _get_session(session_id: str) -> UploadSession:
+    sessions = await run_in_threadpool(get_upload_sessions)
+    session = await run_in_threadpool(sessions.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Upload session {session_id} not found.")
+    return session
+
+async def _session_status(session: UploadSession) -> dict:
+    sessions = await run_in_threadpool(get_upload_sessions)
+    return session.to_status(await run_in_threadpool(sessions.received_chunks, session.session_id))
+
+@router.post("/sessions", status_code=201) # Route is at /api/v1/upload/sessions
+async def create_upload_session(request: UploadSessionRequest):
+    """
+    Starts a resumable upload. The file is then sent as numbered chunks of
+    `chunk_size` bytes (the last one may be shorter) with
+    `PUT /sessions/{session_id}/chunks/{index}`, in any order and in parallel,
+    and turned into a regular file ID with `POST /sessions/{session_id}/complete`.
+    """
+    max_bytes = get_max_upload_bytes()
+    if max_bytes and request.size_bytes > max_bytes:
+        raise HTTPException(status_code=413, detail=str(UploadTooLargeError(max_bytes)))
+    chunk_size = request.chunk_size or get_upload_session_chunk_size()
+    sessions = await run_in_threadpool(get_upload_sessions)
+    session = await run_in_threadpool(
+        sessions.create, request.filename, request.size_bytes, request.sha256, chunk_size, request.content_type
+    )
+    logger.info(f"Opened upload session {session.session_id} for {request.filename} "
+                f"({request.size_bytes} bytes in {session.chunk_count} chunk(s))")
+    return session.to_status([])
+
+@router.get("/sessions/{session_id}") # Route is at /api/v1/upload/sessions/{session_id}
+async def get_upload_session(session_id: str = PathParam(..., title="The ID of the upload session")):
+    """Returns the session with its received byte ranges and missing chunk indexes, for resuming."""
+    return await _session_status(await _get_session(session_id))
+
+@router.put("/sessions/{session_id}/chunks/{index}") # Route is at /api/v1/upload/sessions/{session_id}/chunks/{index}
+async def upload_chunk(
+    request: Request,
+    session_id: str = PathParam(..., title="The ID of the upload session"),
+    index: int = PathParam(..., ge=0, title="Zero-based chunk number"),
+    chunk_sha256: Optional[str] = Header(None, alias="X-Chunk-SHA256"),
+):
+    """
+    Receives one chunk as the raw request body and writes it in place. Sending
+    a chunk again replaces it, so a failed or interrupted chunk is simply retried.
+    """
+    session = await _get_session(session_id)
+    if session.status != OPEN:
+        raise HTTPException(status_code=409, detail=f"Upload session {session_id} is already {session.status}.")
+    sessions = await run_in_threadpool(get_upload_sessions)
+    try:
+        digest = await write_chunk(sessions, session, index, request.stream(), get_upload_chunk_size(), chunk_sha256)
+    except ChunkError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ChecksumMismatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SessionStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    start, end = session.chunk_range(index)
+    return {"session_id": session_id, "index": index, "start": start, "end": end, "sha256": digest}
+
+@router.post("/sessions/{session_id}/complete") # Route is at /api/v1/upload/sessions/{session_id}/complete
+async def complete_upload_session(session_id: str = PathParam(..., title="The ID of the upload session")):
+    """
+    Verifies the whole file against the declared SHA-256 and stores it like a
+    regular upload. Completing an already completed session returns the same file.
+    """
+    session = await _get_session(session_id)
+    store = await run_in_threadpool(get_blob_store)
+    if session.status == COMPLETED:
+        record = await run_in_threadpool(store.get_record, session.file_id)
+        created = False
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"File {session.file_id} not found.")
+    else:
+        sessions = await run_in_threadpool(get_upload_sessions)
+        try:
+            record, created = await run_in_threadpool(finalize_session, sessions, store, session_id)
+        except SessionStateError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except ChecksumMismatchError as e:
+            logger.error(f"Rejected upload session {session_id}: {e}")
+            raise HTTPException(status_code=422, detail=str(e))
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Upload session {session_id} not found.")
+        logger.info(f"Completed upload session {session_id} as {record.file_id} (deduplicated={not created})")
+
+    return {
+        "file_id": record.file_id,
+        "original_filename": session.filename,
+        "content_type": session.content_type,
+        "sha256": record.digest,
+        "size_bytes": record.size_bytes,
+        "deduplicated": not created
+    }
+
+@router.delete("/sessions/{session_id}") # Route is at /api/v1/upload/sessions/{session_id}
+async def abort_upload_session(session_id: str = PathParam(..., title="The ID of the upload session")):
+    """Aborts a session and discards the chunks received so far."""
+    sessions = await run_in_threadpool(get_upload_sessions)
+    if not await run_in_threadpool(sessions.delete, session_id):
+        raise HTTPException(status_code=404, detail=f"Upload session {session_id} not found.")
+    return {"session_id": session_id, "status": "aborted"}
+
+@router.get("/{file_id}") # Route is at /api/v1/upload/{file_id}
+async def get_upload(file_id: str = PathParam(..., title="The ID of the uploaded file")):
+    """Returns the stored metadata for an uploaded file."""
+    store = await run_in_threadpool(get_blob_store)
+    record = await run_in_threadpool(store.get_record, file_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"File {file_id} not found.")
+    return _record_response(record)
+
+@router.delete("/{file_id}") # Route is at /api/v1/upload/{file_id}
+async def release_upload(file_id: str = PathParam(..., title="The ID of the uploaded file")):
+    """
+    Drops one reference to an uploaded file. The blob is removed by the
+    background sweeper once no references remain.
+    """
+    store = await run_in_threadpool(get_blob_store)
+    record = await run_in_threadpool(store.release, file_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"File {file_id} not found.")
+    return _record_response(record)
@@ -1,14 +1,46 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
+import logging
+
+from ....core.config import get_webhook_secret
+from ....core.webhooks import SIGNATURE_HEADER, configure_endpoint, get_webhook_dispatcher, verify_signature
+from ....models.webhook import WebhookEndpoint
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.post("/configure") # Route is at /api/v1/webhooks/configure
-async def configure_webhook(request_body: dict):
-    # Placeholder for webhook configuration logic
-    return {"message": "Webhook configuration placeholder"}
+async def configure_webhook(endpoint: WebhookEndpoint):
+    """
+    Set delivery settings for a receiving URL: its signing secret (generated
+    when omitted), batching, and how many requests may be in flight to it.
+    """
+    secret = await run_in_threadpool(
+        configure_endpoint, endpoint.url, endpoint.secret, endpoint.batch, endpoint.max_batch_size, endpoint.max_concurrency
+    )
+    return {**endpoint.model_dump(), "secret": secret, "message": "Webhook endpoint configured."}
+
+@router.get("/dead_letters")
+async def list_dead_letters(limit: int = Query(100, ge=1, le=1000)):
+    """Events that could not be delivered, most recent first."""
+    return await run_in_threadpool(get_webhook_dispatcher().store.dead_letters, limit)
+
+@router.post("/dead_letters/{delivery_id}/retry")
+async def retry_dead_letter(delivery_id: str):
+    """Put a dead-lettered event back in the outbox with a fresh retry budget."""
+    dispatcher = get_webhook_dispatcher()
+    if not await run_in_threadpool(dispatcher.store.retry_dead_letter, delivery_id):
+        raise HTTPException(status_code=404, detail=f"Dead letter {delivery_id} not found.")
+    dispatcher.notify()
+    return {"delivery_id": delivery_id, "message": "Delivery requeued."}
 
 @router.post("/callback") # Route for receiving webhook events
-async def webhook_callback(request_body: dict):
-    # Placeholder for handling incoming webhook events (e.g., from Svix)
-    print(f"Webhook callback received: {request_body}")
-    return {"status": "received"} 
\ No newline at end of file
+async def webhook_callback(request: Request):
+    """Stand-in receiver: checks the signature (when WEBHOOK_SECRET is set) and logs the event."""
+    body = await request.body()
+    secret = get_webhook_secret()
+    if secret and not verify_signature(secret, request.headers.get(SIGNATURE_HEADER, ""), body):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature.")
+    logger.info(f"Webhook callback received: {body[:1000]!r}")
+    return {"status": "received"}
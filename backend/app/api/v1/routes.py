@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 
 # Import routers from endpoint files
-from .endpoints import upload, webhooks, jobs
+from .endpoints import upload, webhooks, jobs, batch, search
 
 from .endpoints.parse import sync_router as parse_sync_router
 from .endpoints.parse import async_router as parse_async_router
@@ -21,6 +21,7 @@ api_v1_router.include_router(upload.router, prefix="/upload", tags=["Upload"])
 
 api_v1_router.include_router(parse_sync_router, prefix="/parse", tags=["Parse"])
 api_v1_router.include_router(parse_async_router, prefix="/parse_async", tags=["Parse"])
+api_v1_router.include_router(batch.router, prefix="/parse_batch", tags=["Parse"])
 
 api_v1_router.include_router(extract_sync_router, prefix="/extract", tags=["Extract"])
 api_v1_router.include_router(extract_async_router, prefix="/extract_async", tags=["Extract"])
@@ -30,5 +31,6 @@ api_v1_router.include_router(split_async_router, prefix="/split_async", tags=["S
 
 api_v1_router.include_router(webhooks.router, prefix="/webhooks", tags=["Webhooks"])
 api_v1_router.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
+api_v1_router.include_router(search.router, prefix="/search", tags=["Search"])
 
 # Add other v1 routes here if needed, or include other sub-routers 
\ No newline at end of file
@@ -0,0 +1,277 @@
+# backend/app/core/admission.py
+"""
+Admission control for the parse, split and extract routes.
+
+Two limits decide whether a request may start work now:
+
+- a token bucket per client (ADMISSION_CLIENT_RATE requests/second with
+  bursts of ADMISSION_CLIENT_BURST), keyed by the client address or the
+  ADMISSION_CLIENT_HEADER header;
+- a global budget of pages in flight (ADMISSION_MAX_PAGES_IN_FLIGHT),
+  counting every page being parsed by sync requests and jobs alike. A
+  document is charged its selected page count when parsing starts and
+  pages are returned as each page range finishes, so the budget tracks
+  the actual load rather than the number of requests.
+
+Sync routes over either limit are answered with 429 and a `Retry-After`
+derived from the pages that must drain and the page throughput observed
+over the last minute. Async routes are never rejected: their jobs are
+queued ADMISSION_ASYNC_PRIORITY_PENALTY lower so admitted work runs first.
+A single document larger than the whole budget is admitted once nothing
+else is in flight, so it cannot be starved.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Optional, Tuple
+
+from .config import (
+    get_admission_max_pages_in_flight, get_admission_client_rate, get_admission_client_burst,
+    get_admission_client_header, get_admission_async_priority_penalty,
+)
+from .metrics import ADMISSION_DECISIONS, PAGES_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+CLIENT_RATE = "client_rate"
+PAGES_BUDGET = "pages_budget"
+
+MAX_RETRY_AFTER_SECONDS = 300.0
+# Completed pages older than this no longer count towards the observed throughput
+THROUGHPUT_WINDOW_SECONDS = 60.0
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+def _whole_seconds(seconds: float) -> int:
+    """Seconds to wait, rounded up to what `Retry-After` can express (never 0, which clients treat as "now")."""
+    return max(1, math.ceil(seconds))
+
+
+class AdmissionRejected(Exception):
+    """The request is over a client's rate or the global page budget."""
+
+    def __init__(self, message: str, retry_after: float, reason: str):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+    @property
+    def retry_after_header(self) -> str:
+        """`Retry-After` value in whole seconds; rejection messages quote the same value."""
+        return str(_whole_seconds(self.retry_after))
+
+
+class TokenBucket:
+    """Tokens refill continuously at `rate` per second, up to `burst`."""
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, cost: float, rate: float, burst: float, now: float) -> float:
+        """Take `cost` tokens. Returns 0 on success, else the seconds until enough have refilled."""
+        self.tokens = min(float(burst), self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / rate
+
+
+class PageLease:
+    """
+    Pages one parse holds against the budget. `start(total)` charges them,
+    `advance(done)` returns finished pages and `close()` returns the rest.
+    `on_progress` does both, so it can be handed to `parse_document` directly.
+    """
+
+    def __init__(self, controller: "AdmissionController", enforce: bool, on_progress: Optional[ProgressCallback] = None):
+        self.controller = controller
+        self.enforce = enforce
+        self.total: Optional[int] = None
+        self.done = 0
+        self._on_progress = on_progress
+
+    def start(self, total: int) -> None:
+        self.controller.acquire_pages(total, self.enforce)
+        self.total = total
+
+    def advance(self, done: int) -> None:
+        if self.total is None or done <= self.done:
+            return
+        self.controller.release_pages(done - self.done)
+        self.done = done
+
+    async def on_progress(self, done: int, total: int) -> None:
+        if self.total is None:
+            self.start(total)
+        else:
+            self.advance(done)
+        if self._on_progress is not None:
+            await self._on_progress(done, total)
+
+    def close(self) -> None:
+        if self.total is not None and self.done < self.total:
+            self.controller.release_pages(self.total - self.done, completed=False)
+            self.done = self.total
+
+    def __enter__(self) -> "PageLease":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AdmissionController:
+    """Per-client token buckets plus the global pages-in-flight budget. Limits are read at call time."""
+
+    def __init__(self, max_clients: int = 10000):
+        self.max_clients = max_clients
+        self.pages_in_flight = 0
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        # (finished_at, pages) of completed page ranges inside the throughput window
+        self._completions: Deque[Tuple[float, int]] = deque()
+        self._completed_pages = 0
+        self._busy_since: Optional[float] = None
+
+    # --- Client rate --- #
+
+    def check_client(self, client: str, cost: float = 1.0) -> float:
+        """Charge `client` for a request. Returns 0 if admitted, else the seconds to wait."""
+        rate = get_admission_client_rate()
+        if not rate:
+            return 0.0
+        burst = get_admission_client_burst()
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(burst, now)
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(client)
+            # A request costing more than the burst (a large batch) waits for a full bucket
+            return bucket.take(min(cost, burst), rate, burst, now)
+
+    # --- Pages in flight --- #
+
+    def acquire_pages(self, pages: int, enforce: bool = True) -> None:
+        """
+        Charge `pages` against the budget. With `enforce`, raise AdmissionRejected
+        instead if they do not fit; jobs pass `enforce=False` and are always counted.
+        """
+        with self._lock:
+            rejection = self._rejection(pages) if enforce else None
+            if rejection is None:
+                now = time.monotonic()
+                self._trim(now)
+                if self.pages_in_flight == 0 and not self._completions:
+                    # Idle for a whole window: measure throughput from now on
+                    self._busy_since = now
+                self.pages_in_flight += pages
+                PAGES_IN_FLIGHT.set(self.pages_in_flight)
+                return
+        raise rejection
+
+    def check_pages(self, pages: int) -> None:
+        """Raise AdmissionRejected if `pages` would not fit now, without charging them."""
+        with self._lock:
+            rejection = self._rejection(pages)
+        if rejection is not None:
+            raise rejection
+
+    def _rejection(self, pages: int) -> Optional[AdmissionRejected]:
+        limit = get_admission_max_pages_in_flight()
+        if not limit or self.pages_in_flight == 0 or self.pages_in_flight + pages <= limit:
+            return None
+        ADMISSION_DECISIONS.inc(kind="sync", outcome="rejected", reason=PAGES_BUDGET)
+        retry_after = self._retry_after(pages, limit)
+        return AdmissionRejected(
+            f"Server is at capacity ({self.pages_in_flight} of {limit} pages in flight); retry in {_whole_seconds(retry_after)}s.",
+            retry_after, PAGES_BUDGET,
+        )
+
+    def release_pages(self, pages: int, completed: bool = True) -> None:
+        """Return `pages` to the budget; `completed` pages count towards the observed throughput."""
+        now = time.monotonic()
+        with self._lock:
+            self.pages_in_flight = max(self.pages_in_flight - pages, 0)
+            PAGES_IN_FLIGHT.set(self.pages_in_flight)
+            if completed and pages:
+                self._completions.append((now, pages))
+                self._completed_pages += pages
+            self._trim(now)
+
+    def lease(self, enforce: bool = True, on_progress: Optional[ProgressCallback] = None) -> PageLease:
+        return PageLease(self, enforce, on_progress)
+
+    def _trim(self, now: float) -> None:
+        while self._completions and self._completions[0][0] < now - THROUGHPUT_WINDOW_SECONDS:
+            self._completed_pages -= self._completions.popleft()[1]
+
+    def throughput(self) -> Optional[float]:
+        """Pages completed per second over the last minute (None before any page has completed)."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            return self._throughput(now)
+
+    def _throughput(self, now: float) -> Optional[float]:
+        if not self._completed_pages or self._busy_since is None:
+            return None
+        span = max(min(THROUGHPUT_WINDOW_SECONDS, now - self._busy_since), 1.0)
+        return self._completed_pages / span
+
+    def _retry_after(self, pages: int, limit: int) -> float:
+        # Pages that must finish before `pages` fit (all of them for a document larger than the budget)
+        excess = self.pages_in_flight if pages > limit else self.pages_in_flight + pages - limit
+        throughput = self._throughput(time.monotonic())
+        if throughput is None:
+            return 1.0
+        return min(max(excess / throughput, 1.0), MAX_RETRY_AFTER_SECONDS)
+
+    def saturated(self) -> bool:
+        limit = get_admission_max_pages_in_flight()
+        with self._lock:
+            return bool(limit) and self.pages_in_flight >= limit
+
+    # --- Route decisions --- #
+
+    def admit_sync(self, client: str) -> None:
+        """Admit a sync request by client rate; raises AdmissionRejected when the client is over it."""
+        wait = self.check_client(client)
+        if wait:
+            ADMISSION_DECISIONS.inc(kind="sync", outcome="rejected", reason=CLIENT_RATE)
+            raise AdmissionRejected(f"Rate limit exceeded for client {client}; retry in {_whole_seconds(wait)}s.", wait, CLIENT_RATE)
+        ADMISSION_DECISIONS.inc(kind="sync", outcome="admitted", reason="")
+
+    def async_priority(self, client: str, priority: int, cost: float = 1.0) -> int:
+        """Priority for an async submission: lowered when the client or the server is over capacity."""
+        reason = CLIENT_RATE if self.check_client(client, cost) else PAGES_BUDGET if self.saturated() else ""
+        if not reason:
+            ADMISSION_DECISIONS.inc(kind="async", outcome="admitted", reason="")
+            return priority
+        ADMISSION_DECISIONS.inc(kind="async", outcome="deferred", reason=reason)
+        logger.info(f"Deferring async work from {client} ({reason}): priority {priority} -> "
+                    f"{priority - get_admission_async_priority_penalty()}")
+        return priority - get_admission_async_priority_penalty()
+
+
+def client_key(request) -> str:
+    """Identify the client of a Starlette request for rate limiting."""
+    header = get_admission_client_header()
+    if header and request.headers.get(header):
+        return request.headers[header]
+    return request.client.host if request.client else "unknown"
+
+
+_controller = AdmissionController()
+
+
+def get_admission_controller() -> AdmissionController:
+    return _controller
@@ -0,0 +1,304 @@
+# backend/app/core/blob_store.py
+"""
+Content-addressed storage for uploaded documents.
+
+Every upload is stored once, under a path derived from its SHA-256 digest:
+
+    {UPLOAD_DIR}/blobs/ab/cd/abcd...   (sharded by the first two byte pairs)
+
+The file ID handed back to clients is derived from the digest, so re-uploading
+the same bytes returns the existing ID and the new copy is discarded instead of
+being stored again. A small SQLite index next to the blobs tracks, per blob, the
+size, a reference count and the last access time; `sweep()` uses it to evict
+blobs by TTL and by a total-bytes budget.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import get_upload_dir, get_blob_ttl_seconds, get_blob_max_total_bytes, get_blob_sweep_interval_seconds
+
+logger = logging.getLogger(__name__)
+
+FILE_ID_PREFIX = "file_"
+
+
+@dataclass
+class BlobRecord:
+    """Index entry for a stored blob."""
+    digest: str
+    size_bytes: int
+    extension: str
+    content_type: Optional[str]
+    refcount: int
+    created_at: float
+    last_access: float
+
+    @property
+    def file_id(self) -> str:
+        return f"{FILE_ID_PREFIX}{self.digest}"
+
+
+def digest_from_file_id(file_id: str) -> Optional[str]:
+    """Return the content digest encoded in `file_id`, or None if it is not a blob file ID."""
+    if not file_id.startswith(FILE_ID_PREFIX):
+        return None
+    digest = file_id[len(FILE_ID_PREFIX):]
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        return None
+    return digest
+
+
+class BlobStore:
+    """Sharded, deduplicating blob store with a reference-counted SQLite index."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.tmp_dir = self.root / "tmp"
+        self.index_path = self.root / "index.sqlite3"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                extension TEXT NOT NULL,
+                content_type TEXT,
+                refcount INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- Paths --- #
+
+    def path_for(self, digest: str) -> Path:
+        """Sharded on-disk location of the blob with the given digest."""
+        return self.blob_dir / digest[:2] / digest[2:4] / digest
+
+    def new_temp_path(self) -> Path:
+        """A fresh path in the store's temp directory (same filesystem as the blobs)."""
+        return self.tmp_dir / f"upload_{uuid.uuid4().hex}"
+
+    # --- Index operations --- #
+
+    def _row_to_record(self, row) -> BlobRecord:
+        return BlobRecord(*row)
+
+    def _get(self, digest: str) -> Optional[BlobRecord]:
+        row = self._conn.execute(
+            "SELECT digest, size_bytes, extension, content_type, refcount, created_at, last_access "
+            "FROM blobs WHERE digest = ?",
+            (digest,),
+        ).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def lookup(self, digest: str) -> Optional[BlobRecord]:
+        """Return the index entry for `digest` without touching its access time."""
+        with self._lock:
+            return self._get(digest)
+
+    def records(self) -> List[BlobRecord]:
+        """Every stored blob's index entry, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT digest, size_bytes, extension, content_type, refcount, created_at, last_access "
+                "FROM blobs ORDER BY created_at"
+            ).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def add_reference(self, digest: str) -> Optional[BlobRecord]:
+        """Give the stored blob `digest` one more reference, or return None if it is not stored."""
+        with self._lock:
+            return self._add_reference(digest)
+
+    def _add_reference(self, digest: str) -> Optional[BlobRecord]:
+        if self._get(digest) is None or not self.path_for(digest).exists():
+            return None
+        self._conn.execute(
+            "UPDATE blobs SET refcount = refcount + 1, last_access = ? WHERE digest = ?", (time.time(), digest)
+        )
+        self._conn.commit()
+        return self._get(digest)
+
+    def ingest(
+        self,
+        tmp_path: Path,
+        digest: str,
+        size_bytes: int,
+        extension: str = "",
+        content_type: Optional[str] = None,
+    ) -> Tuple[BlobRecord, bool]:
+        """
+        Move a freshly written temp file into the store.
+
+        If a blob with the same digest already exists the temp file is discarded
+        and the existing entry gains a reference. Returns (record, created).
+        """
+        now = time.time()
+        with self._lock:
+            existing = self._add_reference(digest)
+            if existing is not None:
+                os.remove(tmp_path)
+                return existing, False
+
+            dest = self.path_for(digest)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, dest)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blobs "
+                "(digest, size_bytes, extension, content_type, refcount, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?)",
+                (digest, size_bytes, extension, content_type, now, now),
+            )
+            self._conn.commit()
+            return self._get(digest), True
+
+    def resolve(self, file_id: str) -> Optional[Path]:
+        """Return the on-disk path for `file_id` and record the access, or None if unknown."""
+        digest = digest_from_file_id(file_id)
+        if digest is None:
+            return None
+        with self._lock:
+            if self._get(digest) is None:
+                return None
+            path = self.path_for(digest)
+            if not path.exists():
+                return None
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+            self._conn.commit()
+            return path
+
+    def get_record(self, file_id: str) -> Optional[BlobRecord]:
+        """Return the index entry for `file_id`, or None if unknown."""
+        digest = digest_from_file_id(file_id)
+        return self.lookup(digest) if digest else None
+
+    def release(self, file_id: str) -> Optional[BlobRecord]:
+        """Drop one reference to `file_id`. Unreferenced blobs are removed by the next sweep."""
+        digest = digest_from_file_id(file_id)
+        if digest is None:
+            return None
+        with self._lock:
+            if self._get(digest) is None:
+                return None
+            self._conn.execute(
+                "UPDATE blobs SET refcount = MAX(refcount - 1, 0) WHERE digest = ?", (digest,)
+            )
+            self._conn.commit()
+            return self._get(digest)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM blobs").fetchone()[0]
+
+    # --- Garbage collection --- #
+
+    def _evict(self, digests: List[str]) -> None:
+        for digest in digests:
+            try:
+                os.remove(self.path_for(digest))
+            except FileNotFoundError:
+                pass
+        self._conn.executemany("DELETE FROM blobs WHERE digest = ?", [(d,) for d in digests])
+        self._conn.commit()
+
+    def sweep(self, ttl_seconds: int = 0, max_total_bytes: int = 0, now: Optional[float] = None) -> List[str]:
+        """
+        Evict blobs and return the evicted digests.
+
+        Eviction happens in three passes:
+          1. blobs whose reference count has dropped to zero;
+          2. blobs not accessed for `ttl_seconds` (skipped if 0);
+          3. while the store exceeds `max_total_bytes` (skipped if 0), the least
+             recently used blobs, unreferenced ones first.
+        Stale temp files left behind by interrupted uploads are removed as well.
+        """
+        now = time.time() if now is None else now
+        evicted: List[str] = []
+        with self._lock:
+            rows = self._conn.execute("SELECT digest FROM blobs WHERE refcount <= 0").fetchall()
+            evicted.extend(r[0] for r in rows)
+
+            if ttl_seconds > 0:
+                rows = self._conn.execute(
+                    "SELECT digest FROM blobs WHERE last_access < ? AND refcount > 0", (now - ttl_seconds,)
+                ).fetchall()
+                evicted.extend(r[0] for r in rows)
+            self._evict(evicted)
+
+            if max_total_bytes > 0:
+                total = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM blobs").fetchone()[0]
+                if total > max_total_bytes:
+                    over_budget = []
+                    rows = self._conn.execute(
+                        "SELECT digest, size_bytes FROM blobs ORDER BY refcount > 0, last_access"
+                    ).fetchall()
+                    for digest, size_bytes in rows:
+                        if total <= max_total_bytes:
+                            break
+                        over_budget.append(digest)
+                        total -= size_bytes
+                    self._evict(over_budget)
+                    evicted.extend(over_budget)
+
+        self._sweep_temp_files(now, max(ttl_seconds, 3600))
+        if evicted:
+            logger.info(f"Blob sweep evicted {len(evicted)} blob(s) from {self.root}")
+        return evicted
+
+    def _sweep_temp_files(self, now: float, max_age_seconds: int) -> None:
+        for tmp_file in self.tmp_dir.iterdir():
+            try:
+                if tmp_file.stat().st_mtime < now - max_age_seconds:
+                    tmp_file.unlink()
+            except FileNotFoundError:
+                pass
+
+
+_stores: Dict[Path, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(root: Optional[Path] = None) -> BlobStore:
+    """Return the shared BlobStore for `root` (defaults to UPLOAD_DIR, read at runtime)."""
+    root = Path(root or get_upload_dir()).resolve()
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None or not store.index_path.exists():
+            if store is not None:
+                store.close()
+            store = BlobStore(root)
+            _stores[root] = store
+        return store
+
+
+async def run_blob_sweeper() -> None:
+    """Background task: periodically evict blobs by TTL and total-bytes budget."""
+    while True:
+        await asyncio.sleep(get_blob_sweep_interval_seconds())
+        try:
+            store = get_blob_store()
+            await asyncio.to_thread(store.sweep, get_blob_ttl_seconds(), get_blob_max_total_bytes())
+        except Exception as e:
+            logger.error(f"Blob sweep failed: {e}")
@@ -0,0 +1,188 @@
+# backend/app/core/cache.py
+"""
+Two-tier cache for serialized parse results.
+
+Entries are keyed by (content hash, parse mode, ocr flag, parser version) and
+stored as the JSON bytes that go out on the wire, so a hit can be returned
+without rebuilding any Pydantic objects.
+
+- Memory tier: an LRU bounded by total bytes.
+- Disk tier: one file per entry under a sharded directory. It survives
+  restarts (the index is rebuilt from the directory on startup, ordered by
+  modification time) and is also bounded by total bytes, evicting the least
+  recently used entries first.
+"""
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from .config import get_parse_cache_dir, get_parse_cache_memory_bytes, get_parse_cache_disk_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(content_hash: str, mode: str, ocr_enabled: bool, parser_version: str, page_selection: str = "") -> str:
+    """Stable key for a parse result. `page_selection` is empty when every page is parsed."""
+    raw = f"{content_hash}|{mode}|{int(bool(ocr_enabled))}|{parser_version}"
+    if page_selection:
+        raw += f"|{page_selection}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ParseResultCache:
+    """Byte-bounded in-memory LRU in front of a byte-bounded on-disk LRU."""
+
+    def __init__(self, cache_dir: Path, memory_max_bytes: int, disk_max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._counters: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load_disk_index()
+
+    # --- Disk tier --- #
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_disk_index(self) -> None:
+        """Rebuild the disk LRU from the cache directory, oldest first."""
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        while self.disk_max_bytes and self._disk_bytes > self.disk_max_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._counters["disk_evictions"] += 1
+            try:
+                os.remove(self._path_for(key))
+            except FileNotFoundError:
+                pass
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{key}.{uuid.uuid4().hex}.tmp")
+        with tmp_path.open("wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # --- Memory tier --- #
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._counters["memory_evictions"] += 1
+
+    # --- Public API --- #
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes for `key`, promoting disk hits into memory."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return data
+            if key not in self._disk:
+                self._counters["misses"] += 1
+                return None
+
+        path = self._path_for(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                size = self._disk.pop(key, None)
+                if size is not None:
+                    self._disk_bytes -= size
+                self._counters["misses"] += 1
+            return None
+
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._counters["disk_hits"] += 1
+            self._put_memory(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store `data` under `key` in both tiers."""
+        if self.disk_max_bytes and len(data) <= self.disk_max_bytes:
+            self._write_disk(key, data)
+            with self._lock:
+                previous = self._disk.pop(key, None)
+                if previous is not None:
+                    self._disk_bytes -= previous
+                self._disk[key] = len(data)
+                self._disk_bytes += len(data)
+                self._evict_disk()
+        with self._lock:
+            self._put_memory(key, data)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and current tier sizes."""
+        with self._lock:
+            return {
+                **self._counters,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def clear_memory(self) -> None:
+        """Drop the memory tier (the disk tier is kept)."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+
+_caches: Dict[Path, ParseResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_parse_cache() -> ParseResultCache:
+    """Return the shared parse-result cache for PARSE_CACHE_DIR (read at runtime)."""
+    cache_dir = get_parse_cache_dir().resolve()
+    with _caches_lock:
+        cache = _caches.get(cache_dir)
+        if cache is None or not cache.cache_dir.exists():
+            cache = ParseResultCache(cache_dir, get_parse_cache_memory_bytes(), get_parse_cache_disk_bytes())
+            _caches[cache_dir] = cache
+        return cache
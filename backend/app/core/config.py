@@ -1 +1,338 @@
-# This file can be used for core configuration settings.
\ No newline at end of file
+# backend/app/core/config.py
+"""
+Core configuration settings.
+
+Settings are read from environment variables when they are requested (not at
+import time), so tests and the container can override them at runtime.
+"""
+import os
+from pathlib import Path
+from typing import Dict
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer environment variable, falling back to `default` if unset or invalid."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean environment variable ("1"/"true"/"yes"/"on" or "0"/"false"/"no"/"off")."""
+    value = os.getenv(name, "").strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float environment variable, falling back to `default` if unset or invalid."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+# --- Startup --- #
+
+def get_startup_prewarm() -> bool:
+    """Pre-warm the parser pool, stores and engines in the background at startup (default on)."""
+    return _env_bool("STARTUP_PREWARM", True)
+
+
+def get_ready_after_prewarm() -> bool:
+    """Keep /ready at 503 until the pre-warm has finished, not just startup (default on)."""
+    return _env_bool("READY_AFTER_PREWARM", True)
+
+
+# --- Uploads --- #
+
+def get_upload_dir() -> Path:
+    """Get the upload directory path, reading from environment variable at runtime."""
+    upload_dir_str = os.getenv("UPLOAD_DIR", "/app/uploads")
+    return Path(upload_dir_str)
+
+
+def get_upload_chunk_size() -> int:
+    """Size in bytes of each chunk read from an incoming upload (default 1 MiB)."""
+    return max(_env_int("UPLOAD_CHUNK_SIZE", 1024 * 1024), 4096)
+
+
+def get_max_upload_bytes() -> int:
+    """Maximum accepted upload size in bytes (default 200 MiB). 0 disables the limit."""
+    return max(_env_int("MAX_UPLOAD_BYTES", 200 * 1024 * 1024), 0)
+
+
+def get_upload_session_chunk_size() -> int:
+    """Default chunk size for resumable upload sessions when the client does not pick one (default 8 MiB)."""
+    return max(_env_int("UPLOAD_SESSION_CHUNK_SIZE", 8 * 1024 * 1024), 64 * 1024)
+
+
+def get_upload_session_ttl_seconds() -> int:
+    """Remove resumable upload sessions not touched for this many seconds (default 24 hours). 0 disables."""
+    return max(_env_int("UPLOAD_SESSION_TTL_SECONDS", 24 * 3600), 0)
+
+
+def get_blob_ttl_seconds() -> int:
+    """Evict stored uploads not accessed for this many seconds (default 7 days). 0 disables."""
+    return max(_env_int("BLOB_TTL_SECONDS", 7 * 24 * 3600), 0)
+
+
+def get_blob_max_total_bytes() -> int:
+    """Total size budget for stored uploads in bytes (default 10 GiB). 0 disables."""
+    return max(_env_int("BLOB_MAX_TOTAL_BYTES", 10 * 1024 ** 3), 0)
+
+
+def get_blob_sweep_interval_seconds() -> int:
+    """How often the background sweeper runs (default every 5 minutes)."""
+    return max(_env_int("BLOB_SWEEP_INTERVAL_SECONDS", 300), 1)
+
+
+# --- Parsing --- #
+
+def get_parser_workers() -> int:
+    """Number of parser worker processes. 0 (the default) means one per available core."""
+    return max(_env_int("PARSER_WORKERS", 0), 0)
+
+
+def get_table_engine() -> str:
+    """
+    Table extraction engine: "layout" (the default; NumPy clustering of word boxes, see
+    core/tables.py) or "pymupdf" (PyMuPDF's `find_tables`, which relies on ruling lines).
+    """
+    engine = os.getenv("TABLE_ENGINE", "layout").strip().lower()
+    return engine if engine in ("layout", "pymupdf") else "layout"
+
+
+# --- Admission control --- #
+
+def get_admission_max_pages_in_flight() -> int:
+    """Global budget of pages being parsed at once (default 500). Sync requests over it get a 429. 0 disables."""
+    return max(_env_int("ADMISSION_MAX_PAGES_IN_FLIGHT", 500), 0)
+
+
+def get_admission_client_rate() -> float:
+    """Sustained requests per second allowed per client on the parse, split and extract routes (default 5). 0 disables."""
+    return max(_env_float("ADMISSION_CLIENT_RATE", 5.0), 0.0)
+
+
+def get_admission_client_burst() -> int:
+    """Requests a client may send back to back before its rate applies (default 20)."""
+    return max(_env_int("ADMISSION_CLIENT_BURST", 20), 1)
+
+
+def get_admission_client_header() -> str:
+    """Request header identifying the client (e.g. X-API-Key behind a gateway). Empty means the client address."""
+    return os.getenv("ADMISSION_CLIENT_HEADER", "").strip()
+
+
+def get_admission_async_priority_penalty() -> int:
+    """How much lower async jobs are queued when they arrive over capacity (default 10)."""
+    return max(_env_int("ADMISSION_ASYNC_PRIORITY_PENALTY", 10), 0)
+
+
+# --- OCR --- #
+
+def get_ocr_engine_name() -> str:
+    """
+    OCR engine used for pages without a usable text layer: a registered name ("tesseract",
+    "fake") or "package.module:ClassName" for a custom engine. Defaults to "tesseract".
+    """
+    return os.getenv("OCR_ENGINE", "tesseract").strip() or "tesseract"
+
+
+def get_ocr_workers() -> int:
+    """Number of OCR processes (default 1). Kept separate from the parser pool."""
+    return max(_env_int("OCR_WORKERS", 1), 1)
+
+
+def get_ocr_batch_size() -> int:
+    """Pages rendered and handed to the OCR engine per batch (default 8)."""
+    return max(_env_int("OCR_BATCH_SIZE", 8), 1)
+
+
+def get_ocr_dpi() -> int:
+    """Resolution pages are rendered at for OCR (default 200)."""
+    return min(max(_env_int("OCR_DPI", 200), 50), 600)
+
+
+# --- Caching --- #
+
+def get_cache_dir() -> Path:
+    """Root directory for on-disk caches, reading from environment variable at runtime."""
+    return Path(os.getenv("CACHE_DIR", "/app/cache"))
+
+
+def get_parse_cache_dir() -> Path:
+    return get_cache_dir() / "parse"
+
+
+def get_parse_cache_memory_bytes() -> int:
+    """Byte budget for the in-memory parse-result cache (default 64 MiB)."""
+    return max(_env_int("PARSE_CACHE_MEMORY_BYTES", 64 * 1024 * 1024), 0)
+
+
+def get_parse_cache_disk_bytes() -> int:
+    """Byte budget for the on-disk parse-result cache (default 1 GiB). 0 disables the disk tier."""
+    return max(_env_int("PARSE_CACHE_DISK_BYTES", 1024 ** 3), 0)
+
+
+def get_page_cache_enabled() -> bool:
+    """Reuse parsed pages whose content fingerprint has been seen before (default on)."""
+    return _env_bool("PAGE_CACHE_ENABLED", True)
+
+
+def get_page_cache_dir() -> Path:
+    return get_cache_dir() / "pages"
+
+
+def get_page_cache_memory_bytes() -> int:
+    """Byte budget for the in-memory page cache (default 64 MiB)."""
+    return max(_env_int("PAGE_CACHE_MEMORY_BYTES", 64 * 1024 * 1024), 0)
+
+
+def get_page_cache_disk_bytes() -> int:
+    """Byte budget for the on-disk page cache (default 1 GiB). 0 disables the disk tier."""
+    return max(_env_int("PAGE_CACHE_DISK_BYTES", 1024 ** 3), 0)
+
+
+def get_extract_plan_cache_size() -> int:
+    """Number of compiled extraction plans kept in memory (default 256)."""
+    return max(_env_int("EXTRACT_PLAN_CACHE_SIZE", 256), 1)
+
+
+# --- Jobs --- #
+
+def get_data_dir() -> Path:
+    """Directory for persistent backend state (job database, etc.), read at runtime."""
+    return Path(os.getenv("DATA_DIR", "/app/data"))
+
+
+def get_jobs_db_path() -> Path:
+    return get_data_dir() / "jobs.sqlite3"
+
+
+def get_results_dir() -> Path:
+    """Directory of stored parse results (resolvable as jobid://...)."""
+    return get_data_dir() / "results"
+
+
+def get_result_ttl_seconds() -> int:
+    """Delete stored parse results not written for this many seconds (default 7 days). 0 disables."""
+    return max(_env_int("RESULT_TTL_SECONDS", 7 * 24 * 3600), 0)
+
+
+def get_search_index_dir() -> Path:
+    """Directory of the full-text search index over parsed pages."""
+    return get_data_dir() / "search"
+
+
+def get_search_index_flush_seconds() -> float:
+    """How often newly parsed pages are written to the search index as a new segment (default 1s)."""
+    return max(_env_float("SEARCH_INDEX_FLUSH_SECONDS", 1.0), 0.05)
+
+
+def get_job_max_workers() -> int:
+    """Maximum number of jobs running at once across all job types (default 4)."""
+    return max(_env_int("JOB_MAX_WORKERS", 4), 1)
+
+
+def get_job_concurrency() -> Dict[str, int]:
+    """
+    Per-job-type concurrency limits from JOB_CONCURRENCY, e.g. "parse=2,split=4,extract=4".
+    Job types that are not listed are only bounded by JOB_MAX_WORKERS.
+    """
+    limits: Dict[str, int] = {}
+    for item in os.getenv("JOB_CONCURRENCY", "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip().isdigit():
+            limits[name.strip()] = max(int(value), 1)
+    return limits
+
+
+def get_batch_max_documents() -> int:
+    """Most documents accepted in one /parse_batch request (default 1000)."""
+    return max(_env_int("BATCH_MAX_DOCUMENTS", 1000), 1)
+
+
+def get_job_poll_interval_seconds() -> float:
+    """How often the job dispatcher re-checks the queue when it has not been woken (default 1s)."""
+    return max(_env_float("JOB_POLL_INTERVAL_SECONDS", 1.0), 0.01)
+
+
+def get_job_lease_seconds() -> float:
+    """
+    How long a worker's claim on a running job lasts without a heartbeat (default 30s).
+    Jobs of a worker that crashed are re-dispatched once their lease expires.
+    """
+    return max(_env_float("JOB_LEASE_SECONDS", 30.0), 1.0)
+
+
+def get_job_max_attempts() -> int:
+    """Attempts before a job whose worker keeps disappearing is failed instead of re-dispatched (default 3)."""
+    return max(_env_int("JOB_MAX_ATTEMPTS", 3), 1)
+
+
+def get_job_dedupe_window_seconds() -> float:
+    """
+    How long a finished async job answers identical requests, and an
+    Idempotency-Key is remembered (default 1 hour). 0 only coalesces
+    requests with jobs still queued or running.
+    """
+    return max(_env_float("JOB_DEDUPE_WINDOW_SECONDS", 3600.0), 0.0)
+
+
+# --- Webhooks --- #
+
+def get_webhooks_db_path() -> Path:
+    """SQLite database holding the webhook outbox, endpoint settings and dead letters."""
+    return get_data_dir() / "webhooks.sqlite3"
+
+
+def get_webhook_secret() -> str:
+    """Default HMAC signing secret for endpoints without their own (unsigned if empty)."""
+    return os.getenv("WEBHOOK_SECRET", "")
+
+
+def get_webhook_timeout_seconds() -> float:
+    """Timeout of one delivery attempt (default 10s)."""
+    return max(_env_float("WEBHOOK_TIMEOUT_SECONDS", 10.0), 0.1)
+
+
+def get_webhook_max_attempts() -> int:
+    """Delivery attempts before an event is moved to the dead-letter table (default 8)."""
+    return max(_env_int("WEBHOOK_MAX_ATTEMPTS", 8), 1)
+
+
+def get_webhook_backoff_base_seconds() -> float:
+    """Base of the exponential retry backoff (default 2s)."""
+    return max(_env_float("WEBHOOK_BACKOFF_BASE_SECONDS", 2.0), 0.0)
+
+
+def get_webhook_backoff_max_seconds() -> float:
+    """Upper bound of a single retry delay (default 10 minutes)."""
+    return max(_env_float("WEBHOOK_BACKOFF_MAX_SECONDS", 600.0), 0.0)
+
+
+def get_webhook_max_connections() -> int:
+    """Size of the shared outbound HTTP connection pool (default 100)."""
+    return max(_env_int("WEBHOOK_MAX_CONNECTIONS", 100), 1)
+
+
+def get_webhook_endpoint_concurrency() -> int:
+    """Default number of concurrent requests to one endpoint (default 4)."""
+    return max(_env_int("WEBHOOK_ENDPOINT_CONCURRENCY", 4), 1)
+
+
+def get_webhook_batch_window_seconds() -> float:
+    """How long events for a batching endpoint are held to be sent together (default 1s)."""
+    return max(_env_float("WEBHOOK_BATCH_WINDOW_SECONDS", 1.0), 0.0)
@@ -0,0 +1,107 @@
+# backend/app/core/documents.py
+"""
+Resolution of the `document_url` values accepted by the async endpoints.
+
+Supported forms:
+- `file_{sha256}`: a file ID returned by /api/v1/upload;
+- `http://` / `https://`: downloaded into the blob store on first use;
+- `jobid://{parse_job_id}`: the stored result of a finished parse job
+  (`resolve_parse_job`), used by split and extract so they never re-parse.
+"""
+import logging
+from pathlib import Path
+from typing import Tuple
+
+from .blob_store import BlobRecord, BlobStore, FILE_ID_PREFIX, digest_from_file_id, get_blob_store
+from .config import get_upload_chunk_size, get_max_upload_bytes
+from .jobs import get_job_engine, SUCCEEDED, FAILED
+from .result_store import StoredParseResult, get_result_store
+from .storage import download_to_store
+
+JOB_ID_SCHEME = "jobid://"
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentNotFoundError(Exception):
+    """Raised when a `document_url` cannot be resolved to a stored document."""
+
+
+class ParseResultNotReadyError(Exception):
+    """Raised when a `jobid://` reference points at a parse job that has not finished yet."""
+
+
+def resolve_document(document_url: str) -> Tuple[BlobRecord, Path]:
+    """
+    Return the blob record and on-disk path for `document_url`.
+
+    Blocking (it may download the document); call it from a worker thread.
+    Pair it with `release_document` once the document is no longer read.
+    """
+    store: BlobStore = get_blob_store()
+
+    if document_url.startswith(FILE_ID_PREFIX):
+        path = store.resolve(document_url)
+        record = store.get_record(document_url)
+        if path is None or record is None:
+            raise DocumentNotFoundError(f"Unknown file ID '{document_url}'.")
+        return record, path
+
+    if is_remote_document(document_url):
+        logger.info(f"Downloading document from {document_url}")
+        record, _ = download_to_store(document_url, store, get_upload_chunk_size(), get_max_upload_bytes())
+        return record, store.path_for(record.digest)
+
+    raise DocumentNotFoundError(
+        f"Unsupported document_url '{document_url}'. Expected a file ID from /api/v1/upload or an http(s) URL."
+    )
+
+
+def release_document(document_url: str, record: BlobRecord) -> None:
+    """
+    Drop the blob reference `resolve_document` took for a downloaded document,
+    once it has been parsed. File IDs are owned by their uploader and keep theirs.
+    """
+    if is_remote_document(document_url):
+        get_blob_store().release(record.file_id)
+
+
+def is_remote_document(document_url: str) -> bool:
+    """Whether `document_url` is downloaded on use, so its content may differ between requests."""
+    return document_url.startswith(("http://", "https://"))
+
+
+def document_fingerprint(document_url: str) -> str:
+    """
+    Identity of the document behind `document_url` for request fingerprints,
+    without fetching it: the content hash for file IDs (which are content
+    addressed), otherwise the URL or job reference itself. A URL does not pin
+    the content, so requests for remote documents should only share jobs that
+    have not finished (see `is_remote_document`).
+    """
+    if document_url.startswith(FILE_ID_PREFIX):
+        digest = digest_from_file_id(document_url)
+        if digest is not None:
+            return f"sha256:{digest}"
+    return document_url
+
+
+def resolve_parse_job(document_url: str) -> StoredParseResult:
+    """
+    Open the stored result of the parse job referenced by `jobid://{job_id}`.
+
+    Blocking; call it from a worker thread. The caller must close the result.
+    """
+    job_id = document_url[len(JOB_ID_SCHEME):]
+    job = get_job_engine().store.get(job_id)
+    if job is None or job.job_type != "parse":
+        raise DocumentNotFoundError(f"Unknown parse job '{job_id}'.")
+    if job.status == FAILED:
+        raise DocumentNotFoundError(f"Parse job '{job_id}' failed: {job.error}")
+    if job.status != SUCCEEDED:
+        raise ParseResultNotReadyError(f"Parse job '{job_id}' has not finished yet (status: {job.status}).")
+
+    result = get_result_store().open_job(job_id)
+    if result is None:
+        raise DocumentNotFoundError(f"The result of parse job '{job_id}' is no longer available.")
+    return result
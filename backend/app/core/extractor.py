@@ -0,0 +1,595 @@
+# backend/app/core/extractor.py
+"""
+Schema-driven extraction for the extract endpoint.
+
+An extract `schema` (a JSON Schema object) is compiled once into an
+`ExtractionPlan`:
+
+- every scalar property becomes a `FieldPlan`: its path in the result, the
+  label terms to look for (from the property name, its description and its
+  parents' names) and a coercer for its type (`number`, `integer`,
+  `boolean`, `string` with optional `enum` or `format: date`);
+- every array becomes a `ListPlan`: the item properties of an array of
+  objects are matched to table columns by their headers, and an array of
+  scalars is read from a matching table column or a "Label: a, b, c" value;
+- the page selection in the options becomes the plan's page selector.
+
+Plans are kept in an LRU keyed by a hash of the canonical JSON of the schema
+and options, so a schema that is sent repeatedly is compiled once.
+
+A plan runs against a `DocumentIndex` built once per document: labelled
+values from text lines ("Label: value", "Label   1,234") and tables (row
+labels, column headers), with an inverted index from label terms to them.
+Each field only looks at the candidates sharing one of its terms (or, for
+enums, one of its accepted values), instead of scanning the full text once
+per field.
+"""
+import copy
+import functools
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from .config import get_extract_plan_cache_size
+from .parser import parse_page_spec
+from .splitter import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Label-term weights by where the term comes from
+NAME_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.5
+PARENT_WEIGHT = 0.25
+# Minimum share of a field's name weight a label must match
+MIN_LABEL_SCORE = 0.5
+# Score penalty per label term the field does not ask for
+EXTRA_TERM_PENALTY = 0.05
+# Candidates whose value is on the line after the label rank below same-line ones
+NEXT_LINE_PENALTY = 0.1
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "value field extract extracted document".split()
+)
+_SYNONYMS = {
+    "number": ("no", "num", "nr"),
+    "amount": ("amt",),
+    "quantity": ("qty",),
+    "id": ("identifier", "number", "no"),
+    "identifier": ("id",),
+    "telephone": ("phone", "tel"),
+    "phone": ("telephone", "tel"),
+}
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+class SchemaError(ValueError):
+    """Raised when an extraction schema or its options cannot be compiled."""
+
+
+# --- Coercers --- #
+
+_NUMBER = re.compile(r"\(?-?\s*[$€£¥]?\s*\d[\d,]*(?:\.\d+)?\)?")
+_DATE_TEXT = re.compile(
+    r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}/\d{2,4}|[A-Za-z]{3,9}\.? \d{1,2},? \d{4}|\d{1,2} [A-Za-z]{3,9}\.? \d{4}"
+)
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d/%m/%Y", "%B %d, %Y", "%B %d %Y", "%b %d, %Y", "%b %d %Y", "%d %B %Y", "%d %b %Y")
+_TRUE = frozenset("yes y true x checked 1".split())
+_FALSE = frozenset("no n false unchecked 0 none".split())
+
+
+def to_number(value: str) -> Optional[float]:
+    """First number in `value`; "(1,200)" and "-1,200" are negative."""
+    match = _NUMBER.search(value)
+    if match is None:
+        return None
+    text = match.group()
+    try:
+        number = float(re.sub(r"[^\d.]", "", text))
+    except ValueError:
+        return None
+    negative = (text.startswith("(") and text.endswith(")")) or text.lstrip("(").startswith("-")
+    return -number if negative else number
+
+
+def to_integer(value: str) -> Optional[int]:
+    number = to_number(value)
+    if number is None or number != int(number):
+        return None
+    return int(number)
+
+
+def to_boolean(value: str) -> Optional[bool]:
+    tokens = tokenize(value)
+    if not tokens:
+        return None
+    if tokens[0] in _TRUE:
+        return True
+    if tokens[0] in _FALSE:
+        return False
+    return None
+
+
+def to_date(value: str) -> Optional[str]:
+    """First date in `value` as an ISO 8601 string."""
+    for text in _DATE_TEXT.findall(value):
+        text = text.replace(".", "")
+        for date_format in _DATE_FORMATS:
+            try:
+                return datetime.strptime(text, date_format).date().isoformat()
+            except ValueError:
+                continue
+    return None
+
+
+def to_string(value: str) -> Optional[str]:
+    return value.strip() or None
+
+
+def _enum_coercer(options: Sequence[Any]) -> Callable[[str], Optional[Any]]:
+    """Match the longest enum option contained in the value (case-insensitive)."""
+    ordered = sorted(options, key=lambda option: -len(str(option)))
+
+    def coerce(value: str) -> Optional[Any]:
+        lowered = value.lower()
+        for option in ordered:
+            if str(option).lower() in lowered:
+                return option
+        return None
+    return coerce
+
+
+def _coercer(spec: Dict[str, Any], path: str) -> Callable[[str], Optional[Any]]:
+    if "enum" in spec:
+        if not isinstance(spec["enum"], list) or not spec["enum"]:
+            raise SchemaError(f"'{path}': enum must be a non-empty list.")
+        return _enum_coercer(spec["enum"])
+    kind = _type_of(spec, path)
+    if kind == "number":
+        return to_number
+    if kind == "integer":
+        return to_integer
+    if kind == "boolean":
+        return to_boolean
+    if kind == "string":
+        return to_date if spec.get("format") in ("date", "date-time") else to_string
+    raise SchemaError(f"'{path}': unsupported type '{kind}'.")
+
+
+def _type_of(spec: Dict[str, Any], path: str) -> str:
+    kind = spec.get("type")
+    if isinstance(kind, list):
+        # e.g. ["string", "null"]
+        kind = next((k for k in kind if k != "null"), "string")
+    if kind is None:
+        kind = "object" if "properties" in spec else "array" if "items" in spec else "string"
+    if not isinstance(kind, str):
+        raise SchemaError(f"'{path}': invalid type {kind!r}.")
+    return kind
+
+
+# --- Plans --- #
+
+def _terms(text: str) -> List[str]:
+    return [term for term in tokenize(_CAMEL.sub(" ", text).replace("_", " ")) if term not in _STOPWORDS]
+
+
+@functools.lru_cache(maxsize=65536)
+def _label_terms(label: str) -> FrozenSet[str]:
+    """Terms of a document label (labels and table headers repeat across pages)."""
+    return frozenset(_terms(label))
+
+
+@dataclass(frozen=True)
+class FieldPlan:
+    """How to find and type one scalar value."""
+    path: Tuple[str, ...]
+    weights: Dict[str, float]
+    name_weight: float
+    coerce: Callable[[str], Optional[Any]]
+    # One group per name term: the term and its synonyms
+    name_groups: Tuple[FrozenSet[str], ...] = ()
+    # Terms of the accepted values themselves (enum options), searched when no label matches
+    value_terms: FrozenSet[str] = frozenset()
+
+    def score(self, label_terms: FrozenSet[str]) -> float:
+        """How well a label matches this field (0 when it does not match enough of the name)."""
+        matched = sum(self.weights.get(term, 0.0) for term in label_terms)
+        name_matched = sum(self.weights[term] for term in label_terms if self.weights.get(term) == NAME_WEIGHT)
+        if not self.name_weight or name_matched / self.name_weight < MIN_LABEL_SCORE:
+            return 0.0
+        extra = sum(1 for term in label_terms if term not in self.weights)
+        return matched / self.name_weight - EXTRA_TERM_PENALTY * extra
+
+
+@dataclass(frozen=True)
+class ListPlan:
+    """
+    An array. `header` finds it by label; items are either objects (one
+    FieldPlan per property, matched to table columns) or scalars typed by `coerce`.
+    """
+    path: Tuple[str, ...]
+    header: FieldPlan
+    columns: Tuple[FieldPlan, ...] = ()
+    coerce: Callable[[str], Optional[Any]] = to_string
+
+
+def _field_plan(path: Tuple[str, ...], spec: Dict[str, Any], coerce: Callable[[str], Optional[Any]]) -> FieldPlan:
+    weights: Dict[str, float] = {}
+
+    def add(terms: Iterable[str], weight: float) -> None:
+        for term in terms:
+            weights[term] = max(weights.get(term, 0.0), weight)
+
+    name_terms = list(dict.fromkeys(_terms(path[-1]))) if path else []
+    for parent in path[:-1]:
+        add(_terms(parent), PARENT_WEIGHT)
+    add(_terms(spec.get("description") or ""), DESCRIPTION_WEIGHT)
+    add(_terms(spec.get("title") or ""), DESCRIPTION_WEIGHT)
+    add(name_terms, NAME_WEIGHT)
+    for term in name_terms:
+        add(_SYNONYMS.get(term, ()), NAME_WEIGHT)
+    name_groups = tuple(frozenset((term,) + _SYNONYMS.get(term, ())) for term in name_terms)
+    value_terms = frozenset(term for option in spec.get("enum") or () for term in tokenize(str(option)))
+    return FieldPlan(
+        path=path, weights=weights, name_weight=NAME_WEIGHT * len(name_terms), coerce=coerce,
+        name_groups=name_groups, value_terms=value_terms,
+    )
+
+
+@dataclass
+class ExtractionResult:
+    data: Dict[str, Any]
+    citations: Dict[str, Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class ExtractionPlan:
+    """A compiled schema: what to look for, where, and how to type it."""
+    key: str
+    fields: Tuple[FieldPlan, ...]
+    lists: Tuple[ListPlan, ...]
+    template: Dict[str, Any]
+    pages: Optional[Tuple[Tuple[int, Optional[int]], ...]] = None
+
+    def select_pages(self, page_numbers: Sequence[int]) -> List[int]:
+        """The stored pages this plan searches."""
+        if self.pages is None:
+            return list(page_numbers)
+        return [n for n in page_numbers if any(start <= n and (end is None or n <= end) for start, end in self.pages)]
+
+    def run(self, index: "DocumentIndex") -> ExtractionResult:
+        data = copy.deepcopy(self.template)
+        citations: Dict[str, Dict[str, Any]] = {}
+        for plan in self.fields:
+            found = index.find_value(plan)
+            if found is not None:
+                value, candidate = found
+                _set_path(data, plan.path, value)
+                citations[".".join(plan.path)] = candidate.citation()
+        for plan in self.lists:
+            items, pages = index.find_list(plan)
+            if items:
+                _set_path(data, plan.path, items)
+                citations[".".join(plan.path)] = {"pages": pages, "source": "table"}
+        return ExtractionResult(data=data, citations=citations)
+
+
+def _set_path(data: Dict[str, Any], path: Tuple[str, ...], value: Any) -> None:
+    for key in path[:-1]:
+        data = data[key]
+    data[path[-1]] = value
+
+
+def compile_plan(schema: Dict[str, Any], options: Optional[Dict[str, Any]] = None, key: str = "") -> ExtractionPlan:
+    """Compile a JSON Schema object (and extraction options) into an `ExtractionPlan`."""
+    if not isinstance(schema, dict) or _type_of(schema, "$") != "object":
+        raise SchemaError("The extraction schema must be an object schema.")
+    fields: List[FieldPlan] = []
+    lists: List[ListPlan] = []
+
+    def walk(spec: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+        """Collect plans below `spec` and return its empty result."""
+        dotted = ".".join(path) or "$"
+        if not isinstance(spec, dict):
+            raise SchemaError(f"'{dotted}': property schemas must be objects.")
+        kind = _type_of(spec, dotted)
+        if kind == "object":
+            properties = spec.get("properties", {})
+            if not isinstance(properties, dict):
+                raise SchemaError(f"'{dotted}': 'properties' must be an object.")
+            return {name: walk(child, path + (name,)) for name, child in properties.items()}
+        if kind == "array":
+            items = spec.get("items") or {"type": "string"}
+            if not isinstance(items, dict):
+                raise SchemaError(f"'{dotted}': 'items' must be a schema object.")
+            header = _field_plan(path, spec, to_string)
+            if _type_of(items, dotted) == "object":
+                columns = []
+                for name, child in (items.get("properties") or {}).items():
+                    if not isinstance(child, dict) or _type_of(child, f"{dotted}[].{name}") in ("object", "array"):
+                        raise SchemaError(f"'{dotted}[].{name}': array items may only have scalar properties.")
+                    columns.append(_field_plan((name,), child, _coercer(child, f"{dotted}[].{name}")))
+                if not columns:
+                    raise SchemaError(f"'{dotted}': array item schemas need 'properties'.")
+                lists.append(ListPlan(path=path, header=header, columns=tuple(columns)))
+            else:
+                lists.append(ListPlan(path=path, header=header, coerce=_coercer(items, f"{dotted}[]")))
+            return []
+        fields.append(_field_plan(path, spec, _coercer(spec, dotted)))
+        return None
+
+    template = walk(schema, ())
+    pages = None
+    page_spec = (options or {}).get("pages")
+    if page_spec:
+        try:
+            pages = tuple(parse_page_spec(page_spec))
+        except ValueError as e:
+            raise SchemaError(str(e)) from None
+    return ExtractionPlan(key=key, fields=tuple(fields), lists=tuple(lists), template=template, pages=pages)
+
+
+# --- Document index --- #
+
+_KEY_VALUE = re.compile(r"^\s*([^:]{1,80}?)\s*:\s*(.+?)\s*$")
+_TRAILING_VALUE = re.compile(r"\s([-(]?[$€£¥]?\s*\d[\d,./-]*\)?%?)$")
+_LETTER = re.compile(r"[A-Za-z]")
+
+
+@dataclass
+class Candidate:
+    """A labelled value found in the document."""
+    page_number: int
+    label: str
+    terms: FrozenSet[str]
+    values: Tuple[str, ...]
+    source: str
+    penalty: float = 0.0
+
+    def citation(self) -> Dict[str, Any]:
+        return {"page": self.page_number, "source": self.source, "label": self.label}
+
+
+@dataclass
+class IndexedTable:
+    page_number: int
+    header_terms: List[FrozenSet[str]]
+    rows: List[List[Optional[str]]]
+
+
+@dataclass
+class DocumentIndex:
+    """Labelled values and tables of a parsed document, with an inverted index on label terms."""
+    candidates: List[Candidate] = field(default_factory=list)
+    postings: Dict[str, List[int]] = field(default_factory=dict)
+    tables: List[IndexedTable] = field(default_factory=list)
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Dict[str, Any]]) -> "DocumentIndex":
+        """Build an index from decoded `Page` dicts."""
+        index = cls()
+        for page in pages:
+            index.add_page(page)
+        return index
+
+    def _add(self, candidate: Candidate) -> None:
+        if not candidate.terms:
+            return
+        position = len(self.candidates)
+        self.candidates.append(candidate)
+        for term in candidate.terms:
+            self.postings.setdefault(term, []).append(position)
+
+    def add_page(self, page: Dict[str, Any]) -> None:
+        page_number = page["page_number"]
+        lines = [line.strip() for line in (page.get("text") or "").splitlines()]
+        lines = [line for line in lines if line]
+        for position, line in enumerate(lines):
+            label = value = None
+            match = _KEY_VALUE.match(line)
+            if match:
+                label, value = match.group(1), match.group(2)
+            elif len(line) <= 120:
+                # "Label   1,234": a short line ending in a number
+                match = _TRAILING_VALUE.search(line)
+                if match:
+                    label, value = line[:match.start()].strip(), match.group(1)
+            if label and _LETTER.search(label):
+                self._add(Candidate(page_number, label, _label_terms(label), (value,), "text"))
+            else:
+                # Possibly a label on its own line, with the value on the next one
+                value = (lines[position + 1],) if position + 1 < len(lines) and len(line) <= 60 else ()
+                self._add(Candidate(page_number, line, _label_terms(line), value, "text", NEXT_LINE_PENALTY))
+
+        for table in page.get("tables") or []:
+            rows = [[cell.strip() if isinstance(cell, str) else None for cell in row] for row in table.get("data") or []]
+            if not rows:
+                continue
+            for row in rows:
+                cells = [cell for cell in row if cell]
+                if len(cells) >= 2:
+                    self._add(Candidate(page_number, cells[0], _label_terms(cells[0]), tuple(cells[1:]), "table"))
+            header = rows[0]
+            for column, label in enumerate(header):
+                if label:
+                    below = tuple(row[column] for row in rows[1:] if column < len(row) and row[column])
+                    self._add(Candidate(page_number, label, _label_terms(label), below, "table"))
+            self.tables.append(IndexedTable(page_number, [_label_terms(cell or "") for cell in header], rows[1:]))
+
+    def find_value(self, plan: FieldPlan) -> Optional[Tuple[Any, Candidate]]:
+        """
+        Best-scoring candidate whose value coerces to the field's type.
+
+        Only candidates sharing a name term (or synonym) can score, so they are
+        gathered from the postings of the name groups: first those matching
+        every group, then, if none of them has a usable value, the rest.
+        """
+        groups = [set().union(*(self.postings.get(term, ()) for term in group)) for group in plan.name_groups]
+        if groups:
+            complete = set.intersection(*groups)
+            for positions in (complete, set().union(*groups) - complete):
+                found = self._best_value(plan, positions)
+                if found is not None:
+                    return found
+
+        # No labelled value: look for the accepted values themselves (e.g. "All amounts in EUR")
+        positions = set()
+        for term in plan.value_terms:
+            positions.update(self.postings.get(term, ()))
+        for position in sorted(positions, key=lambda p: (self.candidates[p].page_number, p)):
+            candidate = self.candidates[position]
+            for value in (candidate.label,) + candidate.values:
+                coerced = plan.coerce(value)
+                if coerced is not None:
+                    return coerced, candidate
+        return None
+
+    def _best_value(self, plan: FieldPlan, positions: Iterable[int]) -> Optional[Tuple[Any, Candidate]]:
+        scored = []
+        for position in positions:
+            candidate = self.candidates[position]
+            score = plan.score(candidate.terms) - candidate.penalty
+            if score > 0:
+                scored.append((-score, candidate.page_number, position))
+        for _, _, position in sorted(scored):
+            candidate = self.candidates[position]
+            for value in candidate.values:
+                coerced = plan.coerce(value)
+                if coerced is not None:
+                    return coerced, candidate
+        return None
+
+    def find_list(self, plan: ListPlan) -> Tuple[List[Any], List[int]]:
+        """Items of an array field, from the tables whose headers best match it."""
+        if not plan.columns:
+            return self._find_scalar_list(plan)
+
+        best_score, matches = 0.0, []
+        for table in self.tables:
+            mapping, score = _match_columns(plan.columns, table.header_terms)
+            if score > best_score + 1e-9:
+                best_score, matches = score, [(table, mapping)]
+            elif score and abs(score - best_score) <= 1e-9:
+                # Same header again, e.g. a table continued on the next page
+                matches.append((table, mapping))
+
+        items: List[Dict[str, Any]] = []
+        pages: List[int] = []
+        for table, mapping in matches:
+            for row in table.rows:
+                item = {
+                    column.path[-1]: (column.coerce(row[mapping[i]]) if i in mapping and mapping[i] < len(row) and row[mapping[i]] else None)
+                    for i, column in enumerate(plan.columns)
+                }
+                if any(value is not None for value in item.values()):
+                    items.append(item)
+            if table.page_number not in pages:
+                pages.append(table.page_number)
+        return items, pages
+
+    def _find_scalar_list(self, plan: ListPlan) -> Tuple[List[Any], List[int]]:
+        best = None
+        for table in self.tables:
+            for column, terms in enumerate(table.header_terms):
+                score = plan.header.score(terms)
+                if score > 0 and (best is None or score > best[0]):
+                    best = (score, table, column)
+        if best is not None:
+            _, table, column = best
+            values = [plan.coerce(row[column]) for row in table.rows if column < len(row) and row[column]]
+            return [value for value in values if value is not None], [table.page_number]
+        # Otherwise a labelled, comma-separated value ("Tags: a, b, c")
+        found = self.find_value(plan.header)
+        if found is None:
+            return [], []
+        text, candidate = found
+        values = [plan.coerce(part) for part in re.split(r"[,;]", text)]
+        return [value for value in values if value is not None], [candidate.page_number]
+
+
+def _match_columns(columns: Sequence[FieldPlan], header_terms: Sequence[FrozenSet[str]]) -> Tuple[Dict[int, int], float]:
+    """Greedily assign item properties to table columns by header score."""
+    pairs = sorted(
+        ((column.score(terms), i, j) for i, column in enumerate(columns) for j, terms in enumerate(header_terms)),
+        reverse=True,
+    )
+    mapping: Dict[int, int] = {}
+    used = set()
+    score = 0.0
+    for pair_score, i, j in pairs:
+        if pair_score <= 0:
+            break
+        if i in mapping or j in used:
+            continue
+        mapping[i] = j
+        used.add(j)
+        score += pair_score
+    return mapping, score
+
+
+# --- Plan cache --- #
+
+def plan_key(schema: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> str:
+    """Hash of the canonical JSON of a schema and its options."""
+    canonical = json.dumps({"schema": schema, "options": options or {}}, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """LRU of compiled extraction plans."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._plans: "OrderedDict[str, ExtractionPlan]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, schema: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> ExtractionPlan:
+        """Return the compiled plan for `schema` and `options`, compiling it on a miss."""
+        key = plan_key(schema, options)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self._counters["hits"] += 1
+                return plan
+            self._counters["misses"] += 1
+        # Compile outside the lock; a concurrent miss on the same key compiles twice, harmlessly
+        plan = compile_plan(schema, options, key=key)
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+                self._counters["evictions"] += 1
+        return plan
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._plans)}
+
+
+_plan_cache: Optional[PlanCache] = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache() -> PlanCache:
+    """Return the shared plan cache, sized from EXTRACT_PLAN_CACHE_SIZE."""
+    global _plan_cache
+    size = get_extract_plan_cache_size()
+    with _plan_cache_lock:
+        if _plan_cache is None or _plan_cache.max_entries != size:
+            _plan_cache = PlanCache(size)
+        return _plan_cache
+
+
+def get_extraction_plan(schema: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> ExtractionPlan:
+    """Compiled plan for `schema` and `options`, from the shared LRU. Raises SchemaError."""
+    return get_plan_cache().get(schema, options)
@@ -0,0 +1,929 @@
+# backend/app/core/jobs.py
+"""
+Persistent asynchronous job engine.
+
+Jobs are stored in a local SQLite database (WAL mode) and executed by a
+bounded pool of asyncio workers:
+
+- `JobStore` owns the database: submitting (one job, or a batch of jobs
+  sharing a `batch_id` in one transaction), claiming, progress updates and
+  completion.
+- `JobEngine` runs a dispatcher that claims queued jobs, highest priority
+  first, while respecting a global worker limit and per-job-type concurrency
+  limits, and runs each job with the handler registered for its type.
+
+Handlers are registered with the `job_handler` decorator by the endpoint
+modules that own each job type. Listeners registered with `on_job_finished`
+(e.g. webhook delivery) are called in their own tasks once a job has
+succeeded or failed, so they never hold a worker slot. The commit of a job's
+outcome also marks its notification as pending (`notify_at`) in the same
+UPDATE; the mark is cleared only after every listener has run, and engines
+drain pending marks on start and on every heartbeat. A crash or stop between
+the commit and the listeners therefore delays the notification instead of
+losing it (listeners may run more than once for a job, never zero times).
+
+Several processes (uvicorn `--workers`, or containers sharing DATA_DIR on one
+host) can run engines over the same database. Claims are leases:
+
+- a worker claims a job by moving it from queued to running under its
+  worker ID, with an expiry JOB_LEASE_SECONDS ahead; the update only
+  succeeds for the one worker that saw it queued;
+- each engine renews the leases of its running jobs every third of the
+  lease (a heartbeat) and cancels any job whose lease it has lost;
+- every engine sweeps for expired leases and re-dispatches those jobs, so
+  the work of a crashed or hung worker is picked up by the others; a job
+  lost JOB_MAX_ATTEMPTS times is failed instead;
+- results, failures and progress are fenced by owner and attempt, so a
+  worker that lost its lease cannot overwrite the outcome of the attempt
+  that replaced it: each job's result is committed exactly once, and
+  finish listeners run only for that commit.
+
+On a graceful stop an engine hands its running jobs straight back to the
+queue. On start it also requeues jobs held by earlier processes on this
+host that are no longer running, so a restart does not wait for the lease.
+
+Submissions can be deduplicated (`JobEngine.submit_once`): a job carries the
+fingerprint of the request that created it (`request_fingerprint`), and an
+identical request attaches to a matching job that is queued or running, or
+that succeeded within JOB_DEDUPE_WINDOW_SECONDS, instead of creating one.
+An Idempotency-Key names a submission explicitly: retries with the same key
+get the same job whatever its state, for the same window.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .config import (
+    get_jobs_db_path, get_job_max_workers, get_job_concurrency, get_job_poll_interval_seconds,
+    get_job_lease_seconds, get_job_max_attempts, get_job_dedupe_window_seconds,
+)
+from .metrics import JOB_DURATION, JOB_QUEUE_WAIT
+from .serialization import loads
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+JOB_STATES = (QUEUED, RUNNING, SUCCEEDED, FAILED)
+
+
+@dataclass
+class Job:
+    """A row of the jobs table."""
+    job_id: str
+    job_type: str
+    status: str
+    priority: int
+    payload: Dict[str, Any]
+    result: Optional[str]
+    error: Optional[str]
+    pages_done: int
+    pages_total: Optional[int]
+    attempts: int
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    batch_id: Optional[str] = None
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+    fingerprint: Optional[str] = None
+
+    def to_status(self) -> Dict[str, Any]:
+        """Public status representation used by the /jobs endpoint."""
+        now = time.time()
+        queue_end = self.started_at or now
+        run_end = self.finished_at or now
+        status = {
+            "job_id": self.job_id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "priority": self.priority,
+            "progress": {"pages_done": self.pages_done, "pages_total": self.pages_total},
+            "timings": {
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "queue_seconds": round(queue_end - self.created_at, 4),
+                "run_seconds": round(run_end - self.started_at, 4) if self.started_at else None,
+            },
+        }
+        if self.batch_id is not None:
+            status["batch_id"] = self.batch_id
+        if self.lease_owner is not None:
+            status["worker"] = self.lease_owner
+        if self.status == SUCCEEDED and self.result is not None:
+            status["result"] = loads(self.result)
+        if self.status == FAILED:
+            status["error"] = self.error
+        return status
+
+
+_JOB_COLUMNS = (
+    "job_id, job_type, status, priority, payload, result, error, "
+    "pages_done, pages_total, attempts, created_at, started_at, finished_at, batch_id, "
+    "lease_owner, lease_expires_at, fingerprint"
+)
+
+# Clears a job's run so it can be claimed again
+_REQUEUE = "status = 'queued', started_at = NULL, pages_done = 0, lease_owner = NULL, lease_expires_at = NULL"
+
+
+class IdempotencyKeyReused(ValueError):
+    """Raised when an Idempotency-Key is sent again with a different request."""
+
+
+def request_fingerprint(job_type: str, request: Dict[str, Any]) -> str:
+    """
+    Canonical fingerprint of an async request: `request` should hold the
+    document's identity and the normalized options that determine the
+    result, so equal fingerprints mean the same work.
+    """
+    canonical = json.dumps([job_type, request], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def new_worker_id() -> str:
+    """Worker ID for a job store: "host:pid:nonce", unique per process start."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _local_worker_gone(worker_id: Optional[str], current: str) -> bool:
+    """
+    Whether `worker_id` belonged to an earlier process on this host that has
+    stopped: its PID is no longer running, or is this process under another
+    worker ID (a restarted container reuses its PIDs). Workers on other hosts
+    are never judged here; their leases simply expire.
+    """
+    if worker_id is None:
+        return True
+    parts = worker_id.rsplit(":", 2)
+    if os.name != "posix" or len(parts) != 3 or parts[0] != socket.gethostname() or not parts[1].isdigit():
+        return False
+    pid = int(parts[1])
+    if pid == os.getpid():
+        return worker_id != current
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+class JobStore:
+    """
+    SQLite-backed job table, safe to share between processes. All methods are
+    blocking; call them from a thread. Jobs are claimed under `worker_id` for
+    `lease_seconds`; `max_attempts` bounds how often an abandoned job is retried.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = 30.0,
+        max_attempts: int = 3,
+    ):
+        self.db_path = Path(db_path)
+        self.worker_id = worker_id or new_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                pages_done INTEGER NOT NULL DEFAULT 0,
+                pages_total INTEGER,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                batch_id TEXT,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                fingerprint TEXT,
+                notify_at REAL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                idempotency_key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                job_id TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        # Databases created before batches, leases or fingerprints existed (running jobs without a lease count as expired)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in (
+            ("batch_id", "TEXT"), ("lease_owner", "TEXT"), ("lease_expires_at", "REAL"), ("fingerprint", "TEXT"),
+            ("notify_at", "REAL"),
+        ):
+            if column not in columns:
+                try:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+                except sqlite3.OperationalError as e:
+                    # Another process sharing the database added it first
+                    if "duplicate column" not in str(e):
+                        raise
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_leases ON jobs (lease_expires_at) WHERE status = 'running'")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id, created_at) WHERE batch_id IS NOT NULL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs (fingerprint, created_at) WHERE fingerprint IS NOT NULL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_notify ON jobs (notify_at) WHERE notify_at IS NOT NULL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idempotency_keys_age ON idempotency_keys (created_at)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _row_to_job(self, row) -> Job:
+        values = list(row)
+        values[4] = json.loads(values[4])
+        return Job(*values)
+
+    def submit(self, job_type: str, payload: Dict[str, Any], priority: int = 0, job_id: Optional[str] = None) -> Job:
+        """Insert a new queued job and return it."""
+        job_id = job_id or f"async-{job_type}-job-{uuid.uuid4().hex}"
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, job_type, status, priority, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, QUEUED, priority, json.dumps(payload), now),
+            )
+            self._conn.commit()
+            return self._get(job_id)
+
+    def submit_once(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        fingerprint: str,
+        priority: int = 0,
+        idempotency_key: Optional[str] = None,
+        window_seconds: float = 3600.0,
+        reuse_finished: bool = True,
+    ) -> Tuple[Job, bool]:
+        """
+        Submit a job unless an equivalent one exists. Returns the job and whether it was created.
+
+        With `idempotency_key`, a submission under the same key within
+        `window_seconds` returns that job in whatever state it is in, and
+        raises `IdempotencyKeyReused` if its fingerprint differs. Otherwise a
+        job with the same `fingerprint` that is queued, running, or succeeded
+        within `window_seconds` is returned (failed jobs are not, so sending
+        the request again retries it); a queued match is raised to `priority`.
+        Without `reuse_finished` only queued and running jobs match, for
+        fingerprints that cannot tell whether the result would still be the
+        same (e.g. a document URL whose content may have changed).
+        The check and the insert are one transaction, so concurrent identical
+        submissions from any process share one job.
+        """
+        now = time.time()
+        with self._lock:
+            # Take the write lock up front: the lookup must not race another process's insert
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                job, created = self._submit_once(
+                    job_type, payload, fingerprint, priority, idempotency_key, now - window_seconds, reuse_finished
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            return job, created
+
+    def _submit_once(self, job_type, payload, fingerprint, priority, idempotency_key, cutoff, reuse_finished) -> Tuple[Job, bool]:
+        if idempotency_key is not None:
+            self._conn.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (cutoff,))
+            row = self._conn.execute(
+                "SELECT fingerprint, job_id FROM idempotency_keys WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+            if row is not None:
+                if row[0] != fingerprint:
+                    raise IdempotencyKeyReused("This Idempotency-Key was already used for a different request.")
+                job = self._get(row[1])
+                if job is not None:
+                    return job, False
+
+        row = self._conn.execute(
+            "SELECT job_id FROM jobs WHERE fingerprint = ? AND job_type = ? "
+            "AND (status IN (?, ?) OR (status = ? AND finished_at >= ?)) ORDER BY created_at DESC LIMIT 1",
+            (fingerprint, job_type, QUEUED, RUNNING, SUCCEEDED, cutoff if reuse_finished else float("inf")),
+        ).fetchone()
+        created = row is None
+        if created:
+            job_id = f"async-{job_type}-job-{uuid.uuid4().hex}"
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, job_type, status, priority, payload, created_at, fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, QUEUED, priority, json.dumps(payload), time.time(), fingerprint),
+            )
+        else:
+            job_id = row[0]
+            self._conn.execute(
+                "UPDATE jobs SET priority = ? WHERE job_id = ? AND status = ? AND priority < ?",
+                (priority, job_id, QUEUED, priority),
+            )
+        if idempotency_key is not None:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys (idempotency_key, fingerprint, job_id, created_at) VALUES (?, ?, ?, ?)",
+                (idempotency_key, fingerprint, job_id, time.time()),
+            )
+        return self._get(job_id), created
+
+    def submit_batch(
+        self,
+        job_type: str,
+        items: Sequence[Tuple[Dict[str, Any], Optional[str]]],
+        priority: int = 0,
+        batch_id: Optional[str] = None,
+    ) -> Tuple[str, List[Job]]:
+        """
+        Insert one job per `(payload, error)` item under a shared batch ID, in one
+        transaction. Items with an `error` (e.g. a rejected upload) are stored as
+        already failed so they show up in the batch without ever running.
+        Returns the batch ID and the jobs in submission order.
+        """
+        batch_id = batch_id or f"batch-{uuid.uuid4().hex}"
+        now = time.time()
+        rows = []
+        for payload, error in items:
+            job_id = f"async-{job_type}-job-{uuid.uuid4().hex}"
+            status, finished_at = (FAILED, now) if error else (QUEUED, None)
+            rows.append((job_id, job_type, status, priority, json.dumps(payload), error, now, finished_at, batch_id))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO jobs (job_id, job_type, status, priority, payload, error, created_at, finished_at, batch_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            return batch_id, self._list_batch(batch_id)
+
+    def _list_batch(self, batch_id: str, with_results: bool = False) -> List[Job]:
+        # Results can be large; leave them out unless asked for
+        columns = _JOB_COLUMNS if with_results else _JOB_COLUMNS.replace(" result,", " NULL,")
+        rows = self._conn.execute(
+            f"SELECT {columns} FROM jobs WHERE batch_id = ? ORDER BY created_at, rowid", (batch_id,)
+        ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def list_batch(self, batch_id: str, with_results: bool = False) -> List[Job]:
+        """Jobs of a batch in submission order (empty if the batch does not exist)."""
+        with self._lock:
+            return self._list_batch(batch_id, with_results)
+
+    def _get(self, job_id: str) -> Optional[Job]:
+        row = self._conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._get(job_id)
+
+    # --- Leases --- #
+
+    def claim_next(self, job_types: List[str]) -> Optional[Job]:
+        """
+        Claim the highest-priority queued job of one of `job_types` for this
+        worker. Safe against other processes: if another worker claims the
+        same job first, the next one is tried.
+        """
+        if not job_types:
+            return None
+        placeholders = ",".join("?" for _ in job_types)
+        with self._lock:
+            while True:
+                row = self._conn.execute(
+                    f"SELECT job_id FROM jobs WHERE status = ? AND job_type IN ({placeholders}) "
+                    "ORDER BY priority DESC, created_at LIMIT 1",
+                    (QUEUED, *job_types),
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, lease_owner = ?, lease_expires_at = ? "
+                    "WHERE job_id = ? AND status = ?",
+                    (RUNNING, now, self.worker_id, now + self.lease_seconds, row[0], QUEUED),
+                )
+                self._conn.commit()
+                if cursor.rowcount:
+                    return self._get(row[0])
+
+    def renew_leases(self, leases: Dict[str, int]) -> Set[str]:
+        """
+        Heartbeat: extend this worker's leases on `{job_id: attempt}`. Returns
+        the job IDs it still holds (including any it has just finished); the
+        others were re-dispatched after their lease expired and must be abandoned.
+        """
+        if not leases:
+            return set()
+        placeholders = ",".join("?" for _ in leases)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET lease_expires_at = ? WHERE status = ? AND lease_owner = ? AND job_id IN ({placeholders})",
+                (time.time() + self.lease_seconds, RUNNING, self.worker_id, *leases),
+            )
+            self._conn.commit()
+            rows = self._conn.execute(
+                f"SELECT job_id, attempts FROM jobs WHERE lease_owner = ? AND job_id IN ({placeholders})",
+                (self.worker_id, *leases),
+            ).fetchall()
+        return {job_id for job_id, attempts in rows if leases[job_id] == attempts}
+
+    def release_leases(self) -> int:
+        """Put this worker's running jobs back in the queue (graceful stop). Returns how many."""
+        with self._lock:
+            # The interrupted run does not count against the job's attempts
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {_REQUEUE}, attempts = MAX(attempts - 1, 0) WHERE status = ? AND lease_owner = ?",
+                (RUNNING, self.worker_id),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def _recover(self, candidates: Sequence[Tuple[str, Optional[str], int]]) -> Tuple[List[str], List[str]]:
+        """
+        Requeue abandoned running jobs `(job_id, lease_owner, attempts)`, or fail
+        those out of attempts. Each update re-checks the owner, so a job another
+        process recovered (or that was renewed) in the meantime is left alone.
+        Returns (requeued, failed) job IDs.
+        """
+        requeued: List[str] = []
+        failed: List[str] = []
+        now = time.time()
+        for job_id, owner, attempts in candidates:
+            if attempts >= self.max_attempts:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL, notify_at = ? "
+                    "WHERE job_id = ? AND status = ? AND lease_owner IS ?",
+                    (FAILED, f"Abandoned after {attempts} attempt(s): the worker running it stopped before finishing.",
+                     now, now, job_id, RUNNING, owner),
+                )
+                if cursor.rowcount:
+                    failed.append(job_id)
+            else:
+                cursor = self._conn.execute(
+                    f"UPDATE jobs SET {_REQUEUE} WHERE job_id = ? AND status = ? AND lease_owner IS ?",
+                    (job_id, RUNNING, owner),
+                )
+                if cursor.rowcount:
+                    requeued.append(job_id)
+        self._conn.commit()
+        return requeued, failed
+
+    def requeue_expired(self) -> Tuple[List[str], List[str]]:
+        """Recover running jobs whose lease has expired (their worker crashed or hung). Returns (requeued, failed)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, lease_owner, attempts FROM jobs WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (RUNNING, time.time()),
+            ).fetchall()
+            if not rows:
+                return [], []
+            return self._recover(rows)
+
+    def requeue_interrupted(self) -> Tuple[List[str], List[str]]:
+        """
+        At start: recover jobs with an expired lease plus those held by an earlier
+        process on this host that is gone, without waiting for their lease.
+        Returns (requeued, failed).
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, lease_owner, attempts, lease_expires_at FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            stale = [
+                (job_id, owner, attempts) for job_id, owner, attempts, expires_at in rows
+                if expires_at is None or expires_at < now or _local_worker_gone(owner, self.worker_id)
+            ]
+            if not stale:
+                return [], []
+            return self._recover(stale)
+
+    # --- Fenced writes (only the current attempt's worker may write) --- #
+
+    def update_progress(self, job_id: str, pages_done: int, pages_total: Optional[int], attempt: int) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET pages_done = ?, pages_total = ? WHERE job_id = ? AND status = ? AND lease_owner = ? AND attempts = ?",
+                (pages_done, pages_total, job_id, RUNNING, self.worker_id, attempt),
+            )
+            self._conn.commit()
+            return bool(cursor.rowcount)
+
+    def complete(self, job_id: str, result_json: str, attempt: int) -> bool:
+        """
+        Commit the job's result, with its finish notification pending. False if
+        this attempt no longer holds the job (nothing is written).
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ?, lease_expires_at = NULL, notify_at = ? "
+                "WHERE job_id = ? AND status = ? AND lease_owner = ? AND attempts = ?",
+                (SUCCEEDED, result_json, now, now, job_id, RUNNING, self.worker_id, attempt),
+            )
+            self._conn.commit()
+            return bool(cursor.rowcount)
+
+    def fail(self, job_id: str, error: str, attempt: int) -> bool:
+        """Record the job's failure, like `complete`. False if this attempt no longer holds the job."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL, notify_at = ? "
+                "WHERE job_id = ? AND status = ? AND lease_owner = ? AND attempts = ?",
+                (FAILED, error, now, now, job_id, RUNNING, self.worker_id, attempt),
+            )
+            self._conn.commit()
+            return bool(cursor.rowcount)
+
+    # --- Finish notifications --- #
+
+    def claim_notifications(self, job_ids: Optional[Sequence[str]] = None, limit: int = 100) -> List[Job]:
+        """
+        Claim pending finish notifications that are due (of `job_ids`, or any),
+        for `lease_seconds`: a claim left by a process that died lapses and the
+        notification is claimed again. Returns the claimed jobs.
+        """
+        now = time.time()
+        with self._lock:
+            if job_ids is None:
+                rows = self._conn.execute(
+                    "SELECT job_id, notify_at FROM jobs WHERE notify_at <= ? ORDER BY notify_at LIMIT ?", (now, limit)
+                ).fetchall()
+            else:
+                placeholders = ",".join("?" for _ in job_ids)
+                rows = self._conn.execute(
+                    f"SELECT job_id, notify_at FROM jobs WHERE notify_at <= ? AND job_id IN ({placeholders})",
+                    (now, *job_ids),
+                ).fetchall()
+            claimed = []
+            for job_id, notify_at in rows:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET notify_at = ? WHERE job_id = ? AND notify_at = ?",
+                    (now + self.lease_seconds, job_id, notify_at),
+                )
+                if cursor.rowcount:
+                    claimed.append(job_id)
+            self._conn.commit()
+            return [self._get(job_id) for job_id in claimed]
+
+    def settle_notifications(self, done: Sequence[str], retry: Sequence[str] = ()) -> None:
+        """Clear the notifications whose listeners all ran; make the others due again now."""
+        with self._lock:
+            self._conn.executemany("UPDATE jobs SET notify_at = NULL WHERE job_id = ?", [(job_id,) for job_id in done])
+            self._conn.executemany(
+                "UPDATE jobs SET notify_at = ? WHERE job_id = ? AND notify_at IS NOT NULL",
+                [(time.time(), job_id) for job_id in retry],
+            )
+            self._conn.commit()
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {state: 0 for state in JOB_STATES}
+        counts.update(dict(rows))
+        return counts
+
+
+# --- Handlers --- #
+
+class JobContext:
+    """Passed to job handlers: the job's payload plus a way to report progress."""
+
+    def __init__(self, store: JobStore, job: Job):
+        self._store = store
+        self.job = job
+
+    @property
+    def job_id(self) -> str:
+        return self.job.job_id
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        return self.job.payload
+
+    async def report_progress(self, pages_done: int, pages_total: Optional[int]) -> None:
+        await asyncio.to_thread(self._store.update_progress, self.job.job_id, pages_done, pages_total, self.job.attempts)
+
+
+JobHandler = Callable[[JobContext], Awaitable[Any]]
+_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(job_type: str) -> Callable[[JobHandler], JobHandler]:
+    """
+    Register an async handler for `job_type`. The handler receives a JobContext
+    and returns a JSON-serializable result (or a pre-serialized JSON `str`).
+    """
+    def decorator(func: JobHandler) -> JobHandler:
+        _HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+JobListener = Callable[[Job], Awaitable[None]]
+_FINISH_LISTENERS: List[JobListener] = []
+
+
+def on_job_finished(listener: JobListener) -> JobListener:
+    """Register an async callback receiving each job once it has succeeded or failed."""
+    _FINISH_LISTENERS.append(listener)
+    return listener
+
+
+# --- Engine --- #
+
+class JobEngine:
+    """
+    Dispatches queued jobs to registered handlers with bounded concurrency, and
+    keeps the leases of its running jobs alive. Limits apply per engine (process).
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        max_workers: int,
+        concurrency: Optional[Dict[str, int]] = None,
+        poll_interval: float = 1.0,
+        dedupe_window_seconds: float = 3600.0,
+    ):
+        self.store = store
+        self.dedupe_window_seconds = dedupe_window_seconds
+        self.max_workers = max(max_workers, 1)
+        self.concurrency = concurrency or {}
+        self.poll_interval = poll_interval
+        self._running: Dict[str, Set[asyncio.Task]] = {}
+        # job_id -> (task, attempt) of the jobs this engine holds leases on
+        self._leases: Dict[str, Tuple[asyncio.Task, int]] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._listener_tasks: Set[asyncio.Task] = set()
+
+    def limit_for(self, job_type: str) -> int:
+        return min(self.concurrency.get(job_type, self.max_workers), self.max_workers)
+
+    @property
+    def running_count(self) -> int:
+        return sum(len(tasks) for tasks in self._running.values())
+
+    @property
+    def heartbeat_interval(self) -> float:
+        return self.store.lease_seconds / 3
+
+    async def start(self) -> None:
+        self._wake = asyncio.Event()
+        requeued, failed = await asyncio.to_thread(self.store.requeue_interrupted)
+        if requeued:
+            logger.info(f"Requeued {len(requeued)} job(s) interrupted by a previous shutdown or crash")
+        await self._notify_failed(failed)
+        # Notifications left pending by a previous stop or crash
+        self._notify()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        logger.info(f"Job engine {self.store.worker_id} started (lease {self.store.lease_seconds:g}s)")
+
+    async def stop(self) -> None:
+        """Stop dispatching and cancel running jobs, handing them back to the queue for any worker."""
+        tasks = [task for tasks in self._running.values() for task in tasks] + list(self._listener_tasks)
+        for loop_task in (self._dispatcher, self._heartbeat):
+            if loop_task is not None:
+                tasks.append(loop_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = self._heartbeat = None
+        released = await asyncio.to_thread(self.store.release_leases)
+        if released:
+            logger.info(f"Released {released} running job(s) back to the queue")
+
+    async def submit(self, job_type: str, payload: Dict[str, Any], priority: int = 0) -> Job:
+        if job_type not in _HANDLERS:
+            raise ValueError(f"No handler registered for job type '{job_type}'.")
+        job = await asyncio.to_thread(self.store.submit, job_type, payload, priority)
+        self.notify()
+        return job
+
+    async def submit_once(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        fingerprint: str,
+        priority: int = 0,
+        idempotency_key: Optional[str] = None,
+        reuse_finished: bool = True,
+    ) -> Tuple[Job, bool]:
+        """Submit a job, or attach to an equivalent one (see `JobStore.submit_once`)."""
+        if job_type not in _HANDLERS:
+            raise ValueError(f"No handler registered for job type '{job_type}'.")
+        job, created = await asyncio.to_thread(
+            self.store.submit_once, job_type, payload, fingerprint, priority, idempotency_key,
+            self.dedupe_window_seconds, reuse_finished,
+        )
+        if created:
+            self.notify()
+        return job, created
+
+    async def submit_batch(
+        self,
+        job_type: str,
+        items: Sequence[Tuple[Dict[str, Any], Optional[str]]],
+        priority: int = 0,
+    ) -> Tuple[str, List[Job]]:
+        """Submit a batch of jobs (see `JobStore.submit_batch`)."""
+        if job_type not in _HANDLERS:
+            raise ValueError(f"No handler registered for job type '{job_type}'.")
+        batch_id, jobs = await asyncio.to_thread(self.store.submit_batch, job_type, items, priority)
+        self.notify()
+        return batch_id, jobs
+
+    def notify(self) -> None:
+        """Wake the dispatcher (e.g. after a submit)."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                await self._fill_slots()
+            except Exception as e:
+                logger.error(f"Job dispatch failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fill_slots(self) -> None:
+        while self.running_count < self.max_workers:
+            free_types = [
+                job_type for job_type in _HANDLERS
+                if len(self._running.get(job_type, ())) < self.limit_for(job_type)
+            ]
+            job = await asyncio.to_thread(self.store.claim_next, free_types)
+            if job is None:
+                return
+            task = asyncio.create_task(self._run(job))
+            self._running.setdefault(job.job_type, set()).add(task)
+            self._leases[job.job_id] = (task, job.attempts)
+            task.add_done_callback(lambda t, job=job: self._on_task_done(job, t))
+
+    def _on_task_done(self, job: Job, task: asyncio.Task) -> None:
+        self._running.get(job.job_type, set()).discard(task)
+        if self._leases.get(job.job_id, (None,))[0] is task:
+            del self._leases[job.job_id]
+        self.notify()
+
+    # --- Leases --- #
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._heartbeat_once()
+            except Exception as e:
+                logger.error(f"Job lease heartbeat failed: {e}")
+
+    async def _heartbeat_once(self) -> None:
+        """Renew this engine's leases, abandon jobs it lost, and re-dispatch jobs of dead workers."""
+        leases = {job_id: attempt for job_id, (_, attempt) in self._leases.items()}
+        held = await asyncio.to_thread(self.store.renew_leases, leases)
+        for job_id in leases.keys() - held:
+            entry = self._leases.get(job_id)
+            if entry is not None and entry[1] == leases[job_id]:
+                logger.warning(f"Lost the lease on job {job_id} (attempt {leases[job_id]}); abandoning it")
+                entry[0].cancel()
+        requeued, failed = await asyncio.to_thread(self.store.requeue_expired)
+        if requeued:
+            logger.warning(f"Re-dispatching {len(requeued)} job(s) whose worker stopped renewing its lease")
+            self.notify()
+        await self._notify_failed(failed)
+        # Including those of jobs whose engine stopped or crashed before running the listeners
+        self._notify()
+
+    async def _notify_failed(self, job_ids: Sequence[str]) -> None:
+        """Run finish listeners for jobs failed by lease recovery rather than by a handler."""
+        for job_id in job_ids:
+            logger.error(f"Job {job_id} failed: abandoned by its workers {self.store.max_attempts} time(s)")
+        if job_ids:
+            self._notify(job_ids)
+
+    def _notify(self, job_ids: Optional[Sequence[str]] = None) -> None:
+        """Run finish listeners, in their own task, for pending notifications (of `job_ids`, or any due)."""
+        task = asyncio.create_task(self._run_listeners(job_ids))
+        self._listener_tasks.add(task)
+        task.add_done_callback(self._listener_tasks.discard)
+
+    async def _run_listeners(self, job_ids: Optional[Sequence[str]]) -> None:
+        jobs = await asyncio.to_thread(self.store.claim_notifications, job_ids)
+        done: List[str] = []
+        try:
+            for job in jobs:
+                results = [await self._call_listener(listener, job) for listener in _FINISH_LISTENERS]
+                if all(results):
+                    done.append(job.job_id)
+        finally:
+            # Failed listeners, and jobs not reached before a stop, are notified again
+            retry = [job.job_id for job in jobs if job.job_id not in done]
+            if jobs:
+                await asyncio.to_thread(self.store.settle_notifications, done, retry)
+
+    async def _run(self, job: Job) -> None:
+        handler = _HANDLERS[job.job_type]
+        logger.info(f"Starting {job.job_type} job {job.job_id} (attempt {job.attempts})")
+        if job.started_at is not None:
+            JOB_QUEUE_WAIT.observe(max(job.started_at - job.created_at, 0.0), job_type=job.job_type)
+        start = time.perf_counter()
+        try:
+            result = await handler(JobContext(self.store, job))
+            result_json = result if isinstance(result, str) else json.dumps(result)
+            outcome = SUCCEEDED
+            committed = await asyncio.to_thread(self.store.complete, job.job_id, result_json, job.attempts)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            outcome = FAILED
+            logger.error(f"Job {job.job_id} failed: {e}")
+            committed = await asyncio.to_thread(self.store.fail, job.job_id, f"{type(e).__name__}: {e}", job.attempts)
+        if not committed:
+            # The lease expired and another attempt owns the job now; its outcome is the one kept
+            logger.warning(f"Discarding the outcome of job {job.job_id} attempt {job.attempts}: its lease was lost")
+            return
+        JOB_DURATION.observe(time.perf_counter() - start, job_type=job.job_type, outcome=outcome)
+        if outcome == SUCCEEDED:
+            logger.info(f"Job {job.job_id} succeeded")
+        self._notify([job.job_id])
+
+    @staticmethod
+    async def _call_listener(listener: JobListener, job: Job) -> bool:
+        try:
+            await listener(job)
+            return True
+        except Exception as e:
+            logger.error(f"Job-finished listener {getattr(listener, '__name__', listener)} failed for {job.job_id}: {e}")
+            return False
+
+
+_engine: Optional[JobEngine] = None
+
+
+def get_job_engine() -> JobEngine:
+    """Return the process-wide job engine, creating it (not started) on first use."""
+    global _engine
+    if _engine is None:
+        _engine = JobEngine(
+            JobStore(get_jobs_db_path(), lease_seconds=get_job_lease_seconds(), max_attempts=get_job_max_attempts()),
+            max_workers=get_job_max_workers(),
+            concurrency=get_job_concurrency(),
+            poll_interval=get_job_poll_interval_seconds(),
+            dedupe_window_seconds=get_job_dedupe_window_seconds(),
+        )
+    return _engine
+
+
+async def start_job_engine() -> JobEngine:
+    engine = get_job_engine()
+    await engine.start()
+    return engine
+
+
+async def stop_job_engine() -> None:
+    """Stop and discard the process-wide engine so the next start re-reads configuration."""
+    global _engine
+    engine, _engine = _engine, None
+    if engine is not None:
+        await engine.stop()
+        engine.store.close()
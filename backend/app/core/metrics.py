@@ -0,0 +1,271 @@
+# backend/app/core/metrics.py
+"""
+In-process metrics with a Prometheus text-format exporter.
+
+- `Counter`, `Gauge` and `Histogram` are labeled metric families kept in a registry
+  and rendered by `render_metrics()` for the /metrics route. Updates take
+  one lock and a bisect, so they are cheap enough for every request and
+  page range.
+- `MetricsMiddleware` is a pure ASGI middleware timing every HTTP request,
+  labeled by route template (not the raw path, to keep cardinality bounded),
+  method, outcome and mode: the parsing mode an endpoint records with
+  `label_request_mode` once it has validated its options ("" otherwise).
+- `stage_timer` times one stage of work (upload write, parse, OCR,
+  serialization, ...) with an `ok`/`error` outcome.
+
+Metrics live in the process that records them; parser and OCR workers are
+timed from the server process around the pool calls.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Upper bounds in seconds, from fast requests to long parses of large documents
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """A value that can go up and down per label set."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set, as Prometheus expects."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "docuparse_http_requests_total", "HTTP requests by route template, method, outcome and mode.",
+    ("route", "method", "outcome", "mode")))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    "docuparse_http_request_duration_seconds", "HTTP request latency, until the response has been sent.",
+    ("route", "method", "outcome", "mode")))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "docuparse_stage_duration_seconds", "Time spent in one stage of request or job work.", ("stage", "mode", "outcome")))
+PAGES_PARSED = REGISTRY.register(Counter(
+    "docuparse_pages_parsed_total", "Pages parsed by the worker pool.", ("mode", "outcome")))
+PAGE_RANGE_DURATION = REGISTRY.register(Histogram(
+    "docuparse_page_range_duration_seconds", "Time to parse one page range on the worker pool, including pool wait.", ("mode",)))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "docuparse_parse_cache_lookups_total", "Parse-result cache lookups.", ("outcome",)))
+PAGE_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "docuparse_page_cache_lookups_total", "Page-fingerprint cache lookups: hits are pages reused instead of parsed.", ("mode", "outcome")))
+JOB_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "docuparse_job_queue_wait_seconds", "Time async jobs spent queued before a worker started them.", ("job_type",)))
+JOB_DURATION = REGISTRY.register(Histogram(
+    "docuparse_job_duration_seconds", "Async job run time.", ("job_type", "outcome")))
+ADMISSION_DECISIONS = REGISTRY.register(Counter(
+    "docuparse_admission_decisions_total", "Admission decisions: admitted, rejected (429) or deferred (async, lower priority).", ("kind", "outcome", "reason")))
+PAGES_IN_FLIGHT = REGISTRY.register(Gauge(
+    "docuparse_pages_in_flight", "Pages currently being parsed, counted against the admission budget."))
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    "docuparse_startup_seconds", "Duration of each startup phase of this process (import, startup, prewarm).", ("phase",)))
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    return REGISTRY.render()
+
+
+@contextmanager
+def stage_timer(stage: str, mode: str = "") -> Iterator[None]:
+    """Record the duration of the enclosed block as `stage`, with an ok/error outcome."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage, mode=mode, outcome=outcome)
+
+
+# --- HTTP middleware --- #
+
+# Key in the ASGI scope's request state under which endpoints leave the mode label
+REQUEST_MODE_STATE = "metrics_mode"
+
+
+def label_request_mode(request, mode: str) -> None:
+    """Label the HTTP metrics of `request` (a Starlette Request) with `mode`."""
+    setattr(request.state, REQUEST_MODE_STATE, mode)
+
+
+def _outcome(status_code: int) -> str:
+    if status_code >= 500:
+        return "server_error"
+    if status_code >= 400:
+        return "client_error"
+    return "success"
+
+
+class MetricsMiddleware:
+    """Times HTTP requests and counts them by route template, method, outcome and mode."""
+
+    def __init__(self, app, exclude: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+        # Shared with the Request the endpoint sees, which may label the mode
+        state = scope.setdefault("state", {})
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            labels = {
+                "route": _route_template(scope),
+                "method": scope["method"],
+                "outcome": _outcome(status_code),
+                "mode": state.get(REQUEST_MODE_STATE, ""),
+            }
+            HTTP_DURATION.observe(time.perf_counter() - start, **labels)
+            HTTP_REQUESTS.inc(**labels)
+
+
+def _route_template(scope) -> str:
+    """
+    The matched route's path with parameters as `{name}`, rebuilt from the
+    request path so it includes router prefixes on every FastAPI version.
+    Requests that matched no route are labeled "unmatched".
+    """
+    if scope.get("route") is None and scope.get("endpoint") is None:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    for name, value in (scope.get("path_params") or {}).items():
+        value = str(value)
+        for index in range(len(segments) - 1, -1, -1):
+            if segments[index] == value:
+                segments[index] = "{" + name + "}"
+                break
+    return "/".join(segments)
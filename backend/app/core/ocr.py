@@ -0,0 +1,265 @@
+# backend/app/core/ocr.py
+"""
+OCR stage for pages without a usable text layer.
+
+When a parse is run with `ocr_enabled`, the parser workers measure each
+page's text layer (characters found, and how much of the page is covered by
+text vs. images). Only pages that look scanned are sent to OCR; pages with a
+real text layer keep it.
+
+Those pages are rendered and recognized in batches of OCR_BATCH_SIZE by a
+separate process pool of OCR_WORKERS processes, so a burst of OCR work
+queues behind that (small) pool instead of occupying the parser pool that
+text-only parses depend on.
+
+Engines implement `OcrEngine.recognize` over a batch of rendered pages and
+are selected with OCR_ENGINE: a name registered with `@register_ocr_engine`
+or "package.module:ClassName". `FakeOcrEngine` ("fake") is deterministic and
+needs no OCR binaries. Parse requests with `ocr_enabled` are refused (503)
+when the configured engine cannot be loaded (`ocr_unavailable_reason`), rather
+than failing every scanned page.
+"""
+import asyncio
+import importlib
+import io
+import logging
+import multiprocessing
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type, Union
+
+from .config import get_ocr_batch_size, get_ocr_dpi, get_ocr_engine_name, get_ocr_workers
+from ..models.compact import PageRecord
+
+logger = logging.getLogger(__name__)
+
+# A page needs OCR when images cover at least this fraction of it...
+MIN_IMAGE_COVERAGE = 0.3
+# ...and its text layer has fewer characters than this.
+MIN_TEXT_CHARS = 50
+
+
+class OcrError(Exception):
+    """Raised when an OCR engine cannot be loaded or fails."""
+
+
+@dataclass
+class OcrImage:
+    """One rendered page handed to an OCR engine."""
+    page_number: int
+    png: bytes
+    width: int
+    height: int
+    dpi: int
+
+
+class OcrEngine(ABC):
+    """Interface for OCR engines. Instances are created inside the OCR worker processes."""
+    name = "base"
+
+    @abstractmethod
+    def recognize(self, images: Sequence[OcrImage]) -> List[str]:
+        """Return the recognized text of each image, in order."""
+
+
+_ENGINES: Dict[str, Type[OcrEngine]] = {}
+
+
+def register_ocr_engine(name: str) -> Callable[[Type[OcrEngine]], Type[OcrEngine]]:
+    """Class decorator registering an OCR engine under `name`."""
+    def decorator(cls: Type[OcrEngine]) -> Type[OcrEngine]:
+        cls.name = name
+        _ENGINES[name] = cls
+        return cls
+    return decorator
+
+
+def load_ocr_engine(name: str) -> OcrEngine:
+    """Instantiate a registered engine or one given as "package.module:ClassName"."""
+    if name in _ENGINES:
+        return _ENGINES[name]()
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise OcrError(f"Unknown OCR engine '{name}'. Registered engines: {', '.join(sorted(_ENGINES))}.")
+    try:
+        engine_class = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError) as e:
+        raise OcrError(f"Could not load OCR engine '{name}': {e}") from e
+    return engine_class()
+
+
+_availability: Dict[str, Optional[str]] = {}
+
+
+def ocr_unavailable_reason() -> Optional[str]:
+    """
+    Why the configured OCR engine cannot run here (missing package or binary),
+    or None when it can. Checked once per engine by loading it in this process.
+    """
+    name = get_ocr_engine_name()
+    if name not in _availability:
+        try:
+            load_ocr_engine(name)
+            _availability[name] = None
+        except OcrError as e:
+            logger.error(f"OCR engine '{name}' is unavailable: {e}")
+            _availability[name] = str(e)
+    return _availability[name]
+
+
+@register_ocr_engine("fake")
+class FakeOcrEngine(OcrEngine):
+    """Deterministic engine for tests: describes the page instead of reading it."""
+
+    def recognize(self, images: Sequence[OcrImage]) -> List[str]:
+        return [
+            f"OCR text of page {image.page_number} ({image.width}x{image.height} px, batch of {len(images)})"
+            for image in images
+        ]
+
+
+@register_ocr_engine("tesseract")
+class TesseractOcrEngine(OcrEngine):
+    """Tesseract through pytesseract (requires the tesseract binary, pytesseract and Pillow)."""
+
+    def __init__(self):
+        try:
+            import pytesseract
+            from PIL import Image
+        except ImportError as e:
+            raise OcrError("The tesseract OCR engine needs pytesseract and Pillow installed.") from e
+        if shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+            raise OcrError(f"The tesseract OCR engine needs the tesseract binary ('{pytesseract.pytesseract.tesseract_cmd}' was not found).")
+        self._pytesseract = pytesseract
+        self._image = Image
+
+    def recognize(self, images: Sequence[OcrImage]) -> List[str]:
+        return [self._pytesseract.image_to_string(self._image.open(io.BytesIO(image.png))) for image in images]
+
+
+# --- Text-layer detection (runs in the parser workers) --- #
+
+def mark_text_layer(page: Any, record: PageRecord) -> None:
+    """
+    Record the page's text-layer coverage in `record.metadata` and flag it
+    with `needs_ocr` when it looks like a scanned page.
+    """
+    area = abs(page.rect) or 1.0
+    words = page.get_text("words")
+    text_chars = sum(len(word[4]) for word in words)
+    text_area = sum((word[2] - word[0]) * (word[3] - word[1]) for word in words)
+    image_area = 0.0
+    for image in page.get_image_info():
+        x0, y0, x1, y1 = image["bbox"]
+        image_area += max(min(x1, page.rect.x1) - max(x0, page.rect.x0), 0) * max(min(y1, page.rect.y1) - max(y0, page.rect.y0), 0)
+
+    image_coverage = min(image_area / area, 1.0)
+    record.metadata["text_coverage"] = round(min(text_area / area, 1.0), 4)
+    record.metadata["image_coverage"] = round(image_coverage, 4)
+    if image_coverage >= MIN_IMAGE_COVERAGE and text_chars < MIN_TEXT_CHARS:
+        record.metadata["needs_ocr"] = True
+
+
+# --- OCR workers --- #
+
+_engine_cache: Dict[str, OcrEngine] = {}
+
+
+def _ocr_batch(path: str, page_numbers: Sequence[int], engine_name: str, dpi: int) -> List[str]:
+    """Render the given pages and recognize them with one engine call (runs in the OCR pool)."""
+    import pymupdf
+    from .parser import _open_pdf
+
+    engine = _engine_cache.get(engine_name)
+    if engine is None:
+        engine = _engine_cache[engine_name] = load_ocr_engine(engine_name)
+
+    images = []
+    with _open_pdf(path) as doc:
+        for page_number in page_numbers:
+            pixmap = doc[page_number - 1].get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY)
+            images.append(OcrImage(page_number, pixmap.tobytes("png"), pixmap.width, pixmap.height, dpi))
+    texts = engine.recognize(images)
+    if len(texts) != len(images):
+        raise OcrError(f"OCR engine '{engine_name}' returned {len(texts)} results for {len(images)} pages.")
+    return texts
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """Return the shared OCR process pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=get_ocr_workers(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_ocr_pool(wait: bool = True) -> None:
+    """Shut down the OCR pool (it is recreated on next use)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _discard_broken_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Scheduling --- #
+
+def plan_ocr_batches(page_numbers: Sequence[int], batch_size: int) -> List[List[int]]:
+    """Group pages into batches of at most `batch_size`, in page order."""
+    ordered = sorted(page_numbers)
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), max(batch_size, 1))]
+
+
+async def apply_ocr(path: Union[str, Path], pages: Sequence[PageRecord]) -> int:
+    """
+    OCR the pages flagged with `needs_ocr` and replace their text in place.
+
+    Batches run concurrently on the OCR pool. A batch that fails leaves its
+    pages' text layer as it was and records `ocr_error` in their metadata.
+    Returns the number of pages sent to OCR.
+    """
+    pending = {page.page_number: page for page in pages if page.metadata.pop("needs_ocr", False)}
+    if not pending:
+        return 0
+
+    engine_name = get_ocr_engine_name()
+    dpi = get_ocr_dpi()
+    batches = plan_ocr_batches(list(pending), get_ocr_batch_size())
+    loop = asyncio.get_running_loop()
+    pool = get_ocr_pool()
+    results = await asyncio.gather(
+        *(loop.run_in_executor(pool, _ocr_batch, str(path), batch, engine_name, dpi) for batch in batches),
+        return_exceptions=True,
+    )
+
+    for batch, result in zip(batches, results):
+        if isinstance(result, BaseException):
+            if isinstance(result, BrokenProcessPool):
+                _discard_broken_pool(pool)
+            logger.error(f"OCR of pages {batch} of {path} failed: {result}")
+            for page_number in batch:
+                pending[page_number].metadata["ocr_error"] = f"{type(result).__name__}: {result}"
+            continue
+        for page_number, text in zip(batch, result):
+            pending[page_number].text = text
+            pending[page_number].metadata["ocr_engine"] = engine_name
+    logger.info(f"OCR'd {len(pending)} page(s) of {path} in {len(batches)} batch(es) with '{engine_name}'")
+    return len(pending)
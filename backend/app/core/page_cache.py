@@ -0,0 +1,86 @@
+# backend/app/core/page_cache.py
+"""
+Cache of parsed pages keyed by page content.
+
+Revised documents (contracts coming back with a couple of pages changed)
+are mostly pages we have parsed before. The parser fingerprints every
+selected page (see `parser._fingerprint_pages`), looks the fingerprints up
+here, and only parses, detects tables on and OCRs the pages it has not seen;
+the rest are served from this cache, renumbered to their new position.
+
+Keys cover the fingerprint, parse mode, parser version and, when OCR is
+enabled, the OCR engine and DPI, so a page is only reused when parsing it
+again would produce the same output. Failed pages and pages whose OCR
+failed are never stored, so they are retried on the next parse.
+
+Entries are the page's JSON, kept in the same two-tier byte-bounded LRU as
+parse results (`cache.ParseResultCache`) under CACHE_DIR/pages.
+"""
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+from .cache import ParseResultCache
+from .config import (
+    get_ocr_dpi, get_ocr_engine_name, get_page_cache_dir, get_page_cache_disk_bytes, get_page_cache_memory_bytes,
+)
+from .serialization import dumps, loads
+from ..models.compact import PageRecord
+
+
+def make_page_key(fingerprint: str, mode: str, ocr_enabled: bool, parser_version: str) -> str:
+    """Cache key of one page's parse output."""
+    ocr = f"{get_ocr_engine_name()}@{get_ocr_dpi()}" if ocr_enabled else ""
+    raw = f"{fingerprint}|{mode}|{ocr}|{parser_version}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(page: PageRecord) -> bool:
+    return not page.failed and "ocr_error" not in page.metadata and "needs_ocr" not in page.metadata
+
+
+def decode_page(data: bytes, page_number: int) -> PageRecord:
+    """Rebuild a cached page at `page_number` (it may have moved since it was cached)."""
+    page = PageRecord.from_dict(loads(data))
+    page.page_number = page_number
+    for item in page.tables + page.figures:
+        item.page_number = page_number
+    return page
+
+
+def lookup_pages(keys: Dict[int, str]) -> Dict[int, PageRecord]:
+    """Cached pages for `{0-based page index: key}`; indices without an entry are left out."""
+    cache = get_page_cache()
+    found: Dict[int, PageRecord] = {}
+    for index, key in keys.items():
+        data = cache.get(key)
+        if data is not None:
+            found[index] = decode_page(data, index + 1)
+    return found
+
+
+def store_pages(entries: Sequence[Tuple[str, PageRecord]]) -> int:
+    """Cache `(key, page)` pairs, skipping pages that must be parsed again. Returns pages stored."""
+    cache = get_page_cache()
+    stored = 0
+    for key, page in entries:
+        if is_cacheable(page):
+            cache.put(key, dumps(page))
+            stored += 1
+    return stored
+
+
+_caches: Dict[Path, ParseResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_page_cache() -> ParseResultCache:
+    """Return the shared page cache for CACHE_DIR/pages (read at runtime)."""
+    cache_dir = get_page_cache_dir().resolve()
+    with _caches_lock:
+        cache = _caches.get(cache_dir)
+        if cache is None or not cache.cache_dir.exists():
+            cache = ParseResultCache(cache_dir, get_page_cache_memory_bytes(), get_page_cache_disk_bytes())
+            _caches[cache_dir] = cache
+        return cache
@@ -1 +1,711 @@
- 
\ No newline at end of file
+# backend/app/core/parser.py
+"""
+PDF parsing engine built on PyMuPDF.
+
+A document is split into contiguous page ranges which are parsed in a process
+pool sized to the available cores, so the CPU-bound work never runs on the
+FastAPI event loop and a long document is parsed by all cores at once. Each
+worker opens the PDF once for its whole range. Results are reassembled in page
+order. Errors are caught per page: a page that fails to parse is returned with
+empty content and an `error` entry in its metadata, and the rest of the
+document is unaffected.
+
+With `ocr_enabled`, pages whose text layer looks scanned are sent to the
+separate OCR pool in `ocr.py` after parsing.
+
+Pages are built as the slotted records in `app/models/compact.py` rather than
+Pydantic models; they are only turned into JSON at the response boundary.
+
+PDFs are opened through a read-only memory map handed to MuPDF without
+copying, so only the byte ranges MuPDF actually reads (the cross-reference
+table and the objects of the requested pages) are ever faulted in. Combined
+with page selection (`pages="1-3,10,20-"`, `max_pages`), parsing the first
+page of a very long document costs about the same as a one-page document.
+
+Before parsing, every selected page is fingerprinted from its content stream,
+the resources it draws with and its geometry. Pages whose fingerprint is in
+the page cache (`page_cache.py`) are reused instead of being parsed, so a
+revision of a document we have seen before only costs its changed pages.
+Each page's metadata carries its `fingerprint` and whether it was `reused`.
+"""
+import asyncio
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from .config import get_page_cache_enabled, get_parser_workers, get_table_engine
+from .ocr import apply_ocr, mark_text_layer
+from .metrics import PAGE_CACHE_LOOKUPS, PAGES_PARSED, PAGE_RANGE_DURATION, stage_timer
+from .page_cache import lookup_pages, make_page_key, store_pages
+from ..models.compact import FigureRecord, PageRecord, TableRecord
+from ..models.document import DocumentMetadata
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever parsing output changes, so cached results are invalidated.
+PARSER_VERSION = "4"
+
+PARSE_MODES = ("text", "tables", "text_and_tables", "full")
+TEXT_MODES = {"text", "text_and_tables", "full"}
+TABLE_MODES = {"tables", "text_and_tables", "full"}
+FIGURE_MODES = {"full"}
+
+# Upper bound on pages handed to a worker in one task. Smaller ranges balance
+# load better; larger ones amortize opening the document in the worker.
+MAX_PAGES_PER_TASK = 32
+
+
+def parser_version() -> str:
+    """PARSER_VERSION qualified by the settings that change parse output (for cache keys)."""
+    return f"{PARSER_VERSION}-{get_table_engine()}"
+
+
+class ParseError(Exception):
+    """Raised when a document cannot be parsed at all (e.g. it is not a valid PDF)."""
+
+
+# --- Page selection --- #
+
+PageSpans = List[Tuple[int, Optional[int]]]
+
+
+def parse_page_spec(spec: str) -> PageSpans:
+    """
+    Parse a page selection such as "1-3,10,20-" into 1-based inclusive spans.
+
+    "20-" means page 20 to the end and "-5" means pages 1 to 5. Raises
+    ValueError on malformed input.
+    """
+    spans: PageSpans = []
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        first, dash, last = part.partition("-")
+        try:
+            start = int(first) if first else 1
+            end = (int(last) if last else None) if dash else start
+        except ValueError:
+            raise ValueError(f"Invalid page selection '{part}'. Use forms like '1-3,10,20-'.") from None
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"Invalid page range '{part}'.")
+        spans.append((start, end))
+    if not spans:
+        raise ValueError("Empty page selection.")
+    return spans
+
+
+def select_pages(page_count: int, pages: Optional[str] = None, max_pages: Optional[int] = None) -> Optional[List[int]]:
+    """
+    Resolve a page selection against the document length.
+
+    Returns sorted, de-duplicated 0-based page indices, or None when every page
+    is selected. Pages past the end of the document are ignored, and `max_pages`
+    keeps only the first N selected pages.
+    """
+    if not pages and not max_pages:
+        return None
+    if pages:
+        selected = set()
+        for start, end in parse_page_spec(pages):
+            last = page_count if end is None else min(end, page_count)
+            selected.update(range(start - 1, last))
+        indices = sorted(selected)
+    else:
+        indices = list(range(page_count))
+    if max_pages:
+        indices = indices[:max_pages]
+    return indices
+
+
+def normalize_page_selection(pages: Optional[str] = None, max_pages: Optional[int] = None) -> str:
+    """Canonical string for a page selection, used in cache keys ("" means all pages)."""
+    if not pages and not max_pages:
+        return ""
+    spans = parse_page_spec(pages) if pages else []
+    span_text = ",".join(f"{start}-{'' if end is None else end}" for start, end in sorted(spans, key=lambda s: (s[0], s[1] or 0)))
+    return f"pages={span_text};max={max_pages or ''}"
+
+
+@dataclass
+class DocumentInfo:
+    """Document-level information available before any page is parsed."""
+    page_count: int
+    metadata: DocumentMetadata
+
+
+@dataclass
+class ParsedDocument:
+    """Output of `parse_document`."""
+    page_count: int
+    pages: List[PageRecord]
+    metadata: DocumentMetadata
+    failed_pages: List[int] = field(default_factory=list)
+
+
+# --- Worker-side functions (run in the process pool) --- #
+
+def _pdf_date_to_iso(value: Optional[str]) -> Optional[str]:
+    """Convert a PDF date string (e.g. "D:20240101120000Z") to ISO 8601."""
+    if not value:
+        return None
+    raw = value[2:] if value.startswith("D:") else value
+    digits = raw[:14]
+    if len(digits) < 8 or not digits.isdigit():
+        return value
+    digits = digits.ljust(14, "0")
+    iso = f"{digits[0:4]}-{digits[4:6]}-{digits[6:8]}T{digits[8:10]}:{digits[10:12]}:{digits[12:14]}"
+    tz = raw[14:]
+    if tz.startswith("Z"):
+        return iso + "Z"
+    if tz[:1] in ("+", "-") and len(tz) >= 3:
+        offset = tz[1:].replace("'", "")
+        return f"{iso}{tz[0]}{offset[:2]}:{offset[2:4] or '00'}"
+    return iso
+
+
+@contextmanager
+def _open_pdf(path: str) -> Iterator[Any]:
+    """
+    Open a PDF through a read-only memory map without copying it.
+
+    MuPDF reads directly from the mapping, so only the parts of the file it
+    needs are paged in. The mapping is released once the document is closed.
+    """
+    import pymupdf
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ParseError("Could not open document: file is empty.")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        try:
+            doc = pymupdf.open(stream=view, filetype="pdf")
+        except Exception as e:
+            raise ParseError(f"Could not open document: {e}") from e
+        try:
+            yield doc
+        finally:
+            doc.close()
+    finally:
+        view.release()
+        mapped.close()
+
+
+def _read_document_info(path: str) -> Tuple[int, Dict[str, Optional[str]]]:
+    """Open the document and return (page_count, metadata fields)."""
+    with _open_pdf(path) as doc:
+        if not doc.is_pdf:
+            raise ParseError("Document is not a PDF.")
+        info = doc.metadata or {}
+        metadata = {
+            "author": info.get("author") or None,
+            "creation_date": _pdf_date_to_iso(info.get("creationDate")),
+            "modification_date": _pdf_date_to_iso(info.get("modDate")),
+            "title": info.get("title") or None,
+        }
+        return doc.page_count, metadata
+
+
+def _round_bbox(bbox: Sequence[float]) -> List[float]:
+    return [round(float(v), 2) for v in bbox]
+
+
+def _extract_tables(page: Any, page_number: int) -> List[TableRecord]:
+    """Extract the page's tables with the configured TABLE_ENGINE."""
+    if get_table_engine() == "pymupdf":
+        return [
+            TableRecord.from_rows(table.extract(), _round_bbox(table.bbox), page_number)
+            for table in page.find_tables().tables
+        ]
+    from .tables import find_tables, words_to_arrays
+
+    boxes, texts = words_to_arrays(page.get_text("words"))
+    return [TableRecord.from_rows(table.rows, _round_bbox(table.bbox), page_number) for table in find_tables(boxes, texts)]
+
+
+def _parse_page(page: Any, page_number: int, mode: str) -> PageRecord:
+    """Extract the content of one PyMuPDF page."""
+    text = page.get_text("text") if mode in TEXT_MODES else ""
+
+    tables = []
+    if mode in TABLE_MODES:
+        tables = _extract_tables(page, page_number)
+
+    figures = []
+    if mode in FIGURE_MODES:
+        for image in page.get_image_info():
+            figures.append(FigureRecord(_round_bbox(image["bbox"]), None, page_number))
+
+    metadata = {
+        "rotation": page.rotation,
+        "width": round(page.rect.width, 2),
+        "height": round(page.rect.height, 2),
+    }
+    return PageRecord(page_number, text, tables, figures, metadata)
+
+
+def _failed_page(page_number: int, error: BaseException) -> PageRecord:
+    return PageRecord(page_number, "", metadata={"error": f"{type(error).__name__}: {error}"})
+
+
+def _parse_page_range(path: str, start: int, stop: int, mode: str, ocr_enabled: bool = False) -> List[PageRecord]:
+    """
+    Parse pages [start, stop) (0-based) of the document, isolating per-page failures.
+    With `ocr_enabled`, pages that need OCR are flagged for `apply_ocr`.
+    """
+    check_text_layer = ocr_enabled and mode in TEXT_MODES
+    results = []
+    try:
+        with _open_pdf(path) as doc:
+            for index in range(start, stop):
+                try:
+                    page = doc[index]
+                    record = _parse_page(page, index + 1, mode)
+                    if check_text_layer:
+                        mark_text_layer(page, record)
+                    results.append(record)
+                except Exception as e:
+                    results.append(_failed_page(index + 1, e))
+    except Exception as e:
+        parsed = {result.page_number for result in results}
+        results.extend(_failed_page(index + 1, e) for index in range(start, stop) if index + 1 not in parsed)
+    return results
+
+
+# --- Page fingerprints --- #
+
+# Indirect reference ("12 0 R") in the source of a PDF object
+_REFERENCE = re.compile(r"\b(\d+) \d+ R\b")
+
+
+class _ObjectDigests:
+    """
+    Content digests of a document's PDF objects. References to other objects
+    are replaced by their digests before hashing, so a digest does not depend
+    on object numbers, which change whenever a revision is re-saved.
+    """
+
+    def __init__(self, doc: Any):
+        self.doc = doc
+        self._digests: Dict[int, str] = {}
+        self._active: Set[int] = set()
+
+    def of_source(self, source: str) -> str:
+        return _REFERENCE.sub(lambda match: self.of_xref(int(match.group(1))), source)
+
+    def of_xref(self, xref: int) -> str:
+        digest = self._digests.get(xref)
+        if digest is not None:
+            return digest
+        if xref in self._active:
+            # Reference cycle: the object is already being hashed further up
+            return "cycle"
+        self._active.add(xref)
+        try:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(self.of_source(self.doc.xref_object(xref, compressed=True)).encode("utf-8", "surrogatepass"))
+            if self.doc.xref_is_stream(xref):
+                h.update(self.doc.xref_stream_raw(xref) or b"")
+            digest = h.hexdigest()
+        finally:
+            self._active.discard(xref)
+        self._digests[xref] = digest
+        return digest
+
+
+def _page_resources(doc: Any, xref: int) -> str:
+    """Source of the page's /Resources entry, inherited from the page tree if the page has none."""
+    seen = set()
+    while xref not in seen:
+        seen.add(xref)
+        kind, value = doc.xref_get_key(xref, "Resources")
+        if kind != "null":
+            return value
+        kind, parent = doc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            break
+        xref = int(parent.split()[0])
+    return ""
+
+
+def _fingerprint_pages(path: str, indices: Sequence[int]) -> List[Optional[str]]:
+    """
+    Fingerprint pages `indices` (0-based): a hash of the decompressed content
+    stream, the resources it uses (fonts, images, forms) and the page geometry.
+    A page that cannot be fingerprinted gets None and is always parsed.
+    """
+    fingerprints: List[Optional[str]] = []
+    with _open_pdf(path) as doc:
+        digests = _ObjectDigests(doc)
+        for index in indices:
+            try:
+                page = doc[index]
+                h = hashlib.blake2b(digest_size=16)
+                h.update(f"{page.rotation}|{_round_bbox(page.mediabox)}|{_round_bbox(page.cropbox)}|".encode("utf-8"))
+                h.update(digests.of_source(_page_resources(doc, page.xref)).encode("utf-8", "surrogatepass"))
+                h.update(b"\0")
+                h.update(page.read_contents())
+                fingerprints.append(h.hexdigest())
+            except Exception as e:
+                logger.debug(f"Could not fingerprint page {index + 1} of {path}: {e}")
+                fingerprints.append(None)
+    return fingerprints
+
+
+class PageReuse:
+    """Fingerprints of the pages selected for one parse, and the ones the page cache already holds."""
+
+    def __init__(self, fingerprints: Dict[int, str], keys: Dict[int, str], cached: Dict[int, PageRecord]):
+        self.fingerprints = fingerprints
+        self.keys = keys
+        self.cached = cached
+
+    @classmethod
+    async def load(
+        cls, path: str, page_count: int, page_indices: Optional[Sequence[int]], mode: str, ocr_enabled: bool,
+    ) -> "PageReuse":
+        if not get_page_cache_enabled():
+            return cls({}, {}, {})
+        indices = list(range(page_count)) if page_indices is None else list(page_indices)
+        with stage_timer("fingerprint", mode):
+            found = await asyncio.to_thread(_fingerprint_pages, path, indices)
+        fingerprints = {index: fingerprint for index, fingerprint in zip(indices, found) if fingerprint}
+        version = parser_version()
+        ocr = ocr_enabled and mode in TEXT_MODES
+        keys = {index: make_page_key(fingerprint, mode, ocr, version) for index, fingerprint in fingerprints.items()}
+        cached = await asyncio.to_thread(lookup_pages, keys)
+        for page in cached.values():
+            page.metadata["reused"] = True
+        if cached:
+            PAGE_CACHE_LOOKUPS.inc(len(cached), mode=mode, outcome="hit")
+            logger.info(f"Reusing {len(cached)} of {len(indices)} page(s) of {path} from the page cache")
+        if len(indices) > len(cached):
+            PAGE_CACHE_LOOKUPS.inc(len(indices) - len(cached), mode=mode, outcome="miss")
+        return cls(fingerprints, keys, cached)
+
+    def to_parse(self, page_count: int, page_indices: Optional[Sequence[int]]) -> Optional[Sequence[int]]:
+        """0-based indices that still need parsing (None means every page, as from `select_pages`)."""
+        if not self.cached:
+            return page_indices
+        indices = range(page_count) if page_indices is None else page_indices
+        return [index for index in indices if index not in self.cached]
+
+    def cached_pages(self) -> List[PageRecord]:
+        return [self.cached[index] for index in sorted(self.cached)]
+
+    async def remember(self, pages: Sequence[PageRecord]) -> None:
+        """Tag freshly parsed (and OCR'd) pages with their fingerprint and add them to the page cache."""
+        if not get_page_cache_enabled():
+            return
+        entries = []
+        for page in pages:
+            fingerprint = self.fingerprints.get(page.page_number - 1)
+            page.metadata["reused"] = False
+            if fingerprint is not None:
+                page.metadata["fingerprint"] = fingerprint
+                entries.append((self.keys[page.page_number - 1], page))
+        if entries:
+            await asyncio.to_thread(store_pages, entries)
+
+
+# --- Process pool --- #
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_count() -> int:
+    """Number of parser processes: PARSER_WORKERS, or the cores available to this process."""
+    configured = get_parser_workers()
+    if configured > 0:
+        return configured
+    try:
+        return max(len(os.sched_getaffinity(0)), 1)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared parser process pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" keeps workers independent of the server's threads and open handles.
+            _pool = ProcessPoolExecutor(
+                max_workers=get_worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _warm_worker() -> int:
+    """Runs in a pool worker at pre-warm: load the PDF and table engines before the first real parse."""
+    import pymupdf  # noqa: F401
+    from . import tables  # noqa: F401
+    return os.getpid()
+
+
+async def prewarm_process_pool() -> int:
+    """
+    Start every parser worker and load its engines. One task per worker is
+    submitted at once, so the pool spawns all of them instead of reusing the
+    first. Returns the number of distinct workers warmed.
+    """
+    pool = get_process_pool()
+    loop = asyncio.get_running_loop()
+    pids = await asyncio.gather(*(loop.run_in_executor(pool, _warm_worker) for _ in range(get_worker_count())))
+    return len(set(pids))
+
+
+def shutdown_process_pool(wait: bool = True) -> None:
+    """Shut down the shared process pool (it is recreated on next use)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _discard_broken_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Orchestration --- #
+
+def plan_page_ranges(page_count: int, workers: int, page_indices: Optional[Sequence[int]] = None) -> List[Tuple[int, int]]:
+    """
+    Split the pages to parse into contiguous [start, stop) ranges for the pool.
+
+    `page_indices` (sorted, 0-based) restricts the plan to selected pages;
+    by default every page is planned. Aims for about four tasks per worker so
+    uneven pages still balance out, without letting any task grow beyond
+    MAX_PAGES_PER_TASK pages.
+    """
+    indices = range(page_count) if page_indices is None else page_indices
+    if len(indices) == 0:
+        return []
+    target_tasks = max(workers, 1) * 4
+    per_task = max(1, min(MAX_PAGES_PER_TASK, -(-len(indices) // target_tasks)))
+
+    ranges: List[Tuple[int, int]] = []
+    run_start = previous = indices[0]
+    for index in list(indices[1:]) + [None]:
+        if index is not None and index == previous + 1 and index - run_start < per_task:
+            previous = index
+            continue
+        ranges.append((run_start, previous + 1))
+        if index is not None:
+            run_start = previous = index
+    return ranges
+
+
+def assemble_pages(
+    ranges: Sequence[Tuple[int, int]],
+    results: Sequence[Union[List[PageRecord], BaseException]],
+) -> Tuple[List[PageRecord], List[int]]:
+    """
+    Merge per-range results back into page order.
+
+    A range whose task raised (e.g. its worker crashed) becomes a run of failed
+    pages. Returns (pages, failed page numbers).
+    """
+    pages: List[PageRecord] = []
+    failed: List[int] = []
+    for (start, stop), result in sorted(zip(ranges, results), key=lambda item: item[0][0]):
+        if isinstance(result, BaseException):
+            result = [_failed_page(index + 1, result) for index in range(start, stop)]
+        for page in result:
+            if page.failed:
+                failed.append(page.page_number)
+            pages.append(page)
+    return pages, failed
+
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+def _record_range(mode: str, submitted: float, page_records: Optional[Sequence[PageRecord]], pages: int) -> None:
+    """Record a finished page range in the metrics (a range that raised counts all its pages as failed)."""
+    PAGE_RANGE_DURATION.observe(time.perf_counter() - submitted, mode=mode)
+    failed = pages if page_records is None else sum(1 for record in page_records if record.failed)
+    if pages - failed:
+        PAGES_PARSED.inc(pages - failed, mode=mode, outcome="ok")
+    if failed:
+        PAGES_PARSED.inc(failed, mode=mode, outcome="error")
+
+
+def _check_mode(mode: str) -> None:
+    if mode not in PARSE_MODES:
+        raise ValueError(f"Unsupported parsing mode '{mode}'. Expected one of {', '.join(PARSE_MODES)}.")
+
+
+async def read_document_info(path: Union[str, Path]) -> DocumentInfo:
+    """Open the document off the event loop and return its page count and metadata."""
+    page_count, info = await asyncio.to_thread(_read_document_info, str(path))
+    return DocumentInfo(page_count=page_count, metadata=DocumentMetadata(**info))
+
+
+async def iter_pages(
+    path: Union[str, Path],
+    page_count: int,
+    mode: str = "text_and_tables",
+    ocr_enabled: bool = False,
+    window: Optional[int] = None,
+    page_indices: Optional[Sequence[int]] = None,
+) -> AsyncIterator[PageRecord]:
+    """
+    Yield the document's pages in order as soon as each one is parsed.
+
+    `page_indices` (from `select_pages`) restricts parsing to those pages.
+    With `ocr_enabled`, each range's scanned pages are OCR'd before it is yielded.
+    Pages found in the page cache are yielded in their place without being parsed.
+
+    At most `window` page ranges (default: two per worker) are in flight at a
+    time, so memory stays bounded by the window rather than the document
+    length. Failed pages are yielded with an `error` in their metadata.
+    """
+    _check_mode(mode)
+    path = str(path)
+    loop = asyncio.get_running_loop()
+    reuse = await PageReuse.load(path, page_count, page_indices, mode, ocr_enabled)
+    reused = deque(reuse.cached_pages())
+    ranges = iter(plan_page_ranges(page_count, get_worker_count(), reuse.to_parse(page_count, page_indices)))
+    window = window or get_worker_count() * 2
+    pending: "deque[Tuple[Tuple[int, int], ProcessPoolExecutor, asyncio.Future, float]]" = deque()
+
+    def submit_next() -> None:
+        page_range = next(ranges, None)
+        if page_range is None:
+            return
+        pool = get_process_pool()
+        try:
+            future = loop.run_in_executor(pool, _parse_page_range, path, page_range[0], page_range[1], mode, ocr_enabled)
+        except BrokenProcessPool:
+            _discard_broken_pool(pool)
+            pool = get_process_pool()
+            future = loop.run_in_executor(pool, _parse_page_range, path, page_range[0], page_range[1], mode, ocr_enabled)
+        pending.append((page_range, pool, future, time.perf_counter()))
+
+    try:
+        for _ in range(window):
+            submit_next()
+        while pending:
+            (start, stop), pool, future, submitted = pending.popleft()
+            try:
+                page_records = await future
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    logger.error(f"Parser process pool broke while parsing {path}; it will be recreated.")
+                    _discard_broken_pool(pool)
+                page_records = [_failed_page(index + 1, e) for index in range(start, stop)]
+            _record_range(mode, submitted, page_records, stop - start)
+            # Keep the workers busy while the caller consumes this range
+            submit_next()
+            if ocr_enabled:
+                with stage_timer("ocr", mode):
+                    await apply_ocr(path, page_records)
+            await reuse.remember(page_records)
+            # Reused pages before this range (page numbers are 1-based, `start` is 0-based)
+            while reused and reused[0].page_number <= start:
+                yield reused.popleft()
+            for page in page_records:
+                yield page
+        while reused:
+            yield reused.popleft()
+    finally:
+        for _, _, future, _ in pending:
+            future.cancel()
+
+
+async def parse_document(
+    path: Union[str, Path],
+    mode: str = "text_and_tables",
+    ocr_enabled: bool = False,
+    on_progress: Optional[ProgressCallback] = None,
+    pages: Optional[str] = None,
+    max_pages: Optional[int] = None,
+) -> ParsedDocument:
+    """
+    Parse the PDF at `path`, fanning its pages out across the process pool.
+
+    `pages` (e.g. "1-3,10,20-") and `max_pages` restrict which pages are
+    parsed; other pages are never loaded. With `ocr_enabled`, pages without
+    a usable text layer are OCR'd (see `ocr.apply_ocr`). Pages found in the
+    page cache by fingerprint are reused rather than parsed or OCR'd.
+    `on_progress(pages_done, pages_total)` is awaited once the number of pages
+    to parse is known, again once cached pages are counted as done, and as
+    each page range finishes.
+
+    Raises ParseError if the document cannot be opened; failures on individual
+    pages are reported in `ParsedDocument.failed_pages` instead.
+    """
+    _check_mode(mode)
+    path = str(path)
+    info = await read_document_info(path)
+    page_count = info.page_count
+    page_indices = select_pages(page_count, pages, max_pages)
+    pages_total = page_count if page_indices is None else len(page_indices)
+    reuse = await PageReuse.load(path, page_count, page_indices, mode, ocr_enabled)
+
+    if on_progress is not None:
+        await on_progress(0, pages_total)
+
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    ranges = plan_page_ranges(page_count, get_worker_count(), reuse.to_parse(page_count, page_indices))
+    pages_done = len(reuse.cached)
+    if pages_done and on_progress is not None:
+        await on_progress(pages_done, pages_total)
+
+    async def run_range(start: int, stop: int) -> List[PageRecord]:
+        nonlocal pages_done
+        submitted = time.perf_counter()
+        page_records: Optional[List[PageRecord]] = None
+        try:
+            page_records = await loop.run_in_executor(pool, _parse_page_range, path, start, stop, mode, ocr_enabled)
+            return page_records
+        finally:
+            _record_range(mode, submitted, page_records, stop - start)
+            pages_done += stop - start
+            if on_progress is not None:
+                await on_progress(pages_done, pages_total)
+
+    with stage_timer("parse_pages", mode):
+        results = await asyncio.gather(*(run_range(start, stop) for start, stop in ranges), return_exceptions=True)
+
+    if any(isinstance(result, BrokenProcessPool) for result in results):
+        logger.error(f"Parser process pool broke while parsing {path}; it will be recreated.")
+        _discard_broken_pool(pool)
+
+    parsed_pages, failed = assemble_pages(ranges, results)
+    if ocr_enabled:
+        with stage_timer("ocr", mode):
+            await apply_ocr(path, parsed_pages)
+    await reuse.remember(parsed_pages)
+    if reuse.cached:
+        parsed_pages = sorted(parsed_pages + reuse.cached_pages(), key=lambda page: page.page_number)
+    if failed:
+        logger.warning(f"Failed to parse {len(failed)} of {pages_total} page(s) in {path} (first: {failed[:10]})")
+    return ParsedDocument(
+        page_count=page_count,
+        pages=parsed_pages,
+        metadata=info.metadata,
+        failed_pages=failed,
+    )
@@ -0,0 +1,223 @@
+# backend/app/core/result_store.py
+"""
+On-disk store of parse results, addressed by `jobid://{parse_job_id}`.
+
+Each result is one file with a per-page offset index, so split and extract
+can memory-map it and decode only the pages they need:
+
+    magic (8 bytes) | header length, page count (<II)
+    header JSON      document-level fields (page_count, metadata, ...)
+    page numbers     page count x <I, ascending
+    offsets          (page count + 1) x <Q, relative to the start of the page data
+    page data        one JSON object per page, in the public `Page` shape
+
+Results are written once per parse-cache key under `by-key/` and hard-linked
+to `jobs/{job_id}` for every parse job that produced them, so repeated jobs
+on the same document and options share one file.
+"""
+import asyncio
+import bisect
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .config import get_results_dir, get_result_ttl_seconds, get_blob_sweep_interval_seconds
+from .serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DPRES\x00\x01\n"
+_PREAMBLE = struct.Struct("<II")
+_OFFSET = struct.Struct("<Q")
+_OFFSET_PAIR = struct.Struct("<QQ")
+
+
+class StoredParseResult:
+    """Read-only, memory-mapped view of one stored parse result."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._mmap[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{self.path} is not a stored parse result.")
+            header_length, count = _PREAMBLE.unpack_from(self._mmap, len(MAGIC))
+            position = len(MAGIC) + _PREAMBLE.size
+            self.header: Dict[str, Any] = loads(self._mmap[position:position + header_length])
+            position += header_length
+            self.page_numbers: List[int] = list(struct.unpack_from(f"<{count}I", self._mmap, position))
+            self._offsets_at = position + 4 * count
+            self._data_at = self._offsets_at + _OFFSET.size * (count + 1)
+        except Exception:
+            self._mmap.close()
+            raise
+
+    @property
+    def page_count(self) -> int:
+        """Total pages in the source document (the result may hold only a selection)."""
+        return self.header["page_count"]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.header["metadata"]
+
+    def __len__(self) -> int:
+        return len(self.page_numbers)
+
+    def __contains__(self, page_number: int) -> bool:
+        index = bisect.bisect_left(self.page_numbers, page_number)
+        return index < len(self.page_numbers) and self.page_numbers[index] == page_number
+
+    def page_bytes(self, page_number: int) -> bytes:
+        """Raw JSON of one page."""
+        index = bisect.bisect_left(self.page_numbers, page_number)
+        if index == len(self.page_numbers) or self.page_numbers[index] != page_number:
+            raise KeyError(page_number)
+        start, stop = _OFFSET_PAIR.unpack_from(self._mmap, self._offsets_at + _OFFSET.size * index)
+        return self._mmap[self._data_at + start:self._data_at + stop]
+
+    def page(self, page_number: int) -> Dict[str, Any]:
+        """Decode one page."""
+        return loads(self.page_bytes(page_number))
+
+    def pages(self, page_numbers: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """Decode the given pages (default: all stored pages) in the order given."""
+        for page_number in self.page_numbers if page_numbers is None else page_numbers:
+            yield self.page(page_number)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "StoredParseResult":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_result(path: Path, header: Dict[str, Any], pages: Sequence[bytes], page_numbers: Sequence[int]) -> None:
+    """Atomically write a result file from pre-encoded page JSON."""
+    header_bytes = dumps(header)
+    offsets = [0]
+    for page in pages:
+        offsets.append(offsets[-1] + len(page))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with tmp_path.open("wb") as f:
+        f.write(MAGIC)
+        f.write(_PREAMBLE.pack(len(header_bytes), len(pages)))
+        f.write(header_bytes)
+        f.write(struct.pack(f"<{len(page_numbers)}I", *page_numbers))
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        for page in pages:
+            f.write(page)
+    os.replace(tmp_path, path)
+
+
+class ParseResultStore:
+    """Parse-result files keyed by parse-cache key, with per-job links."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.keys_dir = self.root / "by-key"
+        self.jobs_dir = self.root / "jobs"
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for_key(self, key: str) -> Path:
+        return self.keys_dir / key[:2] / f"{key}.dpr"
+
+    def path_for_job(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.dpr"
+
+    def has(self, key: str) -> bool:
+        return self.path_for_key(key).exists()
+
+    def write_body(self, key: str, body: bytes) -> Path:
+        """
+        Store a ParseResponse body (as produced by the parse endpoint, without
+        `source_filename`) under `key`, unless it is already stored.
+        """
+        path = self.path_for_key(key)
+        if path.exists():
+            # Refresh so the sweeper keeps results that are still being produced
+            os.utime(path)
+            return path
+        parsed = loads(body)
+        pages = parsed.pop("pages")
+        pages.sort(key=lambda page: page["page_number"])
+        write_result(path, parsed, [dumps(page) for page in pages], [page["page_number"] for page in pages])
+        return path
+
+    def link_job(self, job_id: str, key: str) -> None:
+        """Make the result stored under `key` available as `jobid://{job_id}`."""
+        target = self.path_for_job(job_id)
+        tmp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.link(self.path_for_key(key), tmp_path)
+        except OSError:
+            tmp_path.write_bytes(self.path_for_key(key).read_bytes())
+        os.replace(tmp_path, target)
+
+    def open_key(self, key: str) -> Optional[StoredParseResult]:
+        return self._open(self.path_for_key(key))
+
+    def open_job(self, job_id: str) -> Optional[StoredParseResult]:
+        return self._open(self.path_for_job(job_id))
+
+    @staticmethod
+    def _open(path: Path) -> Optional[StoredParseResult]:
+        try:
+            return StoredParseResult(path)
+        except FileNotFoundError:
+            return None
+
+    def sweep(self, ttl_seconds: int, now: Optional[float] = None) -> int:
+        """Delete results (and job links) not modified for `ttl_seconds`. Returns files removed."""
+        if ttl_seconds <= 0:
+            return 0
+        cutoff = (now or time.time()) - ttl_seconds
+        removed = 0
+        for path in list(self.keys_dir.glob("*/*.dpr")) + list(self.jobs_dir.glob("*.dpr")):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+_stores: Dict[Path, ParseResultStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_result_store() -> ParseResultStore:
+    """Return the shared result store for RESULTS_DIR (read at runtime)."""
+    root = get_results_dir().resolve()
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None or not store.jobs_dir.exists():
+            store = ParseResultStore(root)
+            _stores[root] = store
+        return store
+
+
+async def run_result_sweeper() -> None:
+    """Background task: periodically delete parse results past RESULT_TTL_SECONDS."""
+    while True:
+        await asyncio.sleep(get_blob_sweep_interval_seconds())
+        try:
+            removed = await asyncio.to_thread(get_result_store().sweep, get_result_ttl_seconds())
+            if removed:
+                logger.info(f"Removed {removed} expired parse result file(s)")
+        except Exception as e:
+            logger.error(f"Result sweep failed: {e}")
@@ -0,0 +1,486 @@
+# backend/app/core/search_index.py
+"""
+Full-text search over parsed pages: an incremental, segmented inverted index.
+
+Pages queued by `search_queue` are written in batches as immutable
+segments, Lucene style. Each segment is a directory of:
+
+    meta.json          document file IDs and page / length totals
+    terms.json         term -> [offset, count, id width, tf width] into postings.bin
+    postings.bin       per term: page ids as ascending deltas, then term
+                       frequencies, each packed at the narrowest width
+                       (1, 2 or 4 bytes) that holds the term's largest value
+    doc_ids.npy        per page: index into the document list
+    page_numbers.npy   per page: page number in its document
+    lengths.npy        per page: token count (BM25 length normalisation)
+    text_offsets.npy   per page: [start, end) of its text in texts.bin, for snippets
+    texts.bin
+
+Postings, page tables and texts are memory-mapped, so a query decodes only
+the postings of its own terms (`np.cumsum` over the deltas) and scores them
+with vectorised BM25 over global statistics, in time proportional to those
+postings (each segment keeps its length normalisation for the current
+average page length). `manifest.json` lists the live
+segments and is replaced atomically; a query works on the segment list it
+started with, so flushes and merges never block searches. Whenever a size
+tier holds MERGE_FACTOR segments they are merged into one by concatenating
+their postings, which keeps the segment count logarithmic in the index size.
+
+Several processes (uvicorn workers) may share one index directory: writes
+take an exclusive lock on `write.lock`, and each process picks up segments
+published by the others when it sees `manifest.json` change.
+"""
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: one process per index
+    fcntl = None
+
+from .config import get_search_index_dir
+from .serialization import dumps, loads
+from .splitter import B, K1, tokenize
+
+logger = logging.getLogger(__name__)
+
+MERGE_FACTOR = 8
+SNIPPET_CHARS = 200
+
+PendingDocument = Tuple[str, Sequence[Tuple[int, str]]]
+
+
+@dataclass
+class SearchHit:
+    file_id: str
+    page_number: int
+    score: float
+    snippet: str
+
+
+def _width(max_value: int) -> int:
+    if max_value < 1 << 8:
+        return 1
+    if max_value < 1 << 16:
+        return 2
+    return 4
+
+
+# --- Segments --- #
+
+class Segment:
+    """One immutable, memory-mapped segment."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.name = self.path.name
+        meta = loads((self.path / "meta.json").read_bytes())
+        self.docs: List[str] = meta["docs"]
+        self.page_count: int = meta["pages"]
+        self.total_length: int = meta["total_length"]
+        self.terms: Dict[str, List[int]] = loads((self.path / "terms.json").read_bytes())
+        self.doc_ids = np.load(self.path / "doc_ids.npy", mmap_mode="r")
+        self.page_numbers = np.load(self.path / "page_numbers.npy", mmap_mode="r")
+        self.lengths = np.load(self.path / "lengths.npy", mmap_mode="r")
+        self.text_offsets = np.load(self.path / "text_offsets.npy", mmap_mode="r")
+        self._postings = self._map(self.path / "postings.bin")
+        self._texts = self._map(self.path / "texts.bin")
+        self._norms: Optional[Tuple[float, np.ndarray]] = None
+
+    @staticmethod
+    def _map(path: Path):
+        if path.stat().st_size == 0:
+            return b""
+        with path.open("rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def document_frequency(self, term: str) -> int:
+        entry = self.terms.get(term)
+        return entry[1] if entry else 0
+
+    def postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(page ids, term frequencies) of `term` in this segment, or None."""
+        entry = self.terms.get(term)
+        if entry is None:
+            return None
+        offset, count, id_width, tf_width = entry
+        deltas = np.frombuffer(self._postings, dtype=f"<u{id_width}", count=count, offset=offset)
+        tfs = np.frombuffer(self._postings, dtype=f"<u{tf_width}", count=count, offset=offset + count * id_width)
+        return np.cumsum(deltas, dtype=np.int64), tfs
+
+    def norms(self, average_length: float) -> np.ndarray:
+        """Per-page BM25 length normalisation for `average_length`, kept until the average changes."""
+        cached = self._norms
+        if cached is None or cached[0] != average_length:
+            lengths = np.asarray(self.lengths, dtype=np.float32)
+            cached = self._norms = (average_length, K1 * (1.0 - B + B * lengths / np.float32(average_length)))
+        return cached[1]
+
+    def text_bytes(self, page_id: int) -> bytes:
+        start, end = int(self.text_offsets[page_id]), int(self.text_offsets[page_id + 1])
+        return self._texts[start:end]
+
+    def text(self, page_id: int) -> str:
+        return self.text_bytes(page_id).decode("utf-8")
+
+    def indexed_pages(self) -> Iterable[Tuple[str, int]]:
+        for doc_index, page_number in zip(self.doc_ids.tolist(), self.page_numbers.tolist()):
+            yield self.docs[doc_index], page_number
+
+
+def write_segment(
+    path: Path,
+    docs: List[str],
+    doc_ids: np.ndarray,
+    page_numbers: np.ndarray,
+    lengths: np.ndarray,
+    texts: Iterable[bytes],
+    postings: Dict[str, Tuple[np.ndarray, np.ndarray]],
+) -> None:
+    """Write a segment directory (built under a temp name, then renamed into place)."""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.mkdir(parents=True)
+    terms: Dict[str, List[int]] = {}
+    with (tmp_path / "postings.bin").open("wb") as f:
+        offset = 0
+        for term in sorted(postings):
+            ids, tfs = postings[term]
+            deltas = np.diff(ids, prepend=0)
+            id_width, tf_width = _width(int(deltas.max())), _width(int(tfs.max()))
+            # Align each term's block so both arrays can be viewed in place
+            padding = -offset % 4
+            f.write(b"\0" * padding)
+            offset += padding
+            block = deltas.astype(f"<u{id_width}").tobytes() + tfs.astype(f"<u{tf_width}").tobytes()
+            f.write(block)
+            terms[term] = [offset, len(ids), id_width, tf_width]
+            offset += len(block)
+    text_offsets = [0]
+    with (tmp_path / "texts.bin").open("wb") as f:
+        for text in texts:
+            f.write(text)
+            text_offsets.append(text_offsets[-1] + len(text))
+    np.save(tmp_path / "doc_ids.npy", doc_ids.astype(np.uint32))
+    np.save(tmp_path / "page_numbers.npy", page_numbers.astype(np.uint32))
+    np.save(tmp_path / "lengths.npy", lengths.astype(np.uint32))
+    np.save(tmp_path / "text_offsets.npy", np.array(text_offsets, dtype=np.uint64))
+    (tmp_path / "terms.json").write_bytes(dumps(terms))
+    meta = {"docs": docs, "pages": int(len(page_numbers)), "total_length": int(lengths.sum())}
+    (tmp_path / "meta.json").write_bytes(dumps(meta))
+    os.replace(tmp_path, path)
+
+
+def build_segment(path: Path, documents: Sequence[PendingDocument]) -> None:
+    """Tokenize the pages of `documents` and write them as one segment."""
+    docs: List[str] = []
+    doc_ids: List[int] = []
+    page_numbers: List[int] = []
+    lengths: List[int] = []
+    texts: List[bytes] = []
+    postings: Dict[str, Tuple[List[int], List[int]]] = {}
+    for file_id, pages in documents:
+        doc_index = len(docs)
+        docs.append(file_id)
+        for page_number, text in pages:
+            page_id = len(page_numbers)
+            tokens = tokenize(text)
+            doc_ids.append(doc_index)
+            page_numbers.append(page_number)
+            lengths.append(len(tokens))
+            texts.append(text.encode("utf-8"))
+            for term, count in Counter(tokens).items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = ([], [])
+                entry[0].append(page_id)
+                entry[1].append(count)
+    write_segment(
+        path, docs, np.array(doc_ids), np.array(page_numbers), np.array(lengths), texts,
+        {term: (np.array(ids, dtype=np.int64), np.array(tfs)) for term, (ids, tfs) in postings.items()},
+    )
+
+
+def merge_segments(path: Path, segments: Sequence[Segment]) -> None:
+    """Write one segment holding every page of `segments`, by concatenating their postings."""
+    page_offsets, doc_offsets = [], []
+    pages = docs = 0
+    for segment in segments:
+        page_offsets.append(pages)
+        doc_offsets.append(docs)
+        pages += segment.page_count
+        docs += len(segment.docs)
+    postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    for term in sorted(set().union(*(segment.terms for segment in segments))):
+        parts = [(segment.postings(term), page_offset) for segment, page_offset in zip(segments, page_offsets)]
+        parts = [(found, page_offset) for found, page_offset in parts if found is not None]
+        postings[term] = (
+            np.concatenate([ids + page_offset for (ids, _), page_offset in parts]),
+            np.concatenate([tfs for (_, tfs), _ in parts]),
+        )
+    write_segment(
+        path,
+        [file_id for segment in segments for file_id in segment.docs],
+        np.concatenate([np.asarray(s.doc_ids, dtype=np.int64) + offset for s, offset in zip(segments, doc_offsets)]),
+        np.concatenate([np.asarray(s.page_numbers) for s in segments]),
+        np.concatenate([np.asarray(s.lengths) for s in segments]),
+        (s.text_bytes(page_id) for s in segments for page_id in range(s.page_count)),
+        postings,
+    )
+
+
+# --- Index --- #
+
+@contextmanager
+def _exclusive(lock_path: Path) -> Iterator[None]:
+    """Exclusive lock shared with other processes using the same index directory."""
+    if fcntl is None:
+        yield
+        return
+    with lock_path.open("a+b") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class SearchIndex:
+    """The live segments of one index directory. Searches are lock-free; writes are serialized across processes."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.segments_dir = self.root / "segments"
+        self.manifest_path = self.root / "manifest.json"
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._segments: Tuple[Segment, ...] = ()
+        self._version: Optional[Tuple[int, int]] = None
+        self._indexed: Dict[str, Set[int]] = {}
+
+        with self._write_lock, _exclusive(self.root / "write.lock"):
+            self._load_manifest()
+            # Segments left behind by a crash between writing and publishing
+            live = {segment.name for segment in self._segments}
+            for entry in self.segments_dir.iterdir():
+                if entry.name not in live:
+                    shutil.rmtree(entry, ignore_errors=True)
+
+    def _manifest_version(self) -> Optional[Tuple[int, int]]:
+        # The manifest is replaced, never rewritten, so a new inode means a new segment list
+        try:
+            stat = self.manifest_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _load_manifest(self) -> None:
+        """(Re)load the segment list, reusing segments already open."""
+        while True:
+            version = self._manifest_version()
+            names: List[str] = json.loads(self.manifest_path.read_text())["segments"] if version else []
+            current = {segment.name: segment for segment in self._segments}
+            try:
+                segments = tuple(current.get(name) or Segment(self.segments_dir / name) for name in names)
+            except FileNotFoundError:
+                # Another process merged a listed segment away after we read the manifest
+                continue
+            break
+        for segment in segments:
+            if segment.name not in current:
+                for file_id, page_number in segment.indexed_pages():
+                    self._indexed.setdefault(file_id, set()).add(page_number)
+        self._segments = segments
+        self._version = version
+
+    def _refresh(self) -> None:
+        """Pick up segments published by other processes sharing the directory."""
+        if self._manifest_version() == self._version:
+            return
+        with self._refresh_lock:
+            if self._manifest_version() != self._version:
+                self._load_manifest()
+
+    # --- Writing --- #
+
+    def add_documents(self, documents: Sequence[PendingDocument]) -> int:
+        """Index the pages not indexed yet as one new segment, then merge if needed. Returns pages added."""
+        with self._write_lock, _exclusive(self.root / "write.lock"):
+            self._refresh()
+            batch: Dict[str, Dict[int, str]] = {}
+            for file_id, pages in documents:
+                known = self._indexed.get(file_id, set())
+                new_pages = batch.setdefault(file_id, {})
+                for page_number, text in pages:
+                    if text.strip() and page_number not in known:
+                        new_pages[page_number] = text
+            batch = {file_id: pages for file_id, pages in batch.items() if pages}
+            if not batch:
+                return 0
+            name = self._new_segment_name()
+            build_segment(self.segments_dir / name, [(file_id, sorted(pages.items())) for file_id, pages in batch.items()])
+            self._publish(self._segments + (Segment(self.segments_dir / name),), removed=())
+            for file_id, pages in batch.items():
+                self._indexed.setdefault(file_id, set()).update(pages)
+            self._maybe_merge()
+            return sum(len(pages) for pages in batch.values())
+
+    def _new_segment_name(self) -> str:
+        return f"seg-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+
+    def _publish(self, segments: Tuple[Segment, ...], removed: Sequence[Segment]) -> None:
+        tmp_path = self.manifest_path.with_name(f".manifest.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(json.dumps({"segments": [segment.name for segment in segments]}))
+        os.replace(tmp_path, self.manifest_path)
+        self._segments = segments
+        self._version = self._manifest_version()
+        # Searches still holding the old segments keep their mappings; only the names go away
+        for segment in removed:
+            shutil.rmtree(segment.path, ignore_errors=True)
+
+    def _maybe_merge(self) -> None:
+        tiers: Dict[int, List[Segment]] = {}
+        for segment in self._segments:
+            tiers.setdefault(int(math.log(max(segment.page_count, 1), MERGE_FACTOR)), []).append(segment)
+        for tier, members in sorted(tiers.items()):
+            if len(members) >= MERGE_FACTOR:
+                name = self._new_segment_name()
+                merge_segments(self.segments_dir / name, members)
+                merged = Segment(self.segments_dir / name)
+                remaining = tuple(segment for segment in self._segments if segment not in members)
+                self._publish(remaining + (merged,), removed=members)
+                logger.info(f"Merged {len(members)} search segment(s) of tier {tier} into {name} ({merged.page_count} pages)")
+                # The merged segment may complete the next tier
+                self._maybe_merge()
+                return
+
+    # --- Searching --- #
+
+    def search(self, query: str, limit: int = 10) -> Tuple[int, List[SearchHit]]:
+        """BM25-ranked pages matching any term of `query`: (matching page count, best `limit` hits)."""
+        self._refresh()
+        segments = self._segments
+        terms = list(dict.fromkeys(tokenize(query)))
+        total_pages = sum(segment.page_count for segment in segments)
+        if not terms or not total_pages:
+            return 0, []
+        average_length = max(sum(segment.total_length for segment in segments) / total_pages, 1.0)
+        weights = {}
+        for term in terms:
+            frequency = sum(segment.document_frequency(term) for segment in segments)
+            if frequency:
+                weights[term] = math.log1p((total_pages - frequency + 0.5) / (frequency + 0.5))
+
+        matches = 0
+        candidates: List[Tuple[float, int, int]] = []
+        for segment_index, segment in enumerate(segments):
+            found = [(segment.postings(term), idf) for term, idf in weights.items()]
+            found = [(postings, idf) for postings, idf in found if postings is not None]
+            if not found:
+                continue
+            norms = segment.norms(average_length)
+            parts = []
+            for (ids, tfs), idf in found:
+                tf = tfs.astype(np.float32)
+                parts.append((ids, np.float32(idf * (K1 + 1.0)) * tf / (tf + norms[ids])))
+            matched, scores = _combine(parts, segment.page_count)
+            matches += len(matched)
+            if len(matched) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+                matched, scores = matched[top], scores[top]
+            candidates.extend((float(score), segment_index, int(page_id)) for score, page_id in zip(scores, matched))
+
+        hits = []
+        for score, segment_index, page_id in heapq.nlargest(limit, candidates):
+            segment = segments[segment_index]
+            text = segment.text(page_id)
+            hits.append(SearchHit(
+                file_id=segment.docs[int(segment.doc_ids[page_id])],
+                page_number=int(segment.page_numbers[page_id]),
+                score=round(score, 4),
+                snippet=make_snippet(text, terms),
+            ))
+        return matches, hits
+
+    def has_document(self, file_id: str) -> bool:
+        """Whether any page of `file_id` is indexed."""
+        self._refresh()
+        return file_id in self._indexed
+
+    def stats(self) -> Dict[str, int]:
+        self._refresh()
+        segments = self._segments
+        return {
+            "segments": len(segments),
+            "documents": len(self._indexed),
+            "pages": sum(segment.page_count for segment in segments),
+            "postings_bytes": sum((segment.path / "postings.bin").stat().st_size for segment in segments),
+        }
+
+
+def _combine(parts: Sequence[Tuple[np.ndarray, np.ndarray]], page_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum per-term (page ids, scores) into (matched page ids, total scores).
+    Work is proportional to the postings, not to the segment, unless the
+    terms together cover a good part of its pages.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    ids = np.concatenate([ids for ids, _ in parts])
+    scores = np.concatenate([scores for _, scores in parts])
+    if len(ids) * 8 < page_count:
+        matched, inverse = np.unique(ids, return_inverse=True)
+        return matched, np.bincount(inverse, weights=scores).astype(np.float32)
+    dense = np.zeros(page_count, dtype=np.float32)
+    for term_ids, term_scores in parts:
+        dense[term_ids] += term_scores
+    matched = np.flatnonzero(dense)
+    return matched, dense[matched]
+
+
+def make_snippet(text: str, terms: Sequence[str], width: int = SNIPPET_CHARS) -> str:
+    """About `width` characters of `text` around the first query term, cut at word boundaries."""
+    text = " ".join(text.split())
+    if len(text) <= width:
+        return text
+    match = re.search(r"\b(?:" + "|".join(re.escape(term) for term in terms) + ")", text, re.IGNORECASE)
+    start = min(max((match.start() if match else 0) - width // 3, 0), len(text) - width)
+    end = start + width
+    if start > 0:
+        space = text.find(" ", start, end)
+        start = space + 1 if space != -1 else start
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+    return ("…" if start > 0 else "") + text[start:end] + ("…" if end < len(text) else "")
+
+
+_indexes: Dict[Path, SearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(root: Optional[Path] = None) -> SearchIndex:
+    """Return the shared search index (defaults to DATA_DIR/search, read at runtime)."""
+    root = Path(root or get_search_index_dir()).resolve()
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None or not index.segments_dir.exists():
+            index = SearchIndex(root)
+            _indexes[root] = index
+        return index
@@ -0,0 +1,98 @@
+# backend/app/core/search_queue.py
+"""
+Hand-off between parsing and the search index.
+
+Parses call `enqueue_pages` with the text of every page they produced; that
+only appends to an in-memory list, so it never delays a parse response. The
+`run_search_indexer` background task writes whatever has accumulated to the
+index every SEARCH_INDEX_FLUSH_SECONDS, in a worker thread, as one segment.
+Pages become searchable within about one flush interval; anything still
+queued at shutdown is flushed by the lifespan.
+
+The queue is not persisted: pages queued when a process dies are lost. Parse
+results served from the cache are therefore queued again the first time this
+process serves each one (`result_queued`; the index skips pages it already
+holds), and the search_backfill job indexes stored documents that never made
+it into the index.
+
+The index itself (`search_index`, which needs NumPy) is only imported once
+there is something to write.
+"""
+import asyncio
+import logging
+import threading
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+from .config import get_search_index_flush_seconds
+
+logger = logging.getLogger(__name__)
+
+# Cache keys of the parse results whose pages this process has queued; forgotten
+# wholesale past this size (queuing a result again only costs a decode)
+MAX_QUEUED_RESULTS = 100_000
+
+_pending: List[Tuple[str, List[Tuple[int, str]]]] = []
+_queued_results: Set[str] = set()
+_pending_lock = threading.Lock()
+
+
+def enqueue_pages(file_id: str, pages: Iterable[Tuple[int, str]], result_key: Optional[str] = None) -> None:
+    """Queue `(page_number, text)` pairs of a parsed document for indexing, from the result cached at `result_key`."""
+    pages = [(page_number, text) for page_number, text in pages if text]
+    with _pending_lock:
+        if pages and _pending and _pending[-1][0] == file_id:
+            # Pages of a stream arrive one at a time; keep them in one entry
+            _pending[-1][1].extend(pages)
+        elif pages:
+            _pending.append((file_id, pages))
+        if result_key is not None:
+            if len(_queued_results) >= MAX_QUEUED_RESULTS:
+                _queued_results.clear()
+            _queued_results.add(result_key)
+
+
+def result_queued(result_key: str) -> bool:
+    """Whether this process has already queued the pages of the parse result cached at `result_key`."""
+    with _pending_lock:
+        return result_key in _queued_results
+
+
+def pending_pages() -> int:
+    with _pending_lock:
+        return sum(len(pages) for _, pages in _pending)
+
+
+def _take_pending() -> List[Tuple[str, Sequence[Tuple[int, str]]]]:
+    global _pending
+    with _pending_lock:
+        taken, _pending = _pending, []
+    return taken
+
+
+async def flush_pending() -> int:
+    """Write the queued pages to the index. Returns how many pages were newly indexed."""
+    documents = _take_pending()
+    if not documents:
+        return 0
+    from .search_index import get_search_index
+
+    try:
+        index = await asyncio.to_thread(get_search_index)
+        return await asyncio.to_thread(index.add_documents, documents)
+    except BaseException:
+        # Keep the pages for the next flush
+        with _pending_lock:
+            _pending[:0] = documents
+        raise
+
+
+async def run_search_indexer() -> None:
+    """Background task: flush queued pages to the search index at a fixed interval."""
+    while True:
+        await asyncio.sleep(get_search_index_flush_seconds())
+        try:
+            added = await flush_pending()
+            if added:
+                logger.info(f"Indexed {added} page(s) for search")
+        except Exception as e:
+            logger.error(f"Search indexing failed: {e}")
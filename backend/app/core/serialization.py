@@ -0,0 +1,50 @@
+# backend/app/core/serialization.py
+"""
+Fast JSON encoding for response bodies.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. `dumps` understands the compact records in `app/models/compact.py`
+and Pydantic models, so data we built ourselves is encoded directly instead
+of being revalidated into response models first.
+"""
+import json
+from typing import Any
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in conda.yml
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode `obj` as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Decode JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with `dumps`. Pre-encoded bytes are sent as-is."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,231 @@
+# backend/app/core/splitter.py
+"""
+Page classification for the split endpoint.
+
+Every page is scored against every split section in one pass:
+
+1. Vocabulary: only terms that occur in a section's name, description or
+   partition key can contribute to a score, so the vocabulary is built from
+   the sections alone (with simple plural variants mapped to the same term).
+2. Page-term matrix: page texts are tokenized once and the hits on that
+   vocabulary are counted with `np.bincount`, a block of pages at a time.
+3. Scores: BM25 term weights (saturated term frequency, page-length
+   normalisation, IDF over the document's pages) times the section-term
+   matrix, as one matrix product per block. Each section's scores are then
+   scaled so its best page scores 1.
+4. Sections: a Viterbi pass over the pages picks one section per page,
+   maximising the total score minus `switch_penalty` for every section
+   change. Pages without matching terms therefore continue the current
+   section, so sections come out contiguous. An "unassigned" state scoring
+   `min_score` lets weak pages fall out of every section.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Query-term weight by the field it comes from
+NAME_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+PARTITION_KEY_WEIGHT = 3.0
+# Pages scored per matrix block (bounds memory to PAGE_BLOCK x vocabulary)
+PAGE_BLOCK = 1024
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "page pages section sections document documents contains containing include includes including".split()
+)
+
+
+@dataclass(frozen=True)
+class SplitSection:
+    """One category pages can be assigned to."""
+    name: str
+    description: str
+    partition_key: str = ""
+
+    @property
+    def key(self) -> str:
+        """Key of the section in `section_mapping`."""
+        return f"{self.name} {self.partition_key}".strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+def _variants(term: str) -> Tuple[str, ...]:
+    """Surface forms matched for a query term (singular and plural)."""
+    if len(term) > 3 and term.endswith("ies"):
+        return term, term[:-3] + "y"
+    if len(term) > 3 and term.endswith("es"):
+        return term, term[:-2], term[:-1]
+    if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+        return term, term[:-1]
+    if term.isdigit():
+        return (term,)
+    if len(term) > 3 and term.endswith("y") and term[-2] not in "aeiou":
+        return term, term[:-1] + "ies"
+    return term, term + "s", term + "es"
+
+
+def build_query_matrix(sections: Sequence[SplitSection]) -> Tuple[Dict[str, int], np.ndarray]:
+    """
+    Map surface forms to vocabulary indices and build the (vocabulary x
+    sections) matrix of query-term weights.
+    """
+    lookup: Dict[str, int] = {}
+    vocabulary_size = 0
+    weights: List[Dict[int, float]] = []
+    for section in sections:
+        section_weights: Dict[int, float] = {}
+        for text, weight in ((section.name, NAME_WEIGHT), (section.description, DESCRIPTION_WEIGHT), (section.partition_key, PARTITION_KEY_WEIGHT)):
+            for token in tokenize(text):
+                if token in _STOPWORDS:
+                    continue
+                index = lookup.get(token)
+                if index is None:
+                    index = vocabulary_size
+                    vocabulary_size += 1
+                    for form in _variants(token):
+                        lookup.setdefault(form, index)
+                section_weights[index] = section_weights.get(index, 0.0) + weight
+        weights.append(section_weights)
+
+    query = np.zeros((vocabulary_size, len(sections)), dtype=np.float32)
+    for column, section_weights in enumerate(weights):
+        for index, weight in section_weights.items():
+            query[index, column] = weight
+    return lookup, query
+
+
+def score_pages(texts: Sequence[str], sections: Sequence[SplitSection]) -> np.ndarray:
+    """BM25 score of every page (rows) against every section (columns), each column scaled to a maximum of 1."""
+    n_pages = len(texts)
+    lookup, query = build_query_matrix(sections)
+    vocabulary_size = query.shape[0]
+    scores = np.zeros((n_pages, len(sections)), dtype=np.float32)
+    if n_pages == 0 or vocabulary_size == 0:
+        return scores
+
+    # Query-term hits as (page, term) pairs, plus every page's length in tokens
+    hit_pages: List[int] = []
+    hit_terms: List[int] = []
+    lengths = np.empty(n_pages, dtype=np.float32)
+    get = lookup.get
+    for page_index, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths[page_index] = len(tokens)
+        terms = [index for index in map(get, tokens) if index is not None]
+        hit_terms.extend(terms)
+        hit_pages.extend([page_index] * len(terms))
+    if not hit_terms:
+        return scores
+    pages = np.asarray(hit_pages, dtype=np.int64)
+    terms = np.asarray(hit_terms, dtype=np.int64)
+
+    document_frequency = np.bincount(np.unique(pages * vocabulary_size + terms) % vocabulary_size, minlength=vocabulary_size)
+    idf = np.log1p((n_pages - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+    length_norm = K1 * (1 - B + B * lengths / max(float(lengths.mean()), 1.0))
+    weighted_query = idf[:, None] * query
+
+    # Hits are in page order, so each block of pages is a contiguous slice of them
+    bounds = np.searchsorted(pages, np.arange(0, n_pages + PAGE_BLOCK, PAGE_BLOCK).clip(max=n_pages))
+    for block, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        first = block * PAGE_BLOCK
+        rows = min(PAGE_BLOCK, n_pages - first)
+        tf = np.bincount((pages[start:stop] - first) * vocabulary_size + terms[start:stop], minlength=rows * vocabulary_size)
+        tf = tf.reshape(rows, vocabulary_size).astype(np.float32)
+        saturated = tf * (K1 + 1) / (tf + length_norm[first:first + rows, None])
+        scores[first:first + rows] = saturated @ weighted_query
+
+    best = scores.max(axis=0)
+    np.divide(scores, best, out=scores, where=best > 0)
+    return scores
+
+
+def assign_sections(scores: np.ndarray, switch_penalty: float, min_score: float) -> np.ndarray:
+    """
+    Pick one section per page (-1 for unassigned) maximising the summed
+    scores minus `switch_penalty` per section change.
+    """
+    n_pages, n_sections = scores.shape
+    if n_pages == 0:
+        return np.empty(0, dtype=np.int64)
+    # The last state is "unassigned"
+    states = np.concatenate([scores, np.full((n_pages, 1), min_score, dtype=scores.dtype)], axis=1).astype(np.float64)
+    labels = np.arange(n_sections + 1)
+    back = np.empty((n_pages, n_sections + 1), dtype=np.int64)
+    total = states[0].copy()
+    back[0] = labels
+    for page in range(1, n_pages):
+        best = int(total.argmax())
+        switched = total[best] - switch_penalty
+        # On ties, switch as late as possible: pages without evidence continue the current section
+        stay = total > switched
+        back[page] = np.where(stay, labels, best)
+        total = np.where(stay, total, switched) + states[page]
+
+    path = np.empty(n_pages, dtype=np.int64)
+    path[-1] = int(total.argmax())
+    for page in range(n_pages - 1, 0, -1):
+        path[page - 1] = back[page, path[page]]
+    path[path == n_sections] = -1
+    return path
+
+
+def split_pages(
+    page_numbers: Sequence[int],
+    texts: Sequence[str],
+    sections: Sequence[SplitSection],
+    contiguous: bool = True,
+    switch_penalty: float = 0.5,
+    min_score: float = 0.0,
+    allow_overlap: bool = False,
+    overlap_ratio: float = 0.8,
+) -> Dict[str, List[int]]:
+    """
+    Assign pages to sections and return the page numbers of each section
+    key, in page order. Sections sharing a key are merged.
+
+    Without `contiguous`, every page goes to its best-scoring section. With
+    `allow_overlap`, a page is also added to every other section scoring at
+    least `overlap_ratio` of its assigned section's score.
+    """
+    scores = score_pages(texts, sections)
+    if contiguous:
+        assigned = assign_sections(scores, switch_penalty, min_score)
+    else:
+        assigned = scores.argmax(axis=1) if len(sections) else np.full(len(texts), -1)
+        assigned = np.where(scores.max(axis=1, initial=0.0) > min_score, assigned, -1)
+
+    members = np.zeros(scores.shape, dtype=bool)
+    pages_with_section = np.flatnonzero(assigned >= 0)
+    members[pages_with_section, assigned[pages_with_section]] = True
+    if allow_overlap and len(pages_with_section):
+        own = scores[pages_with_section, assigned[pages_with_section]]
+        close = scores[pages_with_section] >= (overlap_ratio * own)[:, None]
+        members[pages_with_section] |= close & (scores[pages_with_section] > min_score)
+
+    numbers = np.asarray(page_numbers, dtype=np.int64)
+    mapping: Dict[str, List[int]] = {}
+    for column, section in enumerate(sections):
+        found = numbers[members[:, column]].tolist()
+        mapping[section.key] = sorted(set(mapping.get(section.key, [])).union(found))
+    return mapping
+
+
+def page_texts(pages: Iterable[Dict]) -> Tuple[List[int], List[str]]:
+    """Page numbers and texts of decoded `Page` dicts."""
+    numbers: List[int] = []
+    texts: List[str] = []
+    for page in pages:
+        numbers.append(page["page_number"])
+        texts.append(page.get("text") or "")
+    return numbers, texts
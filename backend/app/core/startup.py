@@ -0,0 +1,166 @@
+# backend/app/core/startup.py
+"""
+Startup lifecycle: readiness and background pre-warming.
+
+The lifespan in main.py calls `mark_started()` once the job engine and
+webhook dispatcher are running, then `start_prewarm()` warms the rest in the
+background so the server accepts connections as early as possible:
+
+- the parser process pool: every worker is spawned and loads PyMuPDF and
+  the table engine;
+- the blob store, parse-result and page caches, result store and search index
+  (directories, databases, disk indexes);
+- the split, extract and search engines, which endpoints import on first use.
+
+`/ready` answers 503 until startup, and with READY_AFTER_PREWARM (the
+default) the pre-warm, has finished; `/` stays a plain liveness check. A
+component that fails to warm is reported but does not block readiness:
+it is loaded again by the first request that needs it.
+
+Import, startup and pre-warm durations are logged, returned by /ready and
+exported on /metrics as `docuparse_startup_seconds`.
+"""
+import asyncio
+import importlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .config import get_ready_after_prewarm, get_startup_prewarm
+from .metrics import STARTUP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Modules (relative to this package) that endpoints import lazily; loading them is part of the pre-warm
+LAZY_ENGINE_MODULES = (".splitter", ".extractor", ".search_index")
+
+
+@dataclass
+class StartupState:
+    """What this process has finished loading, and how long each phase took."""
+    import_seconds: Optional[float] = None
+    startup_seconds: Optional[float] = None
+    prewarm_seconds: Optional[float] = None
+    started: bool = False
+    prewarm_done: bool = False
+    components: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def ready(self) -> bool:
+        return self.started and (self.prewarm_done or not get_ready_after_prewarm())
+
+    def to_status(self) -> Dict[str, Any]:
+        """Body of the /ready endpoint."""
+        return {
+            "status": "ready" if self.ready else "starting",
+            "started": self.started,
+            "prewarm_done": self.prewarm_done,
+            "timings": {
+                "import_seconds": self.import_seconds,
+                "startup_seconds": self.startup_seconds,
+                "prewarm_seconds": self.prewarm_seconds,
+            },
+            "components": self.components,
+        }
+
+
+_state = StartupState()
+
+
+def get_startup_state() -> StartupState:
+    return _state
+
+
+def record_import_time(seconds: float) -> None:
+    """Record how long importing the application took (measured by main.py)."""
+    _state.import_seconds = round(seconds, 4)
+    STARTUP_SECONDS.set(seconds, phase="import")
+    logger.info(f"Application imported in {seconds * 1000:.0f} ms")
+
+
+def mark_started(seconds: float) -> None:
+    """The lifespan has started every service; requests can be served (possibly cold)."""
+    _state.started = True
+    _state.startup_seconds = round(seconds, 4)
+    STARTUP_SECONDS.set(seconds, phase="startup")
+    logger.info(f"Startup finished in {seconds * 1000:.0f} ms")
+
+
+def mark_stopped() -> None:
+    """Reset readiness at shutdown, so a restarted app in the same process starts cold."""
+    _state.started = False
+    _state.prewarm_done = False
+    _state.prewarm_seconds = None
+    _state.components = {}
+
+
+# --- Pre-warm --- #
+
+def _warm_stores() -> None:
+    from .blob_store import get_blob_store
+    from .cache import get_parse_cache
+    from .page_cache import get_page_cache
+    from .result_store import get_result_store
+    from .search_index import get_search_index
+
+    get_blob_store()
+    get_parse_cache()
+    get_page_cache()
+    get_result_store()
+    get_search_index()
+
+
+def _import_engines() -> None:
+    for module in LAZY_ENGINE_MODULES:
+        importlib.import_module(module, __package__)
+
+
+async def _warm_parser_pool() -> None:
+    from .parser import prewarm_process_pool
+
+    workers = await prewarm_process_pool()
+    _state.components["parser_pool"]["workers"] = workers
+
+
+def _prewarm_steps() -> Dict[str, Callable[[], Awaitable[None]]]:
+    return {
+        "parser_pool": _warm_parser_pool,
+        "stores": lambda: asyncio.to_thread(_warm_stores),
+        "engines": lambda: asyncio.to_thread(_import_engines),
+    }
+
+
+async def _run_step(name: str, step: Callable[[], Awaitable[None]]) -> None:
+    component = _state.components[name] = {"status": "warming"}
+    start = time.perf_counter()
+    try:
+        await step()
+        component["status"] = "ready"
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        component["status"] = "failed"
+        component["error"] = f"{type(e).__name__}: {e}"
+        logger.error(f"Pre-warming {name} failed: {e}")
+    component["seconds"] = round(time.perf_counter() - start, 4)
+
+
+async def prewarm() -> None:
+    """Warm every component concurrently, then mark the pre-warm done."""
+    start = time.perf_counter()
+    await asyncio.gather(*(_run_step(name, step) for name, step in _prewarm_steps().items()))
+    seconds = time.perf_counter() - start
+    _state.prewarm_seconds = round(seconds, 4)
+    _state.prewarm_done = True
+    STARTUP_SECONDS.set(seconds, phase="prewarm")
+    logger.info(f"Pre-warm finished in {seconds * 1000:.0f} ms: "
+                + ", ".join(f"{name} {component['status']}" for name, component in _state.components.items()))
+
+
+def start_prewarm() -> Optional[asyncio.Task]:
+    """Start the pre-warm in the background (or mark it done when STARTUP_PREWARM is off)."""
+    if not get_startup_prewarm():
+        _state.prewarm_done = True
+        return None
+    return asyncio.create_task(prewarm())
@@ -0,0 +1,256 @@
+# backend/app/core/storage.py
+"""
+Streaming helpers for writing uploaded documents to disk.
+
+Uploads are copied in fixed-size chunks. File writes run in the threadpool so a
+large upload never blocks the event loop, and the SHA-256 digest and byte count
+are computed in the same pass over the data. `ingest_upload` hashes the
+(already spooled) upload first and only writes it when the blob store does not
+hold that content yet, so repeat uploads cost a read, not a copy.
+
+By the time an endpoint sees an `UploadFile`, Starlette has already received
+and spooled the multipart body, so `UploadLimitMiddleware` enforces
+MAX_UPLOAD_BYTES earlier: on the declared Content-Length before anything is
+read, and on the bytes received while the body is being parsed.
+"""
+import hashlib
+import json
+import logging
+import os
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from .blob_store import BlobStore, BlobRecord
+from .config import get_batch_max_documents, get_max_upload_bytes
+from .metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured maximum size."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds the maximum allowed size of {max_bytes} bytes.")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class StoredUpload:
+    """Result of streaming an upload to disk."""
+    path: Path
+    sha256: str
+    size_bytes: int
+
+
+def _hash_and_write(buffer, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+def _hash_file(file, chunk_size: int, max_bytes: Optional[int] = None) -> Tuple[str, int]:
+    """SHA-256 hex digest and size of `file` from its current position, read in chunks (blocking)."""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise UploadTooLargeError(max_bytes)
+        digest.update(chunk)
+    return digest.hexdigest(), size
+
+
+def _remove_quietly(path: Path) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as rm_err:
+        logger.error(f"Failed to remove partially saved file {path}: {rm_err}")
+
+
+async def stream_upload_to_path(
+    upload: UploadFile,
+    dest: Path,
+    chunk_size: int,
+    max_bytes: Optional[int] = None,
+) -> StoredUpload:
+    """
+    Copy `upload` to `dest` chunk by chunk, hashing as we go.
+
+    The size limit is checked again after every chunk, so no more than
+    `max_bytes` of a single file is ever written (`UploadLimitMiddleware` has
+    already bounded the request body). On any error the partially written
+    file is removed.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with stage_timer("upload_write"):
+        buffer = await run_in_threadpool(dest.open, "wb")
+        try:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                await run_in_threadpool(_hash_and_write, buffer, digest, chunk)
+            await run_in_threadpool(buffer.close)
+        except BaseException:
+            await run_in_threadpool(buffer.close)
+            await run_in_threadpool(_remove_quietly, dest)
+            raise
+
+    return StoredUpload(path=dest, sha256=digest.hexdigest(), size_bytes=size)
+
+
+async def ingest_upload(
+    upload: UploadFile,
+    store: BlobStore,
+    chunk_size: int,
+    max_bytes: Optional[int] = None,
+) -> Tuple[BlobRecord, bool]:
+    """
+    Stream `upload` into `store`, returning (record, created). The record holds
+    a new reference to the blob; callers that only need it transiently release it.
+
+    The upload is hashed first; content the store already holds just gains a
+    reference. Otherwise the upload is rewound and written to a temp file that
+    is moved into place.
+    """
+    with stage_timer("upload_hash"):
+        digest, _ = await run_in_threadpool(_hash_file, upload.file, chunk_size, max_bytes)
+    existing = await run_in_threadpool(store.add_reference, digest)
+    if existing is not None:
+        return existing, False
+
+    await upload.seek(0)
+    stored = await stream_upload_to_path(upload, store.new_temp_path(), chunk_size, max_bytes)
+    extension = Path(upload.filename or "").suffix
+    return await run_in_threadpool(
+        store.ingest, stored.path, stored.sha256, stored.size_bytes, extension, upload.content_type
+    )
+
+
+def download_to_store(
+    url: str,
+    store: BlobStore,
+    chunk_size: int,
+    max_bytes: Optional[int] = None,
+    timeout: float = 60.0,
+) -> Tuple[BlobRecord, bool]:
+    """
+    Blocking counterpart of `ingest_upload` for documents referenced by URL.
+
+    The response body is streamed to a temp file and hashed in one pass, with
+    the same size limit as uploads. Call it from a worker thread.
+    """
+    tmp_path = store.new_temp_path()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response, tmp_path.open("wb") as buffer:
+            content_type = response.headers.get("Content-Type")
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                _hash_and_write(buffer, digest, chunk)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+    extension = Path(urllib.parse.urlparse(url).path).suffix
+    return store.ingest(tmp_path, digest.hexdigest(), size, extension, content_type)
+
+
+# --- Request body limit --- #
+
+# Room for the multipart boundaries, part headers and form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+BATCH_UPLOAD_PATH = "/api/v1/parse_batch/upload"
+
+
+def multipart_body_limit(path: str) -> int:
+    """Largest multipart body accepted for `path` (0: unlimited). Batch uploads may carry one file per document."""
+    max_bytes = get_max_upload_bytes()
+    if not max_bytes:
+        return 0
+    files = get_batch_max_documents() if path.rstrip("/") == BATCH_UPLOAD_PATH else 1
+    return max_bytes * files + MULTIPART_OVERHEAD_BYTES
+
+
+class UploadLimitMiddleware:
+    """
+    Rejects oversized multipart uploads with 413 before their body is buffered:
+    immediately when Content-Length is over the limit, otherwise as soon as
+    the bytes received cross it (e.g. chunked transfer encoding).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _is_multipart(scope):
+            await self.app(scope, receive, send)
+            return
+        limit = multipart_body_limit(scope["path"])
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body exceeds the maximum allowed size of {limit} bytes."
+        declared = _header(scope, b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            logger.warning(f"Rejected upload to {scope['path']}: Content-Length {declared} over {limit}")
+            await _send_too_large(send, detail)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    logger.warning(f"Rejected upload to {scope['path']}: body over {limit} bytes")
+                    # Raised from the body parser; FastAPI re-raises HTTPExceptions from it as-is
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _is_multipart(scope) -> bool:
+    content_type = _header(scope, b"content-type") or ""
+    return content_type.lower().startswith("multipart/form-data")
+
+
+async def _send_too_large(send, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")],
+    })
+    await send({"type": "http.response.body", "body": body})
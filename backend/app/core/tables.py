@@ -0,0 +1,223 @@
+# backend/app/core/tables.py
+"""
+Table detection and cell reconstruction from word boxes.
+
+Works on the word boxes PyMuPDF reports for a page (`page.get_text("words")`),
+so it finds tables that are laid out with whitespace only (typical of
+financial statements) as well as ruled ones. All geometric work is done with
+NumPy array operations over the whole page; Python only loops over the
+detected tables and over the text segments when joining cell text.
+
+1. Lines: words are grouped into text lines by their vertical centre.
+2. Segments: within a line, words separated by a horizontal gap wider than
+   COLUMN_GAP (relative to the text height) start a new segment. A line with
+   at least MIN_COLUMNS segments is "tabular".
+3. Rows: a line much closer to the previous line than the usual row pitch
+   continues the previous row, so wrapped cell text becomes one multi-line
+   cell instead of an extra row.
+4. Tables: runs of rows containing a tabular line, with no unusually large
+   vertical gap between them and at least MIN_ROWS rows.
+5. Columns: the union of the x-intervals of the segments on the table's
+   fullest lines; every segment goes to the column its centre falls in.
+6. Prose check: multi-column running text (two-column articles, letters)
+   also lines up into aligned segments, but every one of its segments is a
+   wrapped line of several words. A table needs at least one column whose
+   cells are mostly compact (labels, amounts, dates: at most
+   COMPACT_CELL_WORDS words); otherwise the candidate is dropped.
+"""
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Word centres closer than this (x median word height) are on the same line
+LINE_TOLERANCE = 0.5
+# Horizontal gap (x median word height) that separates two cells on a line
+COLUMN_GAP = 0.6
+# A line whose pitch to the previous line is below this fraction of the row pitch continues that row
+CONTINUATION_PITCH = 0.75
+# A pitch above this multiple of the row pitch ends the table
+TABLE_BREAK_PITCH = 1.8
+MIN_ROWS = 2
+MIN_COLUMNS = 2
+# Segments of at most this many words count as compact table cells rather than wrapped prose lines
+COMPACT_CELL_WORDS = 3
+# Share of compact segments at least one column needs for the candidate to be a table
+MIN_COMPACT_SHARE = 0.5
+
+
+@dataclass
+class DetectedTable:
+    """A reconstructed table: its bounding box and its cell grid (None for empty cells)."""
+    bbox: Tuple[float, float, float, float]
+    rows: List[List[Optional[str]]]
+
+
+def words_to_arrays(words: Sequence[Sequence[Any]]) -> Tuple[np.ndarray, List[str]]:
+    """Split PyMuPDF word tuples (x0, y0, x1, y1, text, ...) into an (n, 4) box array and the texts."""
+    if not words:
+        return np.empty((0, 4), dtype=np.float64), []
+    boxes = np.array([word[:4] for word in words], dtype=np.float64)
+    return boxes, [word[4] for word in words]
+
+
+def _group_starts(sorted_keys: np.ndarray) -> np.ndarray:
+    """Indices where a new run of equal values starts in a sorted key array."""
+    starts = np.ones(len(sorted_keys), dtype=bool)
+    starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return np.flatnonzero(starts)
+
+
+def find_tables(boxes: np.ndarray, texts: Sequence[str]) -> List[DetectedTable]:
+    """Detect tables among the given word boxes and rebuild their cell grids."""
+    n = len(texts)
+    if n < MIN_ROWS * MIN_COLUMNS:
+        return []
+    x0, y0, x1, y1 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    unit = float(np.median(y1 - y0)) or 1.0
+
+    # 1. Lines, numbered top to bottom
+    y_centre = (y0 + y1) / 2
+    by_y = np.argsort(y_centre, kind="stable")
+    new_line = np.ones(n, dtype=bool)
+    new_line[1:] = np.diff(y_centre[by_y]) > LINE_TOLERANCE * unit
+    word_line = np.empty(n, dtype=np.int64)
+    word_line[by_y] = np.cumsum(new_line) - 1
+
+    # 2. Segments: words ordered by line, then left to right
+    order = np.lexsort((x0, word_line))
+    s_x0, s_x1, s_y0, s_y1, s_line = x0[order], x1[order], y0[order], y1[order], word_line[order]
+    new_segment = np.ones(n, dtype=bool)
+    new_segment[1:] = (s_line[1:] != s_line[:-1]) | (s_x0[1:] - s_x1[:-1] > COLUMN_GAP * unit)
+    seg_starts = np.flatnonzero(new_segment)
+    seg_x0 = np.minimum.reduceat(s_x0, seg_starts)
+    seg_x1 = np.maximum.reduceat(s_x1, seg_starts)
+    seg_y0 = np.minimum.reduceat(s_y0, seg_starts)
+    seg_y1 = np.maximum.reduceat(s_y1, seg_starts)
+    seg_line = s_line[seg_starts]
+
+    line_starts = _group_starts(s_line)
+    line_centre = (np.minimum.reduceat(s_y0, line_starts) + np.maximum.reduceat(s_y1, line_starts)) / 2
+    n_lines = len(line_starts)
+    segments_per_line = np.bincount(seg_line, minlength=n_lines)
+    tabular = segments_per_line >= MIN_COLUMNS
+    if tabular.sum() < MIN_ROWS:
+        return []
+
+    # 3. Rows: the usual pitch between consecutive tabular lines sets the scale
+    pitch = np.diff(line_centre)
+    tabular_pitch = pitch[tabular[1:] & tabular[:-1]]
+    row_pitch = float(np.median(tabular_pitch)) if len(tabular_pitch) else float(np.median(pitch))
+    new_row = np.ones(n_lines, dtype=bool)
+    new_row[1:] = pitch > CONTINUATION_PITCH * row_pitch
+    line_row = np.cumsum(new_row) - 1
+    row_first_line = np.flatnonzero(new_row)
+    row_last_line = np.r_[row_first_line[1:] - 1, n_lines - 1]
+    row_tabular = np.bincount(line_row, weights=tabular) > 0
+
+    # 4. Tables: runs of tabular rows without a large gap between them
+    row_pitch_between = line_centre[row_first_line[1:]] - line_centre[row_last_line[:-1]]
+    new_table = np.ones(len(row_first_line), dtype=bool)
+    new_table[1:] = ~(row_tabular[1:] & row_tabular[:-1] & (row_pitch_between <= TABLE_BREAK_PITCH * row_pitch))
+    row_table = np.cumsum(new_table) - 1
+
+    # Segment texts, joined once for all segments
+    sorted_texts = [texts[i] for i in order]
+    text_bounds = np.r_[seg_starts, n].tolist()
+    segment_texts = [" ".join(sorted_texts[start:stop]) for start, stop in zip(text_bounds[:-1], text_bounds[1:])]
+    seg_words = np.diff(seg_starts, append=n)
+
+    # Lines (and so segments) are numbered top to bottom, so each table's rows and
+    # segments are contiguous slices
+    seg_row = line_row[seg_line]
+    seg_table = row_table[seg_row]
+    seg_width = segments_per_line[seg_line]
+    n_tables = int(row_table[-1]) + 1
+    row_bounds = np.searchsorted(row_table, np.arange(n_tables + 1)).tolist()
+    seg_bounds = np.searchsorted(seg_table, np.arange(n_tables + 1)).tolist()
+
+    tables: List[DetectedTable] = []
+    for table_id in range(n_tables):
+        first_row, stop_row = row_bounds[table_id], row_bounds[table_id + 1]
+        if stop_row - first_row < MIN_ROWS or not row_tabular[first_row]:
+            continue
+        segs = slice(seg_bounds[table_id], seg_bounds[table_id + 1])
+        table = _build_table(
+            seg_x0[segs], seg_y0[segs], seg_x1[segs], seg_y1[segs], seg_line[segs],
+            seg_row[segs] - first_row, seg_width[segs], seg_words[segs], stop_row - first_row,
+            segment_texts[segs],
+        )
+        if table is not None:
+            tables.append(table)
+    return tables
+
+
+def _build_table(
+    x0: np.ndarray,
+    y0: np.ndarray,
+    x1: np.ndarray,
+    y1: np.ndarray,
+    line: np.ndarray,
+    row: np.ndarray,
+    width: np.ndarray,
+    words: np.ndarray,
+    n_rows: int,
+    texts: Sequence[str],
+) -> Optional[DetectedTable]:
+    """
+    Find the columns of one table and place its segments into a grid. Arrays
+    are per segment: box, line, row within the table, segments on its line and
+    words in the segment. Returns None for candidates that are running text.
+    """
+    # Column layout comes from the lines with the most common (or a larger) number of
+    # cells, so headers spanning several columns do not merge them
+    first_of_line = np.ones(len(line), dtype=bool)
+    first_of_line[1:] = line[1:] != line[:-1]
+    line_widths = width[first_of_line]
+    typical = int(np.bincount(line_widths[line_widths >= MIN_COLUMNS]).argmax())
+    reference = np.flatnonzero(width >= typical)
+
+    ref_order = reference[np.argsort(x0[reference], kind="stable")]
+    ref_x0, ref_x1 = x0[ref_order], x1[ref_order]
+    reach = np.maximum.accumulate(ref_x1)
+    new_column = np.ones(len(ref_order), dtype=bool)
+    new_column[1:] = ref_x0[1:] > reach[:-1]
+    column_starts = np.flatnonzero(new_column)
+    n_cols = len(column_starts)
+    if n_cols < MIN_COLUMNS:
+        return None
+    column_x0 = ref_x0[column_starts]
+    column_x1 = np.maximum.reduceat(ref_x1, column_starts)
+    boundaries = (column_x1[:-1] + column_x0[1:]) / 2
+    column = np.searchsorted(boundaries, (x0 + x1) / 2)
+
+    # 6. Running text in columns: no column is made of compact cells
+    compact_share = (
+        np.bincount(column, weights=words <= COMPACT_CELL_WORDS, minlength=n_cols)
+        / np.maximum(np.bincount(column, minlength=n_cols), 1)
+    )
+    if compact_share.max() < MIN_COMPACT_SHARE:
+        return None
+
+    # Within a cell, segments are joined left to right on a line and by newlines across lines
+    cell = row * n_cols + column
+    cell_order = np.lexsort((x0, line, cell))
+    ordered_cells = cell[cell_order]
+    ordered_lines = line[cell_order]
+    first_in_cell = np.ones(len(cell_order), dtype=bool)
+    first_in_cell[1:] = ordered_cells[1:] != ordered_cells[:-1]
+    same_line = np.zeros(len(cell_order), dtype=bool)
+    same_line[1:] = ordered_lines[1:] == ordered_lines[:-1]
+
+    grid: List[List[Optional[str]]] = [[None] * n_cols for _ in range(n_rows)]
+    for index, cell_index, first, on_same_line in zip(
+        cell_order.tolist(), ordered_cells.tolist(), first_in_cell.tolist(), same_line.tolist()
+    ):
+        r, c = divmod(cell_index, n_cols)
+        if first:
+            grid[r][c] = texts[index]
+        else:
+            grid[r][c] += (" " if on_same_line else "\n") + texts[index]
+
+    bbox = (float(x0.min()), float(y0.min()), float(x1.max()), float(y1.max()))
+    return DetectedTable(bbox=bbox, rows=grid)
@@ -0,0 +1,495 @@
+# backend/app/core/upload_sessions.py
+"""
+Resumable, chunked uploads.
+
+A client creates a session declaring the file's size and SHA-256, then PUTs
+numbered chunks (in any order, several at once) and finally completes it:
+
+- Creating a session preallocates a data file of the declared size, so
+  every chunk is written in place with a positional write (`os.pwrite`) at
+  `index * chunk_size`. Chunks never depend on each other, and a chunk can
+  be re-sent after a dropped connection without touching the others.
+- Received chunks are recorded in a small SQLite index next to the blob
+  store, so the session (and the received ranges) survive restarts.
+- Completing a session re-hashes the whole file, checks it against the
+  declared SHA-256 and moves it into the blob store, returning a regular
+  `file_id`. Completing again returns the same file.
+- Chunk writers register in the index before opening the data file and
+  renew that registration before every write. Completion is refused while
+  a writer is registered, and a writer whose registration has lapsed stops
+  without writing, so a late re-sent chunk can never land in a file that
+  has already been verified and moved into the blob store.
+
+Sessions not touched for UPLOAD_SESSION_TTL_SECONDS are removed by the
+background sweeper together with their data files.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from .blob_store import BlobRecord, BlobStore
+from .config import get_upload_dir, get_upload_session_ttl_seconds, get_blob_sweep_interval_seconds
+from .metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+OPEN = "open"
+FINALIZING = "finalizing"
+COMPLETED = "completed"
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# Bytes hashed per read when verifying a completed file
+_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+# A chunk writer that has not renewed its registration for this long (crashed worker) no longer blocks completion
+WRITER_LEASE_SECONDS = 60.0
+
+
+class ChunkError(ValueError):
+    """A chunk index or length that does not fit the session."""
+
+
+class SessionStateError(Exception):
+    """The session cannot accept the operation in its current state (e.g. chunks still missing)."""
+
+
+class ChecksumMismatchError(Exception):
+    """Received data does not match the declared SHA-256."""
+
+
+@dataclass
+class UploadSession:
+    """A row of the upload_sessions table."""
+    session_id: str
+    filename: str
+    content_type: Optional[str]
+    size_bytes: int
+    sha256: str
+    chunk_size: int
+    status: str
+    file_id: Optional[str]
+    created_at: float
+    updated_at: float
+
+    @property
+    def chunk_count(self) -> int:
+        return -(-self.size_bytes // self.chunk_size)
+
+    def chunk_range(self, index: int) -> Tuple[int, int]:
+        """Byte range [start, end) covered by chunk `index`."""
+        if not 0 <= index < self.chunk_count:
+            raise ChunkError(f"Chunk index {index} is out of range (0-{self.chunk_count - 1}).")
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.size_bytes)
+
+    def to_status(self, received: List[int]) -> Dict:
+        """Public representation: received byte ranges and the chunks still missing."""
+        received_set = set(received)
+        ranges: List[Dict[str, int]] = []
+        for index in sorted(received_set):
+            start, end = self.chunk_range(index)
+            if ranges and ranges[-1]["end"] == start:
+                ranges[-1]["end"] = end
+            else:
+                ranges.append({"start": start, "end": end})
+        return {
+            "session_id": self.session_id,
+            "filename": self.filename,
+            "content_type": self.content_type,
+            "size_bytes": self.size_bytes,
+            "sha256": self.sha256,
+            "chunk_size": self.chunk_size,
+            "chunk_count": self.chunk_count,
+            "status": self.status,
+            "file_id": self.file_id,
+            "received_bytes": sum(end - start for start, end in (self.chunk_range(i) for i in received_set)),
+            "received_ranges": ranges,
+            "missing_chunks": [i for i in range(self.chunk_count) if i not in received_set],
+        }
+
+
+_SESSION_COLUMNS = (
+    "session_id, filename, content_type, size_bytes, sha256, chunk_size, status, file_id, created_at, updated_at"
+)
+
+
+def _preallocate(path: Path, size: int) -> None:
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            # Reserve the blocks up front so chunk writes cannot fail half way for lack of space
+            os.posix_fallocate(fd, 0, size)
+        except (AttributeError, OSError):
+            # Not available on every platform / filesystem: a sparse file works the same
+            os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+
+def _remove_quietly(path: Path) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class UploadSessionStore:
+    """Session index (SQLite) and preallocated data files. All methods are blocking."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.data_dir = self.root / "data"
+        self.index_path = self.root / "sessions.sqlite3"
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                session_id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                content_type TEXT,
+                size_bytes INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                chunk_size INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                file_id TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS upload_chunks (
+                session_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                PRIMARY KEY (session_id, chunk_index)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS upload_writers (
+                writer_id TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS upload_writers_session ON upload_writers (session_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS upload_sessions_updated ON upload_sessions (updated_at)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def data_path(self, session_id: str) -> Path:
+        return self.data_dir / session_id
+
+    # --- Sessions --- #
+
+    def _get(self, session_id: str) -> Optional[UploadSession]:
+        row = self._conn.execute(
+            f"SELECT {_SESSION_COLUMNS} FROM upload_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return UploadSession(*row) if row else None
+
+    def get(self, session_id: str) -> Optional[UploadSession]:
+        with self._lock:
+            return self._get(session_id)
+
+    def create(
+        self,
+        filename: str,
+        size_bytes: int,
+        sha256: str,
+        chunk_size: int,
+        content_type: Optional[str] = None,
+    ) -> UploadSession:
+        """Register a session and preallocate its data file."""
+        session_id = f"upload-session-{uuid.uuid4().hex}"
+        _preallocate(self.data_path(session_id), size_bytes)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO upload_sessions ({_SESSION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                (session_id, filename, content_type, size_bytes, sha256.lower(), chunk_size, OPEN, now, now),
+            )
+            self._conn.commit()
+            return self._get(session_id)
+
+    def received_chunks(self, session_id: str) -> List[int]:
+        with self._lock:
+            return self._received(session_id)
+
+    def _received(self, session_id: str) -> List[int]:
+        rows = self._conn.execute(
+            "SELECT chunk_index FROM upload_chunks WHERE session_id = ? ORDER BY chunk_index", (session_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def record_chunk(self, session_id: str, index: int, sha256: str) -> None:
+        """Mark chunk `index` as received (after its bytes have been written)."""
+        with self._lock:
+            session = self._get(session_id)
+            if session is None or session.status != OPEN:
+                raise SessionStateError(f"Upload session {session_id} is not accepting chunks.")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO upload_chunks (session_id, chunk_index, sha256) VALUES (?, ?, ?)",
+                (session_id, index, sha256),
+            )
+            self._conn.execute("UPDATE upload_sessions SET updated_at = ? WHERE session_id = ?", (time.time(), session_id))
+            self._conn.commit()
+
+    def forget_chunk(self, session_id: str, index: int) -> None:
+        """Mark chunk `index` as missing again (its bytes may have been partly overwritten)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM upload_chunks WHERE session_id = ? AND chunk_index = ?", (session_id, index))
+            self._conn.commit()
+
+    # --- Chunk writers --- #
+
+    def begin_write(self, session_id: str, index: int) -> str:
+        """Register a writer for chunk `index` of an open session, before its data file is opened. Returns its ID."""
+        writer_id = uuid.uuid4().hex
+        with self._lock:
+            session = self._get(session_id)
+            if session is None or session.status != OPEN:
+                raise SessionStateError(f"Upload session {session_id} is not accepting chunks.")
+            self._conn.execute(
+                "INSERT INTO upload_writers (writer_id, session_id, chunk_index, expires_at) VALUES (?, ?, ?, ?)",
+                (writer_id, session_id, index, time.time() + WRITER_LEASE_SECONDS),
+            )
+            self._conn.commit()
+        return writer_id
+
+    def renew_write(self, writer_id: str) -> bool:
+        """
+        Extend a writer's registration before it writes. False if it has lapsed
+        or its session is no longer open; the writer must then stop without writing.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE upload_writers SET expires_at = ? WHERE writer_id = ? AND expires_at >= ? AND session_id IN "
+                "(SELECT session_id FROM upload_sessions WHERE status = ?)",
+                (now + WRITER_LEASE_SECONDS, writer_id, now, OPEN),
+            )
+            self._conn.commit()
+            return bool(cursor.rowcount)
+
+    def end_write(self, writer_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM upload_writers WHERE writer_id = ?", (writer_id,))
+            self._conn.commit()
+
+    def _set_status(self, session_id: str, status: str, file_id: Optional[str] = None) -> None:
+        self._conn.execute(
+            "UPDATE upload_sessions SET status = ?, file_id = ?, updated_at = ? WHERE session_id = ?",
+            (status, file_id, time.time(), session_id),
+        )
+        self._conn.commit()
+
+    def begin_finalize(self, session_id: str) -> UploadSession:
+        """
+        Move an open session with every chunk received and no chunk being
+        written to `finalizing`, so no chunk can change under the hash.
+        """
+        with self._lock:
+            session = self._get(session_id)
+            if session is None:
+                raise KeyError(session_id)
+            if session.status != OPEN:
+                raise SessionStateError(f"Upload session {session_id} is already {session.status}.")
+            # Lapsed writers renew before every write, so they will never write again
+            self._conn.execute(
+                "DELETE FROM upload_writers WHERE session_id = ? AND expires_at < ?", (session_id, time.time())
+            )
+            writing = self._conn.execute(
+                "SELECT COUNT(*) FROM upload_writers WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            if writing:
+                self._conn.commit()
+                raise SessionStateError(f"Upload session {session_id} has {writing} chunk(s) still being written.")
+            missing = session.chunk_count - len(self._received(session_id))
+            if missing:
+                raise SessionStateError(f"Upload session {session_id} is missing {missing} chunk(s).")
+            self._set_status(session_id, FINALIZING)
+            return self._get(session_id)
+
+    def reopen(self, session_id: str) -> None:
+        """Put a session whose finalization failed back to `open`, keeping its chunks."""
+        with self._lock:
+            self._set_status(session_id, OPEN)
+
+    def mark_completed(self, session_id: str, file_id: str) -> UploadSession:
+        with self._lock:
+            self._conn.execute("DELETE FROM upload_chunks WHERE session_id = ?", (session_id,))
+            self._set_status(session_id, COMPLETED, file_id)
+            return self._get(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        """Abort a session: drop its index rows and data file. Returns False if it did not exist."""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM upload_sessions WHERE session_id = ?", (session_id,)).rowcount
+            self._conn.execute("DELETE FROM upload_chunks WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM upload_writers WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+        _remove_quietly(self.data_path(session_id))
+        return bool(deleted)
+
+    def sweep(self, ttl_seconds: int) -> int:
+        """Remove sessions (and their data files) not updated for `ttl_seconds`. Returns how many."""
+        if not ttl_seconds:
+            return 0
+        cutoff = time.time() - ttl_seconds
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT session_id FROM upload_sessions WHERE updated_at < ? AND status != ?", (cutoff, FINALIZING)
+            )]
+        for session_id in expired:
+            self.delete(session_id)
+        return len(expired)
+
+
+# --- Chunk transfer and completion --- #
+
+async def write_chunk(
+    sessions: UploadSessionStore,
+    session: UploadSession,
+    index: int,
+    body: AsyncIterator[bytes],
+    buffer_size: int,
+    expected_sha256: Optional[str] = None,
+) -> str:
+    """
+    Write chunk `index` of `session` from the request `body` in place.
+
+    Incoming data is buffered up to `buffer_size` and written with `os.pwrite`
+    at the chunk's offset, so concurrent chunks of the same session write to
+    disjoint ranges of the preallocated file. The chunk is only recorded as
+    received once all of its bytes are on disk (and match `expected_sha256`,
+    if given). The write is registered with `sessions` for its whole duration
+    (see `UploadSessionStore.begin_write`); raises `SessionStateError` if the
+    session stops accepting chunks. Returns the chunk's SHA-256.
+    """
+    start, end = session.chunk_range(index)
+    expected_length = end - start
+    digest = hashlib.sha256()
+    written = 0
+    pending = bytearray()
+
+    async def flush() -> None:
+        nonlocal written
+        if not await asyncio.to_thread(sessions.renew_write, writer_id):
+            raise SessionStateError(f"Upload session {session.session_id} is no longer accepting chunks.")
+        await asyncio.to_thread(os.pwrite, fd, bytes(pending), start + written)
+        written += len(pending)
+        pending.clear()
+
+    with stage_timer("upload_chunk"):
+        writer_id = await asyncio.to_thread(sessions.begin_write, session.session_id, index)
+        try:
+            fd = await asyncio.to_thread(os.open, sessions.data_path(session.session_id), os.O_WRONLY)
+            try:
+                async for piece in body:
+                    if written + len(pending) + len(piece) > expected_length:
+                        raise ChunkError(f"Chunk {index} must be {expected_length} bytes.")
+                    digest.update(piece)
+                    pending += piece
+                    if len(pending) >= buffer_size:
+                        await flush()
+                if pending:
+                    await flush()
+                if written != expected_length:
+                    raise ChunkError(f"Chunk {index} must be {expected_length} bytes, received {written}.")
+                chunk_sha256 = digest.hexdigest()
+                if expected_sha256 and expected_sha256.lower() != chunk_sha256:
+                    raise ChecksumMismatchError(f"Chunk {index} does not match its declared SHA-256.")
+            except BaseException:
+                # A failed re-send may have overwritten part of a chunk received earlier
+                await asyncio.to_thread(sessions.forget_chunk, session.session_id, index)
+                raise
+            finally:
+                await asyncio.to_thread(os.close, fd)
+            await asyncio.to_thread(sessions.record_chunk, session.session_id, index, chunk_sha256)
+        finally:
+            await asyncio.to_thread(sessions.end_write, writer_id)
+    return chunk_sha256
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize_session(sessions: UploadSessionStore, store: BlobStore, session_id: str) -> Tuple[BlobRecord, bool]:
+    """
+    Verify a fully received session against its declared SHA-256 and move the
+    file into the blob store. Returns (record, created) like `BlobStore.ingest`.
+    Blocking; call it from a worker thread.
+    """
+    session = sessions.begin_finalize(session_id)
+    path = sessions.data_path(session_id)
+    try:
+        with stage_timer("upload_finalize"):
+            actual = _hash_file(path)
+            if actual != session.sha256:
+                raise ChecksumMismatchError(
+                    f"Uploaded data has SHA-256 {actual}, but the session declared {session.sha256}."
+                )
+            record, created = store.ingest(
+                path, session.sha256, session.size_bytes, Path(session.filename).suffix, session.content_type
+            )
+    except BaseException:
+        # Keep the received chunks: the client can re-send the bad ones and complete again
+        sessions.reopen(session_id)
+        raise
+    sessions.mark_completed(session_id, record.file_id)
+    return record, created
+
+
+_stores: Dict[Path, UploadSessionStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_upload_sessions(root: Optional[Path] = None) -> UploadSessionStore:
+    """Return the shared session store (defaults to UPLOAD_DIR/sessions, read at runtime)."""
+    root = Path(root or get_upload_dir() / "sessions").resolve()
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None or not store.index_path.exists():
+            if store is not None:
+                store.close()
+            store = UploadSessionStore(root)
+            _stores[root] = store
+        return store
+
+
+async def run_upload_session_sweeper() -> None:
+    """Background task: periodically remove abandoned upload sessions."""
+    while True:
+        await asyncio.sleep(get_blob_sweep_interval_seconds())
+        try:
+            removed = await asyncio.to_thread(get_upload_sessions().sweep, get_upload_session_ttl_seconds())
+            if removed:
+                logger.info(f"Removed {removed} expired upload session(s)")
+        except Exception as e:
+            logger.error(f"Upload session sweep failed: {e}")
@@ -0,0 +1,523 @@
+# backend/app/core/webhooks.py
+"""
+Outbound webhook delivery for job-completion events.
+
+When an async job submitted with `webhook: {"mode": "direct", "url": ...}`
+finishes, an event is written to a SQLite outbox (`WebhookStore`) and
+delivered by the `WebhookDispatcher`:
+
+- one shared `httpx.AsyncClient` (connection pool of WEBHOOK_MAX_CONNECTIONS)
+  for every endpoint, with at most `max_concurrency` requests in flight per
+  endpoint;
+- each request is signed with HMAC-SHA256 over "{timestamp}.{body}" and
+  carries `X-DocuParse-Signature: t=...,v1=...`;
+- failures (network errors, 408, 429 and 5xx) are retried with exponential
+  backoff and full jitter, honouring Retry-After. Other 4xx responses and
+  exhausted retries move the event to the dead-letter table;
+- endpoints configured with `batch` get the events of a short window in one
+  POST as `{"events": [...]}`.
+
+Events are enqueued from a job-finished listener that runs in its own task,
+and delivery runs on the dispatcher's tasks, so job workers never wait on a
+receiver. The job engine keeps a job's notification pending until the
+listener has run, so an outcome committed just before a crash or stop is
+still enqueued on the next start. The outbox survives restarts; delivery is
+at least once, and every event carries a `delivery_id` receivers can
+deduplicate on (`whd-{job_id}` for job events, so a listener that runs twice
+for a job enqueues the same delivery).
+
+Processes sharing the outbox (uvicorn workers) each run a dispatcher; a
+dispatcher reserves deliveries (`WebhookStore.claim`) before sending them, so
+each attempt is made by one process. A reservation left by a process that
+died expires after CLAIM_SECONDS and the event is picked up again.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import secrets
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+
+from .config import (
+    get_webhooks_db_path, get_webhook_secret, get_webhook_timeout_seconds, get_webhook_max_attempts,
+    get_webhook_backoff_base_seconds, get_webhook_backoff_max_seconds, get_webhook_max_connections,
+    get_webhook_endpoint_concurrency, get_webhook_batch_window_seconds,
+)
+from .jobs import Job, SUCCEEDED, on_job_finished
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-DocuParse-Signature"
+DELIVERY_HEADER = "X-DocuParse-Delivery"
+EVENT_HEADER = "X-DocuParse-Event"
+# Status codes worth retrying; any other non-2xx response is final
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+# Minimum time a dispatcher reserves a delivery for while sending it
+CLAIM_SECONDS = 30.0
+
+
+def sign_payload(secret: str, timestamp: int, body: bytes) -> str:
+    """Signature header value for `body` sent at `timestamp`."""
+    digest = hmac.new(secret.encode("utf-8"), f"{timestamp}.".encode("ascii") + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def verify_signature(secret: str, header: str, body: bytes, tolerance_seconds: Optional[float] = 300) -> bool:
+    """Check a signature header (for receivers, and the stand-in /callback route)."""
+    try:
+        parts = dict(item.split("=", 1) for item in header.split(","))
+        timestamp = int(parts["t"])
+    except (KeyError, ValueError):
+        return False
+    if tolerance_seconds is not None and abs(time.time() - timestamp) > tolerance_seconds:
+        return False
+    return hmac.compare_digest(sign_payload(secret, timestamp, body), f"t={timestamp},v1={parts.get('v1', '')}")
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2 ** (attempt - 1))]."""
+    return random.uniform(0, min(cap, base * 2 ** max(attempt - 1, 0)))
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class Delivery:
+    """A pending event in the outbox."""
+    delivery_id: str
+    url: str
+    event: Dict[str, Any]
+    attempts: int
+    next_attempt_at: float
+    created_at: float
+
+
+@dataclass
+class EndpointSettings:
+    url: str
+    secret: Optional[str]
+    batch: bool
+    max_batch_size: int
+    max_concurrency: int
+
+
+class WebhookStore:
+    """SQLite outbox, endpoint settings and dead letters. Blocking; call from a thread."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS webhook_outbox (
+                delivery_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                event TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS webhook_outbox_due ON webhook_outbox (next_attempt_at);
+            CREATE TABLE IF NOT EXISTS webhook_dead_letters (
+                delivery_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                event TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                failed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS webhook_endpoints (
+                url TEXT PRIMARY KEY,
+                secret TEXT,
+                batch INTEGER NOT NULL DEFAULT 0,
+                max_batch_size INTEGER NOT NULL DEFAULT 50,
+                max_concurrency INTEGER,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- Outbox --- #
+
+    def enqueue(
+        self, url: str, event: Dict[str, Any], available_at: Optional[float] = None, delivery_id: Optional[str] = None,
+    ) -> str:
+        """Queue a delivery; enqueueing a `delivery_id` that is still pending is a no-op."""
+        delivery_id = delivery_id or f"whd-{uuid.uuid4().hex}"
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO webhook_outbox (delivery_id, url, event, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (delivery_id, url, json.dumps({**event, "delivery_id": delivery_id}), available_at or now, now),
+            )
+            self._conn.commit()
+        return delivery_id
+
+    def due(self, now: float, limit: int = 500) -> List[Delivery]:
+        """Pending deliveries whose next attempt is due, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT delivery_id, url, event, attempts, next_attempt_at, created_at FROM webhook_outbox "
+                "WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+        return [Delivery(row[0], row[1], json.loads(row[2]), *row[3:]) for row in rows]
+
+    def claim(self, deliveries: List[Delivery], until: float) -> List[Delivery]:
+        """
+        Reserve due deliveries for this process until `until`. Deliveries another
+        process reserved or finished since they were read are left out.
+        """
+        claimed = []
+        with self._lock:
+            for delivery in deliveries:
+                cursor = self._conn.execute(
+                    "UPDATE webhook_outbox SET next_attempt_at = ? WHERE delivery_id = ? AND next_attempt_at = ?",
+                    (until, delivery.delivery_id, delivery.next_attempt_at),
+                )
+                if cursor.rowcount:
+                    claimed.append(delivery)
+            self._conn.commit()
+        return claimed
+
+    def next_due_after(self, now: float) -> Optional[float]:
+        """Earliest attempt time after `now` (deliveries already due are in flight or waiting for a free slot)."""
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(next_attempt_at) FROM webhook_outbox WHERE next_attempt_at > ?", (now,)).fetchone()
+        return row[0]
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM webhook_outbox").fetchone()[0]
+
+    def mark_delivered(self, delivery_ids: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM webhook_outbox WHERE delivery_id = ?", [(d,) for d in delivery_ids])
+            self._conn.commit()
+
+    def reschedule(self, delivery_ids: List[str], error: str, next_attempt_at: float) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE webhook_outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = ? WHERE delivery_id = ?",
+                [(error, next_attempt_at, d) for d in delivery_ids],
+            )
+            self._conn.commit()
+
+    def dead_letter(self, delivery_ids: List[str], error: str) -> None:
+        """Move deliveries from the outbox to the dead-letter table."""
+        now = time.time()
+        with self._lock:
+            for delivery_id in delivery_ids:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO webhook_dead_letters "
+                    "(delivery_id, url, event, attempts, last_error, created_at, failed_at) "
+                    "SELECT delivery_id, url, event, attempts + 1, ?, created_at, ? FROM webhook_outbox WHERE delivery_id = ?",
+                    (error, now, delivery_id),
+                )
+                self._conn.execute("DELETE FROM webhook_outbox WHERE delivery_id = ?", (delivery_id,))
+            self._conn.commit()
+
+    # --- Dead letters --- #
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT delivery_id, url, event, attempts, last_error, created_at, failed_at "
+                "FROM webhook_dead_letters ORDER BY failed_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        keys = ("delivery_id", "url", "event", "attempts", "last_error", "created_at", "failed_at")
+        return [{**dict(zip(keys, row)), "event": json.loads(row[2])} for row in rows]
+
+    def retry_dead_letter(self, delivery_id: str) -> bool:
+        """Move a dead letter back to the outbox with a fresh attempt budget."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO webhook_outbox (delivery_id, url, event, attempts, next_attempt_at, created_at) "
+                "SELECT delivery_id, url, event, 0, ?, created_at FROM webhook_dead_letters WHERE delivery_id = ?",
+                (time.time(), delivery_id),
+            )
+            self._conn.execute("DELETE FROM webhook_dead_letters WHERE delivery_id = ?", (delivery_id,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    # --- Endpoints --- #
+
+    def upsert_endpoint(self, url: str, secret: Optional[str], batch: bool, max_batch_size: int, max_concurrency: Optional[int]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO webhook_endpoints (url, secret, batch, max_batch_size, max_concurrency, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, secret, int(batch), max_batch_size, max_concurrency, time.time()),
+            )
+            self._conn.commit()
+
+    def endpoint(self, url: str) -> EndpointSettings:
+        """Settings for `url`, with defaults for endpoints that were never configured."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT secret, batch, max_batch_size, max_concurrency FROM webhook_endpoints WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return EndpointSettings(url, get_webhook_secret() or None, False, 1, get_webhook_endpoint_concurrency())
+        secret, batch, max_batch_size, max_concurrency = row
+        return EndpointSettings(
+            url, secret or get_webhook_secret() or None, bool(batch), max_batch_size,
+            max_concurrency or get_webhook_endpoint_concurrency(),
+        )
+
+
+def job_event(job: Job, metadata: Any = None) -> Dict[str, Any]:
+    """The event body sent when `job` finishes (the result itself is fetched from /api/v1/jobs)."""
+    event = {
+        "event": f"job.{job.status}",
+        "job_id": job.job_id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "finished_at": job.finished_at,
+        "metadata": metadata,
+    }
+    if job.status != SUCCEEDED:
+        event["error"] = job.error
+    return event
+
+
+class WebhookDispatcher:
+    """Delivers outbox events over a shared connection pool with per-endpoint limits."""
+
+    def __init__(self, store: WebhookStore, poll_interval: float = 1.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._in_flight: Set[str] = set()
+        self._in_flight_by_url: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._endpoints: Dict[str, EndpointSettings] = {}
+
+    async def start(self) -> None:
+        self._client = httpx.AsyncClient(
+            transport=self._transport,
+            timeout=get_webhook_timeout_seconds(),
+            limits=httpx.Limits(max_connections=get_webhook_max_connections(), max_keepalive_connections=min(get_webhook_max_connections(), 20)),
+            follow_redirects=False,
+        )
+        self._wake = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self) -> None:
+        """Stop delivering. Events still in the outbox are delivered after the next start."""
+        tasks = list(self._tasks)
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    def forget_endpoint(self, url: str) -> None:
+        """Drop cached settings for `url` (after /configure)."""
+        self._endpoints.pop(url, None)
+
+    async def enqueue(self, url: str, event: Dict[str, Any], delivery_id: Optional[str] = None) -> str:
+        endpoint = await self._endpoint(url)
+        available_at = time.time() + (get_webhook_batch_window_seconds() if endpoint.batch else 0)
+        delivery_id = await asyncio.to_thread(self.store.enqueue, url, event, available_at, delivery_id)
+        self.notify()
+        return delivery_id
+
+    async def _endpoint(self, url: str) -> EndpointSettings:
+        endpoint = self._endpoints.get(url)
+        if endpoint is None:
+            endpoint = self._endpoints[url] = await asyncio.to_thread(self.store.endpoint, url)
+        return endpoint
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                await self._dispatch_due()
+                next_due = await asyncio.to_thread(self.store.next_due_after, time.time())
+            except Exception as e:
+                logger.error(f"Webhook dispatch failed: {e}")
+                next_due = None
+            timeout = self.poll_interval if next_due is None else min(max(next_due - time.time(), 0.01), self.poll_interval)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch_due(self) -> None:
+        # Look one batch window ahead, so a batching endpoint whose oldest event is
+        # due also gets the events queued after it
+        now = time.time()
+        due = await asyncio.to_thread(self.store.due, now + get_webhook_batch_window_seconds())
+        by_url: Dict[str, List[Delivery]] = {}
+        for delivery in due:
+            if delivery.delivery_id not in self._in_flight:
+                by_url.setdefault(delivery.url, []).append(delivery)
+
+        for url, deliveries in by_url.items():
+            endpoint = await self._endpoint(url)
+            if not endpoint.batch:
+                deliveries = [d for d in deliveries if d.next_attempt_at <= now]
+            elif deliveries[0].next_attempt_at > now:
+                continue
+            size = endpoint.max_batch_size if endpoint.batch else 1
+            while deliveries and self._in_flight_by_url.get(url, 0) < endpoint.max_concurrency:
+                unit, deliveries = deliveries[:size], deliveries[size:]
+                self._in_flight.update(d.delivery_id for d in unit)
+                self._in_flight_by_url[url] = self._in_flight_by_url.get(url, 0) + 1
+                task = asyncio.create_task(self._deliver(endpoint, unit))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, endpoint: EndpointSettings, unit: List[Delivery]) -> None:
+        in_flight = [d.delivery_id for d in unit]
+        try:
+            until = time.time() + max(CLAIM_SECONDS, 2 * get_webhook_timeout_seconds())
+            unit = await asyncio.to_thread(self.store.claim, unit, until)
+            if not unit:
+                return
+            ids = [d.delivery_id for d in unit]
+            error, retry_after = await self._post(endpoint, unit)
+            if error is None:
+                await asyncio.to_thread(self.store.mark_delivered, ids)
+                return
+            attempts = max(d.attempts for d in unit) + 1
+            if retry_after is False or attempts >= get_webhook_max_attempts():
+                logger.warning(f"Webhook delivery to {endpoint.url} dead-lettered after {attempts} attempt(s): {error}")
+                await asyncio.to_thread(self.store.dead_letter, ids, error)
+                return
+            delay = backoff_delay(attempts, get_webhook_backoff_base_seconds(), get_webhook_backoff_max_seconds())
+            if retry_after:
+                delay = max(delay, min(retry_after, get_webhook_backoff_max_seconds()))
+            logger.info(f"Webhook delivery to {endpoint.url} failed ({error}); retrying in {delay:.1f}s")
+            await asyncio.to_thread(self.store.reschedule, ids, error, time.time() + delay)
+        except Exception as e:
+            logger.error(f"Webhook delivery bookkeeping failed for {in_flight}: {e}")
+        finally:
+            self._in_flight.difference_update(in_flight)
+            self._in_flight_by_url[endpoint.url] -= 1
+            self.notify()
+
+    async def _post(self, endpoint: EndpointSettings, unit: List[Delivery]):
+        """
+        Send one request. Returns (None, None) on success, or (error, retry)
+        where retry is False for final failures and otherwise an optional
+        Retry-After delay.
+        """
+        if endpoint.batch:
+            body = dumps({"events": [d.event for d in unit]})
+            event_name = "batch"
+        else:
+            body = dumps(unit[0].event)
+            event_name = unit[0].event.get("event", "")
+        headers = {
+            "Content-Type": "application/json",
+            DELIVERY_HEADER: ",".join(d.delivery_id for d in unit),
+            EVENT_HEADER: event_name,
+        }
+        if endpoint.secret:
+            headers[SIGNATURE_HEADER] = sign_payload(endpoint.secret, int(time.time()), body)
+        try:
+            response = await self._client.post(endpoint.url, content=body, headers=headers)
+        except httpx.HTTPError as e:
+            return f"{type(e).__name__}: {e}", None
+        if 200 <= response.status_code < 300:
+            return None, None
+        error = f"HTTP {response.status_code}"
+        if response.status_code in RETRYABLE_STATUS:
+            return error, _retry_after(response)
+        return error, False
+
+
+# --- Process-wide dispatcher --- #
+
+_dispatcher: Optional[WebhookDispatcher] = None
+
+
+def get_webhook_dispatcher() -> WebhookDispatcher:
+    """Return the process-wide dispatcher, creating it (not started) on first use."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = WebhookDispatcher(WebhookStore(get_webhooks_db_path()))
+    return _dispatcher
+
+
+async def start_webhook_dispatcher() -> WebhookDispatcher:
+    dispatcher = get_webhook_dispatcher()
+    await dispatcher.start()
+    return dispatcher
+
+
+async def stop_webhook_dispatcher() -> None:
+    global _dispatcher
+    dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        await dispatcher.stop()
+        dispatcher.store.close()
+
+
+def configure_endpoint(url: str, secret: Optional[str], batch: bool, max_batch_size: int, max_concurrency: Optional[int]) -> str:
+    """Store delivery settings for `url` and return its signing secret (generated if not given). Blocking."""
+    secret = secret or f"whsec_{secrets.token_urlsafe(24)}"
+    dispatcher = get_webhook_dispatcher()
+    dispatcher.store.upsert_endpoint(url, secret, batch, max_batch_size, max_concurrency)
+    dispatcher.forget_endpoint(url)
+    return secret
+
+
+@on_job_finished
+async def _enqueue_job_event(job: Job) -> None:
+    """Job-finished listener: queue the event for jobs submitted with a direct webhook."""
+    webhook = job.payload.get("webhook") or {}
+    if webhook.get("mode", "direct") != "direct" or not webhook.get("url"):
+        return
+    await get_webhook_dispatcher().enqueue(
+        webhook["url"], job_event(job, webhook.get("metadata")), delivery_id=f"whd-{job.job_id}"
+    )
@@ -1,15 +1,88 @@
 # backend/app/main.py
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 # Import the central v1 router
 from .api.v1.routes import api_v1_router
+from .core.blob_store import run_blob_sweeper
+from .core.result_store import run_result_sweeper
+from .core.upload_sessions import run_upload_session_sweeper
+from .core.search_queue import run_search_indexer, flush_pending
+from .core.parser import shutdown_process_pool
+from .core.ocr import shutdown_ocr_pool
+from .core.jobs import start_job_engine, stop_job_engine
+from .core.webhooks import start_webhook_dispatcher, stop_webhook_dispatcher
+from .core.metrics import MetricsMiddleware, render_metrics
+from .core.storage import UploadLimitMiddleware
+from .core.serialization import FastJSONResponse
+from .core.startup import get_startup_state, mark_started, mark_stopped, record_import_time, start_prewarm
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Start background maintenance tasks
+    sweepers = [
+        asyncio.create_task(run_blob_sweeper()),
+        asyncio.create_task(run_result_sweeper()),
+        asyncio.create_task(run_upload_session_sweeper()),
+    ]
+    indexer = asyncio.create_task(run_search_indexer())
+    await start_webhook_dispatcher()
+    await start_job_engine()
+    mark_started(time.perf_counter() - started)
+    # Warm the parser pool, stores and engines without delaying the first request
+    prewarm = start_prewarm()
+    yield
+    if prewarm is not None:
+        prewarm.cancel()
+        with suppress(asyncio.CancelledError):
+            await prewarm
+    mark_stopped()
+    await stop_job_engine()
+    await stop_webhook_dispatcher()
+    for sweeper in sweepers:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
+    indexer.cancel()
+    with suppress(asyncio.CancelledError):
+        await indexer
+    # Pages parsed since the last flush stay searchable after a restart
+    await flush_pending()
+    shutdown_process_pool()
+    shutdown_ocr_pool()
 
-app = FastAPI(title="DocuParse Backend - Reducto API Mirror")
+app = FastAPI(title="DocuParse Backend - Reducto API Mirror", lifespan=lifespan)
+# Bounds multipart bodies while they are received, before endpoints see an UploadFile
+app.add_middleware(UploadLimitMiddleware)
+# Times every request by route template (outermost, so rejected uploads are counted too);
+# per-stage timers live in the core modules
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 def read_root():
+    # Liveness: answers as soon as the process serves requests
     return {"message": "DocuParse Backend (Reducto Mirror) is running"}
 
+@app.get("/ready", include_in_schema=False)
+def readiness():
+    """Readiness: 503 until startup (and the background pre-warm) has finished, with per-phase timings."""
+    state = get_startup_state()
+    return FastJSONResponse(state.to_status(), status_code=200 if state.ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Include the main v1 router
 # All routes defined in routes.py (which includes routes from endpoint files)
 # will be available under the /api/v1 prefix
-app.include_router(api_v1_router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(api_v1_router, prefix="/api/v1")
+
+record_import_time(time.perf_counter() - _IMPORT_STARTED)
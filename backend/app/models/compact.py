@@ -0,0 +1,119 @@
+# backend/app/models/compact.py
+"""
+Compact internal representation of parsed pages.
+
+The parser builds these slotted records instead of the Pydantic models in
+`document.py`: they are cheap to create and to pickle back from the worker
+processes, and they skip validation of data we produced ourselves. Table cells
+are stored row-major in one flat list with repeated values interned, so a
+table is one list instead of one list per row and repeated cells ("", "0",
+"N/A", ...) share a single string object.
+
+Records serialize to the public `Page` / `Table` / `Figure` JSON shape via
+`to_dict`; they are only converted at the response boundary
+(see `app/core/serialization.py`).
+"""
+import sys
+from itertools import chain
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class TableRecord:
+    """A table as a flat, row-major list of cells."""
+    __slots__ = ("bbox", "n_rows", "n_cols", "cells", "page_number")
+
+    def __init__(self, bbox: Optional[List[float]], n_rows: int, n_cols: int, cells: List[Optional[str]], page_number: int):
+        self.bbox = bbox
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.cells = cells
+        self.page_number = page_number
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]], bbox: Optional[List[float]], page_number: int) -> "TableRecord":
+        """Build a record from a list of rows; short rows are padded with None."""
+        n_cols = max((len(row) for row in rows), default=0)
+        if any(len(row) != n_cols for row in rows):
+            rows = [list(row) + [None] * (n_cols - len(row)) for row in rows]
+        intern = sys.intern
+        cells = [
+            intern(value) if value.__class__ is str else (None if value is None else intern(str(value)))
+            for value in chain.from_iterable(rows)
+        ]
+        return cls(bbox, len(rows), n_cols, cells, page_number)
+
+    def rows(self) -> List[Tuple[Optional[str], ...]]:
+        if self.n_cols == 0:
+            return [()] * self.n_rows
+        # zip over one shared iterator chunks the flat list in C
+        return list(zip(*[iter(self.cells)] * self.n_cols))
+
+    def column(self, index: int) -> List[Optional[str]]:
+        return self.cells[index::self.n_cols]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"bbox": self.bbox, "data": self.rows(), "page_number": self.page_number}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TableRecord":
+        return cls.from_rows(data["data"], data["bbox"], data["page_number"])
+
+
+class FigureRecord:
+    """A figure's bounding box and optional caption."""
+    __slots__ = ("bbox", "caption", "page_number")
+
+    def __init__(self, bbox: Optional[List[float]], caption: Optional[str], page_number: int):
+        self.bbox = bbox
+        self.caption = caption
+        self.page_number = page_number
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"bbox": self.bbox, "caption": self.caption, "page_number": self.page_number}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FigureRecord":
+        return cls(data["bbox"], data["caption"], data["page_number"])
+
+
+class PageRecord:
+    """Content extracted from one page; mirrors the public `Page` model."""
+    __slots__ = ("page_number", "text", "tables", "figures", "metadata")
+
+    def __init__(
+        self,
+        page_number: int,
+        text: str,
+        tables: Optional[List[TableRecord]] = None,
+        figures: Optional[List[FigureRecord]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        self.page_number = page_number
+        self.text = text
+        self.tables = tables if tables is not None else []
+        self.figures = figures if figures is not None else []
+        self.metadata = metadata if metadata is not None else {}
+
+    @property
+    def failed(self) -> bool:
+        return "error" in self.metadata
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "page_number": self.page_number,
+            "text": self.text,
+            "tables": [table.to_dict() for table in self.tables],
+            "figures": [figure.to_dict() for figure in self.figures],
+            "metadata": self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PageRecord":
+        """Rebuild a record from its `to_dict` form (e.g. a cached page)."""
+        return cls(
+            data["page_number"],
+            data["text"],
+            [TableRecord.from_dict(table) for table in data["tables"]],
+            [FigureRecord.from_dict(figure) for figure in data["figures"]],
+            dict(data["metadata"]),
+        )
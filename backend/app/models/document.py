@@ -1 +1,33 @@
- 
\ No newline at end of file
+# backend/app/models/document.py
+"""Pydantic models describing parsed document content."""
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
+
+class Table(BaseModel):
+    """Represents a table extracted from a page."""
+    bbox: Optional[List[float]] = Field(None, description="Bounding box of the table [x1, y1, x2, y2].")
+    data: List[List[Optional[str]]] = Field(..., description="Table data as a list of lists.")
+    page_number: int = Field(..., description="Page number where the table was found.")
+
+class Figure(BaseModel):
+    """Represents a figure/image extracted from a page."""
+    bbox: Optional[List[float]] = Field(None, description="Bounding box of the figure [x1, y1, x2, y2].")
+    caption: Optional[str] = Field(None, description="Caption associated with the figure.")
+    page_number: int = Field(..., description="Page number where the figure was found.")
+    # In a real scenario, might include image data (e.g., base64) or a link
+
+class Page(BaseModel):
+    """Represents content extracted from a single page."""
+    page_number: int = Field(..., description="The 1-based page number.")
+    text: str = Field(..., description="Extracted text content of the page.")
+    tables: List[Table] = Field(default_factory=list, description="List of tables extracted from the page.")
+    figures: List[Figure] = Field(default_factory=list, description="List of figures/images extracted from the page.")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Page-specific metadata.")
+
+class DocumentMetadata(BaseModel):
+    """Represents metadata for the entire document."""
+    author: Optional[str] = Field(None, description="Document author.")
+    creation_date: Optional[str] = Field(None, description="Document creation date.")
+    modification_date: Optional[str] = Field(None, description="Document modification date.")
+    title: Optional[str] = Field(None, description="Document title.")
+    # Add other relevant metadata fields as needed
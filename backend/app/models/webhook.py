@@ -0,0 +1,52 @@
+# backend/app/models/webhook.py
+"""Pydantic models for webhook configuration."""
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Any, List, Optional
+
+WEBHOOK_MODES = ("direct", "svix", "disabled")
+
+
+def _check_url(url: Optional[str]) -> Optional[str]:
+    if url is not None and not url.startswith(("http://", "https://")):
+        raise ValueError("Webhook URLs must start with http:// or https://.")
+    return url
+
+
+class WebhookConfig(BaseModel):
+    """The `webhook` option of async requests: where to send the job-completion event."""
+    mode: str = Field("direct", description="'direct' POSTs the event to `url`; 'svix' and 'disabled' send nothing from this server.")
+    url: Optional[str] = Field(None, description="Endpoint receiving the event (required for 'direct').")
+    metadata: Optional[Any] = Field(None, description="Echoed back unchanged in the event.")
+    channels: List[str] = Field(default_factory=list, description="Svix channels (unused in 'direct' mode).")
+
+    @field_validator("mode")
+    @classmethod
+    def _check_mode(cls, mode: str) -> str:
+        if mode not in WEBHOOK_MODES:
+            raise ValueError(f"Invalid webhook mode '{mode}'. Expected one of: {', '.join(WEBHOOK_MODES)}.")
+        return mode
+
+    @field_validator("url")
+    @classmethod
+    def _check_url(cls, url: Optional[str]) -> Optional[str]:
+        return _check_url(url)
+
+    @model_validator(mode="after")
+    def _direct_needs_url(self) -> "WebhookConfig":
+        if self.mode == "direct" and not self.url:
+            raise ValueError("A 'direct' webhook needs a url.")
+        return self
+
+
+class WebhookEndpoint(BaseModel):
+    """Delivery settings for one receiving URL, set with /api/v1/webhooks/configure."""
+    url: str = Field(..., description="The receiving URL these settings apply to.")
+    secret: Optional[str] = Field(None, description="HMAC-SHA256 signing secret. Generated when omitted.")
+    batch: bool = Field(False, description="Send several events per POST as {\"events\": [...]}.")
+    max_batch_size: int = Field(50, ge=1, le=1000, description="Most events in one batched POST.")
+    max_concurrency: Optional[int] = Field(None, ge=1, le=64, description="Concurrent requests to this URL (default WEBHOOK_ENDPOINT_CONCURRENCY).")
+
+    @field_validator("url")
+    @classmethod
+    def _check_url(cls, url: str) -> str:
+        return _check_url(url)
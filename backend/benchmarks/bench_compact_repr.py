@@ -0,0 +1,143 @@
+# backend/benchmarks/bench_compact_repr.py
+"""
+Compare the old page pipeline (plain dicts from the workers, validated into
+Pydantic `Page` models in the API process and dumped with `model_dump_json`)
+with the compact records (built in the workers, encoded with orjson) on a
+table-heavy document.
+
+Reported per pipeline:
+- worker:   building the per-page results from `find_tables`-style rows
+- transfer: pickled size and pickle round-trip time (what the process pool does)
+- api:      time spent in the API process turning worker results into the
+            response body, and the memory held by the pages it keeps
+
+The pages mimic what PyMuPDF's `find_tables` returns (rectangular rows with
+many repeated cells), so the benchmark runs without a PDF or process pool.
+Both pipelines must produce byte-identical JSON.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_compact_repr [--pages 200] [--tables 4] [--rows 60] [--cols 8]
+"""
+import argparse
+import gc
+import pickle
+import random
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import BaseModel
+
+from app.core.serialization import dumps
+from app.models.compact import PageRecord, TableRecord
+from app.models.document import DocumentMetadata, Page
+
+
+class _LegacyResponse(BaseModel):
+    page_count: int
+    pages: List[Page]
+    metadata: DocumentMetadata
+    parsing_mode: str
+    failed_pages: List[int]
+
+
+def _raw_pages(pages: int, tables: int, rows: int, cols: int):
+    """Table rows per page, with a fresh str object per cell as find_tables returns them."""
+    rng = random.Random(0)
+    vocabulary = ["", "0", "N/A", "Yes", "No", "Total", "USD", "-"]
+    result = []
+    for page_number in range(1, pages + 1):
+        page_tables = []
+        for _ in range(tables):
+            data = [
+                ["".join(list(rng.choice(vocabulary) if rng.random() < 0.7 else f"{rng.random():.4f}")) for _ in range(cols)]
+                for _ in range(rows)
+            ]
+            page_tables.append((data, [10.0, 20.0, 300.0, 400.0]))
+        result.append((page_number, f"Text of page {page_number}", page_tables))
+    return result
+
+
+# --- Old pipeline: dicts in the worker, Pydantic in the API process --- #
+
+def _legacy_worker(raw):
+    return [
+        {
+            "page_number": page_number,
+            "text": text,
+            "tables": [{"bbox": bbox, "data": data, "page_number": page_number} for data, bbox in tables],
+            "figures": [],
+            "metadata": {"rotation": 0},
+        }
+        for page_number, text, tables in raw
+    ]
+
+
+def _legacy_api(page_dicts, metadata):
+    pages = [Page(**page_dict) for page_dict in page_dicts]
+    response = _LegacyResponse(page_count=len(pages), pages=pages, metadata=metadata, parsing_mode="tables", failed_pages=[])
+    return pages, response.model_dump_json().encode("utf-8")
+
+
+# --- Compact pipeline: records in the worker, orjson in the API process --- #
+
+def _compact_worker(raw):
+    return [
+        PageRecord(page_number, text, [TableRecord.from_rows(data, bbox, page_number) for data, bbox in tables], [], {"rotation": 0})
+        for page_number, text, tables in raw
+    ]
+
+
+def _compact_api(pages, metadata):
+    body = dumps({"page_count": len(pages), "pages": pages, "metadata": metadata, "parsing_mode": "tables", "failed_pages": []})
+    return pages, body
+
+
+def _timed(fn, *args):
+    gc.collect()
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def _run(label, worker, api, raw, metadata):
+    worker_result, worker_seconds = _timed(worker, raw)
+    pickled, dump_seconds = _timed(pickle.dumps, worker_result, pickle.HIGHEST_PROTOCOL)
+    received, load_seconds = _timed(pickle.loads, pickled)
+    (_, body), api_seconds = _timed(api, received, metadata)
+
+    # Memory the API process holds for the pages (received objects + anything built from them)
+    del received
+    gc.collect()
+    tracemalloc.start()
+    kept, _ = api(pickle.loads(pickled), metadata)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    print(f"{label:<9} worker {worker_seconds * 1000:7.1f} ms | transfer {len(pickled) / 1e6:5.2f} MB "
+          f"{(dump_seconds + load_seconds) * 1000:6.1f} ms | api {api_seconds * 1000:7.1f} ms, "
+          f"holds {held / 1e6:5.2f} MB | body {len(body) / 1e6:5.2f} MB")
+    return body
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark the compact page representation.")
+    arg_parser.add_argument("--pages", type=int, default=200)
+    arg_parser.add_argument("--tables", type=int, default=4)
+    arg_parser.add_argument("--rows", type=int, default=60)
+    arg_parser.add_argument("--cols", type=int, default=8)
+    args = arg_parser.parse_args()
+
+    raw = _raw_pages(args.pages, args.tables, args.rows, args.cols)
+    metadata = DocumentMetadata(title="bench")
+    print(f"{args.pages} pages x {args.tables} tables x {args.rows}x{args.cols} cells")
+
+    legacy = _run("pydantic", _legacy_worker, _legacy_api, raw, metadata)
+    compact = _run("compact", _compact_worker, _compact_api, raw, metadata)
+    assert legacy == compact, "both pipelines must produce identical JSON"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+# backend/benchmarks/bench_endpoints.py
+"""
+Endpoint benchmark and load test.
+
+Drives the routers in app/api/v1/routes.py in-process: requests go through
+httpx to the ASGI app while the app's lifespan runs, so the job engine,
+parser pool and webhook dispatcher behave as they do in production. Each
+scenario is run for every document size in --pages (generated PDFs of 1 to
+1,000 pages), with --concurrency requests in flight:
+
+- upload       POST /upload
+- parse        POST /parse (multipart, sync)
+- parse_async  POST /parse_async, then poll /jobs/{id} until it finishes
+- parse_batch  POST /parse_batch with --batch-size documents, then poll it
+- split        POST /split on an already-parsed document
+- extract      POST /extract on an already-parsed document
+- jobs         GET /jobs/{id} of a finished parse job
+
+Uploaded payloads get a unique trailing PDF comment, so every request
+stores new content and misses the parse cache (pass --warm to reuse one
+payload and measure cache hits instead). For each scenario and size the
+p50/p95/p99 latency, requests/sec, error count and peak RSS (this process
+plus its parser/OCR worker processes) are reported.
+
+Results can be saved as a JSON baseline and later runs compared against it;
+the run exits with status 1 when a metric regresses by more than
+--tolerance. Baselines are specific to the machine they were recorded on.
+
+Admission control (app/core/admission.py) is turned off unless --admission
+is given: its per-client rate limit would reject the benchmark's own
+requests, and documents near the page budget could not be measured at all.
+With --admission the server's configured limits apply and 429s count as
+errors, to measure backpressure on purpose. Admission settings already in
+the environment are respected either way.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_endpoints [--scenarios parse,split] [--pages 1,10,100,1000]
+        [--requests 20] [--concurrency 4] [--admission] [--save baseline.json] [--baseline baseline.json --tolerance 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+RequestFn = Callable[[int], Awaitable[None]]
+
+WORDS = (
+    "revenue operating income balance sheet assets liabilities equity cash flow statement auditor report "
+    "notes disclosures segment results management discussion risk factors outlook customers contracts"
+).split()
+
+
+# --- Payloads --- #
+
+def _make_pdf(pages: int) -> bytes:
+    """A PDF of `pages` pages with invoice-like lines and a section heading every 10 pages."""
+    import pymupdf
+
+    doc = pymupdf.open()
+    for n in range(pages):
+        page = doc.new_page()
+        lines = [
+            f"Section {n // 10}: {WORDS[(n // 10) % len(WORDS)]} report",
+            f"Invoice number: INV-{n:05d}",
+            "Issue date: 2024-03-05",
+            f"Total amount: {1000 + n:,}.00",
+        ]
+        lines += [" ".join(WORDS[(n + k) % len(WORDS)] for k in range(line, line + 12)) for line in range(20)]
+        page.insert_text((72, 72), "\n".join(lines), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class Payloads:
+    """Generated PDFs of one size, unique per request unless `warm`."""
+
+    def __init__(self, pages: int, warm: bool):
+        self.pages = pages
+        self.base = _make_pdf(pages)
+        self.warm = warm
+        self._counter = 0
+
+    def next(self) -> bytes:
+        if self.warm:
+            return self.base
+        self._counter += 1
+        # Bytes after %%EOF are ignored by readers but change the content hash
+        return self.base + f"\n% request {os.getpid()}-{self._counter}-{time.time_ns()}\n".encode("ascii")
+
+
+def _check(response: httpx.Response) -> httpx.Response:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path} -> {response.status_code}: {response.text[:200]}")
+    return response
+
+
+async def _upload(client: httpx.AsyncClient, data: bytes) -> str:
+    response = _check(await client.post("/api/v1/upload", files={"file": ("bench.pdf", data, "application/pdf")}))
+    return response.json()["file_id"]
+
+
+async def _wait_for_job(client: httpx.AsyncClient, job_id: str, interval: float = 0.01) -> Dict[str, Any]:
+    while True:
+        body = _check(await client.get(f"/api/v1/jobs/{job_id}")).json()
+        if body["status"] == "failed":
+            raise RuntimeError(f"Job {job_id} failed: {body.get('error')}")
+        if body["status"] == "succeeded":
+            return body
+        await asyncio.sleep(interval)
+
+
+# --- Scenarios --- #
+# Each setup function prepares what its requests need and returns the request
+# coroutine factory; only the requests are timed.
+
+async def _setup_upload(client, payloads: Payloads, count: int, args) -> RequestFn:
+    blobs = [payloads.next() for _ in range(count)]
+
+    async def request(n: int) -> None:
+        await _upload(client, blobs[n])
+    return request
+
+
+async def _setup_parse(client, payloads: Payloads, count: int, args) -> RequestFn:
+    blobs = [payloads.next() for _ in range(count)]
+
+    async def request(n: int) -> None:
+        files = {"file": ("bench.pdf", blobs[n], "application/pdf")}
+        _check(await client.post("/api/v1/parse/", files=files, data={"mode": args.mode}))
+    return request
+
+
+async def _setup_parse_async(client, payloads: Payloads, count: int, args) -> RequestFn:
+    file_ids = [await _upload(client, payloads.next()) for _ in range(count)]
+
+    async def request(n: int) -> None:
+        body = {"document_url": file_ids[n], "options": {"mode": args.mode}}
+        job_id = _check(await client.post("/api/v1/parse_async/", json=body)).json()["job_id"]
+        await _wait_for_job(client, job_id)
+    return request
+
+
+async def _setup_parse_batch(client, payloads: Payloads, count: int, args) -> RequestFn:
+    batches = [[await _upload(client, payloads.next()) for _ in range(args.batch_size)] for _ in range(count)]
+
+    async def request(n: int) -> None:
+        body = {"documents": [{"document_url": file_id} for file_id in batches[n]], "options": {"mode": args.mode}}
+        batch_id = _check(await client.post("/api/v1/parse_batch", json=body)).json()["batch_id"]
+        while True:
+            status = _check(await client.get(f"/api/v1/parse_batch/{batch_id}")).json()
+            if status["status"] == "completed":
+                if status["counts"]["failed"]:
+                    raise RuntimeError(f"Batch {batch_id}: {status['counts']['failed']} document(s) failed")
+                return
+            await asyncio.sleep(0.01)
+    return request
+
+
+async def _parsed_document(client, payloads: Payloads, args) -> str:
+    """Upload one document and parse it so split/extract measure their own work, not the first parse."""
+    file_id = await _upload(client, payloads.next())
+    job_id = _check(await client.post("/api/v1/parse_async/", json={"document_url": file_id, "options": {"mode": args.mode}})).json()["job_id"]
+    await _wait_for_job(client, job_id)
+    return f"jobid://{job_id}"
+
+
+async def _setup_split(client, payloads: Payloads, count: int, args) -> RequestFn:
+    document_url = await _parsed_document(client, payloads, args)
+    sections = [{"name": word.title(), "description": f"Pages of the {word} report"} for word in WORDS[:8]]
+
+    async def request(n: int) -> None:
+        _check(await client.post("/api/v1/split/", json={"document_url": document_url, "split_description": sections}))
+    return request
+
+
+async def _setup_extract(client, payloads: Payloads, count: int, args) -> RequestFn:
+    document_url = await _parsed_document(client, payloads, args)
+    schema = {
+        "type": "object",
+        "properties": {
+            "invoice_number": {"type": "string"},
+            "issue_date": {"type": "string", "format": "date"},
+            "total_amount": {"type": "number"},
+        },
+    }
+
+    async def request(n: int) -> None:
+        _check(await client.post("/api/v1/extract/", json={"document_url": document_url, "schema": schema}))
+    return request
+
+
+async def _setup_jobs(client, payloads: Payloads, count: int, args) -> RequestFn:
+    job_id = (await _parsed_document(client, payloads, args)).removeprefix("jobid://")
+
+    async def request(n: int) -> None:
+        _check(await client.get(f"/api/v1/jobs/{job_id}"))
+    return request
+
+
+SCENARIOS: Dict[str, Callable[..., Awaitable[RequestFn]]] = {
+    "upload": _setup_upload,
+    "parse": _setup_parse,
+    "parse_async": _setup_parse_async,
+    "parse_batch": _setup_parse_batch,
+    "split": _setup_split,
+    "extract": _setup_extract,
+    "jobs": _setup_jobs,
+}
+
+
+# --- Measurement --- #
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _descendants(pid: int) -> List[int]:
+    children: List[int] = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        return []
+    return children + [grandchild for child in children for grandchild in _descendants(child)]
+
+
+class RssSampler:
+    """
+    Samples the resident set size of this process and its worker processes.
+    Uses /proc where available; elsewhere falls back to getrusage peaks.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._proc = os.path.exists(f"/proc/{os.getpid()}/status")
+
+    def sample(self) -> int:
+        if self._proc:
+            pid = os.getpid()
+            return _rss_bytes(pid) + sum(_rss_bytes(child) for child in _descendants(pid))
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.sample())
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = self.sample()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.sample())
+
+
+async def _measure(request: RequestFn, count: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def one(n: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await request(n)
+            except Exception as e:
+                errors.append(str(e))
+                return
+            latencies.append(time.perf_counter() - start)
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(count)))
+        elapsed = time.perf_counter() - start
+
+    if errors:
+        print(f"    {len(errors)} error(s), first: {errors[0]}", file=sys.stderr)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if latencies else (float("nan"),) * 3
+    return {
+        "requests": count,
+        "errors": len(errors),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "peak_rss_mb": round(rss.peak / 1024 ** 2, 1),
+    }
+
+
+async def run(args) -> Dict[str, Dict[str, Any]]:
+    """Run every scenario at every size against the app; returns results keyed "scenario@<pages>p"."""
+    from app.main import app
+
+    results: Dict[str, Dict[str, Any]] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for pages in args.pages:
+                payloads = Payloads(pages, args.warm)
+                # Large documents get fewer requests so a run stays within --page-budget pages
+                count = max(min(args.requests, args.page_budget // pages), 2)
+                for name in args.scenarios:
+                    setup = SCENARIOS[name]
+                    request = await setup(client, payloads, count + args.warmup, args)
+                    for n in range(args.warmup):
+                        await request(count + n)
+                    key = f"{name}@{pages}p"
+                    results[key] = await _measure(request, count, args.concurrency)
+                    print(_format_row(key, results[key]), flush=True)
+    return results
+
+
+# --- Baselines --- #
+
+# metric -> True when a higher value is worse
+TRACKED_METRICS = {"p50_ms": True, "p95_ms": True, "p99_ms": True, "rps": False, "peak_rss_mb": True, "errors": True}
+
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    List regressions of `current` against `baseline` results: a metric worse by
+    more than `tolerance` (a fraction). Latency changes smaller than
+    `min_delta_ms` are treated as noise; any new error is a regression.
+    """
+    regressions = []
+    for key, metrics in current.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric, higher_is_worse in TRACKED_METRICS.items():
+            if metric not in reference or metric not in metrics:
+                continue
+            old, new = float(reference[metric]), float(metrics[metric])
+            if metric == "errors":
+                worse = new > old
+            elif metric.endswith("_ms") and abs(new - old) < min_delta_ms:
+                worse = False
+            elif higher_is_worse:
+                worse = new > old * (1 + tolerance)
+            else:
+                worse = new < old * (1 - tolerance)
+            if worse:
+                regressions.append(f"{key} {metric}: {old:g} -> {new:g}")
+    return regressions
+
+
+def _format_row(key: str, metrics: Dict[str, Any]) -> str:
+    return (
+        f"{key:<22} p50 {metrics['p50_ms']:9.1f} ms  p95 {metrics['p95_ms']:9.1f} ms  p99 {metrics['p99_ms']:9.1f} ms  "
+        f"{metrics['rps']:8.2f} req/s  rss {metrics['peak_rss_mb']:7.1f} MB  errors {metrics['errors']}"
+    )
+
+
+def _csv(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark and load-test the API endpoints in-process.")
+    arg_parser.add_argument("--scenarios", type=_csv, default=list(SCENARIOS), help=f"comma-separated, from: {','.join(SCENARIOS)}")
+    arg_parser.add_argument("--pages", type=lambda v: [int(p) for p in _csv(v)], default=[1, 10, 100, 1000], help="document sizes in pages")
+    arg_parser.add_argument("--requests", type=int, default=20, help="timed requests per scenario and size")
+    arg_parser.add_argument("--page-budget", type=int, default=5000, help="cap requests so requests x pages stays under this")
+    arg_parser.add_argument("--concurrency", type=int, default=4)
+    arg_parser.add_argument("--warmup", type=int, default=1, help="untimed requests before each measurement")
+    arg_parser.add_argument("--batch-size", type=int, default=10, help="documents per parse_batch request")
+    arg_parser.add_argument("--mode", default="text_and_tables", help="parse mode used by the parse scenarios")
+    arg_parser.add_argument("--warm", action="store_true", help="reuse one payload per size (measures cache hits)")
+    arg_parser.add_argument("--admission", action="store_true", help="keep the server's rate limit and page budget")
+    arg_parser.add_argument("--save", type=Path, help="write the results to this JSON baseline")
+    arg_parser.add_argument("--baseline", type=Path, help="compare against this JSON baseline; exit 1 on regression")
+    arg_parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (default 0.2)")
+    arg_parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore latency changes smaller than this")
+    args = arg_parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        arg_parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    # Keep uploads, caches and the job database out of the real data directories
+    state_dir = tempfile.TemporaryDirectory(prefix="docuparse-bench-")
+    for name in ("UPLOAD_DIR", "CACHE_DIR", "DATA_DIR"):
+        os.environ.setdefault(name, str(Path(state_dir.name) / name.lower()))
+    if not args.admission:
+        os.environ.setdefault("ADMISSION_CLIENT_RATE", "0")
+        os.environ.setdefault("ADMISSION_MAX_PAGES_IN_FLIGHT", "0")
+
+    results = asyncio.run(run(args))
+    state_dir.cleanup()
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+            "config": {key: value for key, value in vars(args).items() if key not in ("save", "baseline")},
+            "results": results,
+        }
+        args.save.write_text(json.dumps(report, indent=2, default=str))
+        print(f"baseline written to {args.save}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%} of {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# backend/benchmarks/bench_extract.py
+"""
+Benchmark for schema extraction (app/core/extractor.py).
+
+Times the three costs of an extract request separately on a synthetic
+document of PAGES invoice-like pages:
+
+- compiling a schema into a plan, against fetching it from the plan LRU
+  (what repeated requests with the same schema pay);
+- building the document index once;
+- running the plan against the index.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_extract [--pages 500] [--fields 30] [--repeat 20]
+"""
+import argparse
+import statistics
+import time
+from typing import Any, Dict, List
+
+from app.core.extractor import DocumentIndex, PlanCache, compile_plan
+
+
+def _schema(fields: int) -> Dict[str, Any]:
+    properties: Dict[str, Any] = {f"field_{n}_amount": {"type": "number", "description": f"Amount for item {n}"} for n in range(fields)}
+    properties["invoice_number"] = {"type": "string"}
+    properties["issue_date"] = {"type": "string", "format": "date"}
+    properties["line_items"] = {
+        "type": "array",
+        "items": {"type": "object", "properties": {"description": {"type": "string"}, "quantity": {"type": "integer"}, "price": {"type": "number"}}},
+    }
+    return {"type": "object", "properties": properties}
+
+
+def _pages(pages: int, fields: int) -> List[Dict[str, Any]]:
+    result = []
+    for n in range(pages):
+        lines = [f"Invoice number: INV-{n:05d}", "Issue date: 2024-03-05"]
+        lines += [f"Field {k} amount {k * 10 + n:,}.00" for k in range(n % fields, min(n % fields + 5, fields))]
+        lines += ["Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor."] * 20
+        table = [["Description", "Quantity", "Price"]] + [[f"Item {r}", str(r), f"{r * 1.5:.2f}"] for r in range(1, 11)]
+        result.append({"page_number": n + 1, "text": "\n".join(lines), "tables": [{"data": table}]})
+    return result
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark schema extraction.")
+    arg_parser.add_argument("--pages", type=int, default=500)
+    arg_parser.add_argument("--fields", type=int, default=30)
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    schema = _schema(args.fields)
+    pages = _pages(args.pages, args.fields)
+    cache = PlanCache(max_entries=16)
+    plan = cache.get(schema)
+    index = DocumentIndex.from_pages(pages)
+    extracted = plan.run(index)
+    found = sum(value is not None for value in extracted.data.values() if not isinstance(value, list))
+
+    print(f"{args.pages} pages, {args.fields + 3} schema fields; {found} scalar fields and {len(extracted.data['line_items'])} line items found")
+    print(f"compile plan:          {_time(lambda: compile_plan(schema), args.repeat):8.3f} ms")
+    print(f"plan from LRU (hit):   {_time(lambda: cache.get(schema), args.repeat):8.3f} ms")
+    print(f"build document index:  {_time(lambda: DocumentIndex.from_pages(pages), max(args.repeat // 4, 1)):8.3f} ms")
+    print(f"run plan on index:     {_time(lambda: plan.run(index), args.repeat):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
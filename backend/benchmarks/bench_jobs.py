@@ -0,0 +1,153 @@
+# backend/benchmarks/bench_jobs.py
+"""
+Multi-process job throughput benchmark (app/core/jobs.py).
+
+For each worker count N in --processes, --jobs jobs are submitted to a fresh
+job database and N worker processes are started, each running its own
+JobEngine over the shared database with --slots job slots, as
+`uvicorn --workers N` would. Every job burns --work-ms of CPU and then waits
+--io-ms (e.g. for a download or webhook). The clock runs from releasing the
+workers (after their imports) to the last job committing.
+
+Each run checks that every job succeeded exactly once on its first attempt,
+and reports jobs/sec, the speedup over the first worker count and how the
+jobs were spread over the workers. CPU-bound speedup is capped by the cores
+available (printed first); use --work-ms 0 --io-ms 20 to measure the
+coordination overhead of leasing alone.
+
+With --crash, one worker is killed (SIGKILL) once half the jobs are done. Its
+running jobs are re-dispatched by the others after their --lease expires, so
+the run still completes, with those jobs on their second attempt.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_jobs [--jobs 400] [--work-ms 20] [--io-ms 0] [--processes 1,2,4]
+        [--slots 1] [--lease 2] [--crash]
+"""
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import signal
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+from app.core.jobs import SUCCEEDED, JobEngine, JobStore, job_handler
+
+JOB_TYPE = "bench-job"
+
+
+@job_handler(JOB_TYPE)
+async def _bench_job(ctx):
+    deadline = time.process_time() + ctx.payload["work_ms"] / 1000
+    digest = b""
+    while time.process_time() < deadline:
+        digest = hashlib.sha256(digest).digest()
+    if ctx.payload["io_ms"]:
+        await asyncio.sleep(ctx.payload["io_ms"] / 1000)
+    return {"pid": os.getpid()}
+
+
+def _worker(db_path: str, slots: int, lease: float, ready, go, stop) -> None:
+    """One worker process: an engine over the shared database until told to stop."""
+    async def run() -> None:
+        engine = JobEngine(JobStore(Path(db_path), lease_seconds=lease), max_workers=slots, poll_interval=0.01)
+        ready.put(os.getpid())
+        await asyncio.to_thread(go.wait)
+        await engine.start()
+        while not stop.is_set():
+            await asyncio.sleep(0.02)
+        await engine.stop()
+        engine.store.close()
+
+    asyncio.run(run())
+
+
+def _run(processes: int, args: argparse.Namespace, root: Path) -> Dict[str, float]:
+    db_path = root / f"jobs-{processes}.sqlite3"
+    store = JobStore(db_path)
+    payload = {"work_ms": args.work_ms, "io_ms": args.io_ms}
+    store.submit_batch(JOB_TYPE, [(payload, None)] * args.jobs)
+
+    context = multiprocessing.get_context("spawn")
+    ready, go, stop = context.Queue(), context.Event(), context.Event()
+    workers = [
+        context.Process(target=_worker, args=(str(db_path), args.slots, args.lease, ready, go, stop))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.get(timeout=60)
+
+    start = time.perf_counter()
+    go.set()
+    crashed = None
+    while True:
+        done = store.count_by_status()[SUCCEEDED]
+        if done >= args.jobs:
+            break
+        if args.crash and crashed is None and processes > 1 and done >= args.jobs // 2:
+            crashed = workers[0]
+            os.kill(crashed.pid, signal.SIGKILL)
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for worker in workers:
+        worker.join(timeout=30)
+
+    with sqlite3.connect(db_path) as conn:
+        attempts = Counter(attempt for (attempt,) in conn.execute("SELECT attempts FROM jobs WHERE status = ?", (SUCCEEDED,)))
+        per_worker = Counter(owner for (owner,) in conn.execute("SELECT lease_owner FROM jobs"))
+    store.close()
+    if sum(attempts.values()) != args.jobs:
+        raise SystemExit(f"{processes} worker(s): {sum(attempts.values())} of {args.jobs} jobs succeeded")
+    if crashed is None and set(attempts) != {1}:
+        raise SystemExit(f"{processes} worker(s): jobs ran more than once without a crash: {dict(attempts)}")
+    return {
+        "elapsed": elapsed,
+        "jobs_per_second": args.jobs / elapsed,
+        "retried": sum(count for attempt, count in attempts.items() if attempt > 1),
+        "spread": sorted(per_worker.values(), reverse=True),
+        "crashed": crashed is not None,
+    }
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark job throughput across worker processes.")
+    arg_parser.add_argument("--jobs", type=int, default=400)
+    arg_parser.add_argument("--work-ms", type=float, default=20.0, help="CPU time burned per job")
+    arg_parser.add_argument("--io-ms", type=float, default=0.0, help="time each job then waits without using CPU")
+    arg_parser.add_argument("--processes", default="1,2,4", help="comma-separated worker process counts")
+    arg_parser.add_argument("--slots", type=int, default=1, help="job slots (JOB_MAX_WORKERS) per process")
+    arg_parser.add_argument("--lease", type=float, default=2.0, help="JOB_LEASE_SECONDS for the workers")
+    arg_parser.add_argument("--crash", action="store_true", help="kill one worker halfway through each multi-worker run")
+    args = arg_parser.parse_args()
+
+    counts: List[int] = [int(n) for n in args.processes.split(",") if n.strip()]
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    print(f"{args.jobs} jobs, {args.work_ms:g} ms CPU + {args.io_ms:g} ms wait each, {args.slots} slot(s) per process, {cores} core(s)")
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for processes in counts:
+            result = _run(processes, args, Path(tmp))
+            baseline = baseline or result["jobs_per_second"] / processes
+            speedup = result["jobs_per_second"] / baseline
+            note = f", worker killed, {result['retried']} job(s) retried" if result["crashed"] else ""
+            print(
+                f"{processes:3d} process(es): {result['elapsed']:7.2f} s  {result['jobs_per_second']:8.1f} jobs/s  "
+                f"speedup {speedup:5.2f}x (ideal {processes}x)  jobs per worker {result['spread']}{note}"
+            )
+
+
+if __name__ == "__main__":
+    main()
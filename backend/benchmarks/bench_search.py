@@ -0,0 +1,103 @@
+# backend/benchmarks/bench_search.py
+"""
+Query latency benchmark for the full-text search index (app/core/search_index.py).
+
+Builds an index of --pages synthetic pages (documents of --doc-pages pages,
+--words words per page drawn from a Zipf-distributed vocabulary of --vocab
+terms) by adding --flush pages at a time, as the background indexer does,
+so the index goes through the same segment writes and merges. Then runs
+--queries queries of each kind and reports median and p95 latency of
+`SearchIndex.search`:
+
+- rare:   one term outside the 5,000 most frequent;
+- medium: one term of rank 100-1,000;
+- common: one of the 20 most frequent terms (matches most pages);
+- mixed:  two or three terms of any rank.
+
+The index is written to a temporary directory unless --dir is given; an
+existing index in --dir is reused, which makes repeated query runs cheap.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_search [--pages 200000] [--words 200] [--vocab 50000] [--queries 200]
+        [--flush 20000] [--dir /tmp/search-bench]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.search_index import SearchIndex
+
+
+def _vocabulary(size: int) -> List[str]:
+    return [f"term{n}" for n in range(size)]
+
+
+def _build(index: SearchIndex, pages: int, words: int, vocab: List[str], doc_pages: int, flush: int, seed: int) -> float:
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    for batch_start in range(0, pages, flush):
+        batch_pages = min(flush, pages - batch_start)
+        ranks = np.minimum(rng.zipf(1.1, size=batch_pages * words) - 1, len(vocab) - 1).reshape(batch_pages, words)
+        documents = []
+        for doc_start in range(0, batch_pages, doc_pages):
+            file_id = f"file_bench{(batch_start + doc_start) // doc_pages:08d}"
+            rows = ranks[doc_start:doc_start + doc_pages]
+            documents.append((file_id, [(n + 1, " ".join(vocab[r] for r in row)) for n, row in enumerate(rows)]))
+        index.add_documents(documents)
+        print(f"  indexed {batch_start + batch_pages:>9} pages ({time.perf_counter() - started:6.1f} s)", flush=True)
+    return time.perf_counter() - started
+
+
+def _queries(vocab: List[str], count: int, seed: int) -> Dict[str, List[str]]:
+    rng = np.random.default_rng(seed)
+    pick = lambda low, high: vocab[int(rng.integers(low, min(high, len(vocab))))]
+    return {
+        "rare": [pick(5000, len(vocab)) for _ in range(count)],
+        "medium": [pick(100, 1000) for _ in range(count)],
+        "common": [pick(0, 20) for _ in range(count)],
+        "mixed": [" ".join(pick(0, len(vocab)) for _ in range(int(rng.integers(2, 4)))) for _ in range(count)],
+    }
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark search index query latency.")
+    arg_parser.add_argument("--pages", type=int, default=200_000)
+    arg_parser.add_argument("--words", type=int, default=200, help="words per page")
+    arg_parser.add_argument("--vocab", type=int, default=50_000)
+    arg_parser.add_argument("--doc-pages", type=int, default=20, help="pages per document")
+    arg_parser.add_argument("--flush", type=int, default=20_000, help="pages per add_documents call")
+    arg_parser.add_argument("--queries", type=int, default=200, help="queries of each kind")
+    arg_parser.add_argument("--limit", type=int, default=10)
+    arg_parser.add_argument("--dir", type=Path, default=None, help="index directory to build or reuse")
+    args = arg_parser.parse_args()
+
+    vocab = _vocabulary(args.vocab)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(args.dir or Path(tmp) / "search")
+        if index.stats()["pages"] == 0:
+            print(f"Building an index of {args.pages} pages x {args.words} words ({args.vocab} terms)")
+            seconds = _build(index, args.pages, args.words, vocab, args.doc_pages, args.flush, seed=0)
+            print(f"built in {seconds:.1f} s ({args.pages / seconds:,.0f} pages/s)")
+        stats = index.stats()
+        print(f"{stats['pages']} pages in {stats['segments']} segment(s), {stats['postings_bytes'] / 2**20:.0f} MiB of postings")
+
+        for kind, queries in _queries(vocab, args.queries, seed=1).items():
+            index.search(queries[0], args.limit)  # Fault the segments in
+            samples = []
+            for query in queries:
+                start = time.perf_counter()
+                index.search(query, args.limit)
+                samples.append(time.perf_counter() - start)
+            samples.sort()
+            p95 = samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+            print(f"{kind:>7}: median {statistics.median(samples) * 1000:7.2f} ms, p95 {p95 * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
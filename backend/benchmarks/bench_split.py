@@ -0,0 +1,78 @@
+# backend/benchmarks/bench_split.py
+"""
+Benchmark for the split page classifier (app/core/splitter.py).
+
+Generates a synthetic document of PAGES pages made of SECTIONS sections of
+random length. Each section opens with a heading page naming its topic;
+the remaining pages are filler prose drawn from a shared vocabulary with an
+occasional mention of the topic. The classifier is timed on the page texts
+(as split reads them from a stored parse result) and its output is checked
+against the generated sections.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_split [--pages 1000] [--sections 40] [--words 400] [--repeat 5]
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from app.core.splitter import SplitSection, split_pages
+
+FILLER = (
+    "the company reported results for the period under review and management discussed liquidity capital "
+    "resources market risk operations outlook revenue cost customers products services growth strategy"
+).split()
+
+
+def _document(pages: int, sections: int, words: int, seed: int = 0) -> Tuple[List[str], List[SplitSection], Dict[str, List[int]]]:
+    rng = random.Random(seed)
+    topics = [f"topic{n}" for n in range(sections)]
+    descriptions = [
+        SplitSection(name=f"Section {n}", description=f"Pages about {topic} and {topic}-related disclosures")
+        for n, topic in enumerate(topics)
+    ]
+    cuts = sorted(rng.sample(range(1, pages), sections - 1))
+    bounds = [0] + cuts + [pages]
+
+    texts: List[str] = []
+    expected: Dict[str, List[int]] = {}
+    for n, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        expected[descriptions[n].key] = list(range(start + 1, stop + 1))
+        for page in range(start, stop):
+            body = rng.choices(FILLER, k=words)
+            if page == start:
+                body[:0] = ["Section", str(n), topics[n], topics[n]]
+            elif rng.random() < 0.2:
+                body.append(topics[n])
+            texts.append(" ".join(body))
+    return texts, descriptions, expected
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark the split page classifier.")
+    arg_parser.add_argument("--pages", type=int, default=1000)
+    arg_parser.add_argument("--sections", type=int, default=40)
+    arg_parser.add_argument("--words", type=int, default=400, help="words per page")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    texts, sections, expected = _document(args.pages, args.sections, args.words)
+    page_numbers = list(range(1, args.pages + 1))
+
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        mapping = split_pages(page_numbers, texts, sections)
+        samples.append(time.perf_counter() - start)
+
+    correct = sum(len(set(mapping[key]) & set(pages)) for key, pages in expected.items())
+    print(f"{args.pages} pages x {args.sections} sections, {args.words} words/page")
+    print(f"pages assigned to their generated section: {correct}/{args.pages}")
+    print(f"split_pages: {statistics.median(samples) * 1000:8.1f} ms (median of {args.repeat})")
+
+
+if __name__ == "__main__":
+    main()
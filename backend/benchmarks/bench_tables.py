@@ -0,0 +1,124 @@
+# backend/benchmarks/bench_tables.py
+"""
+Micro-benchmark for the word-box table engine (app/core/tables.py).
+
+Generates a synthetic, table-dense page: TABLES financial-statement style
+tables stacked vertically, each with a header row, numeric columns, and some
+labels wrapped onto a second line. Word boxes are laid out from a fixed
+glyph advance, so the engine is timed on its own without PDF extraction, and
+its output is checked against the generated grid.
+
+With --pdf the same layout is also written to a real PDF page and the engine
+(including `get_text("words")`) is compared with PyMuPDF's `find_tables`.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_tables [--tables 50] [--rows 6] [--cols 5] [--repeat 50] [--pdf]
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+from app.core.tables import find_tables, words_to_arrays
+
+FONT_SIZE = 6.0
+GLYPH_ADVANCE = FONT_SIZE * 0.5
+LINE_HEIGHT = FONT_SIZE * 1.35
+ROW_PITCH = FONT_SIZE * 2.0
+WRAP_PITCH = FONT_SIZE * 1.15
+TABLE_GAP = FONT_SIZE * 5
+LABEL_WIDTH = 40 * GLYPH_ADVANCE
+COLUMN_WIDTH = 16 * GLYPH_ADVANCE
+
+Word = Tuple[float, float, float, float, str]
+
+
+def _layout(tables: int, rows: int, cols: int, seed: int = 0):
+    """Return (words, expected grids, text placements) for a synthetic page."""
+    rng = random.Random(seed)
+    words: List[Word] = []
+    placements: List[Tuple[float, float, str]] = []
+    expected: List[List[List[Optional[str]]]] = []
+
+    def place(x: float, baseline: float, text: str) -> None:
+        placements.append((x, baseline, text))
+        for token in text.split(" "):
+            width = len(token) * GLYPH_ADVANCE
+            words.append((x, baseline - FONT_SIZE, x + width, baseline - FONT_SIZE + LINE_HEIGHT, token))
+            x += width + GLYPH_ADVANCE
+
+    y = 40.0
+    for t in range(tables):
+        place(36, y, f"Statement {t + 1}")
+        y += ROW_PITCH * 1.5 + TABLE_GAP / 2
+        grid = [["Item"] + [str(2024 - c) for c in range(cols - 1)]]
+        for c, text in enumerate(grid[0]):
+            place(36 + (LABEL_WIDTH if c else 0) + max(c - 1, 0) * COLUMN_WIDTH, y, text)
+        for r in range(rows - 1):
+            y += ROW_PITCH
+            values = [f"{rng.randint(1, 99_999):,}" for _ in range(cols - 1)]
+            if r % 3 == 2:
+                # Wrapped label: first line holds only the label start
+                place(36, y, "Total operating")
+                y += WRAP_PITCH
+                place(36, y, f"expenses {r}")
+                label = f"Total operating\nexpenses {r}"
+            else:
+                label = f"Line item {r}"
+                place(36, y, label)
+            for c, value in enumerate(values):
+                place(36 + LABEL_WIDTH + c * COLUMN_WIDTH, y, value)
+            grid.append([label] + values)
+        expected.append(grid)
+        y += TABLE_GAP
+    return words, expected, placements, y
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark the word-box table engine.")
+    arg_parser.add_argument("--tables", type=int, default=50)
+    arg_parser.add_argument("--rows", type=int, default=6)
+    arg_parser.add_argument("--cols", type=int, default=5)
+    arg_parser.add_argument("--repeat", type=int, default=50)
+    arg_parser.add_argument("--pdf", action="store_true", help="also compare with PyMuPDF find_tables on a real page")
+    args = arg_parser.parse_args()
+
+    words, expected, placements, height = _layout(args.tables, args.rows, args.cols)
+    boxes, texts = words_to_arrays(words)
+    found = find_tables(boxes, texts)
+    correct = sum(table.rows == grid for table, grid in zip(found, expected))
+    print(f"{args.tables} tables x {args.rows}x{args.cols} cells, {len(words)} words")
+    print(f"engine: found {len(found)} tables, {correct} exactly as generated")
+    print(f"engine (word boxes in memory): {_time(lambda: find_tables(boxes, texts), args.repeat):8.2f} ms/page")
+
+    if args.pdf:
+        import pymupdf
+
+        doc = pymupdf.open()
+        page = doc.new_page(width=612, height=height + 40)
+        for x, baseline, text in placements:
+            page.insert_text((x, baseline), text, fontsize=FONT_SIZE)
+
+        def engine_on_page():
+            return find_tables(*words_to_arrays(page.get_text("words")))
+
+        print(f"engine (incl. get_text):       {_time(engine_on_page, args.repeat):8.2f} ms/page, "
+              f"{len(engine_on_page())} tables")
+        repeat = max(args.repeat // 10, 1)
+        print(f"pymupdf find_tables:           {_time(lambda: page.find_tables(), repeat):8.2f} ms/page, "
+              f"{len(page.find_tables().tables)} tables")
+
+
+if __name__ == "__main__":
+    main()
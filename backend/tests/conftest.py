@@ -0,0 +1,74 @@
+import os
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence
+
+import pytest
+
+
+def build_pdf(path: Path, page_texts: Sequence[str], metadata: Optional[dict] = None) -> Path:
+    """Write a simple PDF with one page per entry of `page_texts`."""
+    import pymupdf
+
+    doc = pymupdf.open()
+    for text in page_texts:
+        page = doc.new_page()
+        page.insert_text((72, 72), text)
+    if metadata:
+        doc.set_metadata(metadata)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_state_dirs(tmp_path_factory):
+    """Keep the job database and caches created by app startup out of /app during tests."""
+    root = tmp_path_factory.mktemp("state")
+    for name in ("DATA_DIR", "CACHE_DIR"):
+        os.environ.setdefault(name, str(root / name.lower()))
+    # Don't spawn parser workers for every TestClient; test_startup.py turns this back on
+    os.environ.setdefault("STARTUP_PREWARM", "0")
+    # Tests fire requests back to back from one client; test_admission.py sets its own limits
+    os.environ.setdefault("ADMISSION_CLIENT_RATE", "0")
+    yield
+
+
+@pytest.fixture
+def make_pdf(tmp_path: Path) -> Callable[..., Path]:
+    """Factory fixture: make_pdf(["page 1 text", "page 2 text"], name="doc.pdf")."""
+    def _make(page_texts: Sequence[str], name: str = "doc.pdf", metadata: Optional[dict] = None) -> Path:
+        return build_pdf(tmp_path / name, page_texts, metadata)
+    return _make
+
+
+@pytest.fixture
+def app_env() -> Dict[str, str]:
+    """Extra environment for `client`; test modules override it to add or replace variables."""
+    return {}
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path: Path, app_env: Dict[str, str]):
+    """
+    TestClient running the app's lifespan with one parser worker and its own
+    upload, cache and data directories, plus `app_env`. The parser pool is
+    shut down afterwards.
+    """
+    from fastapi.testclient import TestClient
+
+    from app.core import parser
+    from app.main import app
+
+    env = {
+        "PARSER_WORKERS": "1",
+        "UPLOAD_DIR": str(tmp_path / "uploads"),
+        "CACHE_DIR": str(tmp_path / "cache"),
+        "DATA_DIR": str(tmp_path / "data"),
+        "JOB_POLL_INTERVAL_SECONDS": "0.05",
+        **app_env,
+    }
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    with TestClient(app) as c:
+        yield c
+    parser.shutdown_process_pool()
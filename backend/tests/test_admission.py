@@ -0,0 +1,106 @@
+import uuid
+
+import pytest
+
+from app.core.admission import AdmissionController, AdmissionRejected, PAGES_BUDGET, get_admission_controller
+
+
+@pytest.fixture
+def app_env():
+    return {"ADMISSION_CLIENT_HEADER": "X-Client-Id"}
+
+
+@pytest.fixture
+def saturated(monkeypatch):
+    """Fill the global page budget (2 pages) as if another parse were running."""
+    monkeypatch.setenv("ADMISSION_MAX_PAGES_IN_FLIGHT", "2")
+    controller = get_admission_controller()
+    controller.acquire_pages(2, enforce=False)
+    yield controller
+    controller.release_pages(2, completed=False)
+
+
+def _parse(client, pdf, **headers):
+    with open(pdf, "rb") as f:
+        return client.post("/api/v1/parse/", files={"file": (pdf.name, f, "application/pdf")}, headers=headers)
+
+
+def test_client_token_bucket(monkeypatch):
+    monkeypatch.setenv("ADMISSION_CLIENT_RATE", "2")
+    monkeypatch.setenv("ADMISSION_CLIENT_BURST", "3")
+    controller = AdmissionController()
+
+    assert [controller.check_client("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert controller.check_client("a") == pytest.approx(0.5, abs=0.05)
+    # Buckets are per client
+    assert controller.check_client("b") == 0.0
+
+
+def test_page_budget_and_retry_after(monkeypatch):
+    monkeypatch.setenv("ADMISSION_MAX_PAGES_IN_FLIGHT", "10")
+    controller = AdmissionController()
+
+    controller.acquire_pages(8)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire_pages(5)
+    assert rejected.value.reason == PAGES_BUDGET
+    # Jobs are always counted, never rejected
+    controller.acquire_pages(5, enforce=False)
+    assert controller.pages_in_flight == 13
+
+    # 4 pages finished within the first second (4 pages/s); 9 + 5 - 10 = 4 pages must drain first
+    controller.release_pages(4)
+    assert controller.throughput() == pytest.approx(4.0)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire_pages(5)
+    assert rejected.value.retry_after == pytest.approx(1.0)
+    assert rejected.value.retry_after_header == "1"
+
+    controller.release_pages(9, completed=False)
+    # A document larger than the whole budget runs once nothing else is in flight
+    controller.acquire_pages(50)
+    assert controller.pages_in_flight == 50
+
+
+def test_page_lease_returns_pages_as_ranges_finish():
+    controller = AdmissionController()
+    with controller.lease() as lease:
+        lease.start(6)
+        lease.advance(4)
+        assert controller.pages_in_flight == 2
+    assert controller.pages_in_flight == 0
+
+
+def test_sync_parse_is_shed_when_saturated(client, make_pdf, saturated):
+    pdf = make_pdf(["over capacity"])
+    response = _parse(client, pdf)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert f"retry in {response.headers['Retry-After']}s." in response.json()["detail"]
+
+    saturated.release_pages(2, completed=False)
+    assert _parse(client, pdf).status_code == 200
+
+
+def test_client_rate_limit_on_sync_routes(client, make_pdf, monkeypatch):
+    monkeypatch.setenv("ADMISSION_CLIENT_RATE", "0.01")
+    monkeypatch.setenv("ADMISSION_CLIENT_BURST", "1")
+    pdf = make_pdf(["rate limited"])
+    client_id = uuid.uuid4().hex
+
+    assert _parse(client, pdf, **{"X-Client-Id": client_id}).status_code == 200
+    response = _parse(client, pdf, **{"X-Client-Id": client_id})
+    assert response.status_code == 429
+    assert 90 <= int(response.headers["Retry-After"]) <= 100
+    assert f"retry in {response.headers['Retry-After']}s." in response.json()["detail"]
+    # Another client is unaffected
+    assert _parse(client, pdf, **{"X-Client-Id": uuid.uuid4().hex}).status_code == 200
+
+
+def test_async_jobs_over_capacity_are_queued_lower(client, make_pdf, saturated):
+    with open(make_pdf(["deferred"]), "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("doc.pdf", f, "application/pdf")}).json()["file_id"]
+
+    response = client.post("/api/v1/parse_async/", json={"document_url": file_id, "priority": 5})
+    assert response.status_code == 202
+    assert client.get(f"/api/v1/jobs/{response.json()['job_id']}").json()["priority"] == -5
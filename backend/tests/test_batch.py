@@ -0,0 +1,100 @@
+import json
+import time
+
+import pytest
+
+from app.core.jobs import FAILED, QUEUED, JobStore
+
+
+@pytest.fixture
+def app_env():
+    return {"JOB_CONCURRENCY": "batch_parse=2"}
+
+
+def _upload(client, path):
+    with open(path, "rb") as f:
+        return client.post("/api/v1/upload", files={"file": (path.name, f, "application/pdf")}).json()["file_id"]
+
+
+def _wait_for_batch(client, batch_id, timeout=20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        body = client.get(f"/api/v1/parse_batch/{batch_id}").json()
+        if body["status"] == "completed":
+            return body
+        time.sleep(0.05)
+    raise AssertionError("batch did not complete in time")
+
+
+def test_submit_batch_is_one_transaction(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    batch_id, jobs = store.submit_batch("batch_parse", [({"n": 1}, None), ({"n": 2}, "ParseError: bad"), ({"n": 3}, None)])
+
+    assert [job.status for job in jobs] == [QUEUED, FAILED, QUEUED]
+    assert [job.payload["n"] for job in store.list_batch(batch_id)] == [1, 2, 3]
+    assert store.list_batch("batch-missing") == []
+    assert store.get(jobs[0].job_id).to_status()["batch_id"] == batch_id
+    store.close()
+
+
+def test_batch_of_file_ids_with_one_bad_document(client, make_pdf):
+    good = [_upload(client, make_pdf([f"document {n}"], name=f"doc{n}.pdf")) for n in range(3)]
+    documents = [{"document_url": file_id} for file_id in good]
+    documents.append({"document_url": "file_missing"})
+    documents.append({"document_url": good[0], "options": {"mode": "bogus"}})
+
+    response = client.post("/api/v1/parse_batch", json={"documents": documents, "options": {"mode": "text"}})
+    assert response.status_code == 202
+    batch_id = response.json()["batch_id"]
+    assert len(response.json()["job_ids"]) == 5
+
+    body = _wait_for_batch(client, batch_id)
+    assert body["counts"]["succeeded"] == 3 and body["counts"]["failed"] == 2
+    assert [doc["status_code"] for doc in body["documents"]] == [200, 200, 200, 404, 400]
+    assert "result" not in body["documents"][0]
+
+    with_results = client.get(f"/api/v1/parse_batch/{batch_id}", params={"include_results": "true"}).json()
+    assert "document 1" in json.dumps(with_results["documents"][1]["result"]["pages"])
+    assert with_results["documents"][1]["result"]["parsing_mode"] == "text"
+
+
+def test_batch_upload_rejects_bad_files_individually(client, make_pdf):
+    files = [
+        ("files", ("a.pdf", make_pdf(["alpha"], name="a.pdf").read_bytes(), "application/pdf")),
+        ("files", ("notes.txt", b"plain text", "text/plain")),
+        ("files", ("b.pdf", make_pdf(["beta"], name="b.pdf").read_bytes(), "application/pdf")),
+    ]
+    response = client.post("/api/v1/parse_batch/upload", files=files, data={"mode": "text"})
+    assert response.status_code == 202
+
+    body = _wait_for_batch(client, response.json()["batch_id"])
+    assert [doc["status"] for doc in body["documents"]] == ["succeeded", "failed", "succeeded"]
+    assert body["documents"][1]["source_filename"] == "notes.txt"
+    assert body["documents"][1]["status_code"] == 400
+
+    job = client.get(f"/api/v1/jobs/{body['documents'][2]['job_id']}").json()
+    assert job["result"]["source_filename"] == "b.pdf"
+
+
+def test_batch_stream_sends_each_document_then_end(client, make_pdf):
+    file_ids = [_upload(client, make_pdf([f"page {n}"], name=f"s{n}.pdf")) for n in range(3)]
+    batch_id = client.post("/api/v1/parse_batch", json={"documents": [{"document_url": f} for f in file_ids]}).json()["batch_id"]
+
+    response = client.get(f"/api/v1/parse_batch/{batch_id}/stream")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [event["type"] for event in events] == ["document"] * 3 + ["end"]
+    assert sorted(event["index"] for event in events[:3]) == [0, 1, 2]
+    assert all(event["result"]["page_count"] == 1 for event in events[:3])
+    assert events[-1]["status"] == "completed"
+
+
+def test_batch_validation(client, monkeypatch):
+    assert client.post("/api/v1/parse_batch", json={"documents": []}).status_code == 422
+    bad_options = client.post("/api/v1/parse_batch", json={"documents": [{"document_url": "x"}], "options": {"mode": "bogus"}})
+    assert bad_options.status_code == 400
+    monkeypatch.setenv("BATCH_MAX_DOCUMENTS", "2")
+    too_many = client.post("/api/v1/parse_batch", json={"documents": [{"document_url": "x"}] * 3})
+    assert too_many.status_code == 413
+    assert client.get("/api/v1/parse_batch/batch-missing").status_code == 404
@@ -0,0 +1,80 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from app.core.blob_store import BlobStore, digest_from_file_id
+
+
+def _put(store: BlobStore, content: bytes, extension: str = ".pdf"):
+    """Write `content` to a temp file and ingest it, mimicking the upload endpoint."""
+    tmp_path = store.new_temp_path()
+    tmp_path.write_bytes(content)
+    digest = hashlib.sha256(content).hexdigest()
+    return store.ingest(tmp_path, digest, len(content), extension, "application/pdf")
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> BlobStore:
+    store = BlobStore(tmp_path / "uploads")
+    yield store
+    store.close()
+
+
+def test_ingest_is_content_addressed_and_sharded(store: BlobStore):
+    record, created = _put(store, b"hello blob")
+
+    assert created
+    assert digest_from_file_id(record.file_id) == record.digest
+    path = store.resolve(record.file_id)
+    assert path == store.blob_dir / record.digest[:2] / record.digest[2:4] / record.digest
+    assert path.read_bytes() == b"hello blob"
+
+
+def test_duplicate_ingest_adds_reference_without_second_copy(store: BlobStore):
+    first, _ = _put(store, b"same bytes")
+    second, created = _put(store, b"same bytes")
+
+    assert not created
+    assert second.file_id == first.file_id
+    assert second.refcount == 2
+    assert list(store.tmp_dir.iterdir()) == []
+    assert len([p for p in store.blob_dir.rglob("*") if p.is_file()]) == 1
+
+
+def test_sweep_evicts_unreferenced_blobs(store: BlobStore):
+    record, _ = _put(store, b"released")
+    store.release(record.file_id)
+
+    assert store.sweep() == [record.digest]
+    assert store.resolve(record.file_id) is None
+
+
+def test_sweep_evicts_by_ttl(store: BlobStore):
+    old, _ = _put(store, b"old")
+    fresh, _ = _put(store, b"fresh")
+    store.resolve(fresh.file_id)
+
+    evicted = store.sweep(ttl_seconds=60, now=time.time() + 30)
+    assert evicted == []
+
+    # Move the clock so only the blob accessed last survives
+    store._conn.execute("UPDATE blobs SET last_access = last_access - 120 WHERE digest = ?", (old.digest,))
+    evicted = store.sweep(ttl_seconds=60)
+    assert evicted == [old.digest]
+    assert store.resolve(fresh.file_id) is not None
+
+
+def test_sweep_enforces_byte_budget_lru_first(store: BlobStore):
+    records = []
+    for i in range(4):
+        record, _ = _put(store, os.urandom(100))
+        store._conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (1000.0 + i, record.digest))
+        records.append(record)
+
+    evicted = store.sweep(max_total_bytes=250)
+
+    assert evicted == [records[0].digest, records[1].digest]
+    assert store.total_bytes() == 200
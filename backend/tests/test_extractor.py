@@ -0,0 +1,117 @@
+import pytest
+
+from app.core.extractor import DocumentIndex, PlanCache, SchemaError, compile_plan, plan_key, to_date, to_number
+
+INVOICE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "invoice_number": {"type": "string"},
+        "invoiceDate": {"type": "string", "format": "date"},
+        "total": {"type": "number", "description": "Total amount due"},
+        "paid": {"type": "boolean"},
+        "currency": {"type": "string", "enum": ["USD", "EUR"]},
+        "customer": {"type": "object", "properties": {"name": {"type": "string"}}},
+        "line_items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "description": {"type": "string"},
+                    "quantity": {"type": "integer"},
+                    "unit_price": {"type": "number"},
+                },
+            },
+        },
+    },
+}
+
+PAGES = [
+    {
+        "page_number": 1,
+        "text": "ACME Corp\nInvoice No: INV-2024-001\nInvoice date: March 5, 2024\nCustomer name: Jane Roe\nPaid: no\nAll amounts in EUR",
+        "tables": [{"data": [["Description", "Qty", "Unit price"], ["Widget", "2", "10.50"], ["Gadget", "1", "(3.00)"]]}],
+    },
+    {
+        "page_number": 2,
+        "text": "Notes about delivery\nTotal amount due 1,234.56",
+        "tables": [{"data": [["Description", "Qty", "Unit price"], ["Spare", "4", "1.25"]]}],
+    },
+]
+
+
+def test_coercers():
+    assert to_number("$1,234.50") == 1234.5
+    assert to_number("(1,200)") == -1200
+    assert to_number("n/a") is None
+    assert to_date("Due 03/05/2024") == "2024-03-05"
+    assert to_date("5 Mar 2024") == "2024-03-05"
+
+
+def test_plan_extracts_fields_and_tables():
+    plan = compile_plan(INVOICE_SCHEMA)
+    extracted = plan.run(DocumentIndex.from_pages(PAGES))
+
+    assert extracted.data == {
+        "invoice_number": "INV-2024-001",
+        "invoiceDate": "2024-03-05",
+        "total": 1234.56,
+        "paid": False,
+        "currency": "EUR",
+        "customer": {"name": "Jane Roe"},
+        "line_items": [
+            {"description": "Widget", "quantity": 2, "unit_price": 10.5},
+            {"description": "Gadget", "quantity": 1, "unit_price": -3.0},
+            {"description": "Spare", "quantity": 4, "unit_price": 1.25},
+        ],
+    }
+    assert extracted.citations["total"]["page"] == 2
+    assert extracted.citations["line_items"] == {"pages": [1, 2], "source": "table"}
+
+
+def test_missing_values_stay_empty():
+    schema = {"type": "object", "properties": {"iban": {"type": "string"}, "tags": {"type": "array", "items": {"type": "string"}}}}
+    assert compile_plan(schema).run(DocumentIndex.from_pages(PAGES)).data == {"iban": None, "tags": []}
+
+
+def test_page_selector():
+    plan = compile_plan(INVOICE_SCHEMA, {"pages": "2-"})
+    assert plan.select_pages([1, 2, 3]) == [2, 3]
+
+
+@pytest.mark.parametrize("schema", [
+    {"type": "array"},
+    {"type": "object", "properties": {"x": {"type": "unknown"}}},
+    {"type": "object", "properties": {"x": {"type": "array", "items": {"type": "object", "properties": {"y": {"type": "object"}}}}}},
+])
+def test_invalid_schemas(schema):
+    with pytest.raises(SchemaError):
+        compile_plan(schema)
+
+
+def test_plan_cache_uses_canonical_key():
+    cache = PlanCache(max_entries=2)
+    reordered = dict(reversed(list(INVOICE_SCHEMA.items())))
+    assert plan_key(INVOICE_SCHEMA) == plan_key(reordered)
+
+    first = cache.get(INVOICE_SCHEMA)
+    assert cache.get(reordered) is first
+    assert cache.get(INVOICE_SCHEMA, {"pages": "1"}) is not first
+    cache.get({"type": "object", "properties": {}})
+    assert cache.stats() == {"hits": 1, "misses": 3, "evictions": 1, "entries": 2}
+
+
+def test_extract_endpoint(client, make_pdf):
+    path = make_pdf(["Invoice number: A-17", "Total: 99.90"])
+    with open(path, "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("a.pdf", f, "application/pdf")}).json()["file_id"]
+    schema = {"type": "object", "properties": {"invoice_number": {"type": "string"}, "total": {"type": "number"}}}
+
+    response = client.post("/api/v1/extract/", json={"document_url": file_id, "schema": schema, "options": {"citations": True}})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["result"] == {"invoice_number": "A-17", "total": 99.9}
+    assert body["citations"]["total"]["page"] == 2
+    assert body["usage"] == {"num_pages": 2}
+
+    assert client.post("/api/v1/extract/", json={"document_url": file_id, "schema": {"type": "array"}}).status_code == 400
+    assert client.post("/api/v1/extract_async/", json={"document_url": file_id, "schema": schema, "options": {"bogus": 1}}).status_code == 400
@@ -0,0 +1,443 @@
+import asyncio
+import functools
+import http.server
+import threading
+import time
+
+import pytest
+
+from app.core.jobs import (
+    FAILED, QUEUED, RUNNING, SUCCEEDED, IdempotencyKeyReused, JobEngine, JobStore, job_handler, on_job_finished,
+    request_fingerprint,
+)
+
+
+@job_handler("test-echo")
+async def _echo_job(ctx):
+    await ctx.report_progress(1, 1)
+    if ctx.payload.get("fail"):
+        raise RuntimeError("boom")
+    return {"echo": ctx.payload["value"]}
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(0.05)
+    raise AssertionError("condition not met in time")
+
+
+def test_store_claims_by_priority_then_age(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    low = store.submit("test-echo", {"value": 1}, priority=0)
+    high = store.submit("test-echo", {"value": 2}, priority=5)
+    low_later = store.submit("test-echo", {"value": 3}, priority=0)
+
+    claimed = [store.claim_next(["test-echo"]).job_id for _ in range(3)]
+
+    assert claimed == [high.job_id, low.job_id, low_later.job_id]
+    assert store.claim_next(["test-echo"]) is None
+    assert store.get(high.job_id).status == RUNNING
+    store.close()
+
+
+def test_interrupted_jobs_are_requeued_and_resumed(tmp_path):
+    db_path = tmp_path / "jobs.sqlite3"
+    store = JobStore(db_path)
+    interrupted = store.submit("test-echo", {"value": "a"})
+    queued = store.submit("test-echo", {"value": "b"})
+    store.claim_next(["test-echo"])  # Simulate a crash while "a" was running
+    store.close()
+
+    async def restart():
+        engine = JobEngine(JobStore(db_path), max_workers=2, poll_interval=0.05)
+        await engine.start()
+        try:
+            for _ in range(100):
+                states = {engine.store.get(j.job_id).status for j in (interrupted, queued)}
+                if states == {SUCCEEDED}:
+                    break
+                await asyncio.sleep(0.05)
+            return [engine.store.get(j.job_id) for j in (interrupted, queued)]
+        finally:
+            await engine.stop()
+            engine.store.close()
+
+    jobs = asyncio.run(restart())
+    assert [job.status for job in jobs] == [SUCCEEDED, SUCCEEDED]
+    assert jobs[0].attempts == 2
+    assert jobs[1].to_status()["result"] == {"echo": "b"}
+
+
+def test_per_type_concurrency_limit(tmp_path):
+    running = 0
+    peak = 0
+
+    @job_handler("test-slow")
+    async def _slow_job(ctx):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return None
+
+    async def run_all():
+        engine = JobEngine(JobStore(tmp_path / "jobs.sqlite3"), max_workers=8, concurrency={"test-slow": 2}, poll_interval=0.05)
+        await engine.start()
+        try:
+            jobs = [await engine.submit("test-slow", {}) for _ in range(6)]
+            for _ in range(200):
+                if all(engine.store.get(j.job_id).status == SUCCEEDED for j in jobs):
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await engine.stop()
+            engine.store.close()
+
+    asyncio.run(run_all())
+    assert peak == 2
+
+
+def test_claims_are_exclusive_across_workers(tmp_path):
+    db_path = tmp_path / "jobs.sqlite3"
+    submitted = {JobStore(db_path).submit("test-echo", {"value": n}).job_id for n in range(60)}
+    # One store (connection) per worker, as separate processes would have
+    stores = [JobStore(db_path, worker_id=f"worker-{n}") for n in range(4)]
+    claims = {store.worker_id: [] for store in stores}
+
+    def drain(store):
+        while (job := store.claim_next(["test-echo"])) is not None:
+            claims[store.worker_id].append(job.job_id)
+
+    threads = [threading.Thread(target=drain, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed = [job_id for job_ids in claims.values() for job_id in job_ids]
+    assert sorted(claimed) == sorted(submitted)
+    assert all(stores[0].get(job_id).attempts == 1 for job_id in claimed)
+    for store in stores:
+        store.close()
+
+
+def test_expired_lease_is_redispatched_and_stale_result_rejected(tmp_path):
+    db_path = tmp_path / "jobs.sqlite3"
+    crashed = JobStore(db_path, worker_id="host-a:1:a", lease_seconds=0.1)
+    survivor = JobStore(db_path, worker_id="host-b:1:b", lease_seconds=5)
+    job_id = crashed.submit("test-echo", {"value": 1}).job_id
+    first = crashed.claim_next(["test-echo"])
+
+    assert survivor.requeue_expired() == ([], [])
+    time.sleep(0.15)
+    assert survivor.requeue_expired() == ([job_id], [])
+    second = survivor.claim_next(["test-echo"])
+    assert (second.attempts, second.lease_owner) == (2, "host-b:1:b")
+
+    # The first worker comes back too late: it can no longer renew or commit
+    assert crashed.renew_leases({job_id: first.attempts}) == set()
+    assert not crashed.complete(job_id, '"stale"', first.attempts)
+    assert survivor.complete(job_id, '"fresh"', second.attempts)
+    assert not survivor.complete(job_id, '"again"', second.attempts)
+    assert survivor.get(job_id).to_status()["result"] == "fresh"
+
+
+def test_abandoned_job_fails_after_max_attempts(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3", worker_id="host-a:1:a", lease_seconds=0.01, max_attempts=2)
+    job_id = store.submit("test-echo", {"value": 1}).job_id
+    for expected in (([job_id], []), ([], [job_id])):
+        store.claim_next(["test-echo"])
+        time.sleep(0.02)
+        assert store.requeue_expired() == expected
+    job = store.get(job_id)
+    assert job.status == FAILED and job.attempts == 2
+    assert "Abandoned after 2 attempt(s)" in job.error
+
+
+def test_heartbeat_keeps_long_jobs_and_peers_recover_crashed_ones(tmp_path):
+    db_path = tmp_path / "jobs.sqlite3"
+    runs = []
+
+    @job_handler("test-long")
+    async def _long_job(ctx):
+        runs.append(ctx.job_id)
+        await asyncio.sleep(0.8)
+        return {"ok": True}
+
+    crashed = JobStore(db_path, worker_id="host-a:1:a", lease_seconds=0.3)
+    orphan = crashed.submit("test-echo", {"value": "orphan"}).job_id
+    crashed.claim_next(["test-echo"])  # Claimed by a worker that then died
+
+    async def run():
+        engine = JobEngine(JobStore(db_path, worker_id="host-b:1:b", lease_seconds=0.3), max_workers=2, poll_interval=0.05)
+        await engine.start()
+        try:
+            long_job = await engine.submit("test-long", {})
+            for _ in range(100):
+                if {engine.store.get(job_id).status for job_id in (orphan, long_job.job_id)} == {SUCCEEDED}:
+                    break
+                await asyncio.sleep(0.05)
+            return engine.store.get(orphan), engine.store.get(long_job.job_id)
+        finally:
+            await engine.stop()
+            engine.store.close()
+
+    recovered, long_job = asyncio.run(run())
+    assert (recovered.status, recovered.attempts, recovered.lease_owner) == (SUCCEEDED, 2, "host-b:1:b")
+    # Outlived its 0.3s lease several times over without being re-dispatched
+    assert (long_job.status, long_job.attempts) == (SUCCEEDED, 1)
+    assert runs == [long_job.job_id]
+
+
+def test_stop_hands_running_jobs_back(tmp_path):
+    db_path = tmp_path / "jobs.sqlite3"
+
+    @job_handler("test-forever")
+    async def _forever_job(ctx):
+        await asyncio.sleep(60)
+
+    async def run():
+        engine = JobEngine(JobStore(db_path), max_workers=1, poll_interval=0.05)
+        await engine.start()
+        job = await engine.submit("test-forever", {})
+        for _ in range(100):
+            if engine.store.get(job.job_id).status == RUNNING:
+                break
+            await asyncio.sleep(0.02)
+        await engine.stop()
+        engine.store.close()
+        return job.job_id
+
+    job = JobStore(db_path).get(asyncio.run(run()))
+    assert (job.status, job.attempts, job.lease_owner) == (QUEUED, 0, None)
+
+
+def test_finish_notification_survives_a_stop_right_after_commit(tmp_path):
+    db_path = tmp_path / "jobs.sqlite3"
+    notified = []
+
+    @on_job_finished
+    async def _record(job):
+        if job.job_type == "test-echo" and job.payload.get("value") == "notify":
+            notified.append(job.job_id)
+
+    async def run():
+        engine = JobEngine(JobStore(db_path), max_workers=1, poll_interval=0.05)
+        engine._notify = lambda job_ids=None: None  # Stopped before the listener tasks got to run
+        await engine.start()
+        job = await engine.submit("test-echo", {"value": "notify"})
+        for _ in range(100):
+            if engine.store.get(job.job_id).status == SUCCEEDED:
+                break
+            await asyncio.sleep(0.02)
+        await engine.stop()
+        engine.store.close()
+        assert notified == []
+
+        engine = JobEngine(JobStore(db_path), max_workers=1, poll_interval=0.05)
+        await engine.start()
+        for _ in range(100):
+            if notified:
+                break
+            await asyncio.sleep(0.02)
+        await engine._heartbeat_once()
+        await asyncio.sleep(0.1)
+        await engine.stop()
+        engine.store.close()
+        return job.job_id
+
+    job_id = asyncio.run(run())
+    assert notified == [job_id]
+    assert JobStore(db_path).claim_notifications() == []
+
+
+def test_identical_submissions_share_a_job(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    fingerprint = request_fingerprint("test-echo", {"document": "sha256:abc", "options": {"mode": "text"}})
+
+    first, created = store.submit_once("test-echo", {"value": 1}, fingerprint)
+    assert created
+    again, created = store.submit_once("test-echo", {"value": 1}, fingerprint, priority=5)
+    assert (again.job_id, created) == (first.job_id, False)
+    # A more urgent duplicate raises the queued job's priority
+    assert again.priority == 5
+
+    # Still attached while running and after succeeding within the window
+    job = store.claim_next(["test-echo"])
+    assert store.submit_once("test-echo", {"value": 1}, fingerprint)[0].job_id == first.job_id
+    store.complete(job.job_id, "{}", job.attempts)
+    assert store.submit_once("test-echo", {"value": 1}, fingerprint)[0].job_id == first.job_id
+    # Outside the window the request runs again
+    fresh, created = store.submit_once("test-echo", {"value": 1}, fingerprint, window_seconds=0)
+    assert created and fresh.job_id != first.job_id
+
+    # A failed job is retried by a new submission
+    job = store.claim_next(["test-echo"])
+    store.fail(job.job_id, "boom", job.attempts)
+    retried, created = store.submit_once("test-echo", {"value": 1}, fingerprint, window_seconds=0)
+    assert created and retried.job_id != fresh.job_id
+    store.close()
+
+
+def test_submissions_without_reusable_results_only_share_unfinished_jobs(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    fingerprint = request_fingerprint("test-echo", {"document": "https://example.com/a.pdf"})
+
+    first, _ = store.submit_once("test-echo", {"value": 1}, fingerprint, reuse_finished=False)
+    assert store.submit_once("test-echo", {"value": 1}, fingerprint, reuse_finished=False)[0].job_id == first.job_id
+    job = store.claim_next(["test-echo"])
+    assert store.submit_once("test-echo", {"value": 1}, fingerprint, reuse_finished=False)[0].job_id == first.job_id
+    store.complete(job.job_id, "{}", job.attempts)
+
+    again, created = store.submit_once("test-echo", {"value": 1}, fingerprint, reuse_finished=False)
+    assert created and again.job_id != first.job_id
+    store.close()
+
+
+def test_idempotency_keys(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    one, other = request_fingerprint("test-echo", {"n": 1}), request_fingerprint("test-echo", {"n": 2})
+
+    job, _ = store.submit_once("test-echo", {"value": 1}, one, idempotency_key="key-1")
+    claimed = store.claim_next(["test-echo"])
+    store.fail(claimed.job_id, "boom", claimed.attempts)
+    # A retry under the key gets the same job, even though it failed
+    replay, created = store.submit_once("test-echo", {"value": 1}, one, idempotency_key="key-1")
+    assert (replay.job_id, replay.status, created) == (job.job_id, FAILED, False)
+
+    with pytest.raises(IdempotencyKeyReused):
+        store.submit_once("test-echo", {"value": 2}, other, idempotency_key="key-1")
+    assert store.submit_once("test-echo", {"value": 2}, other, idempotency_key="key-2")[1]
+    store.close()
+
+
+def test_concurrent_identical_submissions_from_several_processes(tmp_path):
+    # One store per thread stands in for one per worker process
+    stores = [JobStore(tmp_path / "jobs.sqlite3") for _ in range(4)]
+    fingerprint = request_fingerprint("test-echo", {"document": "sha256:abc"})
+    job_ids = []
+
+    def submit(store):
+        for _ in range(10):
+            job_ids.append(store.submit_once("test-echo", {"value": 1}, fingerprint)[0].job_id)
+
+    threads = [threading.Thread(target=submit, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(job_ids) == 40 and len(set(job_ids)) == 1
+    assert stores[0].count_by_status()[QUEUED] == 1
+
+
+def test_parse_async_job_lifecycle(client, make_pdf):
+    path = make_pdf(["async one", "async two", "async three"])
+    with open(path, "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("a.pdf", f, "application/pdf")}).json()["file_id"]
+
+    response = client.post("/api/v1/parse_async/", json={"document_url": file_id, "options": {"mode": "text"}})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    status = _wait_for(lambda: (s := client.get(f"/api/v1/jobs/{job_id}").json())["status"] in (SUCCEEDED, FAILED) and s)
+
+    assert status["status"] == SUCCEEDED
+    assert status["progress"] == {"pages_done": 3, "pages_total": 3}
+    assert status["timings"]["run_seconds"] is not None
+    assert status["result"]["page_count"] == 3
+    assert status["result"]["source_filename"] == file_id
+    assert "async three" in status["result"]["pages"][2]["text"]
+
+
+def test_parse_async_unknown_document_fails(client):
+    job_id = client.post("/api/v1/parse_async/", json={"document_url": f"file_{'0' * 64}"}).json()["job_id"]
+    status = _wait_for(lambda: (s := client.get(f"/api/v1/jobs/{job_id}").json())["status"] in (SUCCEEDED, FAILED) and s)
+    assert status["status"] == FAILED
+    assert "Unknown file ID" in status["error"]
+
+
+def test_parse_async_rejects_invalid_mode(client):
+    response = client.post("/api/v1/parse_async/", json={"document_url": "file_x", "options": {"mode": "bogus"}})
+    assert response.status_code == 400
+
+
+def test_split_and_extract_async_run_as_jobs(client, make_pdf):
+    path = make_pdf(["chained one", "chained two"])
+    with open(path, "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("a.pdf", f, "application/pdf")}).json()["file_id"]
+    parse_job = client.post("/api/v1/parse_async/", json={"document_url": file_id}).json()["job_id"]
+    _wait_for(lambda: client.get(f"/api/v1/jobs/{parse_job}").json()["status"] == SUCCEEDED)
+
+    split = client.post("/api/v1/split_async/", json={
+        "document_url": f"jobid://{parse_job}",
+        "split_description": [{"name": "Intro", "description": "Introduction"}],
+    })
+    extract = client.post("/api/v1/extract_async/", json={"document_url": f"jobid://{parse_job}", "schema": {"type": "object"}})
+    assert split.status_code == 202
+    assert extract.status_code == 202
+
+    for job_id in (split.json()["job_id"], extract.json()["job_id"]):
+        status = _wait_for(lambda: (s := client.get(f"/api/v1/jobs/{job_id}").json())["status"] in (SUCCEEDED, FAILED) and s)
+        assert status["status"] == SUCCEEDED
+        assert status["result"]["usage"] == {"num_pages": 2}
+
+
+def test_async_submissions_are_deduplicated(client, make_pdf):
+    path = make_pdf(["dedupe one", "dedupe two"])
+    with open(path, "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("a.pdf", f, "application/pdf")}).json()["file_id"]
+
+    # Equivalent options (explicit default mode, same pages in another order) share one job
+    first = client.post("/api/v1/parse_async/", json={"document_url": file_id, "options": {"pages": "1,2"}}).json()
+    second = client.post("/api/v1/parse_async/", json={
+        "document_url": file_id, "options": {"mode": "text_and_tables", "pages": "2,1"}, "priority": 3,
+    }).json()
+    assert not first["deduplicated"]
+    assert second["deduplicated"] and second["job_id"] == first["job_id"]
+    _wait_for(lambda: client.get(f"/api/v1/jobs/{first['job_id']}").json()["status"] == SUCCEEDED)
+    assert client.post("/api/v1/parse_async/", json={"document_url": file_id, "options": {"pages": "1,2"}}).json()["job_id"] == first["job_id"]
+
+    other = client.post("/api/v1/parse_async/", json={"document_url": file_id, "options": {"mode": "text"}}).json()
+    assert not other["deduplicated"] and other["job_id"] != first["job_id"]
+
+    split = {"document_url": file_id, "split_description": [{"name": "A", "description": "a"}]}
+    headers = {"Idempotency-Key": "split-1"}
+    split_job = client.post("/api/v1/split_async/", json=split, headers=headers).json()
+    assert client.post("/api/v1/split_async/", json=split, headers=headers).json()["job_id"] == split_job["job_id"]
+    split["split_rules"] = {"contiguous": False}
+    assert client.post("/api/v1/split_async/", json=split, headers=headers).status_code == 422
+
+
+def test_url_documents_are_parsed_again_once_their_job_finished(client, make_pdf, tmp_path):
+    make_pdf(["first version"], name="remote.pdf")
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    request = {"document_url": f"http://127.0.0.1:{server.server_port}/remote.pdf", "options": {"mode": "text"}}
+    try:
+        first = client.post("/api/v1/parse_async/", json=request).json()["job_id"]
+        status = _wait_for(lambda: _finished(client.get(f"/api/v1/jobs/{first}").json()))
+        assert "first version" in status["result"]["pages"][0]["text"]
+
+        # The document changed behind the same URL: the finished job is not reused
+        make_pdf(["second version"], name="remote.pdf")
+        second = client.post("/api/v1/parse_async/", json=request).json()
+        assert not second["deduplicated"] and second["job_id"] != first
+        status = _wait_for(lambda: _finished(client.get(f"/api/v1/jobs/{second['job_id']}").json()))
+        assert "second version" in status["result"]["pages"][0]["text"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _finished(status):
+    return status if status["status"] in (SUCCEEDED, FAILED) else None
+
+
+def test_unknown_job_returns_404(client):
+    assert client.get("/api/v1/jobs/does-not-exist").status_code == 404
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from app.core.metrics import Counter, Histogram, Registry, stage_timer, STAGE_DURATION
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(Histogram("test_seconds", "Test latency.", ("route",), buckets=(0.1, 1.0)))
+    counter = registry.register(Counter("test_total", "Test count.", ("route",)))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, route="/a")
+    counter.inc(route='/say "hi"')
+
+    text = registry.render()
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{route="/a",le="1"} 3' in text
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'test_seconds_count{route="/a"} 4' in text
+    assert 'test_seconds_sum{route="/a"} 6.05' in text
+    assert 'test_total{route="/say \\"hi\\""} 1' in text
+
+
+def test_stage_timer_records_outcome():
+    before = STAGE_DURATION.count(stage="test_stage", mode="", outcome="error")
+    with pytest.raises(RuntimeError):
+        with stage_timer("test_stage"):
+            raise RuntimeError("boom")
+    with stage_timer("test_stage"):
+        pass
+    assert STAGE_DURATION.count(stage="test_stage", mode="", outcome="error") == before + 1
+    assert STAGE_DURATION.count(stage="test_stage", mode="", outcome="ok") >= 1
+
+
+def test_observe_overhead_is_small():
+    histogram = Histogram("overhead_seconds", "Overhead.", ("route", "method", "outcome"))
+    start = time.perf_counter()
+    for _ in range(20000):
+        histogram.observe(0.01, route="/api/v1/parse/", method="POST", outcome="success")
+    assert (time.perf_counter() - start) / 20000 < 50e-6
+
+
+def test_metrics_endpoint_reports_routes_and_stages(client, make_pdf):
+    path = make_pdf(["metrics page one", "metrics page two"])
+    with open(path, "rb") as f:
+        assert client.post("/api/v1/parse/", files={"file": ("m.pdf", f, "application/pdf")}, data={"mode": "text"}).status_code == 200
+    assert client.get("/api/v1/jobs/async-missing").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'docuparse_http_requests_total{route="/api/v1/parse/",method="POST",outcome="success",mode="text"}' in text
+    # Route templates, not raw paths, keep label cardinality bounded
+    assert 'route="/api/v1/jobs/{job_id}",method="GET",outcome="client_error",mode=""' in text
+    assert 'docuparse_stage_duration_seconds_count{stage="upload_write",mode="",outcome="ok"}' in text
+    assert 'docuparse_stage_duration_seconds_count{stage="parse",mode="text",outcome="ok"}' in text
+    assert 'docuparse_stage_duration_seconds_count{stage="serialize",mode="text",outcome="ok"}' in text
+    assert 'docuparse_pages_parsed_total{mode="text",outcome="ok"}' in text
+    assert 'docuparse_parse_cache_lookups_total{outcome="miss"}' in text
+    assert 'route="/metrics"' not in text
+
+
+def test_job_queue_wait_is_recorded(client, make_pdf):
+    path = make_pdf(["queued page"])
+    with open(path, "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("q.pdf", f, "application/pdf")}).json()["file_id"]
+    job_id = client.post("/api/v1/parse_async/", json={"document_url": file_id}).json()["job_id"]
+    deadline = time.time() + 10
+    while client.get(f"/api/v1/jobs/{job_id}").json()["status"] != "succeeded" and time.time() < deadline:
+        time.sleep(0.05)
+
+    text = client.get("/metrics").text
+    assert 'docuparse_job_queue_wait_seconds_count{job_type="parse"}' in text
+    assert 'docuparse_job_duration_seconds_count{job_type="parse",outcome="succeeded"}' in text
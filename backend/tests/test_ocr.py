@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from app.core import ocr, parser
+from app.core.ocr import FakeOcrEngine, OcrError, load_ocr_engine, plan_ocr_batches
+from app.core.parser import parse_document
+
+
+@pytest.fixture(autouse=True)
+def fake_ocr(monkeypatch, tmp_path):
+    monkeypatch.setenv("PARSER_WORKERS", "1")
+    # Fake OCR text names the page and batch, so pages must not be reused across tests
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("OCR_ENGINE", "fake")
+    monkeypatch.setenv("OCR_DPI", "50")
+    monkeypatch.setattr(ocr, "_availability", {})
+    yield
+    parser.shutdown_process_pool()
+    ocr.shutdown_ocr_pool()
+
+
+def _scanned_pdf(path, kinds):
+    """One page per entry: "text" pages have a text layer, "scan" pages are a full-page image."""
+    import pymupdf
+
+    doc = pymupdf.open()
+    for n, kind in enumerate(kinds, start=1):
+        page = doc.new_page()
+        if kind == "text":
+            page.insert_text((72, 72), f"Real text layer on page {n}. " * 3)
+        else:
+            pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 60, 80), False)
+            pixmap.clear_with(230)
+            page.insert_image(page.rect, pixmap=pixmap)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_plan_ocr_batches():
+    assert plan_ocr_batches([7, 1, 3, 4, 9], 2) == [[1, 3], [4, 7], [9]]
+    assert plan_ocr_batches([], 8) == []
+
+
+def test_load_ocr_engine():
+    assert isinstance(load_ocr_engine("fake"), FakeOcrEngine)
+    assert isinstance(load_ocr_engine("app.core.ocr:FakeOcrEngine"), FakeOcrEngine)
+    with pytest.raises(OcrError):
+        load_ocr_engine("no-such-engine")
+
+
+def test_only_pages_without_text_layer_are_ocrd(tmp_path):
+    path = _scanned_pdf(tmp_path / "mixed.pdf", ["text", "scan", "text", "scan"])
+
+    parsed = asyncio.run(parse_document(path, mode="text", ocr_enabled=True))
+
+    text_page, scanned_page = parsed.pages[0], parsed.pages[1]
+    assert "Real text layer on page 1" in text_page.text
+    assert "ocr_engine" not in text_page.metadata
+    assert text_page.metadata["text_coverage"] > 0
+    assert scanned_page.text.startswith("OCR text of page 2")
+    assert scanned_page.metadata["ocr_engine"] == "fake"
+    assert scanned_page.metadata["image_coverage"] > 0.9
+    assert "needs_ocr" not in scanned_page.metadata
+    assert parsed.pages[3].text.startswith("OCR text of page 4")
+
+
+def test_scanned_pages_are_batched(tmp_path, monkeypatch):
+    monkeypatch.setenv("OCR_BATCH_SIZE", "2")
+    path = _scanned_pdf(tmp_path / "scans.pdf", ["scan"] * 5)
+
+    parsed = asyncio.run(parse_document(path, mode="text", ocr_enabled=True))
+
+    assert [page.text.split("batch of ")[1] for page in parsed.pages] == ["2)", "2)", "2)", "2)", "1)"]
+
+
+def test_ocr_is_skipped_unless_enabled(tmp_path):
+    path = _scanned_pdf(tmp_path / "scan.pdf", ["scan"])
+
+    parsed = asyncio.run(parse_document(path, mode="text"))
+
+    assert parsed.pages[0].text == ""
+    assert "image_coverage" not in parsed.pages[0].metadata
+
+
+def test_engine_failure_keeps_page(tmp_path, monkeypatch):
+    monkeypatch.setenv("OCR_ENGINE", "no-such-engine")
+    path = _scanned_pdf(tmp_path / "scan.pdf", ["scan"])
+
+    parsed = asyncio.run(parse_document(path, mode="text", ocr_enabled=True))
+
+    assert parsed.failed_pages == []
+    assert "Unknown OCR engine" in parsed.pages[0].metadata["ocr_error"]
+
+
+class FailingOcrEngine(FakeOcrEngine):
+    """Loads (so OCR is offered) but fails every batch, like an engine with a broken install."""
+
+    def recognize(self, images):
+        raise OcrError("recognition failed")
+
+
+def test_results_with_failed_ocr_are_not_cached(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("OCR_ENGINE", "tests.test_ocr:FailingOcrEngine")
+    payload = _scanned_pdf(tmp_path / "scan.pdf", ["scan"]).read_bytes()
+    files = {"file": ("scan.pdf", payload, "application/pdf")}
+
+    first = client.post("/api/v1/parse/", files=files, data={"mode": "text", "ocr_enabled": "true"})
+    second = client.post("/api/v1/parse/", files=files, data={"mode": "text", "ocr_enabled": "true"})
+
+    assert first.status_code == 200
+    assert "recognition failed" in first.json()["pages"][0]["metadata"]["ocr_error"]
+    assert [first.headers["x-cache"], second.headers["x-cache"]] == ["miss", "miss"]
+
+
+def test_ocr_requests_are_refused_when_the_engine_cannot_load(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("OCR_ENGINE", "no-such-engine")
+    files = {"file": ("scan.pdf", _scanned_pdf(tmp_path / "scan.pdf", ["scan"]).read_bytes(), "application/pdf")}
+
+    refused = client.post("/api/v1/parse/", files=files, data={"mode": "text", "ocr_enabled": "true"})
+    without_ocr = client.post("/api/v1/parse/", files=files, data={"mode": "text"})
+
+    assert refused.status_code == 503
+    assert "Unknown OCR engine 'no-such-engine'" in refused.json()["detail"]
+    assert without_ocr.status_code == 200
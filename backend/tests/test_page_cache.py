@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.core import parser
+from app.core.page_cache import decode_page, lookup_pages, store_pages
+from app.core.parser import _fingerprint_pages, iter_pages, parse_document
+from app.core.serialization import dumps
+from app.models.compact import FigureRecord, PageRecord, TableRecord
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("PARSER_WORKERS", "1")
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache"))
+    yield
+    parser.shutdown_process_pool()
+
+
+def _parse(path, **kwargs):
+    return asyncio.run(parse_document(path, mode="text", **kwargs))
+
+
+def test_fingerprints_follow_page_content_not_position(make_pdf):
+    original = make_pdf(["clause one", "clause two", "clause three"], name="v1.pdf")
+    # Re-saved revision: a cover page shifts every object number, page 3 is amended
+    revised = make_pdf(["cover", "clause one", "clause two", "clause three (amended)"], name="v2.pdf")
+
+    before = _fingerprint_pages(str(original), range(3))
+    after = _fingerprint_pages(str(revised), range(4))
+
+    assert after[1:3] == before[:2]
+    assert after[3] != before[2]
+    assert len(set(after)) == 4
+
+
+def test_revision_reuses_unchanged_pages(make_pdf):
+    first = _parse(make_pdf(["clause one", "clause two", "clause three"], name="v1.pdf"))
+    assert [page.metadata["reused"] for page in first.pages] == [False, False, False]
+
+    progress = []
+
+    async def on_progress(done, total):
+        progress.append((done, total))
+
+    revised = make_pdf(["cover", "clause one", "clause two", "clause three (amended)"], name="v2.pdf")
+    second = _parse(revised, on_progress=on_progress)
+
+    assert [page.page_number for page in second.pages] == [1, 2, 3, 4]
+    assert [page.metadata["reused"] for page in second.pages] == [False, True, True, False]
+    assert "clause one" in second.pages[1].text
+    assert second.pages[1].metadata["fingerprint"] == first.pages[0].metadata["fingerprint"]
+    # The two reused pages count as done before any range is parsed
+    assert progress[:2] == [(0, 4), (2, 4)]
+    assert progress[-1] == (4, 4)
+
+    # Output depends on the mode, so another mode parses every page again
+    tables = asyncio.run(parse_document(revised, mode="text_and_tables"))
+    assert not any(page.metadata["reused"] for page in tables.pages)
+
+
+def test_streaming_interleaves_reused_pages(make_pdf):
+    _parse(make_pdf(["alpha", "beta"], name="v1.pdf"))
+    revised = make_pdf(["new", "alpha", "changed", "beta"], name="v2.pdf")
+
+    async def collect():
+        return [page async for page in iter_pages(revised, 4, mode="text")]
+
+    pages = asyncio.run(collect())
+    assert [(page.page_number, page.metadata["reused"]) for page in pages] == [(1, False), (2, True), (3, False), (4, True)]
+
+
+def test_failed_pages_are_not_cached():
+    failed = PageRecord(1, "", metadata={"error": "boom"})
+    ocr_failed = PageRecord(2, "", metadata={"ocr_error": "OcrError: no engine"})
+    ok = PageRecord(3, "fine")
+
+    assert store_pages([("failed", failed), ("ocr", ocr_failed), ("ok", ok)]) == 1
+    assert lookup_pages({0: "failed", 1: "ocr", 2: "ok"}).keys() == {2}
+
+
+def test_disabled_page_cache(make_pdf, monkeypatch):
+    monkeypatch.setenv("PAGE_CACHE_ENABLED", "0")
+    path = make_pdf(["same page"])
+    _parse(path)
+    page = _parse(path).pages[0]
+    assert "reused" not in page.metadata and "fingerprint" not in page.metadata
+
+
+def test_decoded_pages_are_renumbered():
+    page = PageRecord(2, "text", [TableRecord.from_rows([["a", "b"]], [0, 0, 1, 1], 2)], [FigureRecord([0, 0, 1, 1], None, 2)], {"width": 10})
+    moved = decode_page(dumps(page), 5)
+    assert moved.page_number == 5
+    assert moved.tables[0].page_number == moved.figures[0].page_number == 5
+    assert moved.tables[0].rows() == [("a", "b")]
+    assert moved.metadata == {"width": 10}
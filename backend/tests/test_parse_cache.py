@@ -0,0 +1,74 @@
+import os
+import time
+
+from app.core.cache import ParseResultCache, make_cache_key
+
+
+def test_cache_key_depends_on_every_component():
+    base = make_cache_key("abc", "text", False, "1")
+    assert base == make_cache_key("abc", "text", False, "1")
+    assert base != make_cache_key("abd", "text", False, "1")
+    assert base != make_cache_key("abc", "full", False, "1")
+    assert base != make_cache_key("abc", "text", True, "1")
+    assert base != make_cache_key("abc", "text", False, "2")
+
+
+def test_memory_tier_is_byte_bounded_lru(tmp_path):
+    cache = ParseResultCache(tmp_path, memory_max_bytes=25, disk_max_bytes=0)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"y" * 10)
+    assert cache.get("a") == b"x" * 10  # "a" is now most recently used
+    cache.put("c", b"z" * 10)
+
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["memory_evictions"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["memory_bytes"] == 20
+
+
+def test_disk_tier_survives_restart_and_evicts_by_size(tmp_path):
+    cache = ParseResultCache(tmp_path, memory_max_bytes=1024, disk_max_bytes=1024)
+    cache.put("old", b"1" * 600)
+    old_path = cache._path_for("old")
+    os.utime(old_path, (time.time() - 60, time.time() - 60))
+    cache.put("new", b"2" * 600)
+    assert cache.stats()["disk_evictions"] == 1
+
+    restarted = ParseResultCache(tmp_path, memory_max_bytes=1024, disk_max_bytes=1024)
+    assert restarted.get("old") is None
+    assert restarted.get("new") == b"2" * 600
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.get("new") == b"2" * 600
+    assert restarted.stats()["memory_hits"] == 1
+
+
+def test_parse_endpoint_serves_repeat_requests_from_cache(client, make_pdf, monkeypatch):
+    path = make_pdf(["cached page"], name="cached.pdf")
+    payload = path.read_bytes()
+
+    first = client.post("/api/v1/parse/", files={"file": ("a.pdf", payload, "application/pdf")}, data={"mode": "text"})
+    assert first.headers["x-cache"] == "miss"
+
+    async def fail_parse(*args, **kwargs):
+        raise AssertionError("cache hit should not re-parse")
+
+    monkeypatch.setattr("app.api.v1.endpoints.parse.parse_document", fail_parse)
+    second = client.post("/api/v1/parse/", files={"file": ("b.pdf", payload, "application/pdf")}, data={"mode": "text"})
+
+    assert second.status_code == 200
+    assert second.headers["x-cache"] == "hit"
+    assert second.json()["source_filename"] == "b.pdf"
+    assert {**second.json(), "source_filename": "a.pdf"} == first.json()
+
+    stats = client.get("/api/v1/parse/cache/stats").json()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_parse_cache_is_keyed_by_mode(client, make_pdf):
+    payload = make_pdf(["mode page"]).read_bytes()
+    files = {"file": ("m.pdf", payload, "application/pdf")}
+    assert client.post("/api/v1/parse/", files=files, data={"mode": "text"}).headers["x-cache"] == "miss"
+    assert client.post("/api/v1/parse/", files=files, data={"mode": "full"}).headers["x-cache"] == "miss"
@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+
+from app.api.v1.endpoints import parse as parse_endpoint
+from app.core import parser
+from app.core.parser import iter_pages
+
+
+@pytest.fixture
+def app_env():
+    return {"PARSER_WORKERS": "2"}
+
+
+def test_iter_pages_yields_in_order_with_small_window(make_pdf, monkeypatch):
+    monkeypatch.setenv("PARSER_WORKERS", "2")
+    path = make_pdf([f"streamed page {n}" for n in range(1, 26)])
+
+    async def collect():
+        return [page async for page in iter_pages(path, 25, mode="text", window=1)]
+
+    try:
+        pages = asyncio.run(collect())
+    finally:
+        parser.shutdown_process_pool()
+
+    assert [page.page_number for page in pages] == list(range(1, 26))
+    assert "streamed page 25" in pages[-1].text
+
+
+def _ndjson_events(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_parse_streams_ndjson(client, make_pdf):
+    path = make_pdf(["first", "second", "third"], metadata={"title": "Streamed"})
+    with open(path, "rb") as f:
+        response = client.post("/api/v1/parse/?stream=ndjson", files={"file": ("s.pdf", f, "application/pdf")}, data={"mode": "text"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = _ndjson_events(response)
+    assert [event["type"] for event in events] == ["metadata", "page", "page", "page", "end"]
+    assert events[0]["page_count"] == 3
+    assert events[0]["metadata"]["title"] == "Streamed"
+    assert events[0]["source_filename"] == "s.pdf"
+    assert [event["page_number"] for event in events[1:4]] == [1, 2, 3]
+    assert "third" in events[3]["text"]
+    assert events[-1] == {"type": "end", "failed_pages": []}
+
+
+def test_parse_streams_sse_from_accept_header(client, make_pdf):
+    path = make_pdf(["only page"])
+    with open(path, "rb") as f:
+        response = client.post(
+            "/api/v1/parse/",
+            files={"file": ("s.pdf", f, "application/pdf")},
+            data={"mode": "text"},
+            headers={"Accept": "text/event-stream"},
+        )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [block for block in response.text.split("\n\n") if block]
+    assert [block.splitlines()[0] for block in blocks] == ["event: metadata", "event: page", "event: end"]
+    page = json.loads(blocks[1].splitlines()[1][len("data: "):])
+    assert "only page" in page["text"]
+
+
+def test_stream_replays_cached_result(client, make_pdf):
+    payload = make_pdf(["cached stream"]).read_bytes()
+    files = {"file": ("c.pdf", payload, "application/pdf")}
+    full = client.post("/api/v1/parse/", files=files, data={"mode": "text"}).json()
+
+    response = client.post("/api/v1/parse/?stream=ndjson", files=files, data={"mode": "text"})
+
+    assert response.headers["x-cache"] == "hit"
+    events = _ndjson_events(response)
+    assert events[1]["text"] == full["pages"][0]["text"]
+
+
+def test_invalid_stream_format(client, make_pdf):
+    with open(make_pdf(["x"]), "rb") as f:
+        response = client.post("/api/v1/parse/?stream=xml", files={"file": ("x.pdf", f, "application/pdf")})
+    assert response.status_code == 400
+
+
+def test_live_stream_queues_each_page_for_search_as_it_is_sent(make_pdf, monkeypatch):
+    path = make_pdf([f"indexed page {n}" for n in range(1, 5)])
+    calls = []
+    monkeypatch.setattr(parse_endpoint, "enqueue_pages", lambda file_id, pages, key=None: calls.append((list(pages), key)))
+    options = parse_endpoint.ParseOptions(mode="text")
+
+    async def consume(stop_after):
+        events = parse_endpoint._live_events("file_x", "s.pdf", {}, path, 4, None, options, "result-key", "ndjson")
+        received = []
+        async for line in events:
+            event = json.loads(line)
+            if event["type"] == "page":
+                received.append(event["page_number"])
+                # Queued before it was sent, and no page is held back for later
+                assert [[number for number, _ in pages] for pages, _ in calls] == [[n] for n in received]
+                assert f"indexed page {received[-1]}" in calls[-1][0][0][1]
+                if len(received) == stop_after:
+                    await events.aclose()
+                    break
+        return received
+
+    try:
+        # A client leaving early still gets the pages it was sent indexed, but the result is not marked as queued
+        assert asyncio.run(consume(stop_after=2)) == [1, 2]
+        assert [key for _, key in calls] == [None, None]
+
+        calls.clear()
+        assert asyncio.run(consume(stop_after=None)) == [1, 2, 3, 4]
+        assert calls[-1] == ([], "result-key")
+        assert all(key is None for _, key in calls[:-1])
+    finally:
+        parser.shutdown_process_pool()
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import parser
+from app.core.parser import ParseError, assemble_pages, parse_document, parse_page_spec, plan_page_ranges, select_pages
+from app.main import app
+from app.models.compact import PageRecord
+
+
+@pytest.fixture(autouse=True)
+def small_pool(monkeypatch, tmp_path):
+    """Use a small process pool and make sure it is torn down after each test."""
+    monkeypatch.setenv("PARSER_WORKERS", "2")
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache"))
+    yield
+    parser.shutdown_process_pool()
+
+
+def test_plan_page_ranges_covers_every_page_once():
+    ranges = plan_page_ranges(300, 4)
+    covered = [index for start, stop in ranges for index in range(start, stop)]
+    assert covered == list(range(300))
+    assert max(stop - start for start, stop in ranges) <= parser.MAX_PAGES_PER_TASK
+    assert plan_page_ranges(0, 4) == []
+
+
+def test_plan_page_ranges_with_selection_keeps_runs_contiguous():
+    selected = [0, 1, 2, 9, 50, 51]
+    ranges = plan_page_ranges(100, 1, page_indices=selected)
+    assert [index for start, stop in ranges for index in range(start, stop)] == selected
+    assert (9, 10) in ranges and (50, 52) in ranges
+
+
+def test_parse_page_spec_and_select_pages():
+    assert parse_page_spec("1-3, 10,20-") == [(1, 3), (10, 10), (20, None)]
+    assert parse_page_spec("-2") == [(1, 2)]
+    for bad in ("", "0", "3-1", "a-b"):
+        with pytest.raises(ValueError):
+            parse_page_spec(bad)
+
+    assert select_pages(10) is None
+    assert select_pages(10, "2-3,9-") == [1, 2, 8, 9]
+    assert select_pages(10, "3,1,3,40") == [0, 2]
+    assert select_pages(10, max_pages=3) == [0, 1, 2]
+    assert select_pages(10, "5-", max_pages=2) == [4, 5]
+
+
+def test_pdf_date_to_iso():
+    assert parser._pdf_date_to_iso("D:20240101120000Z") == "2024-01-01T12:00:00Z"
+    assert parser._pdf_date_to_iso("D:20240102153000+05'30'") == "2024-01-02T15:30:00+05:30"
+    assert parser._pdf_date_to_iso("") is None
+
+
+def test_parse_document_returns_pages_in_order(make_pdf):
+    texts = [f"Content of page {n}" for n in range(1, 41)]
+    path = make_pdf(texts, metadata={"author": "Jane Doe", "title": "Report", "creationDate": "D:20240101120000Z"})
+
+    parsed = asyncio.run(parse_document(path, mode="text"))
+
+    assert parsed.page_count == 40
+    assert [page.page_number for page in parsed.pages] == list(range(1, 41))
+    assert all(f"Content of page {page.page_number}" in page.text for page in parsed.pages)
+    assert parsed.failed_pages == []
+    assert parsed.metadata.author == "Jane Doe"
+    assert parsed.metadata.title == "Report"
+    assert parsed.metadata.creation_date == "2024-01-01T12:00:00Z"
+
+
+def test_parse_document_only_parses_selected_pages(make_pdf, monkeypatch):
+    path = make_pdf([f"Content of page {n}" for n in range(1, 21)])
+    parsed_pages = []
+    real_parse_page = parser._parse_page
+
+    def recording_parse_page(page, page_number, mode):
+        parsed_pages.append(page_number)
+        return real_parse_page(page, page_number, mode)
+
+    # Run in-process so the recording wrapper is visible.
+    monkeypatch.setattr(parser, "_parse_page", recording_parse_page)
+    monkeypatch.setattr(parser, "get_process_pool", lambda: _InlineExecutor())
+
+    parsed = asyncio.run(parse_document(path, mode="text", pages="2-4,18-", max_pages=4))
+
+    assert parsed.page_count == 20
+    assert [page.page_number for page in parsed.pages] == [2, 3, 4, 18]
+    assert sorted(parsed_pages) == [2, 3, 4, 18]
+
+
+def test_parse_document_rejects_non_pdf(tmp_path):
+    path = tmp_path / "not_a.pdf"
+    path.write_bytes(b"definitely not a pdf")
+    with pytest.raises(ParseError):
+        asyncio.run(parse_document(path))
+
+
+def test_page_failure_is_isolated(make_pdf, monkeypatch):
+    path = make_pdf(["one", "two", "three"])
+    real_parse_page = parser._parse_page
+
+    def flaky_parse_page(page, page_number, mode):
+        if page_number == 2:
+            raise RuntimeError("corrupt content stream")
+        return real_parse_page(page, page_number, mode)
+
+    monkeypatch.setattr(parser, "_parse_page", flaky_parse_page)
+    results = parser._parse_page_range(str(path), 0, 3, "text")
+
+    assert [r.page_number for r in results] == [1, 2, 3]
+    assert "corrupt content stream" in results[1].metadata["error"]
+    assert "three" in results[2].text
+
+
+def test_assemble_pages_reports_crashed_ranges():
+    ok = [PageRecord(1, "a")]
+    pages, failed = assemble_pages([(1, 3), (0, 1)], [RuntimeError("worker died"), ok])
+
+    assert [page.page_number for page in pages] == [1, 2, 3]
+    assert failed == [2, 3]
+    assert "worker died" in pages[1].metadata["error"]
+
+
+def test_parse_endpoint(make_pdf):
+    path = make_pdf(["Hello from page one", "Hello from page two"], name="hello.pdf")
+    with TestClient(app) as client:
+        with open(path, "rb") as f:
+            response = client.post(
+                "/api/v1/parse/",
+                files={"file": ("hello.pdf", f, "application/pdf")},
+                data={"mode": "text"},
+            )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["source_filename"] == "hello.pdf"
+    assert data["page_count"] == 2
+    assert "Hello from page two" in data["pages"][1]["text"]
+    assert data["failed_pages"] == []
+    assert data["parsing_mode"] == "text"
+
+
+def test_parse_endpoint_page_selection(make_pdf):
+    path = make_pdf([f"Page {n}" for n in range(1, 11)], name="ten.pdf")
+    with TestClient(app) as client:
+        with open(path, "rb") as f:
+            response = client.post(
+                "/api/v1/parse/",
+                files={"file": ("ten.pdf", f, "application/pdf")},
+                data={"mode": "text", "pages": "8-", "max_pages": "2"},
+            )
+        with open(path, "rb") as f:
+            everything = client.post("/api/v1/parse/", files={"file": ("ten.pdf", f, "application/pdf")}, data={"mode": "text"})
+        with open(path, "rb") as f:
+            bad = client.post("/api/v1/parse/", files={"file": ("ten.pdf", f, "application/pdf")}, data={"pages": "5-2"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["page_count"] == 10
+    assert [page["page_number"] for page in data["pages"]] == [8, 9]
+    # A different selection must not be served from the cached subset.
+    assert everything.headers["X-Cache"] == "miss"
+    assert len(everything.json()["pages"]) == 10
+    assert bad.status_code == 400
+
+
+def test_parse_endpoint_rejects_unknown_mode(make_pdf):
+    path = make_pdf(["x"])
+    with TestClient(app) as client:
+        with open(path, "rb") as f:
+            response = client.post("/api/v1/parse/", files={"file": ("x.pdf", f, "application/pdf")}, data={"mode": "everything"})
+    assert response.status_code == 400
+
+
+class _InlineExecutor:
+    """Executor stand-in that runs submitted work in the calling process."""
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
@@ -0,0 +1,107 @@
+import time
+from dataclasses import replace
+
+import pytest
+
+from app.api.v1.endpoints import parse as parse_endpoint
+from app.core.jobs import FAILED, RUNNING, SUCCEEDED
+from app.core.result_store import ParseResultStore
+from app.core.serialization import dumps
+
+
+def _body(page_numbers):
+    return dumps({
+        "page_count": 10,
+        "metadata": {"title": "t"},
+        "pages": [{"page_number": n, "text": f"page {n}", "tables": [], "figures": [], "metadata": {}} for n in page_numbers],
+    })
+
+
+def test_round_trip_with_lazy_page_access(tmp_path):
+    store = ParseResultStore(tmp_path)
+    store.write_body("ab" * 32, _body([5, 2, 9]))
+
+    with store.open_key("ab" * 32) as result:
+        assert result.page_numbers == [2, 5, 9]
+        assert len(result) == 3 and result.page_count == 10
+        assert result.metadata == {"title": "t"}
+        assert 5 in result and 3 not in result
+        assert result.page(9)["text"] == "page 9"
+        assert [page["page_number"] for page in result.pages([9, 2])] == [9, 2]
+        with pytest.raises(KeyError):
+            result.page(3)
+    assert store.open_key("cd" * 32) is None
+
+
+def test_job_links_and_sweep(tmp_path):
+    store = ParseResultStore(tmp_path)
+    store.write_body("ab" * 32, _body([1]))
+    store.link_job("job-1", "ab" * 32)
+
+    with store.open_job("job-1") as result:
+        assert result.page(1)["text"] == "page 1"
+    assert store.sweep(ttl_seconds=3600) == 0
+    assert store.sweep(ttl_seconds=3600, now=time.time() + 7200) == 2
+    assert store.open_job("job-1") is None
+
+
+def _finished(client, job_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f"/api/v1/jobs/{job_id}").json()
+        if status["status"] in (SUCCEEDED, FAILED):
+            return status
+        time.sleep(0.05)
+    raise AssertionError("job did not finish in time")
+
+
+def test_split_and_extract_reuse_parse_job_without_reparsing(client, make_pdf, monkeypatch):
+    path = make_pdf(["alpha", "beta", "gamma"])
+    with open(path, "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("a.pdf", f, "application/pdf")}).json()["file_id"]
+    job_id = client.post("/api/v1/parse_async/", json={"document_url": file_id}).json()["job_id"]
+    assert _finished(client, job_id)["status"] == SUCCEEDED
+
+    async def no_parsing(*args, **kwargs):
+        raise AssertionError("document was parsed again")
+    monkeypatch.setattr(parse_endpoint, "parse_document", no_parsing)
+
+    split = client.post("/api/v1/split/", json={
+        "document_url": f"jobid://{job_id}",
+        "split_description": [{"name": "Intro", "description": "Introduction"}],
+    })
+    extract = client.post("/api/v1/extract/", json={"document_url": f"jobid://{job_id}", "schema": {"type": "object"}})
+
+    assert split.status_code == 200
+    assert split.json()["usage"] == {"num_pages": 3}
+    assert extract.status_code == 200
+    assert extract.json()["usage"] == {"num_pages": 3}
+
+
+def test_file_ids_are_parsed_once_and_stored(client, make_pdf, monkeypatch):
+    path = make_pdf(["one", "two"])
+    with open(path, "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("a.pdf", f, "application/pdf")}).json()["file_id"]
+    calls = []
+    real_parse = parse_endpoint.parse_document
+
+    async def counting_parse(*args, **kwargs):
+        calls.append(args)
+        return await real_parse(*args, **kwargs)
+    monkeypatch.setattr(parse_endpoint, "parse_document", counting_parse)
+
+    for _ in range(2):
+        response = client.post("/api/v1/extract/", json={"document_url": file_id, "schema": {"type": "object"}})
+        assert response.json()["usage"] == {"num_pages": 2}
+    assert len(calls) == 1
+
+
+def test_unknown_and_unfinished_parse_jobs(client, monkeypatch):
+    response = client.post("/api/v1/extract/", json={"document_url": "jobid://does-not-exist", "schema": {"type": "object"}})
+    assert response.status_code == 404
+
+    store = parse_endpoint.get_job_engine().store
+    running = replace(store.submit("test-never-claimed", {}), job_type="parse", status=RUNNING)
+    monkeypatch.setattr(store, "get", lambda job_id: running if job_id == running.job_id else None)
+    response = client.post("/api/v1/extract/", json={"document_url": f"jobid://{running.job_id}", "schema": {"type": "object"}})
+    assert response.status_code == 409
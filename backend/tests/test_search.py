@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.core import search_queue
+from app.core.search_index import MERGE_FACTOR, SearchIndex, make_snippet
+from app.core.search_queue import flush_pending, pending_pages
+
+
+@pytest.fixture
+def app_env():
+    # Tests flush the queue themselves
+    return {"SEARCH_INDEX_FLUSH_SECONDS": "3600"}
+
+
+def test_bm25_ranking_and_page_hits(tmp_path):
+    index = SearchIndex(tmp_path / "search")
+    added = index.add_documents([
+        ("doc-a", [(1, "invoice total due"), (2, "terms and conditions")]),
+        ("doc-b", [(1, "invoice invoice invoice summary"), (3, "")]),
+    ])
+    assert added == 3
+
+    total, hits = index.search("invoice")
+    assert total == 2
+    assert [(hit.file_id, hit.page_number) for hit in hits] == [("doc-b", 1), ("doc-a", 1)]
+    assert hits[0].score > hits[1].score > 0
+    assert hits[0].snippet == "invoice invoice invoice summary"
+
+    # Any term matches; rarer terms weigh more
+    total, hits = index.search("conditions summary", limit=1)
+    assert total == 2 and len(hits) == 1
+    assert index.search("nothing here") == (0, [])
+
+
+def test_already_indexed_pages_are_skipped_and_index_reopens(tmp_path):
+    index = SearchIndex(tmp_path / "search")
+    index.add_documents([("doc", [(1, "alpha"), (2, "beta")])])
+    assert index.add_documents([("doc", [(1, "alpha"), (2, "beta")])]) == 0
+    assert index.add_documents([("doc", [(3, "gamma")])]) == 1
+
+    reopened = SearchIndex(tmp_path / "search")
+    assert reopened.stats()["pages"] == 3
+    assert reopened.stats()["documents"] == 1
+    assert reopened.add_documents([("doc", [(2, "beta")])]) == 0
+    assert [hit.page_number for hit in reopened.search("gamma")[1]] == [3]
+
+
+def test_segments_are_merged_and_orphans_removed(tmp_path):
+    root = tmp_path / "search"
+    index = SearchIndex(root)
+    for i in range(MERGE_FACTOR):
+        index.add_documents([(f"doc-{i}", [(1, f"common word{i}")])])
+    assert index.stats()["segments"] == 1
+    assert index.stats()["pages"] == MERGE_FACTOR
+    total, hits = index.search("common word3")
+    assert total == MERGE_FACTOR
+    assert hits[0].file_id == "doc-3"
+
+    # A segment written but never published (crash before the manifest swap) is dropped at open
+    (root / "segments" / "seg-orphan").mkdir()
+    SearchIndex(root)
+    assert sorted(p.name for p in (root / "segments").iterdir()) == json.loads((root / "manifest.json").read_text())["segments"]
+
+
+def test_processes_sharing_an_index_see_each_others_segments(tmp_path):
+    # Two instances over one directory stand in for two uvicorn workers
+    first, second = SearchIndex(tmp_path / "search"), SearchIndex(tmp_path / "search")
+    first.add_documents([("doc-a", [(1, "shared alpha")])])
+    second.add_documents([("doc-b", [(1, "shared beta")])])
+    # Already indexed by the other worker
+    assert second.add_documents([("doc-a", [(1, "shared alpha")])]) == 0
+
+    for index in (first, second):
+        assert index.search("shared")[0] == 2
+        assert index.stats()["segments"] == 2
+
+    for i in range(MERGE_FACTOR):
+        (first if i % 2 else second).add_documents([(f"doc-{i}", [(1, f"shared gamma{i}")])])
+    assert first.search("shared")[0] == second.search("shared")[0] == MERGE_FACTOR + 2
+    assert first.stats()["segments"] == second.stats()["segments"]
+
+
+def test_snippet_is_cut_at_word_boundaries():
+    text = " ".join(f"word{i}" for i in range(100)) + " needle " + " ".join(f"tail{i}" for i in range(100))
+    snippet = make_snippet(text, ["needle"], width=60)
+    assert "needle" in snippet
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert len(snippet) <= 62
+    assert all(part.startswith(("word", "tail", "needle", "…")) for part in snippet.strip("…").split())
+
+
+def test_parsed_pages_become_searchable(client, make_pdf):
+    asyncio.run(flush_pending())
+    pdf = make_pdf(["quarterly revenue report", "unrelated appendix"])
+    with open(pdf, "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("report.pdf", f, "application/pdf")}).json()["file_id"]
+    with open(pdf, "rb") as f:
+        assert client.post("/api/v1/parse/", files={"file": ("report.pdf", f, "application/pdf")}).status_code == 200
+
+    # Indexing happens after the response, in the background
+    assert pending_pages() == 2
+    assert asyncio.run(flush_pending()) == 2
+
+    response = client.get("/api/v1/search", params={"q": "revenue"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_hits"] == 1
+    assert body["results"][0]["file_id"] == file_id
+    assert body["results"][0]["page_number"] == 1
+    assert "revenue" in body["results"][0]["snippet"]
+
+    stats = client.get("/api/v1/search/stats").json()
+    assert stats["pages"] == 2 and stats["pending_pages"] == 0
+    assert client.get("/api/v1/search", params={"q": "!!!"}).status_code == 400
+
+
+def test_cache_hits_requeue_pages_lost_before_a_flush(client, make_pdf, monkeypatch):
+    monkeypatch.setattr(search_queue, "_queued_results", set())
+    asyncio.run(flush_pending())
+    pdf = make_pdf(["lost ledger page", "second page"])
+    files = {"file": ("ledger.pdf", pdf.read_bytes(), "application/pdf")}
+    assert client.post("/api/v1/parse/", files=files).headers["x-cache"] == "miss"
+
+    # A restart before the flush loses the queue
+    search_queue._take_pending()
+    monkeypatch.setattr(search_queue, "_queued_results", set())
+    assert client.post("/api/v1/parse/", files=files).headers["x-cache"] == "hit"
+    assert pending_pages() == 2
+    assert asyncio.run(flush_pending()) == 2
+    assert client.get("/api/v1/search", params={"q": "ledger"}).json()["total_hits"] == 1
+
+    # Later hits, streamed ones included, are not queued again
+    assert client.post("/api/v1/parse/", files=files).headers["x-cache"] == "hit"
+    assert client.post("/api/v1/parse/?stream=ndjson", files=files).headers["x-cache"] == "hit"
+    assert pending_pages() == 0
+
+
+def _finished_job(client, job_id):
+    for _ in range(200):
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_backfill_indexes_stored_documents(client, make_pdf):
+    asyncio.run(flush_pending())
+    pdf = make_pdf(["uploaded but never parsed", "archive page"])
+    file_id = client.post("/api/v1/upload", files={"file": ("archive.pdf", pdf.read_bytes(), "application/pdf")}).json()["file_id"]
+
+    response = client.post("/api/v1/search/backfill")
+    assert response.status_code == 202
+    job = _finished_job(client, response.json()["job_id"])
+    assert job["result"] == {"documents": 1, "failed": 0, "pages_indexed": 2}
+    hits = client.get("/api/v1/search", params={"q": "archive"}).json()["results"]
+    assert [(hit["file_id"], hit["page_number"]) for hit in hits] == [(file_id, 2)]
+    # Nothing is left to backfill
+    job = _finished_job(client, client.post("/api/v1/search/backfill").json()["job_id"])
+    assert job["result"]["documents"] == 0
@@ -0,0 +1,39 @@
+import pickle
+
+from app.core.serialization import dumps, loads
+from app.models.compact import FigureRecord, PageRecord, TableRecord
+from app.models.document import DocumentMetadata, Page
+
+
+def _sample_page():
+    rows = [["Name", "Qty", None], ["Widget", "0", ""], ["Gadget", "0", ""]]
+    table = TableRecord.from_rows(rows, [1.0, 2.0, 3.0, 4.0], page_number=3)
+    figure = FigureRecord([5.0, 6.0, 7.0, 8.0], None, page_number=3)
+    return rows, PageRecord(3, "Inventory", [table], [figure], {"rotation": 0})
+
+
+def test_table_record_is_flat_and_interned():
+    rows, page = _sample_page()
+    table = page.tables[0]
+
+    assert (table.n_rows, table.n_cols) == (3, 3)
+    assert [list(row) for row in table.rows()] == rows
+    assert table.column(0) == ["Name", "Widget", "Gadget"]
+    assert table.cells[4] is table.cells[7]
+    assert TableRecord.from_rows([["a"], ["b", "c"]], None, 1).rows() == [("a", None), ("b", "c")]
+
+
+def test_records_serialize_to_public_schema():
+    rows, page = _sample_page()
+    encoded = loads(dumps({"pages": [page], "metadata": DocumentMetadata(title="T")}))
+
+    validated = Page(**encoded["pages"][0])
+    assert validated.tables[0].data == rows
+    assert validated.figures[0].bbox == [5.0, 6.0, 7.0, 8.0]
+    assert encoded["metadata"]["title"] == "T"
+
+
+def test_records_survive_pickling():
+    _, page = _sample_page()
+    restored = pickle.loads(pickle.dumps(page))
+    assert restored.to_dict() == page.to_dict()
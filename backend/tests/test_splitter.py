@@ -0,0 +1,71 @@
+from app.core.splitter import SplitSection, build_query_matrix, score_pages, split_pages
+
+SECTIONS = [
+    SplitSection("Balance sheet", "Assets, liabilities and equity"),
+    SplitSection("Income statement", "Revenue, expenses and net income"),
+]
+
+
+def test_query_matrix_matches_plural_forms():
+    lookup, query = build_query_matrix([SplitSection("Liability", "Assets")])
+    assert lookup["liabilities"] == lookup["liability"]
+    assert lookup["asset"] == lookup["assets"]
+    assert "and" not in lookup
+    assert query.shape == (2, 1)
+
+
+def test_scores_are_scaled_per_section():
+    scores = score_pages(["total assets and liabilities", "net income and revenue", "unrelated"], SECTIONS)
+    assert scores.shape == (3, 2)
+    assert scores[0].argmax() == 0 and scores[1].argmax() == 1
+    assert scores.max(axis=0).tolist() == [1.0, 1.0]
+    assert scores[2].tolist() == [0.0, 0.0]
+
+
+def test_pages_without_evidence_continue_the_current_section():
+    texts = ["Balance sheet: total assets", "more figures", "Income statement: revenue", "continued", "net income"]
+    assert split_pages([1, 2, 3, 4, 5], texts, SECTIONS) == {
+        "Balance sheet": [1, 2],
+        "Income statement": [3, 4, 5],
+    }
+
+
+def test_split_rules():
+    texts = ["Balance sheet total assets", "assets and revenue", "Income statement net income revenue", "unrelated"]
+    numbers = [1, 2, 3, 4]
+
+    contiguous = split_pages(numbers, texts, SECTIONS)
+    assert contiguous["Balance sheet"] + contiguous["Income statement"] == numbers
+    # Not contiguous: every page to its best section, pages without matches left out
+    independent = split_pages(numbers, texts, SECTIONS, contiguous=False)
+    assert 1 in independent["Balance sheet"] and 3 in independent["Income statement"]
+    assert 4 not in independent["Balance sheet"] + independent["Income statement"]
+    # Overlap: page 2 matches both sections
+    overlapping = split_pages(numbers, texts, SECTIONS, allow_overlap=True, overlap_ratio=0.1)
+    assert 2 in overlapping["Balance sheet"] and 2 in overlapping["Income statement"]
+    # min_score: weak pages fall out of every section
+    strict = split_pages(numbers, texts, SECTIONS, min_score=0.9, switch_penalty=0.0)
+    assert strict == {"Balance sheet": [1], "Income statement": [3]}
+
+
+def test_partition_keys_and_page_numbers():
+    sections = [SplitSection("Statement", "Account statement", "1234"), SplitSection("Statement", "Account statement", "5678")]
+    texts = ["Account 1234 statement", "transactions", "Account 5678 statement", "transactions"]
+    assert split_pages([10, 11, 12, 13], texts, sections) == {"Statement 1234": [10, 11], "Statement 5678": [12, 13]}
+
+
+def test_split_endpoint(client, make_pdf):
+    path = make_pdf(["Balance sheet total assets", "Liabilities continued", "Income statement revenue"])
+    with open(path, "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("a.pdf", f, "application/pdf")}).json()["file_id"]
+    split_description = [item.__dict__ for item in SECTIONS]
+
+    response = client.post("/api/v1/split/", json={"document_url": file_id, "split_description": split_description})
+    assert response.status_code == 200
+    assert response.json()["result"]["section_mapping"] == {"Balance sheet": [1, 2], "Income statement": [3]}
+    assert response.json()["usage"] == {"num_pages": 3}
+
+    response = client.post("/api/v1/split/", json={
+        "document_url": file_id, "split_description": split_description, "split_rules": {"bogus": 1},
+    })
+    assert response.status_code == 400
@@ -0,0 +1,68 @@
+import subprocess
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import startup
+from app.main import app
+
+
+@pytest.fixture
+def app_env():
+    return {"PARSER_WORKERS": "2", "STARTUP_PREWARM": "1"}
+
+
+def _wait_ready(client, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        response = client.get("/ready")
+        if response.status_code == 200:
+            return response.json()
+        time.sleep(0.05)
+    raise AssertionError("server did not become ready in time")
+
+
+def test_ready_after_prewarm(client):
+    assert client.get("/").status_code == 200
+    body = _wait_ready(client)
+
+    assert body["status"] == "ready" and body["prewarm_done"]
+    assert body["components"]["parser_pool"] == {**body["components"]["parser_pool"], "status": "ready", "workers": 2}
+    assert body["components"]["stores"]["status"] == "ready"
+    assert body["components"]["engines"]["status"] == "ready"
+    assert body["timings"]["startup_seconds"] is not None and body["timings"]["import_seconds"] is not None
+    assert 'docuparse_startup_seconds{phase="prewarm"}' in client.get("/metrics").text
+
+
+def test_not_ready_until_prewarm_finishes(client, monkeypatch):
+    monkeypatch.setattr(startup.get_startup_state(), "prewarm_done", False)
+    response = client.get("/ready")
+    assert response.status_code == 503 and response.json()["status"] == "starting"
+
+    monkeypatch.setenv("READY_AFTER_PREWARM", "0")
+    assert client.get("/ready").status_code == 200
+
+
+def test_failed_component_does_not_block_readiness(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("STARTUP_PREWARM", "1")
+
+    async def broken():
+        raise RuntimeError("no engine")
+    monkeypatch.setattr(startup, "_prewarm_steps", lambda: {"engines": broken})
+    with TestClient(app) as client:
+        body = _wait_ready(client)
+    assert body["components"]["engines"]["status"] == "failed"
+    assert "no engine" in body["components"]["engines"]["error"]
+
+
+def test_importing_the_app_does_not_load_engines():
+    code = (
+        "import sys, app.main\n"
+        "heavy = [m for m in ('numpy', 'pymupdf', 'app.core.splitter', 'app.core.extractor', 'app.core.tables') if m in sys.modules]\n"
+        "print(','.join(heavy))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
@@ -0,0 +1,121 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.core import parser
+from app.core.parser import parse_document
+from app.core.tables import find_tables, words_to_arrays
+
+GLYPH = 5.0
+
+
+def _words(placements, height=12.0):
+    """Word tuples for (x, top, text) placements, one box per space-separated token."""
+    words = []
+    for x, top, text in placements:
+        for token in text.split(" "):
+            words.append((x, top, x + len(token) * GLYPH, top + height, token))
+            x += (len(token) + 1) * GLYPH
+    return words
+
+
+def _row(top, *cells, columns=(50, 250, 350)):
+    return [(x, top, text) for x, text in zip(columns, cells) if text]
+
+
+def test_rebuilds_grid_with_empty_and_multiline_cells():
+    placements = (
+        _row(100, "Item", "2023", "2022")
+        + _row(118, "Cash and equivalents", "1,200", "900")
+        + _row(136, "Total operating")
+        + _row(147, "expenses", "4,000", "3,100")
+        + _row(165, "Goodwill", "", "75")
+    )
+    tables = find_tables(*words_to_arrays(_words(placements)))
+
+    assert len(tables) == 1
+    assert tables[0].rows == [
+        ["Item", "2023", "2022"],
+        ["Cash and equivalents", "1,200", "900"],
+        ["Total operating\nexpenses", "4,000", "3,100"],
+        ["Goodwill", None, "75"],
+    ]
+    assert tables[0].bbox == (50.0, 100.0, 375.0, 177.0)
+
+
+def test_separates_tables_and_ignores_prose():
+    prose = [(50, 20, "An introductory paragraph of ordinary prose."), (50, 34, "It wraps onto a second line.")]
+    first = _row(80, "A", "1", "2") + _row(98, "B", "3", "4")
+    heading = [(50, 160, "Second statement")]
+    second = _row(200, "C", "5", "6") + _row(218, "D", "7", "8") + _row(236, "E", "9", "10")
+    tables = find_tables(*words_to_arrays(_words(prose + first + heading + second)))
+
+    assert [table.rows for table in tables] == [
+        [["A", "1", "2"], ["B", "3", "4"]],
+        [["C", "5", "6"], ["D", "7", "8"], ["E", "9", "10"]],
+    ]
+
+
+def test_header_spanning_columns_does_not_merge_them():
+    placements = _row(100, "Item", "Year ended December 31") + _row(118, "", "2023", "2022")
+    for n in range(4):
+        placements += _row(136 + 18 * n, f"Row {n}", f"{n},000", f"{n},500")
+    rows = find_tables(*words_to_arrays(_words(placements)))[0].rows
+
+    assert rows[0] == ["Item", "Year ended December 31", None]
+    assert rows[1] == [None, "2023", "2022"]
+    assert rows[2] == ["Row 0", "0,000", "0,500"]
+
+
+def test_two_column_prose_is_not_a_table():
+    import pymupdf
+
+    text = ("The committee reviewed the proposal in detail and agreed that the budget for the coming year should "
+            "reflect the increased costs of maintenance, staffing and the new reporting obligations. ") * 4
+    doc = pymupdf.open()
+    page = doc.new_page()
+    page.insert_textbox(pymupdf.Rect(72, 72, 290, 500), text, fontsize=10)
+    page.insert_textbox(pymupdf.Rect(310, 72, 530, 500), text, fontsize=10)
+    words = page.get_text("words")
+    doc.close()
+    assert find_tables(*words_to_arrays(words)) == []
+
+    # A column of long descriptions is fine next to a column of short labels
+    placements = []
+    for n, label in enumerate(["Term", "Notice period", "Governing law"]):
+        placements += _row(100 + 18 * n, label, f"clause text that runs on for quite a few words {n}", columns=(50, 200))
+    assert len(find_tables(*words_to_arrays(_words(placements)))) == 1
+
+
+def test_no_words():
+    assert find_tables(np.empty((0, 4)), []) == []
+
+
+@pytest.fixture
+def table_pdf(tmp_path):
+    import pymupdf
+
+    doc = pymupdf.open()
+    page = doc.new_page()
+    page.insert_text((72, 60), "Income statement", fontsize=14)
+    for n, (label, current, prior) in enumerate([("Item", "2023", "2022"), ("Revenue", "10,500", "9,800"), ("Net income", "1,250", "1,100")]):
+        for x, text in zip((72, 300, 400), (label, current, prior)):
+            page.insert_text((x, 100 + 18 * n), text, fontsize=10)
+    path = tmp_path / "statement.pdf"
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_parser_uses_layout_engine(table_pdf, monkeypatch):
+    monkeypatch.setenv("PARSER_WORKERS", "1")
+    try:
+        parsed = asyncio.run(parse_document(table_pdf, mode="tables"))
+    finally:
+        parser.shutdown_process_pool()
+
+    tables = parsed.pages[0].tables
+    assert len(tables) == 1
+    assert [list(row) for row in tables[0].rows()] == [["Item", "2023", "2022"], ["Revenue", "10,500", "9,800"], ["Net income", "1,250", "1,100"]]
+    assert tables[0].page_number == 1
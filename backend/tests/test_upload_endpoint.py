@@ -5,6 +5,11 @@ import pytest
 from fastapi.testclient import TestClient
 import shutil
 import uuid
+import hashlib
+import functools
+import http.server
+import threading
+import time
 
 # Determine the script's directory and the backend directory
 script_dir = Path(__file__).resolve().parent
@@ -28,6 +33,9 @@ except ImportError:
     sys.path.insert(0, Path(__file__).resolve().parent.parent.as_posix())
     from app.main import app
 
+from app.core import parser, storage
+from app.core.blob_store import get_blob_store
+
 # Determine the test upload directory from environment or use a default
 TEST_UPLOAD_DIR_STR = os.getenv("UPLOAD_DIR", "/app/test_uploads")
 TEST_UPLOAD_DIR = Path(TEST_UPLOAD_DIR_STR)
@@ -138,11 +146,14 @@ def test_upload_success(client: TestClient):
     assert data["original_filename"] == test_filename
     assert data["content_type"] == 'application/pdf'
     assert data["file_id"].startswith("file_")
+    assert data["sha256"] == hashlib.sha256(file_content_original).hexdigest()
+    assert data["size_bytes"] == len(file_content_original)
 
-    # Verify the file was actually saved in the test directory and matches the original content
+    # Verify the file was actually saved in the test directory's blob store and matches the original content
     file_id = data["file_id"]
-    expected_path = TEST_UPLOAD_DIR / f"{file_id}.pdf"
-    assert expected_path.exists()
+    expected_path = get_blob_store(TEST_UPLOAD_DIR).resolve(file_id)
+    assert expected_path is not None
+    assert TEST_UPLOAD_DIR.resolve() in expected_path.parents
     assert expected_path.read_bytes() == file_content_original
 
 def test_upload_no_filename(client: TestClient):
@@ -160,6 +171,139 @@ def test_upload_no_filename(client: TestClient):
     assert len(detail) > 0
     assert any("file" in item.get("loc", []) for item in detail) # Check that the error is related to the 'file' field
 
+def test_upload_streams_in_chunks(client: TestClient, monkeypatch):
+    """Uploads larger than one chunk are reassembled and hashed correctly."""
+    monkeypatch.setenv("UPLOAD_CHUNK_SIZE", "4096")
+    content = os.urandom(4096 * 5 + 123)
+    files = {'file': ("chunked.pdf", content, 'application/pdf')}
+    response = client.post("/api/v1/upload", files=files)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["size_bytes"] == len(content)
+    assert data["sha256"] == hashlib.sha256(content).hexdigest()
+
+def test_upload_too_large(client: TestClient, monkeypatch):
+    """Uploads over MAX_UPLOAD_BYTES are rejected with 413 and leave no file behind."""
+    monkeypatch.setenv("UPLOAD_CHUNK_SIZE", "4096")
+    monkeypatch.setenv("MAX_UPLOAD_BYTES", "10000")
+    before = set(TEST_UPLOAD_DIR.rglob("*"))
+    files = {'file': ("too_big.pdf", b"x" * 20000, 'application/pdf')}
+    response = client.post("/api/v1/upload", files=files)
+
+    assert response.status_code == 413
+    assert set(TEST_UPLOAD_DIR.rglob("*")) == before
+
+def _asgi_upload(headers, chunks):
+    """Send a multipart upload straight to the ASGI app; returns (status, body chunks the app read)."""
+    import asyncio
+
+    read = 0
+    messages = []
+
+    async def receive():
+        nonlocal read
+        read += 1
+        return {"type": "http.request", "body": chunks[read - 1], "more_body": read < len(chunks)}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/api/v1/upload", "raw_path": b"/api/v1/upload", "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=xyz"), *headers],
+        "client": ("testclient", 1), "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    return messages[0]["status"], read
+
+def test_oversized_body_is_rejected_before_it_is_read(monkeypatch):
+    """The limit applies while the multipart body is received, not after Starlette has spooled it."""
+    monkeypatch.setenv("MAX_UPLOAD_BYTES", "1000")
+    head = b'--xyz\r\nContent-Disposition: form-data; name="file"; filename="big.pdf"\r\n\r\n'
+    chunks = [head] + [b"x" * 64 * 1024] * 20 + [b"\r\n--xyz--\r\n"]
+
+    # A declared Content-Length over the limit is answered before any of the body is read
+    status, read = _asgi_upload([(b"content-length", str(sum(map(len, chunks))).encode())], chunks)
+    assert (status, read) == (413, 0)
+
+    # Without one (chunked encoding), reading stops once the limit is crossed
+    status, read = _asgi_upload([], chunks)
+    assert status == 413
+    assert read < len(chunks) // 2
+
+def test_upload_deduplicates_identical_content(client: TestClient):
+    """Re-uploading the same bytes returns the same file ID and stores one copy."""
+    content = b"%PDF-1.4 duplicate invoice " + os.urandom(64)
+    first = client.post("/api/v1/upload", files={'file': ("invoice.pdf", content, 'application/pdf')}).json()
+    second = client.post("/api/v1/upload", files={'file': ("invoice-copy.pdf", content, 'application/pdf')}).json()
+
+    assert first["file_id"] == second["file_id"]
+    assert first["deduplicated"] is False
+    assert second["deduplicated"] is True
+
+    info = client.get(f"/api/v1/upload/{first['file_id']}").json()
+    assert info["refcount"] == 2
+    assert info["size_bytes"] == len(content)
+
+    released = client.delete(f"/api/v1/upload/{first['file_id']}").json()
+    assert released["refcount"] == 1
+
+def test_repeat_upload_is_hashed_but_not_written(client: TestClient, monkeypatch):
+    """Content that is already stored gains a reference without being copied to a temp file again."""
+    writes = []
+    original = storage.stream_upload_to_path
+    async def counting_stream(upload, dest, *args):
+        writes.append(dest)
+        return await original(upload, dest, *args)
+    monkeypatch.setattr(storage, "stream_upload_to_path", counting_stream)
+
+    content = b"%PDF-1.4 repeat " + os.urandom(64)
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        assert client.post("/api/v1/upload", files={'file': (name, content, 'application/pdf')}).status_code == 200
+
+    assert len(writes) == 1
+    assert get_blob_store().lookup(hashlib.sha256(content).hexdigest()).refcount == 3
+
+def test_parse_inputs_take_no_lasting_reference(client: TestClient, make_pdf, monkeypatch, tmp_path):
+    """Sync parses and URL downloads release their blob once parsed; uploaded file IDs keep theirs."""
+    monkeypatch.setenv("PARSER_WORKERS", "1")
+    path = make_pdf(["transient page"], name="transient.pdf")
+    content = path.read_bytes()
+    digest = hashlib.sha256(content).hexdigest()
+    files = {'file': ("transient.pdf", content, 'application/pdf')}
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert client.post("/api/v1/parse/", files=files, data={"mode": "text"}).status_code == 200
+        assert get_blob_store().lookup(digest).refcount == 0
+
+        job_id = client.post("/api/v1/parse_async", json={
+            "document_url": f"http://127.0.0.1:{server.server_port}/transient.pdf", "options": {"mode": "text"},
+        }).json()["job_id"]
+        for _ in range(200):
+            if client.get(f"/api/v1/jobs/{job_id}").json()["status"] == "succeeded":
+                break
+            time.sleep(0.05)
+        assert client.get(f"/api/v1/jobs/{job_id}").json()["status"] == "succeeded"
+        assert get_blob_store().lookup(digest).refcount == 0
+
+        client.post("/api/v1/upload", files=files)
+        streamed = client.post("/api/v1/parse/?stream=ndjson", files=files, data={"mode": "text"})
+        assert streamed.status_code == 200
+        assert client.post("/api/v1/parse/", files=files, data={"mode": "text"}).status_code == 200
+        assert get_blob_store().lookup(digest).refcount == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+        parser.shutdown_process_pool()
+
+def test_get_unknown_upload(client: TestClient):
+    response = client.get(f"/api/v1/upload/file_{'0' * 64}")
+    assert response.status_code == 404
+
 # Optional: Add a test for incorrect field name if desired
 # def test_upload_wrong_field_name(client: TestClient):
 #     test_filename = "wrong_field.txt"
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core import upload_sessions
+from app.core.blob_store import BlobStore
+from app.core.upload_sessions import MIN_CHUNK_SIZE, SessionStateError, UploadSessionStore, finalize_session, write_chunk
+
+CHUNK = MIN_CHUNK_SIZE
+
+
+def _open_session(client, data, name="doc.pdf", sha256=None):
+    response = client.post("/api/v1/upload/sessions", json={
+        "filename": name,
+        "size_bytes": len(data),
+        "sha256": sha256 or hashlib.sha256(data).hexdigest(),
+        "chunk_size": CHUNK,
+    })
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _put_chunk(client, session_id, data, index, **headers):
+    return client.put(f"/api/v1/upload/sessions/{session_id}/chunks/{index}",
+                      content=data[index * CHUNK:(index + 1) * CHUNK], headers=headers)
+
+
+def test_chunks_in_any_order_and_in_parallel(client):
+    data = os.urandom(4 * CHUNK + 1234)
+    session = _open_session(client, data, name="blob.bin")
+    assert session["chunk_count"] == 5
+    assert session["missing_chunks"] == [0, 1, 2, 3, 4]
+
+    # Chunks 4 and 1 first, then the rest concurrently
+    assert _put_chunk(client, session["session_id"], data, 4).status_code == 200
+    assert _put_chunk(client, session["session_id"], data, 1).status_code == 200
+    status = client.get(f"/api/v1/upload/sessions/{session['session_id']}").json()
+    assert status["received_ranges"] == [{"start": CHUNK, "end": 2 * CHUNK}, {"start": 4 * CHUNK, "end": len(data)}]
+    assert status["missing_chunks"] == [0, 2, 3]
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        responses = list(pool.map(lambda i: _put_chunk(client, session["session_id"], data, i), [3, 0, 2]))
+    assert [r.status_code for r in responses] == [200, 200, 200]
+
+    status = client.get(f"/api/v1/upload/sessions/{session['session_id']}").json()
+    assert status["received_ranges"] == [{"start": 0, "end": len(data)}]
+    assert status["received_bytes"] == len(data)
+
+    body = client.post(f"/api/v1/upload/sessions/{session['session_id']}/complete").json()
+    assert body["file_id"] == "file_" + hashlib.sha256(data).hexdigest()
+    assert body["size_bytes"] == len(data)
+    # Completing again is idempotent
+    again = client.post(f"/api/v1/upload/sessions/{session['session_id']}/complete").json()
+    assert again["file_id"] == body["file_id"]
+    assert client.get(f"/api/v1/upload/{body['file_id']}").status_code == 200
+
+
+def test_completed_session_is_parseable(client, make_pdf):
+    # Pad the PDF with a trailing comment so it spans several chunks
+    data = make_pdf(["resumable upload"]).read_bytes() + b"%" + b"x" * (2 * CHUNK) + b"\n"
+    session = _open_session(client, data)
+    for index in reversed(range(session["chunk_count"])):
+        assert _put_chunk(client, session["session_id"], data, index).status_code == 200
+    file_id = client.post(f"/api/v1/upload/sessions/{session['session_id']}/complete").json()["file_id"]
+
+    job_id = client.post("/api/v1/parse_async/", json={"document_url": file_id, "options": {"mode": "text"}}).json()["job_id"]
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "succeeded", job
+    assert "resumable upload" in job["result"]["pages"][0]["text"]
+
+
+def test_incomplete_or_corrupt_sessions_are_rejected(client):
+    data = os.urandom(2 * CHUNK)
+    session = _open_session(client, data, sha256="0" * 64)
+    session_id = session["session_id"]
+
+    assert _put_chunk(client, session_id, data, 0).status_code == 200
+    assert client.post(f"/api/v1/upload/sessions/{session_id}/complete").status_code == 409
+    # Wrong length, out-of-range index and a bad per-chunk hash
+    assert client.put(f"/api/v1/upload/sessions/{session_id}/chunks/1", content=b"short").status_code == 400
+    assert _put_chunk(client, session_id, data, 2).status_code == 400
+    assert _put_chunk(client, session_id, data, 1, **{"X-Chunk-SHA256": "f" * 64}).status_code == 422
+    assert client.get(f"/api/v1/upload/sessions/{session_id}").json()["missing_chunks"] == [1]
+
+    # Every chunk arrived, but the file does not match the declared hash: the session stays open
+    assert _put_chunk(client, session_id, data, 1).status_code == 200
+    assert client.post(f"/api/v1/upload/sessions/{session_id}/complete").status_code == 422
+    assert client.get(f"/api/v1/upload/sessions/{session_id}").json()["status"] == "open"
+
+    assert client.delete(f"/api/v1/upload/sessions/{session_id}").status_code == 200
+    assert client.get(f"/api/v1/upload/sessions/{session_id}").status_code == 404
+
+
+def test_session_size_limit(client, monkeypatch):
+    monkeypatch.setenv("MAX_UPLOAD_BYTES", str(CHUNK))
+    response = client.post("/api/v1/upload/sessions", json={
+        "filename": "big.pdf", "size_bytes": CHUNK + 1, "sha256": "0" * 64,
+    })
+    assert response.status_code == 413
+
+
+def test_sessions_survive_reopen_and_expire(tmp_path):
+    store = UploadSessionStore(tmp_path / "sessions")
+    session = store.create("doc.pdf", 3 * CHUNK, "a" * 64, CHUNK)
+    assert store.data_path(session.session_id).stat().st_size == 3 * CHUNK
+    store.record_chunk(session.session_id, 2, "b" * 64)
+    store.close()
+
+    store = UploadSessionStore(tmp_path / "sessions")
+    assert store.received_chunks(session.session_id) == [2]
+    assert store.sweep(3600) == 0
+    time.sleep(0.01)
+    assert store.sweep(0.001) == 1
+    assert store.get(session.session_id) is None
+    assert not store.data_path(session.session_id).exists()
+    store.close()
+
+
+async def _body(chunk, gate=None):
+    """Request body for write_chunk; with a `gate`, the rest of the chunk waits for it after the first KiB."""
+    if gate is None:
+        yield chunk
+        return
+    yield chunk[:1024]
+    await gate.wait()
+    yield chunk[1024:]
+
+
+def test_chunk_writes_in_flight_cannot_touch_a_completed_file(tmp_path, monkeypatch):
+    sessions, blobs = UploadSessionStore(tmp_path / "sessions"), BlobStore(tmp_path / "blobs")
+    data = os.urandom(2 * CHUNK)
+
+    async def resend_during_complete(session_id, lease_lapses):
+        session = sessions.get(session_id)
+        for index in (0, 1):
+            await write_chunk(sessions, session, index, _body(data[index * CHUNK:(index + 1) * CHUNK]), CHUNK)
+        gate = asyncio.Event()
+        # A re-send of chunk 0 with other bytes, stalled after its first KiB (nothing flushed yet)
+        resend = asyncio.create_task(write_chunk(sessions, session, 0, _body(os.urandom(CHUNK), gate), 4096))
+        await asyncio.sleep(0.05)
+        if not lease_lapses:
+            with pytest.raises(SessionStateError):
+                await asyncio.to_thread(finalize_session, sessions, blobs, session_id)
+            gate.set()
+            await resend
+            return None
+        await asyncio.sleep(0.1)
+        record, _ = await asyncio.to_thread(finalize_session, sessions, blobs, session_id)
+        gate.set()
+        with pytest.raises(SessionStateError):
+            await resend
+        return record
+
+    # Completion is refused while a chunk is being written
+    session = sessions.create("doc.pdf", len(data), hashlib.sha256(data).hexdigest(), CHUNK)
+    assert asyncio.run(resend_during_complete(session.session_id, lease_lapses=False)) is None
+    assert sessions.get(session.session_id).status == upload_sessions.OPEN
+
+    # A writer stalled past its lease no longer blocks completion, and cannot write into the stored blob
+    monkeypatch.setattr(upload_sessions, "WRITER_LEASE_SECONDS", 0.05)
+    session = sessions.create("doc.pdf", len(data), hashlib.sha256(data).hexdigest(), CHUNK)
+    record = asyncio.run(resend_during_complete(session.session_id, lease_lapses=True))
+    assert hashlib.sha256(blobs.path_for(record.digest).read_bytes()).hexdigest() == record.digest
+    sessions.close()
+    blobs.close()
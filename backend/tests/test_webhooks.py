@@ -0,0 +1,222 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+
+from app.core import webhooks
+from app.core.jobs import SUCCEEDED
+from app.core.webhooks import SIGNATURE_HEADER, WebhookDispatcher, WebhookStore, backoff_delay, verify_signature
+
+
+class Receiver:
+    """Local stand-in for a webhook receiver, reached through an ASGI transport."""
+
+    def __init__(self, fail_first=0, status=503, delay=0.0):
+        self.requests = []
+        self.fail_first = fail_first
+        self.status = status
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.app = FastAPI()
+
+        @self.app.post("/hook")
+        async def hook(request: Request):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                await asyncio.sleep(self.delay)
+                self.requests.append((dict(request.headers), await request.body()))
+                if len(self.requests) <= self.fail_first:
+                    return Response(status_code=self.status)
+                return {"ok": True}
+            finally:
+                self.active -= 1
+
+    @property
+    def transport(self):
+        return httpx.ASGITransport(app=self.app)
+
+    def events(self):
+        out = []
+        for _, body in self.requests:
+            payload = json.loads(body)
+            out.extend(payload["events"] if "events" in payload else [payload])
+        return out
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setenv("WEBHOOK_BACKOFF_BASE_SECONDS", "0.01")
+    monkeypatch.setenv("WEBHOOK_BACKOFF_MAX_SECONDS", "0.05")
+    monkeypatch.setenv("WEBHOOK_BATCH_WINDOW_SECONDS", "0.2")
+
+
+async def _run(store, receiver, enqueue, until, timeout=5.0):
+    dispatcher = WebhookDispatcher(store, poll_interval=0.05, transport=receiver.transport)
+    await dispatcher.start()
+    try:
+        await enqueue(dispatcher)
+        deadline = time.time() + timeout
+        while not until() and time.time() < deadline:
+            await asyncio.sleep(0.02)
+    finally:
+        await dispatcher.stop()
+
+
+def test_backoff_has_full_jitter_and_cap():
+    delays = [backoff_delay(attempt, 1.0, 8.0) for attempt in (1, 3, 10) for _ in range(200)]
+    assert all(0 <= d <= 1.0 for d in delays[:200])
+    assert all(0 <= d <= 4.0 for d in delays[200:400])
+    assert all(0 <= d <= 8.0 for d in delays[400:]) and max(delays[400:]) > 4.0
+
+
+def test_signed_delivery(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEBHOOK_SECRET", "s3cret")
+    store = WebhookStore(tmp_path / "webhooks.sqlite3")
+    receiver = Receiver()
+
+    async def enqueue(dispatcher):
+        await dispatcher.enqueue("http://receiver/hook", {"event": "job.succeeded", "job_id": "j1"})
+
+    asyncio.run(_run(store, receiver, enqueue, until=lambda: receiver.requests))
+
+    headers, body = receiver.requests[0]
+    assert verify_signature("s3cret", headers[SIGNATURE_HEADER.lower()], body)
+    assert not verify_signature("other", headers[SIGNATURE_HEADER.lower()], body)
+    assert json.loads(body)["job_id"] == "j1"
+    assert headers["x-docuparse-delivery"] == json.loads(body)["delivery_id"]
+    assert store.pending_count() == 0
+
+
+def test_retries_then_delivers(tmp_path):
+    store = WebhookStore(tmp_path / "webhooks.sqlite3")
+    receiver = Receiver(fail_first=2)
+
+    async def enqueue(dispatcher):
+        await dispatcher.enqueue("http://receiver/hook", {"event": "job.succeeded", "job_id": "j1"})
+
+    asyncio.run(_run(store, receiver, enqueue, until=lambda: store.pending_count() == 0 and receiver.requests))
+    assert len(receiver.requests) == 3
+    assert store.dead_letters() == []
+
+
+def test_dispatchers_sharing_an_outbox_deliver_once(tmp_path):
+    # One store and dispatcher per process, as with several uvicorn workers
+    stores = [WebhookStore(tmp_path / "webhooks.sqlite3") for _ in range(3)]
+    receiver = Receiver(delay=0.01)
+
+    async def run():
+        dispatchers = [WebhookDispatcher(store, poll_interval=0.02, transport=receiver.transport) for store in stores]
+        for dispatcher in dispatchers:
+            await dispatcher.start()
+        try:
+            for n in range(20):
+                await dispatchers[n % 3].enqueue("http://receiver/hook", {"event": "job.succeeded", "job_id": f"j{n}"})
+            deadline = time.time() + 5
+            while stores[0].pending_count() and time.time() < deadline:
+                await asyncio.sleep(0.02)
+            await asyncio.sleep(0.1)
+        finally:
+            for dispatcher in dispatchers:
+                await dispatcher.stop()
+
+    asyncio.run(run())
+    assert sorted(event["job_id"] for event in receiver.events()) == sorted(f"j{n}" for n in range(20))
+
+
+def test_dead_letters(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEBHOOK_MAX_ATTEMPTS", "3")
+    store = WebhookStore(tmp_path / "webhooks.sqlite3")
+    receiver = Receiver(fail_first=100)
+
+    async def enqueue(dispatcher):
+        await dispatcher.enqueue("http://receiver/hook", {"event": "job.failed", "job_id": "j1"})
+
+    asyncio.run(_run(store, receiver, enqueue, until=lambda: store.dead_letters()))
+    [dead] = store.dead_letters()
+    assert dead["attempts"] == 3 and dead["last_error"] == "HTTP 503"
+    assert len(receiver.requests) == 3
+
+    # Client errors are not retried
+    rejecting = Receiver(fail_first=100, status=400)
+    asyncio.run(_run(store, rejecting, enqueue, until=lambda: len(store.dead_letters()) == 2))
+    assert len(rejecting.requests) == 1
+
+    assert store.retry_dead_letter(dead["delivery_id"])
+    assert store.pending_count() == 1 and len(store.dead_letters()) == 1
+
+
+def test_batches_events_for_batching_endpoints(tmp_path):
+    store = WebhookStore(tmp_path / "webhooks.sqlite3")
+    store.upsert_endpoint("http://receiver/hook", "s", batch=True, max_batch_size=10, max_concurrency=1)
+    receiver = Receiver()
+
+    async def enqueue(dispatcher):
+        for n in range(5):
+            await dispatcher.enqueue("http://receiver/hook", {"event": "job.succeeded", "job_id": f"j{n}"})
+
+    asyncio.run(_run(store, receiver, enqueue, until=lambda: len(receiver.events()) == 5))
+    assert len(receiver.requests) == 1
+    assert [event["job_id"] for event in receiver.events()] == [f"j{n}" for n in range(5)]
+
+
+def test_per_endpoint_concurrency_limit(tmp_path):
+    store = WebhookStore(tmp_path / "webhooks.sqlite3")
+    store.upsert_endpoint("http://receiver/hook", None, batch=False, max_batch_size=1, max_concurrency=2)
+    receiver = Receiver(delay=0.05)
+
+    async def enqueue(dispatcher):
+        for n in range(8):
+            await dispatcher.enqueue("http://receiver/hook", {"event": "job.succeeded", "job_id": f"j{n}"})
+
+    asyncio.run(_run(store, receiver, enqueue, until=lambda: len(receiver.requests) == 8))
+    assert receiver.peak == 2
+
+
+@pytest.fixture
+def receiver(monkeypatch):
+    """Routes the app's webhook deliveries to a Receiver; requested before `client` starts the dispatcher."""
+    receiver = Receiver()
+    original_init = WebhookDispatcher.__init__
+
+    def init_with_receiver(self, store, poll_interval=0.05, transport=None):
+        original_init(self, store, poll_interval=poll_interval, transport=receiver.transport)
+    monkeypatch.setattr(WebhookDispatcher, "__init__", init_with_receiver)
+    return receiver
+
+
+@pytest.fixture
+def client(receiver, client):
+    client.receiver = receiver
+    return client
+
+
+def test_job_completion_is_delivered(client, make_pdf):
+    path = make_pdf(["webhook page"])
+    with open(path, "rb") as f:
+        file_id = client.post("/api/v1/upload", files={"file": ("a.pdf", f, "application/pdf")}).json()["file_id"]
+    secret = client.post("/api/v1/webhooks/configure", json={"url": "http://receiver/hook"}).json()["secret"]
+
+    response = client.post("/api/v1/parse_async/", json={
+        "document_url": file_id,
+        "webhook": {"mode": "direct", "url": "http://receiver/hook", "metadata": {"ref": 7}},
+    })
+    job_id = response.json()["job_id"]
+
+    deadline = time.time() + 10
+    while not client.receiver.requests and time.time() < deadline:
+        time.sleep(0.05)
+    headers, body = client.receiver.requests[0]
+    event = json.loads(body)
+    assert event["job_id"] == job_id and event["status"] == SUCCEEDED
+    assert event["metadata"] == {"ref": 7}
+    assert verify_signature(secret, headers[SIGNATURE_HEADER.lower()], body)
+
+
+def test_invalid_webhook_config_is_rejected(client):
+    response = client.post("/api/v1/parse_async/", json={"document_url": "file_x", "webhook": {"mode": "direct"}})
+    assert response.status_code == 422
@@ -1,9 +1,10 @@
 # frontend/app.py
 import streamlit as st
 import os
-import requests # Make sure 'requests' is in frontend/conda.yml
 import logging
 
+from utils.api_client import ApiError, DocuParseClient
+
 # Configure basic logging for the frontend too (optional)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,18 +15,38 @@ st.title("📄 DocuParse")
 # Get backend URL from environment variable set in docker-compose.yml
 backend_url = os.getenv("BACKEND_URL", "http://localhost:8000") # Default for local run
 
-st.write(f"Connecting to backend at: {backend_url}")
 
-# Simple check to see if backend is reachable
-try:
-    response = requests.get(f"{backend_url}/", timeout=5) # Added timeout
-    response.raise_for_status() # Raise an exception for bad status codes
-    st.success(f"Backend Connection Successful: {response.json().get('message', '')}")
-except requests.exceptions.RequestException as e:
-    st.error(f"Backend Connection Failed: {e}")
+@st.cache_resource
+def get_client(base_url: str) -> DocuParseClient:
+    # One pooled client (keep-alive connections + result cache) shared across reruns and sessions
+    return DocuParseClient(base_url)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def backend_status(base_url: str):
+    # Checked at most every 30s instead of on every rerun
+    client = get_client(base_url)
+    try:
+        return client.health().get("message", ""), client.is_ready(), None
+    except Exception as e:
+        return None, False, str(e)
+
+
+client = get_client(backend_url)
+
+st.write(f"Connecting to backend at: {backend_url}")
+message, ready, error = backend_status(backend_url)
+if error:
+    st.error(f"Backend Connection Failed: {error}")
+elif ready:
+    st.success(f"Backend Connection Successful: {message}")
+else:
+    st.warning(f"Backend is starting up: {message}")
 
 st.header("Upload Document")
 uploaded_file = st.file_uploader("Choose a PDF file", type="pdf")
+mode = st.selectbox("Parsing mode", ["text_and_tables", "text", "tables", "full"])
+ocr_enabled = st.checkbox("OCR scanned pages", value=False)
 
 if uploaded_file is not None:
     st.write("Filename:", uploaded_file.name)
@@ -34,29 +55,42 @@ if uploaded_file is not None:
 
     # Button to trigger sending the file to the backend
     if st.button("Parse Document"):
-        # Prepare the file for the POST request
-        files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
-        parse_endpoint = f"{backend_url}/api/v1/parse/upload"
+        options = {"mode": mode, "ocr_enabled": ocr_enabled}
+        progress = st.progress(0.0, text=f"Parsing {uploaded_file.name}...")
 
-        st.info(f"Sending {uploaded_file.name} to {parse_endpoint}...")
-        logger.info(f"Frontend: Sending {uploaded_file.name} to backend.")
+        def show_progress(job):
+            pages = job["progress"]
+            if pages["pages_total"]:
+                progress.progress(pages["pages_done"] / pages["pages_total"], text=f"Parsed {pages['pages_done']} of {pages['pages_total']} pages")
 
+        logger.info(f"Frontend: Parsing {uploaded_file.name} via the backend.")
         try:
-            parse_response = requests.post(parse_endpoint, files=files, timeout=30) # Added timeout
-            parse_response.raise_for_status()
-            st.success("File sent successfully!")
-            st.json(parse_response.json()) # Display backend response
-        except requests.exceptions.RequestException as e:
-            st.error(f"Error sending file to backend: {e}")
-            if e.response:
-                st.error(f"Backend response: {e.response.text}")
+            # Same file and options as before: served from the client's cache without a request
+            uploaded_file.seek(0)
+            st.session_state.parse_result = client.parse_document(uploaded_file, uploaded_file.name, options, on_progress=show_progress)
+            progress.progress(1.0, text="Done")
+            st.success("Document parsed successfully!")
+        except ApiError as e:
+            progress.empty()
+            st.error(f"Backend error: {e}")
         except Exception as e:
+            progress.empty()
             st.error(f"An unexpected error occurred: {e}")
 
 st.header("Results")
-# Placeholder for displaying results - clear previous results on new upload/parse
+# Results are kept in session state, so reruns (widget changes) re-render without re-parsing
 if 'parse_result' in st.session_state:
-    # Display logic here based on the structure of parse_result
-    st.json(st.session_state.parse_result)
+    result = st.session_state.parse_result
+    st.write(f"**{result.get('source_filename')}**: {result.get('page_count')} page(s), mode `{result.get('parsing_mode')}`")
+    if result.get("failed_pages"):
+        st.warning(f"Pages that could not be parsed: {result['failed_pages']}")
+    for page in result.get("pages", []):
+        with st.expander(f"Page {page.get('page_number')}"):
+            if page.get("text"):
+                st.text(page["text"])
+            for table in page.get("tables", []):
+                st.table(table.get("data") or [])
+    with st.expander("Raw JSON"):
+        st.json(result)
 else:
-    st.info("Parsing results will appear here.")
\ No newline at end of file
+    st.info("Parsing results will appear here.")
@@ -1 +1,300 @@
- 
\ No newline at end of file
+# frontend/utils/api_client.py
+"""
+Client for the DocuParse backend API.
+
+- One pooled keep-alive `requests.Session` per client (create it once, e.g.
+  with `st.cache_resource`), with retries on idempotent GETs only.
+- Uploads are streamed as multipart bodies read from the file in chunks,
+  so large files are never held in memory by the client.
+- Small documents are parsed with the synchronous /parse endpoint; larger
+  ones are uploaded (skipped when the server already stores the content)
+  and parsed with /parse_async, polling /jobs/{id} with adaptive backoff.
+- Results are cached by SHA-256 of the file plus the parse options, so a
+  Streamlit rerun re-renders from memory instead of re-parsing.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+FileSource = Union[str, Path, IO[bytes]]
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+CHUNK_SIZE = 1024 * 1024
+FILE_ID_PREFIX = "file_"
+
+
+class ApiError(Exception):
+    """The backend answered with an error status, or a job failed."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# --- Streaming multipart --- #
+
+class MultipartStream:
+    """
+    A multipart/form-data body read lazily from `fileobj`.
+
+    Its length is known up front, so requests sends a Content-Length and
+    streams the body with `read()` instead of building it in memory.
+    """
+
+    def __init__(self, fields: Dict[str, Any], file_field: str, filename: str, fileobj: IO[bytes], size: int, content_type: str):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        head = b"".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+            for name, value in fields.items() if value is not None
+        )
+        head += (
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        self._parts: List[Union[bytes, IO[bytes]]] = [head, fileobj, f"\r\n--{self.boundary}--\r\n".encode("ascii")]
+        self._length = len(head) + size + len(self._parts[2])
+        self._current = io.BytesIO(head)
+        self._index = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        size = CHUNK_SIZE if size is None or size < 0 else size
+        while True:
+            chunk = self._current.read(size)
+            if chunk or self._index == len(self._parts) - 1:
+                return chunk
+            self._index += 1
+            part = self._parts[self._index]
+            self._current = io.BytesIO(part) if isinstance(part, bytes) else part
+
+
+def _open_source(source: FileSource) -> Tuple[IO[bytes], bool]:
+    """Return (file object, opened_here) for a path or an already open binary file."""
+    if isinstance(source, (str, Path)):
+        return open(source, "rb"), True
+    return source, False
+
+
+def _size_and_digest(fileobj: IO[bytes]) -> Tuple[int, str]:
+    """Hash the file in chunks and rewind it."""
+    start = fileobj.tell()
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(start)
+    return size, digest.hexdigest()
+
+
+# --- Result cache --- #
+
+class ResultCache:
+    """Small LRU of parse results keyed by file hash and options."""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+
+    @staticmethod
+    def key(digest: str, options: Dict[str, Any]) -> str:
+        return digest + ":" + json.dumps(options, sort_keys=True, separators=(",", ":"))
+
+    def get(self, key: str) -> Optional[Any]:
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# --- Client --- #
+
+class DocuParseClient:
+    """Pooled client for the backend. Safe to share across Streamlit reruns and sessions."""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool_size: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 300.0,
+        sync_max_bytes: int = 5 * 1024 * 1024,
+        cache_entries: int = 32,
+    ):
+        self.base_url = (base_url or os.getenv("BACKEND_URL", "http://localhost:8000")).rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        # Documents up to this size use the synchronous /parse endpoint
+        self.sync_max_bytes = sync_max_bytes
+        self.cache = ResultCache(cache_entries)
+        self.session = requests.Session()
+        # Retry connection errors and gateway errors on GETs only; uploads are never replayed, and a
+        # 503 from /ready must be reported rather than retried
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 504), allowed_methods=frozenset({"GET"}))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.request(method, self._url(path), **kwargs)
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail", response.text)
+            except ValueError:
+                detail = response.text
+            raise ApiError(f"{method} {path} failed ({response.status_code}): {detail}", response.status_code)
+        return response
+
+    # --- Endpoints --- #
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/", timeout=(self.timeout[0], 5)).json()
+
+    def is_ready(self) -> bool:
+        try:
+            self._request("GET", "/ready", timeout=(self.timeout[0], 5))
+            return True
+        except (ApiError, requests.RequestException):
+            return False
+
+    def get_upload(self, file_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._request("GET", f"/api/v1/upload/{file_id}").json()
+        except ApiError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    def upload(self, source: FileSource, filename: str, content_type: str = "application/pdf") -> Dict[str, Any]:
+        """Stream a file to /api/v1/upload."""
+        fileobj, opened = _open_source(source)
+        try:
+            size, _ = _size_and_digest(fileobj)
+            return self._post_file("/api/v1/upload", {}, filename, fileobj, size, content_type)
+        finally:
+            if opened:
+                fileobj.close()
+
+    def _post_file(self, path: str, fields: Dict[str, Any], filename: str, fileobj: IO[bytes], size: int, content_type: str) -> Dict[str, Any]:
+        body = MultipartStream(fields, "file", filename, fileobj, size, content_type)
+        headers = {"Content-Type": body.content_type, "Content-Length": str(len(body))}
+        return self._request("POST", path, data=body, headers=headers).json()
+
+    def parse_async(self, document_url: str, options: Optional[Dict[str, Any]] = None, priority: int = 0) -> str:
+        body = {"document_url": document_url, "options": options or {}, "priority": priority}
+        return self._request("POST", "/api/v1/parse_async/", json=body).json()["job_id"]
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        return self._request("GET", f"/api/v1/jobs/{job_id}").json()
+
+    def wait_for_job(
+        self,
+        job_id: str,
+        timeout: float = 1800.0,
+        on_progress: Optional[ProgressCallback] = None,
+        min_interval: float = 0.25,
+        max_interval: float = 5.0,
+    ) -> Dict[str, Any]:
+        """
+        Poll a job until it finishes. The interval grows by 1.5x while nothing
+        changes and drops back to `min_interval` whenever progress advances,
+        so short jobs return quickly and long ones are not polled hot.
+        """
+        deadline = time.monotonic() + timeout
+        interval = min_interval
+        last_progress = None
+        while True:
+            job = self.get_job(job_id)
+            if job["status"] == "succeeded":
+                return job
+            if job["status"] == "failed":
+                raise ApiError(f"Job {job_id} failed: {job.get('error')}")
+            progress = (job["status"], job["progress"]["pages_done"])
+            if progress != last_progress:
+                last_progress = progress
+                interval = min_interval
+                if on_progress is not None:
+                    on_progress(job)
+            else:
+                interval = min(interval * 1.5, max_interval)
+            if time.monotonic() + interval > deadline:
+                raise ApiError(f"Job {job_id} did not finish within {timeout:.0f}s")
+            time.sleep(interval)
+
+    # --- High-level parse --- #
+
+    def parse_document(
+        self,
+        source: FileSource,
+        filename: str,
+        options: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Parse a document, returning the ParseResponse JSON.
+
+        Cached results (same bytes, same options) are returned without a
+        request. Small files go through the synchronous endpoint in one round
+        trip; larger ones are uploaded once, parsed asynchronously and polled.
+        """
+        options = {key: value for key, value in (options or {}).items() if value is not None}
+        fileobj, opened = _open_source(source)
+        try:
+            size, digest = _size_and_digest(fileobj)
+            cache_key = ResultCache.key(digest, options)
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Serving cached parse result for {filename}")
+                    return cached
+
+            if size <= self.sync_max_bytes:
+                result = self._post_file("/api/v1/parse/", options, filename, fileobj, size, "application/pdf")
+            else:
+                result = self._parse_large(fileobj, filename, size, digest, options, on_progress)
+        finally:
+            if opened:
+                fileobj.close()
+
+        self.cache.put(cache_key, result)
+        return result
+
+    def _parse_large(self, fileobj: IO[bytes], filename: str, size: int, digest: str, options: Dict[str, Any], on_progress: Optional[ProgressCallback]) -> Dict[str, Any]:
+        # File IDs are content addressed: skip the upload when the server already has the bytes
+        file_id = FILE_ID_PREFIX + digest
+        if self.get_upload(file_id) is None:
+            file_id = self._post_file("/api/v1/upload", {}, filename, fileobj, size, "application/pdf")["file_id"]
+        job_id = self.parse_async(file_id, options)
+        logger.info(f"Parsing {filename} ({size} bytes) as job {job_id}")
+        result = self.wait_for_job(job_id, on_progress=on_progress)["result"]
+        result["source_filename"] = filename
+        return result